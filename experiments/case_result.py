@@ -0,0 +1,83 @@
+"""
+单次生成的结果记录
+
+experiment_runner 与 simple_experiment 共用: 由 ollama_client.generate_stream 的结果与
+ResourceMonitor 计算 token 数、吞吐、分阶段能耗与每 token 能耗, 整理为结果字典。
+token 数优先取服务端 eval_count, 缺失时按模型分词器计数 (与 run_experiments 一样传入模型 family)。
+"""
+
+from datetime import datetime
+
+from experiments import ollama_client
+from experiments.token_counter import count_tokens
+
+def token_metrics(response, model):
+    """
+    Returns:
+        tuple: (token数, 计数方式, 吞吐 tokens/s)
+    """
+    gen_text = response["response"]
+    eval_count = response.get("eval_count")
+    eval_dur_ns = response.get("eval_duration")
+    if eval_count:
+        token_count, token_method = eval_count, "ollama_eval_count"
+    else:
+        # 使用模型对应的分词器计数, 分词器不可用时退回近似估计
+        family = ollama_client.model_family(model, response.get("host"))
+        token_count, token_method = count_tokens(gen_text, model, family)
+    if eval_count and eval_dur_ns:
+        throughput = eval_count / (eval_dur_ns / 1e9)
+    else:
+        gen_s = response["total_time"] - (response.get("first_token_seconds") or 0)
+        throughput = token_count / gen_s if gen_s > 0 else 0
+    return token_count, token_method, throughput
+
+def build_result(model, prompt, task_type, response, mon, max_tokens, temperature, quality=None):
+    """
+    整理单次实验的结果
+
+    Args:
+        response (dict): generate_stream 的结果, 另含 total_time (秒)
+        mon (ResourceMonitor): 已停止的资源监控器
+        quality (dict, optional): 质量评估结果, 提供时写入 quality 字段
+
+    Returns:
+        dict: 实验结果
+    """
+    total_time = response["total_time"]
+    token_count, token_method, throughput = token_metrics(response, model)
+    # 按生成阶段 (load / prompt_eval / eval) 拆分能耗
+    phase_metrics = mon.phase_summary(ollama_client.phase_windows(response))
+    gpu_energy_j = mon.energy_between(response["t_request"], response["t_done"])[0]
+    result = {
+        "model": model,
+        "prompt": prompt,
+        "task_type": task_type,
+        "generated_text": response["response"],
+        "latency_seconds": total_time,
+        "throughput_tokens_per_sec": throughput,
+        "first_token_seconds": response.get("first_token_seconds"),
+        "token_count": token_count,
+        "token_count_method": token_method,
+        "api_metrics": ollama_client.api_metrics(response),
+        "performance": {
+            "total_time_seconds": total_time,
+            "first_token_seconds": response.get("first_token_seconds"),
+            "token_count": token_count,
+            "token_count_method": token_method,
+            "throughput_tokens_per_sec": throughput
+        },
+        "resources": mon.resource_stats(),
+        "system_metrics_summary": mon.summary(),
+        "phase_metrics": phase_metrics,
+        "gpu_energy_j": gpu_energy_j,
+        "energy_j_per_token": (gpu_energy_j / token_count) if token_count else None
+    }
+    if quality is not None:
+        result["quality"] = quality
+    result["metadata"] = {
+        "timestamp": datetime.now().isoformat(),
+        "max_tokens": max_tokens,
+        "temperature": temperature
+    }
+    return result
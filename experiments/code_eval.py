@@ -0,0 +1,354 @@
+"""
+基于执行的代码质量评估
+
+从生成文本中抽取Python代码, 在受限子进程中运行用例里定义的单元测试,
+统计 pass@k、运行时间与峰值内存。用例格式 (test_cases.json 中的 unit_tests 字段):
+
+    "unit_tests": {
+        "entry_point": "fibonacci",
+        "tests": ["assert fibonacci(10) == 55", ...],
+        "timeout": 10
+    }
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import signal
+import hashlib
+import argparse
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_RESULT_MARKER = "__CODE_EVAL_RESULT__"
+
+# 子进程内执行的测试桩: 设置资源限制 (argv[1], 在子进程自身中设置, 不使用 preexec_fn),
+# 屏蔽网络, 吞掉候选代码的输出, 逐条执行测试并记录耗时与峰值内存
+_HARNESS = r'''
+import io, sys, json, time, socket
+try:
+    import resource
+    _lim = json.loads(sys.argv[1])
+    _cpu = int(_lim["cpu_seconds"])
+    _mem = int(_lim["memory_mb"]) * 1024 * 1024
+    for _res, _val in (
+        (resource.RLIMIT_CPU, (_cpu, _cpu + 1)),
+        (resource.RLIMIT_AS, (_mem, _mem)),
+        (resource.RLIMIT_FSIZE, (int(_lim["fsize_mb"]) * 1024 * 1024,) * 2),
+        (resource.RLIMIT_NOFILE, (int(_lim["nofile"]),) * 2),
+        (resource.RLIMIT_CORE, (0, 0)),
+    ):
+        try:
+            resource.setrlimit(_res, _val)
+        except Exception:
+            pass
+except ImportError:
+    resource = None
+def _deny(*a, **k):
+    raise OSError("network disabled in sandbox")
+for _n in ("connect", "connect_ex", "bind", "sendto"):
+    setattr(socket.socket, _n, _deny)
+socket.create_connection = _deny
+socket.getaddrinfo = _deny
+if resource is not None:
+    def _rss_mb():
+        r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return r / 1024 / 1024 if sys.platform == "darwin" else r / 1024
+else:
+    def _rss_mb():
+        return None
+payload = json.loads(sys.stdin.read())
+real_stdout = sys.stdout
+sys.stdout = io.StringIO()
+sys.stderr = io.StringIO()
+res = {"loaded": False, "load_error": None, "tests": [], "baseline_rss_mb": _rss_mb()}
+g = {"__name__": "__candidate__"}
+t0 = time.perf_counter()
+try:
+    exec(compile(payload["code"], "solution.py", "exec"), g)
+    res["loaded"] = True
+except BaseException as e:
+    res["load_error"] = type(e).__name__ + ": " + str(e)[:200]
+res["load_seconds"] = time.perf_counter() - t0
+if res["loaded"]:
+    for src in payload["tests"]:
+        t1 = time.perf_counter()
+        err = None
+        try:
+            exec(compile(src, "test.py", "exec"), dict(g))
+        except BaseException as e:
+            err = type(e).__name__ + ": " + str(e)[:200]
+        res["tests"].append({"passed": err is None, "error": err, "seconds": time.perf_counter() - t1})
+res["peak_rss_mb"] = _rss_mb()
+real_stdout.write("\n" + MARKER + json.dumps(res) + "\n")
+real_stdout.flush()
+'''.replace("MARKER", repr(_RESULT_MARKER))
+
+DEFAULT_LIMITS = {"timeout": 10.0, "cpu_seconds": 10, "memory_mb": 512, "fsize_mb": 16, "nofile": 64}
+# 与机器负载等偶发因素有关的结果, 只在进程内缓存, 不写入磁盘缓存 (下次运行重试)
+TRANSIENT_STATUSES = ("timeout", "crashed")
+
+def extract_code(text, entry_point=None):
+    """抽取代码块; 指定 entry_point 时优先选择定义了该函数的代码块"""
+    blocks = re.findall(r"```(?:python|py)?[ \t]*\n(.*?)```", text or "", re.S | re.I)
+    if not blocks:
+        return ""
+    if entry_point:
+        pat = re.compile(r"^\s*def\s+" + re.escape(entry_point) + r"\s*\(", re.M)
+        for b in blocks:
+            if pat.search(b):
+                return b
+    return blocks[0]
+
+def pass_at_k(n, c, k):
+    """无偏 pass@k 估计: 1 - C(n-c, k) / C(n, k)"""
+    if k > n:
+        return None
+    if n - c < k:
+        return 1.0
+    return 1.0 - math.prod((n - c - i) / (n - i) for i in range(k))
+
+def _kill_tree(p):
+    """结束子进程及其派生的进程 (POSIX 下子进程为独立会话的进程组组长)"""
+    if os.name == "posix":
+        try:
+            os.killpg(p.pid, signal.SIGKILL)
+        except OSError:
+            pass
+    else:
+        p.kill()
+
+def run_sandboxed(code, tests, limits=None):
+    """在独立子进程中执行代码与测试, 返回单个样本的执行结果"""
+    lim = dict(DEFAULT_LIMITS)
+    lim.update(limits or {})
+    env = {"PYTHONHASHSEED": "0", "PYTHONDONTWRITEBYTECODE": "1", "PYTHONIOENCODING": "utf-8",
+           "http_proxy": "http://127.0.0.1:9", "https_proxy": "http://127.0.0.1:9", "no_proxy": ""}
+    if os.name == "nt":
+        env["SYSTEMROOT"] = os.environ.get("SYSTEMROOT", "")
+    payload = json.dumps({"code": code, "tests": list(tests)})
+    with tempfile.TemporaryDirectory(prefix="code_eval_") as cwd:
+        # 线程池中调用: 不使用 preexec_fn (fork 与 exec 之间可能死锁), 资源限制由测试桩设置
+        with subprocess.Popen(
+            [sys.executable, "-I", "-c", _HARNESS, json.dumps(lim)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+            start_new_session=os.name == "posix",
+        ) as p:
+            try:
+                stdout, stderr = p.communicate(payload.encode("utf-8"), timeout=float(lim["timeout"]))
+            except subprocess.TimeoutExpired:
+                _kill_tree(p)
+                p.wait()
+                return {"status": "timeout", "passed": False, "tests_passed": 0, "tests_total": len(tests),
+                        "runtime_seconds": None, "peak_memory_mb": None, "error": "wall timeout"}
+            finally:
+                # 候选代码派生的后台进程同样结束
+                _kill_tree(p)
+    out = stdout.decode("utf-8", errors="ignore")
+    pos = out.rfind(_RESULT_MARKER)
+    if pos < 0:
+        # 被 rlimit 杀死 (SIGXCPU/SIGKILL) 或解释器异常退出
+        err = stderr.decode("utf-8", errors="ignore").strip().splitlines()
+        if p.returncode < 0:
+            try:
+                msg = f"killed by {signal.Signals(-p.returncode).name}"
+            except ValueError:
+                msg = f"killed by signal {-p.returncode}"
+        else:
+            msg = err[-1] if err else f"exit code {p.returncode}"
+        return {"status": "crashed", "passed": False, "tests_passed": 0, "tests_total": len(tests),
+                "runtime_seconds": None, "peak_memory_mb": None, "error": msg[:200]}
+    r = json.loads(out[pos + len(_RESULT_MARKER):].strip().splitlines()[0])
+    n_pass = sum(1 for t in r["tests"] if t["passed"])
+    first_err = next((t["error"] for t in r["tests"] if not t["passed"]), None)
+    peak = r.get("peak_rss_mb")
+    base = r.get("baseline_rss_mb")
+    return {
+        "status": "ok" if r["loaded"] else "load_error",
+        "passed": r["loaded"] and n_pass == len(tests) and len(tests) > 0,
+        "tests_passed": n_pass,
+        "tests_total": len(tests),
+        "runtime_seconds": sum(t["seconds"] for t in r["tests"]) if r["loaded"] else None,
+        "peak_memory_mb": peak,
+        "peak_memory_delta_mb": (peak - base) if peak is not None and base is not None else None,
+        "error": r.get("load_error") or first_err
+    }
+
+class CodeEvaluator:
+    """子进程沙箱池: 按代码哈希缓存结果, 多核并行执行"""
+
+    def __init__(self, max_workers=None, cache_dir=None, limits=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache_dir = cache_dir
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self._memo = {}
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _key(self, code, tests, limits):
+        h = hashlib.sha256()
+        h.update(json.dumps({"code": code, "tests": list(tests), "limits": limits}, sort_keys=True).encode("utf-8"))
+        return h.hexdigest()
+
+    def _cache_get(self, key):
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+        if self.cache_dir:
+            p = os.path.join(self.cache_dir, key + ".json")
+            try:
+                with open(p, "r", encoding="utf-8") as f:
+                    r = json.load(f)
+                with self._lock:
+                    self._memo[key] = r
+                return r
+            except Exception:
+                return None
+        return None
+
+    def _cache_put(self, key, r):
+        with self._lock:
+            self._memo[key] = r
+        if self.cache_dir and r["status"] not in TRANSIENT_STATUSES:
+            p = os.path.join(self.cache_dir, key + ".json")
+            tmp = p + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(r, f)
+                os.replace(tmp, p)
+            except Exception:
+                pass
+
+    def evaluate(self, code, tests, limits=None):
+        return self.evaluate_many([(code, tests, limits)])[0]
+
+    def evaluate_many(self, items):
+        """items: [(code, tests, limits_or_None), ...]; 相同代码只执行一次"""
+        keys = []
+        todo = {}
+        for code, tests, limits in items:
+            lim = dict(self.limits)
+            lim.update(limits or {})
+            k = self._key(code, tests, lim)
+            keys.append(k)
+            if k not in todo and self._cache_get(k) is None:
+                todo[k] = (code, tests, lim)
+        if todo:
+            def job(k):
+                code, tests, lim = todo[k]
+                if not code.strip():
+                    r = {"status": "no_code", "passed": False, "tests_passed": 0, "tests_total": len(tests),
+                         "runtime_seconds": None, "peak_memory_mb": None, "error": "no code block found"}
+                else:
+                    r = run_sandboxed(code, tests, lim)
+                r["code_sha256"] = hashlib.sha256(code.encode("utf-8")).hexdigest()
+                self._cache_put(k, r)
+                return r
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(todo))) as ex:
+                list(ex.map(job, list(todo)))
+        return [dict(self._cache_get(k)) for k in keys]
+
+    def score_samples(self, texts, unit_tests, ks=(1, 5, 10)):
+        """对同一用例的n个生成样本评分, 返回每个样本的结果与聚合的 pass@k"""
+        spec = unit_tests or {}
+        tests = spec.get("tests") or []
+        limits = {"timeout": spec["timeout"]} if spec.get("timeout") else None
+        codes = [extract_code(t, spec.get("entry_point")) for t in texts]
+        samples = self.evaluate_many([(c, tests, limits) for c in codes])
+        n = len(samples)
+        c = sum(1 for s in samples if s["passed"])
+        ok = [s for s in samples if s["passed"]]
+        return {
+            "n": n,
+            "passed": c,
+            "pass_at_k": {f"pass@{k}": pass_at_k(n, c, k) for k in ks if k <= n},
+            "runtime_seconds_mean": (sum(s["runtime_seconds"] for s in ok) / len(ok)) if ok else None,
+            "peak_memory_mb_max": max((s["peak_memory_mb"] for s in ok if s["peak_memory_mb"] is not None), default=None),
+            "samples": samples
+        }
+
+_default_evaluator = None
+
+def get_evaluator():
+    global _default_evaluator
+    if _default_evaluator is None:
+        cache = os.environ.get("CODE_EVAL_CACHE_DIR", os.path.join(tempfile.gettempdir(), "genai_code_eval_cache"))
+        _default_evaluator = CodeEvaluator(cache_dir=cache)
+    return _default_evaluator
+
+def _task_of(rec, fname):
+    md = rec.get("metadata") or {}
+    return md.get("task") or fname.split("_")[0]
+
+def evaluate_experiment_dir(exp_dir, ks=(1, 5, 10), max_workers=None):
+    """对实验目录中的代码任务输出做事后执行评估, 按 (模型, 用例) 汇总 pass@k"""
+    with open(os.path.join(exp_dir, "test_cases.json"), "r", encoding="utf-8") as f:
+        cases = json.load(f)
+    code_cases = {i: c for i, c in enumerate(cases) if c.get("unit_tests")}
+    if not code_cases:
+        print("test_cases.json 中没有定义 unit_tests 的用例")
+        return []
+    groups = {}
+    raw_base = os.path.join(exp_dir, "raw")
+    for model_dir in sorted(os.listdir(raw_base)):
+        p = os.path.join(raw_base, model_dir)
+        if not os.path.isdir(p):
+            continue
+        for fname in sorted(os.listdir(p)):
+            if not fname.endswith(".json"):
+                continue
+            with open(os.path.join(p, fname), "r", encoding="utf-8") as f:
+                rec = json.load(f)
+            if _task_of(rec, fname) != "code":
+                continue
+            ci = (rec.get("metadata") or {}).get("case_index")
+            if ci is None and len(code_cases) == 1:
+                ci = next(iter(code_cases))
+            if ci not in code_cases:
+                continue
+            groups.setdefault((rec.get("model"), ci), []).append(rec.get("generated_text", ""))
+    ev = CodeEvaluator(max_workers=max_workers, cache_dir=os.path.join(exp_dir, "summary", ".code_eval_cache"))
+    rows = []
+    for (model, ci), texts in sorted(groups.items(), key=lambda x: (str(x[0][0]), x[0][1])):
+        s = ev.score_samples(texts, code_cases[ci]["unit_tests"], ks=ks)
+        row = {"model": model, "case_index": ci, "n": s["n"], "passed": s["passed"]}
+        for k in ks:
+            row[f"pass@{k}"] = s["pass_at_k"].get(f"pass@{k}")
+        row["runtime_seconds_mean"] = s["runtime_seconds_mean"]
+        row["peak_memory_mb_max"] = s["peak_memory_mb_max"]
+        rows.append(row)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="对实验目录中的代码生成结果做基于执行的评估")
+    parser.add_argument("--exp-dir", required=True)
+    parser.add_argument("--k", nargs="+", type=int, default=[1, 5, 10])
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+    rows = evaluate_experiment_dir(args.exp_dir, ks=tuple(args.k), max_workers=args.workers)
+    if not rows:
+        return 1
+    out = os.path.join(args.exp_dir, "summary", "code_exec.csv")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    cols = list(rows[0].keys())
+    with open(out, "w", encoding="utf-8") as f:
+        f.write(",".join(cols) + "\n")
+        for r in rows:
+            f.write(",".join("" if r[c] is None else str(r[c]) for c in cols) + "\n")
+    for r in rows:
+        print(r)
+    print("执行评估写入:", out)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
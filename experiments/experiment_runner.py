@@ -9,7 +9,7 @@ GenAI模型能效评级体系实验执行脚本
 import subprocess
 import time
 import json
-import psutil
+import queue
 import threading
 from datetime import datetime
 import argparse
@@ -19,6 +19,11 @@ import sys
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from experiments import ollama_client
+from experiments.case_result import build_result
+from experiments.monitor import ResourceMonitor
+from experiments.result_sink import open_sink
+
 try:
     # 尝试从conda环境导入BARTScore
     import sys
@@ -37,19 +42,52 @@ except Exception as e:
     print(f"警告: BARTScore初始化时出错: {e}，将跳过质量评估")
     BARTSCORE_AVAILABLE = False
 
+class StageStats:
+    """实验套件各阶段的处理耗时统计, blocked 为结果放入下游队列时的阻塞时间"""
+    def __init__(self, workers):
+        self.workers = max(1, workers)
+        self.count = 0
+        self.busy = 0.0
+        self.max = 0.0
+        self.blocked = 0.0
+        self._lock = threading.Lock()
+    
+    def add(self, busy, blocked=0.0):
+        with self._lock:
+            self.count += 1
+            self.busy += busy
+            self.max = max(self.max, busy)
+            self.blocked += blocked
+    
+    def to_dict(self, wall_seconds):
+        return {
+            "workers": self.workers,
+            "count": self.count,
+            "busy_seconds": self.busy,
+            "avg_seconds": self.busy / self.count if self.count else 0,
+            "max_seconds": self.max,
+            "blocked_seconds": self.blocked,
+            "utilization": self.busy / (wall_seconds * self.workers) if wall_seconds > 0 else 0
+        }
+
 class ExperimentRunner:
-    def __init__(self, output_dir="./results"):
+    def __init__(self, output_dir="./results", ollama_host=None, keep_alive=None):
         """
         初始化实验运行器
         
         Args:
             output_dir (str): 结果输出目录
+            ollama_host (str, optional): Ollama服务地址，默认取 OLLAMA_HOST 或 http://localhost:11434
+            keep_alive (str, optional): 生成后模型保留时长，None 表示使用服务端默认值
         """
         self.output_dir = output_dir
+        self.ollama_host = ollama_host
+        self.keep_alive = keep_alive
         os.makedirs(self.output_dir, exist_ok=True)
         
-        # 初始化BARTScore评估器（如果可用）
+        # 初始化BARTScore评估器（如果可用）; 流水线模式下多个质量评估线程共用, 评分时加锁
         self.bart_scorer = None
+        self._bart_lock = threading.Lock()
         if BARTSCORE_AVAILABLE:
             try:
                 self.bart_scorer = BARTScorer(device='cuda:0', checkpoint='facebook/bart-large-cnn')
@@ -61,14 +99,8 @@ class ExperimentRunner:
     def check_ollama_service(self):
         """检查Ollama服务是否运行"""
         try:
-            result = subprocess.run(["ollama", "--version"], 
-                                  capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
-                print(f"Ollama版本: {result.stdout.strip()}")
-                return True
-            else:
-                print("Ollama服务未运行或不可访问")
-                return False
+            print(f"Ollama版本: {ollama_client.version(self.ollama_host)}")
+            return True
         except Exception as e:
             print(f"检查Ollama服务时出错: {e}")
             return False
@@ -93,96 +125,35 @@ class ExperimentRunner:
             print(f"重启Ollama服务时出错: {e}")
             return False
     
-    def call_ollama_generate(self, model, prompt, max_tokens=500, temperature=0.7):
+    def call_ollama_generate(self, model, prompt, max_tokens=500, temperature=0.7, host=None):
         """
-        调用Ollama API生成文本
+        通过流式HTTP接口调用Ollama生成文本
         
         Args:
             model (str): 模型名称
             prompt (str): 输入提示
             max_tokens (int): 最大token数
             temperature (float): 温度参数
+            host (str, optional): Ollama服务地址，默认使用 self.ollama_host
             
         Returns:
-            dict: 生成结果和性能数据
+            dict: 生成结果、首token时间和服务端各阶段耗时
         """
         print(f"正在调用模型 {model} 生成文本...")
         
-        cmd = f'ollama run {model} --max-tokens={max_tokens} --temperature={temperature} "{prompt}"'
-        
+        options = {"num_predict": max_tokens, "temperature": temperature}
         start_time = time.time()
         try:
-            result = subprocess.run(
-                cmd,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=300  # 5分钟超时
+            api = ollama_client.generate_stream(
+                model, prompt, options=options, keep_alive=self.keep_alive,
+                host=host or self.ollama_host, timeout=300  # 5分钟超时
             )
-            end_time = time.time()
-            
-            if result.returncode != 0:
-                raise Exception(f"Ollama调用失败: {result.stderr}")
-            
-            return {
-                "response": result.stdout.strip(),
-                "total_time": end_time - start_time,
-                "success": True
-            }
-        except subprocess.TimeoutExpired:
-            end_time = time.time()
-            raise Exception(f"Ollama调用超时 ({end_time - start_time:.2f}秒)")
         except Exception as e:
             end_time = time.time()
             raise Exception(f"Ollama调用异常: {str(e)} (耗时: {end_time - start_time:.2f}秒)")
-    
-    def monitor_resources(self, duration):
-        """
-        监控系统资源使用情况
-        
-        Args:
-            duration (float): 监控持续时间（秒）
-            
-        Returns:
-            tuple: (资源数据字典, 监控线程)
-        """
-        resource_data = {
-            "cpu_percent": [],
-            "memory_percent": [],
-            "gpu_utilization": [],
-            "gpu_memory_used": []
-        }
-        
-        def collect():
-            """资源收集函数"""
-            for _ in range(int(duration * 2)):  # 每0.5秒采样一次
-                # CPU和内存使用率
-                cpu_percent = psutil.cpu_percent(interval=0.1)
-                memory_percent = psutil.virtual_memory().percent
-                resource_data["cpu_percent"].append(cpu_percent)
-                resource_data["memory_percent"].append(memory_percent)
-                
-                # GPU监控（如果可用）
-                try:
-                    import pynvml
-                    pynvml.nvmlInit()
-                    handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-                    util = pynvml.nvmlDeviceGetUtilizationRates(handle)
-                    mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-                    
-                    resource_data["gpu_utilization"].append(util.gpu)
-                    resource_data["gpu_memory_used"].append(mem_info.used / 1024 / 1024)  # MB
-                except:
-                    # 如果GPU监控不可用，添加默认值
-                    if resource_data["gpu_utilization"]:  # 非空时才添加
-                        resource_data["gpu_utilization"].append(0)
-                        resource_data["gpu_memory_used"].append(0)
-                
-                time.sleep(0.5)
-        
-        monitor_thread = threading.Thread(target=collect)
-        monitor_thread.start()
-        return resource_data, monitor_thread
+        api["total_time"] = api["t_done"] - api["t_request"]
+        api["success"] = True
+        return api
     
     def evaluate_quality(self, generated_text, reference_text=None):
         """
@@ -205,7 +176,8 @@ class ExperimentRunner:
         try:
             if reference_text:
                 # 有参考文本时的评估
-                scores = self.bart_scorer.score([reference_text], [generated_text])
+                with self._bart_lock:
+                    scores = self.bart_scorer.score([reference_text], [generated_text])
                 return {
                     "bartscore": scores[0],
                     "has_reference": True
@@ -243,120 +215,260 @@ class ExperimentRunner:
         """
         print(f"\n开始实验: 模型={model}, 任务类型={task_type}")
         
+        generated = self.generate_case(model, prompt, max_tokens, temperature)
+        if generated is None:
+            return None
+        response, mon = generated
+        return self.finalize_result(model, prompt, task_type, response, mon,
+                                    reference_text, max_tokens, temperature)
+    
+    def generate_case(self, model, prompt, max_tokens=500, temperature=0.7, host=None):
+        """
+        实验的生成阶段: 在资源监控下调用模型
+        
+        Args:
+            model (str): 模型名称
+            prompt (str): 输入提示
+            max_tokens (int): 最大token数
+            temperature (float): 温度参数
+            host (str, optional): Ollama服务地址，默认使用 self.ollama_host
+            
+        Returns:
+            tuple: (生成结果, ResourceMonitor)，生成失败时返回 None
+        """
         # 重启Ollama服务（可选，根据需要启用）
         # self.restart_ollama_service()
         
-        # 开始资源监控（预估30秒完成）
-        resource_data, monitor_thread = self.monitor_resources(30)
+        # 资源监控与生成调用同生命周期: 请求发出前启动, 流结束后立即停止
+        mon = ResourceMonitor(interval=0.2)
+        mon.start()
         
         # 生成文本
         try:
             response = self.call_ollama_generate(
-                model, prompt, max_tokens, temperature)
+                model, prompt, max_tokens, temperature, host=host)
         except Exception as e:
             print(f"生成文本失败: {e}")
-            # 确保资源监控线程结束
-            monitor_thread.join(timeout=1)
+            mon.stop()
             return None
             
-        # 等待资源监控完成
-        monitor_thread.join(timeout=1)
+        mon.stop()
+        return response, mon
+    
+    def finalize_result(self, model, prompt, task_type, response, mon, reference_text=None,
+                        max_tokens=500, temperature=0.7):
+        """
+        实验的评估阶段: 质量评估并整理性能、资源与分阶段能耗
         
+        Args:
+            response (dict): generate_case 返回的生成结果
+            mon (ResourceMonitor): generate_case 返回的资源监控器
+            其余参数同 run_single_experiment
+            
+        Returns:
+            dict: 实验结果
+        """
         # 评估质量
         quality_scores = self.evaluate_quality(response["response"], reference_text)
         
-        # 计算性能指标
-        gen_text = response["response"]
-        total_time = response["total_time"]
-        # 简单的token计数（实际应用中可能需要更精确的方法）
-        token_count = len(gen_text.split())
-        
-        # 计算资源使用统计
-        def safe_avg(lst):
-            return sum(lst) / len(lst) if lst else 0
-            
-        def safe_max(lst):
-            return max(lst) if lst else 0
-        
-        # 整理结果
-        result = {
-            "model": model,
-            "prompt": prompt,
-            "task_type": task_type,
-            "generated_text": gen_text,
-            "performance": {
-                "total_time_seconds": total_time,
-                "token_count": token_count,
-                "throughput_tokens_per_sec": token_count / total_time if total_time > 0 else 0
-            },
-            "resources": {
-                "avg_cpu_percent": safe_avg(resource_data["cpu_percent"]),
-                "max_cpu_percent": safe_max(resource_data["cpu_percent"]),
-                "avg_memory_percent": safe_avg(resource_data["memory_percent"]),
-                "max_memory_percent": safe_max(resource_data["memory_percent"]),
-                "avg_gpu_utilization": safe_avg(resource_data["gpu_utilization"]) if resource_data["gpu_utilization"] else 0,
-                "max_gpu_utilization": safe_max(resource_data["gpu_utilization"]) if resource_data["gpu_utilization"] else 0,
-                "avg_gpu_memory_mb": safe_avg(resource_data["gpu_memory_used"]) if resource_data["gpu_memory_used"] else 0,
-                "max_gpu_memory_mb": safe_max(resource_data["gpu_memory_used"]) if resource_data["gpu_memory_used"] else 0
-            },
-            "quality": quality_scores,
-            "metadata": {
-                "timestamp": datetime.now().isoformat(),
-                "max_tokens": max_tokens,
-                "temperature": temperature
-            }
-        }
+        result = build_result(model, prompt, task_type, response, mon, max_tokens, temperature,
+                              quality=quality_scores)
         
         print(f"实验完成: 模型={model}, 任务类型={task_type}")
         return result
     
-    def run_experiment_suite(self, test_cases, output_file=None):
+    def run_experiment_suite(self, test_cases, output_file=None, fsync="batch", pipeline=False,
+                             max_per_host=1, quality_workers=2, queue_size=8):
         """
         运行完整的实验套件
         
         Args:
-            test_cases (list): 测试用例列表
-            output_file (str, optional): 输出文件路径
+            test_cases (list): 测试用例列表，用例可用 "host" 字段指定Ollama服务地址
+            output_file (str, optional): 输出文件路径, 默认JSONL; 以 .parquet 结尾时按批写入Parquet,
+                以 .json 结尾时结束后生成JSON数组
+            fsync (str): 落盘策略, "always" / "batch" / "never", 见 experiments.result_sink
+            pipeline (bool): 是否以 生成 -> 质量评估 -> 持久化 三级流水线并发执行
+            max_per_host (int): 流水线模式下每个Ollama服务地址的并发生成数
+            quality_workers (int): 流水线模式下质量评估线程数
+            queue_size (int): 流水线各级之间队列的容量
             
         Returns:
-            list: 实验结果列表
+            list: 实验结果列表，顺序与 test_cases 一致
         """
+        if pipeline:
+            # 没有质量评估线程时队列无人消费 (死锁), 没有生成线程时用例被静默丢弃
+            if max_per_host < 1:
+                raise ValueError(f"max_per_host 必须 >= 1: {max_per_host}")
+            if quality_workers < 1:
+                raise ValueError(f"quality_workers 必须 >= 1: {quality_workers}")
         if output_file is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = os.path.join(self.output_dir, f"experiment_results_{timestamp}.json")
+            output_file = os.path.join(self.output_dir, f"experiment_results_{timestamp}.jsonl")
         
         results = []
         
         print(f"开始执行实验套件，共 {len(test_cases)} 个测试用例")
         print(f"结果将保存到: {output_file}")
         
+        # 每条结果追加写入 .part, 套件结束后原子重命名为最终文件
+        t0 = time.perf_counter()
+        with open_sink(output_file, fsync=fsync) as sink:
+            if pipeline:
+                stats = self._run_pipelined(test_cases, sink, results, max_per_host,
+                                            quality_workers, queue_size)
+            else:
+                stats = self._run_cases(test_cases, sink, results)
+        wall = time.perf_counter() - t0
+        self.last_stage_stats = {"wall_seconds": wall}
+        self.last_stage_stats.update({name: st.to_dict(wall) for name, st in stats.items()})
+        
+        print(f"\n所有实验完成，共获得 {len(results)} 条有效结果")
+        self._print_stage_stats()
+        return results
+    
+    def _print_stage_stats(self):
+        stats = getattr(self, "last_stage_stats", None)
+        if not stats:
+            return
+        print(f"各阶段耗时 (总耗时 {stats['wall_seconds']:.2f}s):")
+        for name in ("generation", "quality", "persistence"):
+            st = stats.get(name)
+            if st:
+                print(f"  {name:<12} 并发={st['workers']:<3} 条数={st['count']:<5} "
+                      f"平均={st['avg_seconds']:.3f}s 最大={st['max_seconds']:.3f}s "
+                      f"利用率={st['utilization']:.0%} 下游阻塞={st['blocked_seconds']:.2f}s")
+    
+    def _case_args(self, case):
+        return dict(model=case["model"], prompt=case["prompt"],
+                    max_tokens=case.get("max_tokens", 500),
+                    temperature=case.get("temperature", 0.7))
+    
+    def _finalize_case(self, case, generated):
+        response, mon = generated
+        return self.finalize_result(
+            case["model"], case["prompt"], case["task_type"], response, mon,
+            reference_text=case.get("reference_text"),
+            max_tokens=case.get("max_tokens", 500),
+            temperature=case.get("temperature", 0.7))
+    
+    def _persist(self, case, result, sink, results):
+        if result:
+            results.append(result)
+            sink.write(result)
+            print(f"实验结果已追加到 {sink.part_path}")
+        else:
+            print(f"实验失败: {case}")
+    
+    def _run_cases(self, test_cases, sink, results):
+        stats = {"generation": StageStats(1), "quality": StageStats(1), "persistence": StageStats(1)}
         for i, case in enumerate(test_cases):
             print(f"\n{'='*50}")
             print(f"运行实验 {i+1}/{len(test_cases)}")
             print(f"{'='*50}")
+            print(f"\n开始实验: 模型={case['model']}, 任务类型={case['task_type']}")
             
-            result = self.run_single_experiment(
-                model=case["model"],
-                prompt=case["prompt"],
-                task_type=case["task_type"],
-                reference_text=case.get("reference_text"),
-                max_tokens=case.get("max_tokens", 500),
-                temperature=case.get("temperature", 0.7)
-            )
-            
-            if result:
-                results.append(result)
-                
-                # 实时保存结果
-                with open(output_file, "w", encoding="utf-8") as f:
-                    json.dump(results, f, ensure_ascii=False, indent=2)
-                
-                print(f"实验结果已保存到 {output_file}")
-            else:
-                print(f"实验失败: {case}")
+            t0 = time.perf_counter()
+            generated = self.generate_case(host=case.get("host"), **self._case_args(case))
+            t1 = time.perf_counter()
+            stats["generation"].add(t1 - t0)
+            result = self._finalize_case(case, generated) if generated else None
+            t2 = time.perf_counter()
+            stats["quality"].add(t2 - t1)
+            self._persist(case, result, sink, results)
+            stats["persistence"].add(time.perf_counter() - t2)
+        return stats
+    
+    def _run_pipelined(self, test_cases, sink, results, max_per_host=1, quality_workers=2, queue_size=8):
+        """
+        三级流水线: 每个Ollama地址 max_per_host 个生成线程 -> quality_workers 个质量评估线程 -> 主线程持久化
         
-        print(f"\n所有实验完成，共获得 {len(results)} 条有效结果")
-        return results
+        各级之间为有界队列, 下游变慢时上游阻塞; 持久化阶段按用例下标重排, 输出顺序与串行执行一致。
+        质量评估使用线程而非进程: BARTScorer 持有GPU上的模型, 无法在进程间传递; 各线程的评分调用串行执行。
+        注意同一台机器上并发生成时, 各用例的资源与能耗监控会互相叠加。
+        """
+        by_host = {}
+        for i, case in enumerate(test_cases):
+            host = ollama_client._base_url(case.get("host") or self.ollama_host)
+            by_host.setdefault(host, queue.Queue()).put(i)
+        gen_workers = sum(min(max_per_host, q.qsize()) for q in by_host.values())
+        stats = {
+            "generation": StageStats(gen_workers),
+            "quality": StageStats(quality_workers),
+            "persistence": StageStats(1)
+        }
+        quality_q = queue.Queue(maxsize=queue_size)
+        persist_q = queue.Queue(maxsize=queue_size)
+        n = len(test_cases)
+        
+        def gen_worker(host, todo):
+            while True:
+                try:
+                    i = todo.get_nowait()
+                except queue.Empty:
+                    return
+                case = test_cases[i]
+                t0 = time.perf_counter()
+                generated = None
+                try:
+                    print(f"[{i+1}/{n}] 开始实验: 模型={case['model']}, 任务类型={case['task_type']}, 服务={host}")
+                    generated = self.generate_case(host=host, **self._case_args(case))
+                except Exception as e:
+                    print(f"[{i+1}/{n}] 生成阶段出错: {e}")
+                t1 = time.perf_counter()
+                quality_q.put((i, generated))
+                stats["generation"].add(t1 - t0, time.perf_counter() - t1)
+        
+        def quality_worker():
+            while True:
+                item = quality_q.get()
+                if item is None:
+                    return
+                i, generated = item
+                t0 = time.perf_counter()
+                result = None
+                if generated:
+                    try:
+                        result = self._finalize_case(test_cases[i], generated)
+                    except Exception as e:
+                        print(f"[{i+1}/{n}] 质量评估阶段出错: {e}")
+                t1 = time.perf_counter()
+                persist_q.put((i, result))
+                stats["quality"].add(t1 - t0, time.perf_counter() - t1)
+        
+        gen_threads = []
+        for host, todo in by_host.items():
+            for _ in range(min(max_per_host, todo.qsize())):
+                t = threading.Thread(target=gen_worker, args=(host, todo), daemon=True)
+                t.start()
+                gen_threads.append(t)
+        q_threads = [threading.Thread(target=quality_worker, daemon=True) for _ in range(quality_workers)]
+        for t in q_threads:
+            t.start()
+        
+        def closer():
+            # 生成线程全部结束后通知质量评估线程退出, 再通知持久化阶段结束
+            for t in gen_threads:
+                t.join()
+            for _ in q_threads:
+                quality_q.put(None)
+            for t in q_threads:
+                t.join()
+            persist_q.put(None)
+        threading.Thread(target=closer, daemon=True).start()
+        
+        pending = {}
+        next_i = 0
+        while True:
+            item = persist_q.get()
+            if item is None:
+                break
+            pending[item[0]] = item[1]
+            while next_i in pending:
+                t0 = time.perf_counter()
+                self._persist(test_cases[next_i], pending.pop(next_i), sink, results)
+                stats["persistence"].add(time.perf_counter() - t0)
+                next_i += 1
+        return stats
 
 def create_sample_test_cases():
     """创建示例测试用例"""
@@ -392,6 +504,11 @@ def main():
     parser.add_argument("--output-dir", default="./results", help="结果输出目录")
     parser.add_argument("--config", help="测试用例配置文件路径（JSON格式）")
     parser.add_argument("--sample", action="store_true", help="运行示例测试用例")
+    parser.add_argument("--output-format", choices=["jsonl", "parquet", "json"], default="jsonl", help="结果文件格式")
+    parser.add_argument("--fsync", choices=["always", "batch", "never"], default="batch", help="结果落盘策略")
+    parser.add_argument("--pipeline", action="store_true", help="以 生成/质量评估/持久化 流水线并发执行用例")
+    parser.add_argument("--max-per-host", type=int, default=1, help="流水线模式下每个Ollama地址的并发生成数")
+    parser.add_argument("--quality-workers", type=int, default=2, help="流水线模式下质量评估线程数")
     
     args = parser.parse_args()
     
@@ -425,7 +542,11 @@ def main():
     
     # 运行实验
     try:
-        results = runner.run_experiment_suite(test_cases)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = os.path.join(args.output_dir, f"experiment_results_{timestamp}.{args.output_format}")
+        results = runner.run_experiment_suite(
+            test_cases, output_file=output_file, fsync=args.fsync, pipeline=args.pipeline,
+            max_per_host=args.max_per_host, quality_workers=args.quality_workers)
         print(f"\n实验执行完成，共获得 {len(results)} 条结果")
         return 0
     except KeyboardInterrupt:
@@ -0,0 +1,118 @@
+"""
+实验与硬件指标的 Prometheus 导出
+
+ExperimentMetrics 维护两类指标:
+
+- 硬件仪表 (GPU 功率/利用率/显存/温度, CPU 利用率与近似功率): 抓取时从当前
+  ResourceMonitor 的最近一次采样读取 (attach/detach), 或由后端从遥测 sample 事件
+  记录 (observe_event); 不额外采样
+- 实验计数: 完成/失败用例数、生成 token 数、GPU/CPU 能耗 (焦耳) 以及按模型统计的
+  首 token 时间与生成速率直方图
+
+run_experiments --metrics-port 时用 serve() 在独立线程提供 /metrics;
+后端把同一组指标注册到进程级 REGISTRY, 由任务调度器转发子进程的遥测事件。
+"""
+
+import time
+import threading
+
+from src.backend.core.metrics import CONTENT_TYPE, MetricsRegistry
+
+TTFT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+TPS_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300)
+
+# 遥测 sample 字段 -> (指标名, 说明)
+HARDWARE_GAUGES = {
+    "gpu_power_w": ("genai_gpu_power_watts", "GPU 功率 (瓦)"),
+    "gpu_util": ("genai_gpu_utilization_percent", "GPU 利用率 (%)"),
+    "gpu_mem_mb": ("genai_gpu_memory_used_megabytes", "GPU 显存占用 (MB)"),
+    "gpu_temp_c": ("genai_gpu_temperature_celsius", "GPU 温度 (摄氏度)"),
+    "cpu_percent": ("genai_cpu_utilization_percent", "CPU 利用率 (%)"),
+    "cpu_power_w_approx": ("genai_cpu_power_watts_approx", "按 CPU_TDP_W 估算的 CPU 功率 (瓦)"),
+    "mem_used_mb": ("genai_memory_used_megabytes", "系统内存占用 (MB)"),
+}
+
+class ExperimentMetrics:
+    def __init__(self, registry=None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.gauges = {k: r.gauge(name, doc) for k, (name, doc) in HARDWARE_GAUGES.items()}
+        self.sample_time = r.gauge("genai_hardware_last_sample_timestamp_seconds", "最近一次资源采样的时间戳")
+        self.cases = r.counter("genai_experiment_cases_total", "已结束的实验用例数", ["model", "task", "status"])
+        self.tokens = r.counter("genai_experiment_tokens_generated_total", "生成的 token 数", ["model"])
+        self.energy = r.counter("genai_experiment_energy_joules_total", "实验用例消耗的能量 (焦耳, CPU 为估算值)",
+                                ["model", "device"])
+        self.ttft = r.histogram("genai_experiment_ttft_seconds", "首 token 时间 (秒)", ["model"], TTFT_BUCKETS)
+        self.tps = r.histogram("genai_experiment_tokens_per_second", "生成速率 (token/s)", ["model"], TPS_BUCKETS)
+        self._monitor = None
+        self._sample = None
+        r.add_collector(self.collect)
+
+    def attach(self, monitor):
+        """抓取时从该 ResourceMonitor 读取最近一次采样"""
+        self._monitor = monitor
+
+    def detach(self):
+        # 保留最后一次采样, 用例之间的抓取仍有数值
+        mon, self._monitor = self._monitor, None
+        if mon is not None:
+            self._sample = mon.last_sample() or self._sample
+
+    def collect(self):
+        mon = self._monitor
+        sample = (mon.last_sample() if mon is not None else None) or self._sample
+        if not sample:
+            return
+        for key, gauge in self.gauges.items():
+            if sample.get(key) is not None:
+                gauge.set((), float(sample[key]))
+        self.sample_time.set((), float(sample.get("t") or time.time()))
+
+    def observe_case(self, model, task, status="ok", tokens=None, gpu_energy_j=None, cpu_energy_j=None,
+                     ttft_s=None, tps=None):
+        self.cases.inc((model, task or "", status))
+        if tokens:
+            self.tokens.inc((model,), tokens)
+        if gpu_energy_j:
+            self.energy.inc((model, "gpu"), gpu_energy_j)
+        if cpu_energy_j:
+            self.energy.inc((model, "cpu"), cpu_energy_j)
+        if ttft_s is not None:
+            self.ttft.observe((model,), ttft_s)
+        if tps:
+            self.tps.observe((model,), tps)
+
+    def observe_event(self, event):
+        """处理一条遥测事件 (experiments.telemetry 的 sample / case_end)"""
+        kind = event.get("type")
+        if kind == "sample":
+            self._sample = event
+        elif kind == "case_end":
+            self.observe_case(
+                event.get("model") or "unknown", event.get("task"), event.get("status") or "ok",
+                tokens=event.get("token_count") or event.get("tokens"), gpu_energy_j=event.get("gpu_energy_j"),
+                cpu_energy_j=event.get("cpu_energy_j"), ttft_s=event.get("ttft_s"), tps=event.get("toks_per_s"))
+
+def serve(registry, port, host="0.0.0.0", path="/metrics"):
+    """在守护线程中提供 Prometheus 抓取端点, 返回 HTTPServer (shutdown() 停止)"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != path:
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE + "; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
@@ -1,10 +1,18 @@
+import os
 import time
 import threading
 import psutil
 
+def _cpu_busy_total(times):
+    """系统CPU时间中的 (非空闲, 总计) 秒数, 口径与 psutil.cpu_percent 一致 (guest 已计入 user)"""
+    total = sum(times) - getattr(times, "guest", 0.0) - getattr(times, "guest_nice", 0.0)
+    return total - times.idle - getattr(times, "iowait", 0.0), total
+
 class ResourceMonitor:
-    def __init__(self, interval=0.2):
+    def __init__(self, interval=0.2, on_sample=None):
         self.interval = interval
+        # 每次采样后回调 on_sample(dict), 用于实时遥测; 回调异常不影响采样
+        self.on_sample = on_sample
         self._stop = threading.Event()
         self._thread = None
         self.timestamps = []
@@ -21,9 +29,19 @@ class ResourceMonitor:
         self.cpu_proc_percent = []
         self.cpu_power_w_approx = []
         self.cpu_energy_j_approx = 0.0
+        # CPU 利用率按本监控器自己的上一次读数计算差值; psutil.cpu_percent(interval=None) 与
+        # process_iter 缓存的 Process.cpu_percent 的基准是进程内共享的, 多个监控器并发运行
+        # (流水线模式) 时会互相重置对方的统计区间
+        self._cpu_last = None
+        self._proc_last = {}
 
     def start(self):
         self._stop.clear()
+        self._cpu_last = _cpu_busy_total(psutil.cpu_times())
+        try:
+            self._ollama_cpu_percent(time.monotonic())
+        except Exception:
+            pass
         self._thread = threading.Thread(target=self._loop)
         self._thread.daemon = True
         self._thread.start()
@@ -69,14 +87,44 @@ class ResourceMonitor:
         except:
             return None, None, None, None, []
 
+    def _system_cpu_percent(self):
+        busy, total = _cpu_busy_total(psutil.cpu_times())
+        last_busy, last_total = self._cpu_last or (busy, total)
+        self._cpu_last = (busy, total)
+        if total <= last_total:
+            return 0.0
+        return min(100.0, max(0.0, (busy - last_busy) / (total - last_total) * 100.0))
+
+    def _ollama_cpu_percent(self, now):
+        """ollama 进程自上次采样以来的CPU占用之和 (单核为100%), 首次出现的进程记 0"""
+        seen = {}
+        pct = 0.0
+        for p in psutil.process_iter(["pid", "name"]):
+            name = p.info.get("name") or ""
+            if "ollama" not in name.lower():
+                continue
+            try:
+                t = p.cpu_times()
+            except Exception:
+                continue
+            used = t.user + t.system
+            seen[p.pid] = (used, now)
+            prev = self._proc_last.get(p.pid)
+            if prev is not None and now > prev[1]:
+                pct += max(0.0, used - prev[0]) / (now - prev[1]) * 100.0
+        self._proc_last = seen
+        return pct
+
     def _loop(self):
         last_ts = None
         last_read = None
         last_write = None
-        while not self._stop.is_set():
+        while True:
+            # stop() 之后再补采一次, 使积分覆盖到停止时刻
+            final = self._stop.is_set()
             ts = time.time()
             self.timestamps.append(ts)
-            self.cpu_percent.append(psutil.cpu_percent(interval=None))
+            self.cpu_percent.append(self._system_cpu_percent())
             vm = psutil.virtual_memory()
             self.mem_used_mb.append((vm.total - vm.available) / 1024 / 1024)
             dio = psutil.disk_io_counters()
@@ -118,18 +166,76 @@ class ResourceMonitor:
                 self.cpu_energy_j_approx += pwr * dt
             last_ts = ts
             try:
-                proc_sum = 0.0
-                for p in psutil.process_iter(["pid", "name"]):
-                    name = p.info.get("name") or ""
-                    if "ollama" in name.lower():
-                        try:
-                            proc_sum += p.cpu_percent(interval=None)
-                        except:
-                            pass
-                self.cpu_proc_percent.append(proc_sum)
+                self.cpu_proc_percent.append(self._ollama_cpu_percent(time.monotonic()))
             except:
                 self.cpu_proc_percent.append(0.0)
-            time.sleep(self.interval)
+            if self.on_sample is not None:
+                try:
+                    self.on_sample(self.last_sample())
+                except Exception:
+                    pass
+            if final:
+                break
+            self._stop.wait(self.interval)
+
+    def last_sample(self):
+        """最近一次采样 (累计能耗为截至该时刻的积分)"""
+        if not self.timestamps:
+            return None
+        return {
+            "t": self.timestamps[-1],
+            "cpu_percent": self.cpu_percent[-1],
+            "mem_used_mb": self.mem_used_mb[-1],
+            "gpu_util": self.gpu_util[-1],
+            "gpu_mem_mb": self.gpu_mem_mb[-1],
+            "gpu_power_w": self.gpu_power_w[-1],
+            "gpu_temp_c": self.gpu_temp_c[-1],
+            "gpu_energy_j": self.gpu_energy_j,
+            "cpu_power_w_approx": self.cpu_power_w_approx[-1] if self.cpu_power_w_approx else 0.0,
+            "cpu_energy_j_approx": self.cpu_energy_j_approx,
+        }
+
+    def energy_between(self, t0, t1):
+        """按采样区间与 [t0, t1] 的重叠时长积分功率, 返回 (GPU能耗J, CPU近似能耗J)"""
+        gpu_j = 0.0
+        cpu_j = 0.0
+        ts = self.timestamps
+        for i in range(1, len(ts)):
+            overlap = min(ts[i], t1) - max(ts[i - 1], t0)
+            if overlap <= 0:
+                continue
+            if i < len(self.gpu_power_w):
+                gpu_j += self.gpu_power_w[i] * overlap
+            if i - 1 < len(self.cpu_power_w_approx):
+                cpu_j += self.cpu_power_w_approx[i - 1] * overlap
+        return gpu_j, cpu_j
+
+    def phase_summary(self, phases):
+        """
+        按阶段统计时长、能耗与平均利用率
+
+        Args:
+            phases (dict): 阶段名 -> (开始时间戳, 结束时间戳)
+        """
+        out = {}
+        for name, win in phases.items():
+            if not win or win[0] is None or win[1] is None or win[1] < win[0]:
+                out[name] = None
+                continue
+            t0, t1 = win
+            gpu_j, cpu_j = self.energy_between(t0, t1)
+            idx = [i for i, t in enumerate(self.timestamps) if t0 <= t <= t1]
+            util = [self.gpu_util[i] for i in idx if i < len(self.gpu_util)]
+            dur = t1 - t0
+            out[name] = {
+                "seconds": dur,
+                "gpu_energy_j": gpu_j,
+                "cpu_energy_j_approx": cpu_j,
+                "gpu_power_avg_w": (gpu_j / dur) if dur > 0 else 0,
+                "gpu_util_avg": (sum(util) / len(util)) if util else 0,
+                "samples": len(idx)
+            }
+        return out
 
     def summary(self):
         def avg(lst):
@@ -149,6 +255,26 @@ class ResourceMonitor:
             "cpu_energy_j_approx": self.cpu_energy_j_approx
         }
 
+    def resource_stats(self):
+        """ExperimentRunner / simple_experiment 结果中 resources 字段的统计口径"""
+        def avg(lst):
+            return sum(lst) / len(lst) if lst else 0
+        def peak(lst):
+            return max(lst) if lst else 0
+        total_mb = psutil.virtual_memory().total / 1024 / 1024
+        mem_pct = [m / total_mb * 100 for m in self.mem_used_mb] if total_mb else []
+        return {
+            "avg_cpu_percent": avg(self.cpu_percent),
+            "max_cpu_percent": peak(self.cpu_percent),
+            "avg_memory_percent": avg(mem_pct),
+            "max_memory_percent": peak(mem_pct),
+            "avg_gpu_utilization": avg(self.gpu_util),
+            "max_gpu_utilization": peak(self.gpu_util),
+            "avg_gpu_memory_mb": avg(self.gpu_mem_mb),
+            "max_gpu_memory_mb": peak(self.gpu_mem_mb),
+            "samples": len(self.timestamps)
+        }
+
     def to_dict(self):
         return {
             "timestamps": self.timestamps,
@@ -0,0 +1,156 @@
+"""
+Ollama HTTP 客户端
+
+所有实验入口共用一个带连接池的 requests.Session, 通过流式 /api/generate
+获取生成文本与服务端各阶段耗时 (load / prompt_eval / eval) 以及客户端测得的首token时间。
+"""
+
+import os
+import json
+import time
+import threading
+
+DEFAULT_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+
+_session = None
+_session_lock = threading.Lock()
+# (服务地址, 模型名) -> /api/tags 中的 details.family
+_families = {}
+
+def _base_url(host=None):
+    h = (host or DEFAULT_HOST).strip().rstrip("/")
+    if not h.startswith(("http://", "https://")):
+        h = "http://" + h
+    return h
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                _session = s
+    return _session
+
+def generate_stream(model, prompt, options=None, keep_alive="0s", host=None, timeout=600, on_token=None):
+    """
+    流式调用 /api/generate
+
+    Args:
+        model (str): 模型名称
+        prompt (str): 输入提示
+        options (dict, optional): Ollama 生成参数 (num_predict, temperature, ...)
+        keep_alive (str, optional): 生成结束后模型保留时长, None 表示使用服务端默认值
+        host (str, optional): Ollama 地址, 默认取 OLLAMA_HOST
+        timeout (float): 请求超时 (秒)
+        on_token (callable, optional): 每收到一个增量片段时回调 on_token(text, timestamp)
+
+    Returns:
+        dict: 生成文本、首token时间、服务端各阶段耗时 (纳秒)、请求/首token/结束的时间戳以及服务地址
+    """
+    body = {"model": model, "prompt": prompt, "stream": True}
+    if options:
+        body["options"] = options
+    if keep_alive is not None:
+        body["keep_alive"] = keep_alive
+    t0 = time.time()
+    r = get_session().post(_base_url(host) + "/api/generate", json=body, stream=True, timeout=timeout)
+    try:
+        r.raise_for_status()
+        t_first = None
+        text_parts = []
+        final = {}
+        for line in r.iter_lines():
+            if not line:
+                continue
+            d = json.loads(line.decode("utf-8", errors="ignore"))
+            if d.get("error"):
+                raise RuntimeError(d["error"])
+            resp = d.get("response")
+            if resp:
+                now = time.time()
+                if t_first is None:
+                    t_first = now
+                text_parts.append(resp)
+                if on_token is not None:
+                    on_token(resp, now)
+            if d.get("done"):
+                final = d
+                break
+    finally:
+        r.close()
+    t_done = time.time()
+    return {
+        "response": "".join(text_parts),
+        "first_token_seconds": (t_first - t0) if t_first else None,
+        "eval_count": final.get("eval_count"),
+        "eval_duration": final.get("eval_duration"),
+        "total_duration": final.get("total_duration"),
+        "load_duration": final.get("load_duration"),
+        "prompt_eval_count": final.get("prompt_eval_count"),
+        "prompt_eval_duration": final.get("prompt_eval_duration"),
+        "t_request": t0,
+        "t_first_token": t_first,
+        "t_done": t_done,
+        "host": _base_url(host)
+    }
+
+def tags(host=None, timeout=10):
+    r = get_session().get(_base_url(host) + "/api/tags", timeout=timeout)
+    r.raise_for_status()
+    return r.json().get("models", [])
+
+def model_family(model, host=None):
+    """模型的 details.family (按服务地址缓存, 供分词器选择), 查询失败时返回 None 且不缓存"""
+    key = (_base_url(host), model)
+    if key not in _families:
+        try:
+            models = tags(host)
+        except Exception:
+            return None
+        for m in models:
+            if m.get("name") == model or m.get("model") == model:
+                _families[key] = (m.get("details") or {}).get("family")
+                break
+        else:
+            _families[key] = None
+    return _families[key]
+
+def version(host=None, timeout=5):
+    r = get_session().get(_base_url(host) + "/api/version", timeout=timeout)
+    r.raise_for_status()
+    return r.json().get("version")
+
+def api_metrics(api):
+    """generate_stream 结果中的服务端计时, 统一为各实验入口原始记录里的 api_metrics 字段"""
+    return {
+        "eval_count": api.get("eval_count"),
+        "eval_duration_ns": api.get("eval_duration"),
+        "total_duration_ns": api.get("total_duration"),
+        "load_duration_ns": api.get("load_duration"),
+        "prompt_eval_count": api.get("prompt_eval_count"),
+        "prompt_eval_duration_ns": api.get("prompt_eval_duration")
+    }
+
+def phase_windows(api):
+    """
+    由 generate_stream 的时间戳划分生成阶段, 供 ResourceMonitor.phase_summary 按阶段积分能耗
+
+    load 取服务端 load_duration 并从请求发出时刻起算; prompt_eval 为其后到首token;
+    eval 为首token到流结束。服务端计时与客户端时钟之间的偏差可忽略 (本机调用)。
+    """
+    t0 = api.get("t_request")
+    tf = api.get("t_first_token")
+    t1 = api.get("t_done")
+    if t0 is None or t1 is None:
+        return {}
+    load_s = (api.get("load_duration") or 0) / 1e9
+    if tf is None:
+        return {"load": (t0, min(t0 + load_s, t1)), "prompt_eval": (min(t0 + load_s, t1), t1), "eval": None}
+    t_load = min(t0 + load_s, tf)
+    return {"load": (t0, t_load), "prompt_eval": (t_load, tf), "eval": (tf, t1)}
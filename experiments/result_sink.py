@@ -0,0 +1,234 @@
+"""
+实验结果的追加式持久化
+
+每条结果写入一行JSON到 <输出文件>.part (每次运行重新创建), 套件结束 (close) 时原子地
+重命名为最终文件; 中途崩溃时 .part 中已写入的记录仍可由 read_results 读出 (末行被截断时自动跳过)。
+输出文件以 .parquet 结尾时按批写入 Parquet 行组 (需要 pyarrow), 运行期间同样以JSONL记录到 .part,
+close 时才生成最终文件 (未关闭的Parquet文件缺少footer, 无法读取);
+以 .json 结尾时最终文件保持原有的JSON数组格式, 运行期间仍以JSONL追加。
+"""
+
+import os
+import json
+import uuid
+
+FSYNC_POLICIES = ("always", "batch", "never")
+
+def _fsync_dir(path):
+    # 重命名后同步所在目录, 保证目录项落盘 (Windows 不支持对目录 fsync)
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class JsonlSink:
+    """
+    JSONL追加写入
+
+    Args:
+        path (str): 最终输出文件路径
+        fsync (str): "always" 每条记录 fsync; "batch" 每条记录flush到系统, 每 batch_size 条 fsync;
+            "never" 仅在 close 时 fsync
+        batch_size (int): fsync="batch" 时的同步间隔
+    """
+
+    def __init__(self, path, fsync="batch", batch_size=50):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync 必须为 {FSYNC_POLICIES} 之一: {fsync}")
+        self.path = path
+        self.part_path = path + ".part"
+        self.fsync = fsync
+        self.batch_size = max(1, int(batch_size))
+        self.count = 0
+        self._pending = 0
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        # 上次运行遗留的 .part 不属于本次结果, 直接覆盖
+        self._f = open(self.part_path, "w", encoding="utf-8")
+
+    def write(self, record):
+        self._f.write(json.dumps(record, ensure_ascii=False, default=str))
+        self._f.write("\n")
+        self.count += 1
+        self._pending += 1
+        if self.fsync == "never":
+            return
+        self._f.flush()
+        if self.fsync == "always" or self._pending >= self.batch_size:
+            os.fsync(self._f.fileno())
+            self._pending = 0
+
+    def _sync(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._pending = 0
+
+    def close(self):
+        """同步剩余数据并原子地生成最终文件"""
+        if self._f is None:
+            return self.path
+        self._sync()
+        self._f.close()
+        self._f = None
+        if self.path.endswith(".json"):
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(read_results(self.part_path), f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            os.remove(self.part_path)
+        else:
+            os.replace(self.part_path, self.path)
+        _fsync_dir(self.path)
+        return self.path
+
+    def discard(self):
+        """关闭并删除 .part (结果已另行落盘时使用)"""
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        os.remove(self.part_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 异常退出时保留 .part, 便于排查和恢复
+        if exc_type is None:
+            self.close()
+        elif self._f is not None:
+            self._sync()
+            self._f.close()
+            self._f = None
+        return False
+
+class ParquetSink:
+    """
+    Parquet分批写入, 每 batch_size 条记录写出一个行组
+
+    结果记录为嵌套结构且各字段可能缺失, 为保证各批次schema一致,
+    只把 model / task_type 存为独立列, 完整记录以JSON字符串存入 record 列。
+    行组写入 <输出文件>.<随机后缀>.tmp, close 时重命名为最终文件; 每条记录同时按 fsync 策略追加到
+    JSONL 格式的 .part, 崩溃后由 read_results 从 .part 读出, 正常关闭后删除。
+    """
+
+    def __init__(self, path, fsync="batch", batch_size=500):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self._log = JsonlSink(path, fsync=fsync, batch_size=batch_size)
+        self.path = path
+        self.part_path = self._log.part_path
+        # 每个写入器各自的临时文件, 同一路径上未关闭的旧写入器不会与之交错写入
+        self.tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        self.batch_size = max(1, int(batch_size))
+        self.count = 0
+        self._buf = []
+        self._schema = pa.schema([
+            ("model", pa.string()),
+            ("task_type", pa.string()),
+            ("record", pa.string())
+        ])
+        self._f = open(self.tmp_path, "wb")
+        self._writer = pq.ParquetWriter(self._f, self._schema)
+
+    def write(self, record):
+        self._log.write(record)
+        self._buf.append(record)
+        self.count += 1
+        if len(self._buf) >= self.batch_size:
+            self._flush_batch()
+
+    def _flush_batch(self):
+        if not self._buf:
+            return
+        cols = {
+            "model": [r.get("model") for r in self._buf],
+            "task_type": [r.get("task_type") for r in self._buf],
+            "record": [json.dumps(r, ensure_ascii=False, default=str) for r in self._buf]
+        }
+        self._writer.write_table(self._pa.table(cols, schema=self._schema))
+        self._buf = []
+
+    def close(self):
+        if self._writer is None:
+            return self.path
+        self._flush_batch()
+        self._writer.close()
+        self._writer = None
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+        os.replace(self.tmp_path, self.path)
+        _fsync_dir(self.path)
+        self._log.discard()
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 异常退出时保留 .part (JSONL), 丢弃不完整的 .tmp
+        if exc_type is None:
+            self.close()
+        elif self._writer is not None:
+            self._log.__exit__(exc_type, exc, tb)
+            self._writer = None
+            self._f.close()
+            try:
+                os.remove(self.tmp_path)
+            except OSError:
+                pass
+        return False
+
+def open_sink(path, fsync="batch", batch_size=None):
+    """按扩展名选择写入器: .parquet 使用 ParquetSink, 其余使用 JsonlSink"""
+    if path.endswith(".parquet"):
+        return ParquetSink(path, fsync=fsync, batch_size=batch_size or 500)
+    return JsonlSink(path, fsync=fsync, batch_size=batch_size or 50)
+
+def _iter_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # 写入中途崩溃只会截断最后一行, 跳过即可
+                continue
+
+def read_results(path):
+    """
+    读取结果文件
+
+    支持 JSONL、Parquet 与原有的JSON数组格式; path 不存在但 path.part 存在时
+    (套件未正常结束) 读取 .part 中已写入的记录。
+
+    Returns:
+        list[dict]: 结果记录
+    """
+    if not os.path.exists(path) and os.path.exists(path + ".part"):
+        path = path + ".part"
+    base = path[:-5] if path.endswith(".part") else path
+    if base.endswith(".parquet") and not path.endswith(".part"):
+        import pyarrow.parquet as pq
+        col = pq.read_table(path, columns=["record"]).column("record").to_pylist()
+        return [json.loads(r) for r in col]
+    if base.endswith(".json") and not path.endswith(".part"):
+        with open(path, "r", encoding="utf-8") as f:
+            head = f.read(1)
+            while head and head.isspace():
+                head = f.read(1)
+            if head == "[":
+                f.seek(0)
+                return json.load(f)
+    return list(_iter_jsonl(path))
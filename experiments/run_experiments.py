@@ -54,6 +54,9 @@ def _validate_cases(cases):
                 problems.append(f"case[{i}] model string empty")
         else:
             problems.append(f"case[{i}] model type invalid")
+        ut = c.get("unit_tests")
+        if ut is not None and not (isinstance(ut, dict) and isinstance(ut.get("tests"), list)):
+            problems.append(f"case[{i}] unit_tests invalid")
     return problems
 
 def _load_config_py(path):
@@ -69,44 +72,9 @@ def _load_config_py(path):
     except Exception:
         return {}
 
-def _ollama_generate_stream(model, prompt, options=None, keep_alive="0s"):
-    import requests
-    import json as _json
-    import time as _time
-    url = "http://localhost:11434/api/generate"
-    body = {"model": model, "prompt": prompt, "stream": True}
-    if options:
-        body["options"] = options
-    if keep_alive is not None:
-        body["keep_alive"] = keep_alive
-    r = requests.post(url, json=body, stream=True, timeout=600)
-    r.raise_for_status()
-    t0 = _time.time()
-    t_first = None
-    text_parts = []
-    final = {}
-    for line in r.iter_lines():
-        if not line:
-            continue
-        d = _json.loads(line.decode("utf-8", errors="ignore"))
-        resp = d.get("response")
-        if resp:
-            if t_first is None:
-                t_first = _time.time()
-            text_parts.append(resp)
-        if d.get("done"):
-            final = d
-            break
-    full_text = "".join(text_parts)
-    return {
-        "response": full_text,
-        "first_token_seconds": (t_first - t0) if t_first else None,
-        "eval_count": final.get("eval_count"),
-        "eval_duration": final.get("eval_duration"),
-        "total_duration": final.get("total_duration"),
-        "load_duration": final.get("load_duration"),
-        "prompt_eval_duration": final.get("prompt_eval_duration")
-    }
+def _ollama_generate_stream(model, prompt, options=None, keep_alive="0s", on_token=None):
+    from experiments.ollama_client import generate_stream
+    return generate_stream(model, prompt, options=options, keep_alive=keep_alive, on_token=on_token)
 
 def _model_info(model):
     import subprocess
@@ -123,12 +91,9 @@ def _model_info(model):
     return {}
 
 def _model_details_from_tags(model):
-    import requests
+    from experiments.ollama_client import tags
     try:
-        r = requests.get("http://localhost:11434/api/tags", timeout=10)
-        r.raise_for_status()
-        data = r.json().get("models", [])
-        for m in data:
+        for m in tags():
             if m.get("name") == model or m.get("model") == model:
                 d = m.get("details", {})
                 return {
@@ -143,12 +108,9 @@ def _model_details_from_tags(model):
     return {}
 
 def _installed_models():
-    import requests
+    from experiments.ollama_client import tags
     try:
-        r = requests.get("http://localhost:11434/api/tags", timeout=10)
-        r.raise_for_status()
-        data = r.json().get("models", [])
-        return [m.get("name") or m.get("model") for m in data if (m.get("name") or m.get("model"))]
+        return [m.get("name") or m.get("model") for m in tags() if (m.get("name") or m.get("model"))]
     except Exception:
         return []
 
@@ -162,14 +124,8 @@ def _resolve_case_models(m):
     return []
 
 def _distinct_metrics(text):
-    import re
-    toks = re.findall(r"\S+", text)
-    def ngrams(n):
-        return [tuple(toks[i:i+n]) for i in range(len(toks)-n+1)]
-    def distinct(n):
-        ng = ngrams(n)
-        return (len(set(ng))/len(ng)) if ng else 0.0
-    return {"distinct_1": distinct(1), "distinct_2": distinct(2), "distinct_3": distinct(3), "length_tokens": len(toks)}
+    from experiments.quality import distinct_metrics
+    return distinct_metrics(text)
 
 def _extract_python_code(text):
     import re
@@ -181,7 +137,7 @@ def _extract_python_code(text):
         return m.group(1)
     return ""
 
-def _code_quality_metrics(text):
+def _code_quality_metrics(text, unit_tests=None):
     import ast
     code = _extract_python_code(text)
     compiles = False
@@ -193,7 +149,16 @@ def _code_quality_metrics(text):
         compiles = False
     has_bs = ("binary_search" in code) or ("二分" in text)
     mentions_complex = ("O(log" in text) or ("log n" in text) or ("logn" in text) or ("时间复杂度" in text)
-    return {"code_compiles": compiles, "has_binary_search_symbol": has_bs, "mentions_complexity": mentions_complex}
+    res = {"code_compiles": compiles, "has_binary_search_symbol": has_bs, "mentions_complexity": mentions_complex}
+    if unit_tests and unit_tests.get("tests"):
+        try:
+            from experiments.code_eval import get_evaluator
+            ex = get_evaluator().score_samples([text], unit_tests, ks=(1,))["samples"][0]
+            res["execution"] = ex
+            res["tests_pass_rate"] = (ex["tests_passed"] / ex["tests_total"]) if ex["tests_total"] else None
+        except Exception as e:
+            res["execution"] = {"status": "error", "error": str(e)}
+    return res
 
 def _bartscore_optional(reference, hypothesis):
     try:
@@ -224,6 +189,10 @@ def main():
     parser.add_argument("--cases-file")
     parser.add_argument("--exp-config")
     parser.add_argument("--use-default-on-error", action="store_true")
+    parser.add_argument("--no-leaderboard", action="store_true", help="不把完成的记录写入能效排行榜")
+    parser.add_argument("--leaderboard", help="能效排行榜文件, 默认为输出目录上一级的 leaderboard.sqlite")
+    parser.add_argument("--telemetry", action="store_true", help="向标准输出逐行写出实时遥测 (资源采样与生成片段时间), 供后端转发")
+    parser.add_argument("--metrics-port", type=int, help="在该端口提供 Prometheus 抓取端点 (/metrics), 导出硬件仪表与实验计数")
     args = parser.parse_args()
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -331,8 +300,66 @@ def main():
         return 0
 
     from experiments.monitor import ResourceMonitor
+    from experiments.token_counter import count_tokens
+    from experiments.ollama_client import api_metrics, phase_windows
+    telemetry = None
+    if args.telemetry:
+        from experiments.telemetry import TelemetryEmitter
+        telemetry = TelemetryEmitter()
+    exporter = None
+    if args.metrics_port:
+        from experiments.exporter import ExperimentMetrics, serve
+        exporter = ExperimentMetrics()
+        serve(exporter.registry, args.metrics_port)
+        print(f"指标导出: http://0.0.0.0:{args.metrics_port}/metrics")
+    leaderboard = None
+    if not args.no_leaderboard:
+        try:
+            from src.evaluation.leaderboard import DB_NAME, Leaderboard
+            leaderboard = Leaderboard(args.leaderboard or os.path.join(os.path.dirname(os.path.abspath(base_dir)), DB_NAME))
+        except Exception as e:
+            print("排行榜不可用:", e)
 
     rows = []
+    # results.csv / stats.csv 随每个用例完成即时更新, 运行中的实验也可被分析 (analyze_experiments.py --watch)
+    stats_path = os.path.join(sum_base, "stats.csv")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        f.write("timestamp,model,task,load,run,latency_s,toks_per_s,gpu_mem_peak_mb,gpu_util_avg,gpu_energy_j,bartscore\n")
+
+    def _write_stats(path, rows):
+        from collections import defaultdict
+        import math
+        grp = defaultdict(list)
+        for ts, model, task, load, run, lat, tps, gmem, gutil, gj, bs in rows:
+            grp[(model, task, load)].append((lat, tps, gmem, gutil, gj, bs))
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("model,task,load,count,latency_mean,latency_std,tps_mean,tps_std,gmem_peak_mean,gutil_mean,energy_j_mean,bartscore_mean\n")
+            for (model, task, load), vals in grp.items():
+                n = len(vals)
+                def mean(lst):
+                    return sum(lst)/len(lst) if lst else 0
+                def std(lst):
+                    m = mean(lst)
+                    return math.sqrt(sum((x-m)**2 for x in lst)/len(lst)) if lst else 0
+                lat = [v[0] for v in vals]
+                tps = [v[1] for v in vals]
+                gmem = [v[2] for v in vals]
+                gutil = [v[3] for v in vals]
+                gj = [v[4] for v in vals]
+                bs = [float(v[5]) for v in vals if isinstance(v[5], (int, float, str)) and str(v[5]) != ""]
+                f.write(
+                    ",".join([
+                        model, task, load, str(n),
+                        str(mean(lat)), str(std(lat)),
+                        str(mean(tps)), str(std(tps)),
+                        str(mean(gmem)), str(mean(gutil)),
+                        str(mean(gj)), str(mean(bs)) if bs else ""
+                    ]) + "\n"
+                )
+        os.replace(tmp, path)
+    _write_stats(stats_path, rows)
+
     # 保存配置快照
     try:
         with open(os.path.join(base_dir, "config.json"), "w", encoding="utf-8") as cf:
@@ -359,7 +386,8 @@ def main():
     except Exception:
         pass
 
-    def _run_case(model, prompt, task_name, ref_text, max_toks, run_idx):
+    def _run_case(model, prompt, task_name, ref_text, max_toks, run_idx, unit_tests=None, case_index=None,
+                  load_name="custom"):
         minfo = _model_info(model)
         mdetails = _model_details_from_tags(model)
         if args.warmup:
@@ -374,37 +402,55 @@ def main():
             "max_tokens": max_toks,
             "seed": args.seed
         }
-        mon = ResourceMonitor(interval=0.2)
+        on_token = telemetry.token if telemetry else None
+        if telemetry:
+            telemetry.case_start(model=model, task=task_name, run=run_idx, case_index=case_index)
+        mon = ResourceMonitor(interval=0.2, on_sample=telemetry.sample if telemetry else None)
         mon.start()
+        if exporter:
+            exporter.attach(mon)
         t0 = time.time()
         try:
-            api = _ollama_generate_stream(model, prompt, options=case_opts, keep_alive=args.keepalive)
+            try:
+                api = _ollama_generate_stream(model, prompt, options=case_opts, keep_alive=args.keepalive, on_token=on_token)
+            except Exception as e:
+                msg = str(e).lower()
+                if ("out of memory" in msg) or ("500" in msg):
+                    case_opts["num_ctx"] = max(512, int(case_opts["num_ctx"] * 0.5))
+                    case_opts["max_tokens"] = max(64, int(case_opts["max_tokens"] * 0.5))
+                    api = _ollama_generate_stream(model, prompt, options=case_opts, keep_alive=args.keepalive, on_token=on_token)
+                else:
+                    raise
+            t1 = time.time()
         except Exception as e:
-            msg = str(e).lower()
-            if ("out of memory" in msg) or ("500" in msg):
-                case_opts["num_ctx"] = max(512, int(case_opts["num_ctx"] * 0.5))
-                case_opts["max_tokens"] = max(64, int(case_opts["max_tokens"] * 0.5))
-                api = _ollama_generate_stream(model, prompt, options=case_opts, keep_alive=args.keepalive)
-            else:
-                raise
-        t1 = time.time()
-        mon.stop()
+            if telemetry:
+                telemetry.case_end(model=model, task=task_name, run=run_idx, status="failed", error=str(e))
+            if exporter:
+                exporter.observe_case(model, task_name, status="failed")
+            raise
+        finally:
+            mon.stop()
+            if exporter:
+                exporter.detach()
         gen = api.get("response", "")
         eval_count = api.get("eval_count")
         eval_dur_ns = api.get("eval_duration")
-        total_dur_ns = api.get("total_duration")
-        load_dur_ns = api.get("load_duration")
-        prompt_eval_ns = api.get("prompt_eval_duration")
         tok_per_sec = (eval_count / (eval_dur_ns / 1e9)) if eval_count and eval_dur_ns else None
         first_token_s = api.get("first_token_seconds")
+        if eval_count:
+            token_count, token_method = eval_count, "ollama_eval_count"
+        else:
+            token_count, token_method = count_tokens(gen, model, mdetails.get("family"))
+            gen_s = (t1 - t0) - (first_token_s or 0)
+            tok_per_sec = (token_count / gen_s) if token_count and gen_s > 0 else None
         qscore = _bartscore_optional(ref_text, gen)
-        code_q = _code_quality_metrics(gen) if task_name == "code" else None
+        code_q = _code_quality_metrics(gen, unit_tests) if task_name == "code" else None
         creative_q = _distinct_metrics(gen) if task_name == "creative" else None
         raw_dir = os.path.join(raw_base, model.replace(":", "_"))
         txt_dir = os.path.join(txt_base, model.replace(":", "_"))
         _ensure_dir(raw_dir)
         _ensure_dir(txt_dir)
-        cid = _case_id(task_name, "custom", run_idx)
+        cid = _case_id(task_name, load_name, run_idx)
         with open(os.path.join(txt_dir, f"{cid}.txt"), "w", encoding="utf-8") as f:
             f.write(gen)
         rec = {
@@ -414,31 +460,34 @@ def main():
                         "latency_seconds": t1 - t0,
                         "throughput_tokens_per_sec": tok_per_sec,
                         "first_token_seconds": first_token_s,
-                        "api_metrics": {
-                            "eval_count": eval_count,
-                            "eval_duration_ns": eval_dur_ns,
-                            "total_duration_ns": total_dur_ns,
-                            "load_duration_ns": load_dur_ns,
-                            "prompt_eval_duration_ns": prompt_eval_ns
-                        },
+                        "token_count": token_count,
+                        "token_count_method": token_method,
+                        "energy_j_per_token": (mon.gpu_energy_j / token_count) if token_count else None,
+                        "api_metrics": api_metrics(api),
                         "system_metrics_summary": mon.summary(),
+                        "phase_metrics": mon.phase_summary(phase_windows(api)),
                         "system_metrics_full": mon.to_dict(),
                         "quality": {"bartscore": qscore, "code": code_q, "creative": creative_q},
                         "metadata": {
                             "options": case_opts,
                             "timestamp": time.time(),
+                            "task": task_name,
+                            "load": load_name,
+                            "run_idx": run_idx,
+                            "case_index": case_index,
                             "model_info": minfo,
                             "model_details": mdetails,
                             "warm_run": bool(args.warmup)
                         }
         }
-        with open(os.path.join(raw_dir, f"{cid}.json"), "w", encoding="utf-8") as f:
+        raw_path = os.path.join(raw_dir, f"{cid}.json")
+        with open(raw_path, "w", encoding="utf-8") as f:
             json.dump(rec, f, ensure_ascii=False, indent=2)
         rows.append([
             timestamp,
             model,
             task_name,
-            "custom",
+            load_name,
             run_idx,
             rec["latency_seconds"],
             rec["throughput_tokens_per_sec"] or 0,
@@ -447,6 +496,23 @@ def main():
             rec["system_metrics_summary"]["gpu_energy_j"],
             qscore if qscore is not None else ""
         ])
+        with open(summary_path, "a", encoding="utf-8") as f:
+            f.write(",".join([str(x) for x in rows[-1]]) + "\n")
+        _write_stats(stats_path, rows)
+        if telemetry:
+            telemetry.case_end(model=model, task=task_name, run=run_idx, status="ok", latency_s=rec["latency_seconds"],
+                               toks_per_s=rec["throughput_tokens_per_sec"], energy_j_per_token=rec["energy_j_per_token"],
+                               token_count=token_count, ttft_s=first_token_s, gpu_energy_j=mon.gpu_energy_j,
+                               cpu_energy_j=mon.cpu_energy_j_approx)
+        if exporter:
+            exporter.observe_case(model, task_name, tokens=token_count, gpu_energy_j=mon.gpu_energy_j,
+                                  cpu_energy_j=mon.cpu_energy_j_approx, ttft_s=first_token_s,
+                                  tps=rec["throughput_tokens_per_sec"])
+        if leaderboard is not None:
+            try:
+                leaderboard.ingest_files([raw_path], experiment=os.path.basename(os.path.normpath(base_dir)))
+            except Exception as e:
+                print("更新排行榜失败:", e)
 
     if cases:
         def map_task(tt):
@@ -458,7 +524,7 @@ def main():
             }
             return m.get(tt, "qa")
         ridx = 1
-        for c in cases:
+        for ci, c in enumerate(cases):
             mm = _resolve_case_models(c.get("model"))
             for one in mm:
                 _run_case(
@@ -467,7 +533,9 @@ def main():
                     map_task(c.get("task_type")),
                     c.get("reference_text"),
                     int(c.get("max_tokens", args.max_tokens)),
-                    ridx
+                    ridx,
+                    unit_tests=c.get("unit_tests"),
+                    case_index=ci
                 )
                 ridx += 1
     else:
@@ -476,44 +544,9 @@ def main():
             for task_name, task in tasks.items():
                 for load_name, load in loads.items():
                     for r in range(1, args.runs + 1):
-                        _run_case(model, task["prompt"], task_name, task.get("reference"), load["max_tokens"], r)
-    def _write_stats(path, rows):
-        from collections import defaultdict
-        import math
-        grp = defaultdict(list)
-        for ts, model, task, load, run, lat, tps, gmem, gutil, gj, bs in rows:
-            grp[(model, task, load)].append((lat, tps, gmem, gutil, gj, bs))
-        with open(path, "w", encoding="utf-8") as f:
-            f.write("model,task,load,count,latency_mean,latency_std,tps_mean,tps_std,gmem_peak_mean,gutil_mean,energy_j_mean,bartscore_mean\n")
-            for (model, task, load), vals in grp.items():
-                n = len(vals)
-                def mean(lst):
-                    return sum(lst)/len(lst) if lst else 0
-                def std(lst):
-                    m = mean(lst)
-                    return math.sqrt(sum((x-m)**2 for x in lst)/len(lst)) if lst else 0
-                lat = [v[0] for v in vals]
-                tps = [v[1] for v in vals]
-                gmem = [v[2] for v in vals]
-                gutil = [v[3] for v in vals]
-                gj = [v[4] for v in vals]
-                bs = [float(v[5]) for v in vals if isinstance(v[5], (int, float, str)) and str(v[5]) != ""]
-                f.write(
-                    ",".join([
-                        model, task, load, str(n),
-                        str(mean(lat)), str(std(lat)),
-                        str(mean(tps)), str(std(tps)),
-                        str(mean(gmem)), str(mean(gutil)),
-                        str(mean(gj)), str(mean(bs)) if bs else ""
-                    ]) + "\n"
-                )
-    with open(summary_path, "w", encoding="utf-8") as f:
-        f.write("timestamp,model,task,load,run,latency_s,toks_per_s,gpu_mem_peak_mb,gpu_util_avg,gpu_energy_j,bartscore\n")
-        for row in rows:
-            f.write(",".join([str(x) for x in row]) + "\n")
+                        _run_case(model, task["prompt"], task_name, task.get("reference"), load["max_tokens"], r,
+                                  load_name=load_name)
     print("汇总写入:", summary_path)
-    stats_path = os.path.join(sum_base, "stats.csv")
-    _write_stats(stats_path, rows)
     print("统计写入:", stats_path)
     return 0
 
@@ -0,0 +1,108 @@
+"""
+Ollama 桩服务
+
+在没有 GPU / Ollama 的环境中联调实验脚本与后端评估任务:
+实现 /api/version、/api/tags、/api/show 与流式 /api/generate, 按固定速率逐个返回片段,
+结束消息中带有与真实服务相同的 eval_count / eval_duration 等字段。
+
+用法:
+    python -m experiments.stub_ollama --port 11555 --models stub:1b
+    OLLAMA_HOST=http://127.0.0.1:11555 python -m experiments.run_experiments --models stub:1b --runs 1
+"""
+
+import json
+import time
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_TEXT = "牛顿第一定律也称惯性定律，物体在不受外力时保持静止或匀速直线运动。"
+
+def make_handler(models, text=DEFAULT_TEXT, token_delay=0.01, load_delay=0.0):
+    pieces = [text[i:i + 2] for i in range(0, len(text), 2)]
+    details = {"family": "stub", "parameter_size": "1B", "quantization_level": "Q4_K_M"}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, obj, status=200):
+            body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(n) or b"{}")
+
+        def do_GET(self):
+            if self.path == "/api/version":
+                return self._json({"version": "0.0.0-stub"})
+            if self.path == "/api/tags":
+                return self._json({"models": [{"name": m, "model": m, "digest": "stub", "details": details}
+                                              for m in models]})
+            return self._json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            req = self._body()
+            if self.path == "/api/show":
+                return self._json({"details": details, "model_info": {}})
+            if self.path != "/api/generate":
+                return self._json({"error": "not found"}, 404)
+            if req.get("model") not in models:
+                return self._json({"error": f"model '{req.get('model')}' not found"}, 404)
+            limit = (req.get("options") or {}).get("num_predict") or len(pieces)
+            out = pieces[:max(1, int(limit))]
+            t0 = time.time()
+            time.sleep(load_delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def chunk(obj):
+                b = (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(b), b))
+                self.wfile.flush()
+
+            t_eval = time.time()
+            for p in out:
+                time.sleep(token_delay)
+                chunk({"model": req["model"], "response": p, "done": False})
+            t1 = time.time()
+            chunk({
+                "model": req["model"], "response": "", "done": True, "done_reason": "stop",
+                "total_duration": int((t1 - t0) * 1e9),
+                "load_duration": int(load_delay * 1e9),
+                "prompt_eval_count": len(req.get("prompt", "")),
+                "prompt_eval_duration": int(1e6),
+                "eval_count": len(out),
+                "eval_duration": max(1, int((t1 - t_eval) * 1e9)),
+            })
+            self.wfile.write(b"0\r\n\r\n")
+
+    return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Ollama 桩服务 (联调用)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11555)
+    parser.add_argument("--models", nargs="+", default=["stub:1b"])
+    parser.add_argument("--token-delay", type=float, default=0.01, help="每个片段的间隔 (秒)")
+    parser.add_argument("--load-delay", type=float, default=0.0, help="首个片段前的延迟 (秒)")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer((args.host, args.port),
+                                 make_handler(args.models, token_delay=args.token_delay, load_delay=args.load_delay))
+    print(f"Ollama 桩服务: http://{args.host}:{args.port} 模型: {', '.join(args.models)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
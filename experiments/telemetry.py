@@ -0,0 +1,58 @@
+"""
+实验进程的实时遥测输出
+
+run_experiments --telemetry 时, 资源采样 (ResourceMonitor.on_sample)、逐片段生成时间
+(generate_stream 的 on_token) 以及用例开始/结束以单行 JSON 写到标准输出, 行首为
+TELEMETRY_PREFIX, 由后端任务调度器解析后放入遥测扇出缓冲区。采样线程与生成线程
+共用一个锁, 保证每行完整。
+"""
+
+import sys
+import json
+import threading
+
+TELEMETRY_PREFIX = "@telemetry "
+
+class TelemetryEmitter:
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+        self._last_token = None
+        self._tokens = 0
+
+    def emit(self, event_type, **fields):
+        line = TELEMETRY_PREFIX + json.dumps(dict(fields, type=event_type), ensure_ascii=False) + "\n"
+        with self._lock:
+            try:
+                self.stream.write(line)
+                self.stream.flush()
+            except (OSError, ValueError):
+                pass
+
+    def case_start(self, **case):
+        self._last_token = None
+        self._tokens = 0
+        self.emit("case_start", **case)
+
+    def case_end(self, **result):
+        self.emit("case_end", tokens=self._tokens, **result)
+
+    def sample(self, sample):
+        if sample:
+            self.emit("sample", **sample)
+
+    def token(self, text, ts):
+        """generate_stream 的 on_token 回调: 记录片段时间与距上一片段的间隔"""
+        gap = None if self._last_token is None else ts - self._last_token
+        self._last_token = ts
+        self._tokens += 1
+        self.emit("token", t=ts, chars=len(text), gap=gap, index=self._tokens)
+
+def parse_line(line):
+    """解析一行输出, 非遥测行返回 None"""
+    if not line.startswith(TELEMETRY_PREFIX):
+        return None
+    try:
+        return json.loads(line[len(TELEMETRY_PREFIX):])
+    except ValueError:
+        return None
@@ -0,0 +1,158 @@
+"""
+按模型分词器统计生成文本的token数
+
+Ollama 模型名 -> Hugging Face 分词器的映射, 分词器按需加载并缓存;
+设置 TOKENIZER_DIR 后优先从本地目录离线加载 (目录名为仓库ID中 "/" 替换为 "__",
+其中包含 tokenizer.json), 其次使用 Hugging Face 本地缓存。默认不联网下载分词器,
+设置 TOKENIZER_DOWNLOAD=1 (或 TokenCounter(allow_download=True)) 后才从 Hub 下载。
+分词器不可用时退回到CJK感知的近似估计。
+"""
+
+import os
+import re
+import threading
+
+# (模型名前缀, 分词器仓库ID), 按顺序匹配, 更具体的前缀放在前面
+TOKENIZER_MAP = [
+    ("deepseek-r1:1.5b", "deepseek-ai/DeepSeek-R1-Distill-Qwen-1.5B"),
+    ("deepseek-r1:7b", "deepseek-ai/DeepSeek-R1-Distill-Qwen-7B"),
+    ("deepseek-r1:8b", "deepseek-ai/DeepSeek-R1-Distill-Llama-8B"),
+    ("deepseek-r1:14b", "deepseek-ai/DeepSeek-R1-Distill-Qwen-14B"),
+    ("deepseek-r1:32b", "deepseek-ai/DeepSeek-R1-Distill-Qwen-32B"),
+    ("deepseek-r1:70b", "deepseek-ai/DeepSeek-R1-Distill-Llama-70B"),
+    ("deepseek-r1", "deepseek-ai/DeepSeek-R1"),
+    ("qwen3", "Qwen/Qwen3-8B"),
+    ("qwen2.5", "Qwen/Qwen2.5-7B-Instruct"),
+    ("qwen2", "Qwen/Qwen2-7B-Instruct"),
+    ("gemma3", "google/gemma-3-4b-it"),
+    ("gemma2", "google/gemma-2-9b-it"),
+    ("llama3.2", "meta-llama/Llama-3.2-3B-Instruct"),
+    ("llama3.1", "meta-llama/Llama-3.1-8B-Instruct"),
+    ("llama3", "meta-llama/Meta-Llama-3-8B-Instruct"),
+    ("mistral", "mistralai/Mistral-7B-Instruct-v0.3"),
+]
+
+# Ollama /api/tags 返回的 details.family -> 仓库ID, 模型名无法匹配时使用
+FAMILY_MAP = {
+    "qwen3": "Qwen/Qwen3-8B",
+    "qwen2": "Qwen/Qwen2.5-7B-Instruct",
+    "gemma3": "google/gemma-3-4b-it",
+    "gemma2": "google/gemma-2-9b-it",
+    "llama": "meta-llama/Llama-3.1-8B-Instruct",
+}
+
+_CJK = "\\u3040-\\u30ff\\u3400-\\u4dbf\\u4e00-\\u9fff\\uf900-\\ufaff\\uac00-\\ud7af"
+_APPROX_RE = re.compile(f"([{_CJK}])|([A-Za-z]+)|([0-9]+)|(\\S)")
+
+def approx_token_count(text):
+    """近似token数: CJK字符约0.8个token, 英文单词约1.3个, 数字每3位1个, 其余符号各1个"""
+    if not text:
+        return 0
+    cjk = words = digits = other = 0
+    for m in _APPROX_RE.finditer(text):
+        if m.group(1):
+            cjk += 1
+        elif m.group(2):
+            words += 1
+        elif m.group(3):
+            digits += (len(m.group(3)) + 2) // 3
+        else:
+            other += 1
+    return int(round(cjk * 0.8 + words * 1.3 + digits + other))
+
+def resolve_tokenizer(model, family=None):
+    name = (model or "").lower()
+    for prefix, repo in TOKENIZER_MAP:
+        if name.startswith(prefix):
+            return repo
+    if family:
+        return FAMILY_MAP.get(str(family).lower())
+    return None
+
+def _env_flag(name):
+    return os.environ.get(name, "") not in ("", "0")
+
+class TokenCounter:
+    def __init__(self, local_dir=None, offline=None, allow_download=None):
+        self.local_dir = local_dir if local_dir is not None else os.environ.get("TOKENIZER_DIR")
+        if offline is None:
+            offline = _env_flag("HF_HUB_OFFLINE")
+        if allow_download is None:
+            allow_download = _env_flag("TOKENIZER_DOWNLOAD")
+        self.offline = offline
+        self.allow_download = allow_download
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _load(self, repo):
+        if self.local_dir:
+            d = os.path.join(self.local_dir, repo.replace("/", "__"))
+            f = os.path.join(d, "tokenizer.json")
+            if os.path.exists(f):
+                try:
+                    from tokenizers import Tokenizer
+                    return ("fast", Tokenizer.from_file(f))
+                except Exception:
+                    pass
+            if os.path.isdir(d):
+                try:
+                    from transformers import AutoTokenizer
+                    return ("hf", AutoTokenizer.from_pretrained(d, local_files_only=True, trust_remote_code=False))
+                except Exception:
+                    pass
+        if self.offline and not self.allow_download:
+            return None
+        try:
+            from transformers import AutoTokenizer
+            return ("hf", AutoTokenizer.from_pretrained(repo, local_files_only=self.offline or not self.allow_download))
+        except Exception:
+            return None
+
+    def get(self, model, family=None):
+        repo = resolve_tokenizer(model, family)
+        if repo is None:
+            return None, None
+        with self._lock:
+            if repo in self._cache:
+                return repo, self._cache[repo]
+        tok = self._load(repo)
+        with self._lock:
+            # 加载失败同样缓存, 避免每次调用都重试下载
+            self._cache.setdefault(repo, tok)
+            return repo, self._cache[repo]
+
+    def count_batch(self, texts, model, family=None):
+        """
+        批量统计token数
+
+        Returns:
+            tuple: (token数列表, 统计方式 "tokenizer:<repo>" 或 "approx")
+        """
+        texts = ["" if t is None else t for t in texts]
+        repo, tok = self.get(model, family)
+        if tok is not None:
+            kind, t = tok
+            try:
+                if kind == "fast":
+                    counts = [len(e.ids) for e in t.encode_batch(texts, add_special_tokens=False)]
+                else:
+                    counts = [len(ids) for ids in t(texts, add_special_tokens=False)["input_ids"]]
+                return counts, f"tokenizer:{repo}"
+            except Exception:
+                pass
+        return [approx_token_count(t) for t in texts], "approx"
+
+    def count(self, text, model, family=None):
+        counts, method = self.count_batch([text], model, family)
+        return counts[0], method
+
+_default_counter = None
+
+def get_token_counter():
+    global _default_counter
+    if _default_counter is None:
+        _default_counter = TokenCounter()
+    return _default_counter
+
+def count_tokens(text, model, family=None):
+    return get_token_counter().count(text, model, family)
@@ -0,0 +1,251 @@
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from scripts import analyze_experiments_1 as composite_analysis
+from scripts import multivariate_statistic_analize as multivariate_analysis
+from src.evaluation.stats import DIRECTIONS, runs_needed
+
+DEFAULT_OUTPUT_DIR = os.path.join(BASE_DIR, "results", "analysis")
+STATE_FILE = "analysis_state.json"
+ANALYSES = ("composite", "multivariate")
+
+def resolve_experiment_dirs(patterns):
+    """展开目录列表与通配符, 只保留包含 summary/results.csv 的实验目录 (按名称排序去重)"""
+    dirs = []
+    for pat in patterns:
+        matches = glob.glob(pat) if glob.has_magic(pat) else [pat]
+        for d in matches:
+            d = os.path.abspath(d)
+            if os.path.isfile(os.path.join(d, "summary", "results.csv")) and d not in dirs:
+                dirs.append(d)
+    return sorted(dirs, key=lambda d: os.path.basename(d))
+
+def experiment_id(exp_dir):
+    return os.path.basename(os.path.normpath(exp_dir))
+
+def fingerprint(exp_dir):
+    """由汇总文件与原始记录的 mtime/大小计算实验目录指纹, 不读取文件内容"""
+    h = hashlib.sha1()
+    paths = [os.path.join(exp_dir, "summary", n) for n in ("results.csv", "stats.csv")]
+    paths += sorted(glob.glob(os.path.join(exp_dir, "raw", "*", "*.json")))
+    for p in paths:
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        h.update(f"{os.path.relpath(p, exp_dir)}|{st.st_mtime_ns}|{st.st_size}\n".encode("utf-8"))
+    return h.hexdigest()
+
+def load_experiment(exp_dir, analyses):
+    """加载单个实验目录, 返回 {"results", "stats", "multivariate"} (未请求的分析对应 None)"""
+    exp_id = experiment_id(exp_dir)
+    out = {"results": None, "stats": None, "multivariate": None}
+    if "composite" in analyses:
+        df_res, df_stats = composite_analysis.load_data(exp_dir)
+        if df_res is not None:
+            out["results"] = df_res.assign(experiment_id=exp_id)
+            out["stats"] = df_stats.assign(experiment_id=exp_id)
+    if "multivariate" in analyses:
+        df = multivariate_analysis.load_and_preprocess_data(exp_dir)
+        if df is not None:
+            out["multivariate"] = df.assign(experiment_id=exp_id)
+    return out
+
+def load_experiments(exp_dirs, analyses, max_workers=4):
+    """并行加载多个实验目录, 返回 {experiment_id: load_experiment 结果}"""
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        loaded = list(ex.map(lambda d: load_experiment(d, analyses), exp_dirs))
+    return {experiment_id(d): data for d, data in zip(exp_dirs, loaded)}
+
+def _concat(frames):
+    frames = [f for f in frames if f is not None and not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+def _label_models(df):
+    # 合并分析时同名模型可能来自不同实验, 以 "模型 [实验]" 区分
+    if df is not None and df["experiment_id"].nunique() > 1:
+        df = df.assign(model=df["model"].astype(str) + " [" + df["experiment_id"] + "]")
+    return df
+
+def run_analyses(data, out_dir, label, analyses, figure_workers=None, force=False):
+    """对一份数据 (单个实验或多个实验的合并) 执行所请求的分析"""
+    os.makedirs(out_dir, exist_ok=True)
+    if "composite" in analyses and data.get("results") is not None and not data["results"].empty:
+        composite_analysis.run_analysis(data["results"], data["stats"], out_dir, label, figure_workers, force)
+    if "multivariate" in analyses and data.get("multivariate") is not None and not data["multivariate"].empty:
+        multivariate_analysis.write_report(data["multivariate"], os.path.join(out_dir, "multivariate_analysis"), label,
+                                           figure_workers, force=force)
+
+def plan_runs(exp_dirs, out_dir, alpha=0.05, power=0.8, workers=4):
+    """
+    汇总所有实验 (同名模型视为同一模型) 的结果, 估算区分相邻排名模型还需的运行次数,
+    输出到 out_dir/runs_plan.csv
+    """
+    loaded = load_experiments(exp_dirs, ["composite"], workers)
+    df = _concat(loaded[k]["results"] for k in loaded)
+    if df is None:
+        print("没有可用的结果数据")
+        return None
+    df = composite_analysis.calculate_composite_metrics(df)
+    plans = []
+    for metric, higher in DIRECTIONS.items():
+        plan = runs_needed(df, metric, "model", higher, "task", alpha, power)
+        plans.append(plan.assign(metric=metric))
+    plan = pd.concat(plans, ignore_index=True)
+    plan = plan[["metric", "a", "b", "diff", "noise_sd", "runs_per_cell", "required", "additional", "note"]]
+    path = os.path.join(out_dir, "runs_plan.csv")
+    plan.to_csv(path, index=False)
+    print(plan.to_string(index=False))
+    # 每个模型需要追加的运行次数取其参与的各比较中的最大值
+    extra = pd.concat([plan[["a", "additional"]].rename(columns={"a": "model"}),
+                       plan[["b", "additional"]].rename(columns={"b": "model"})])
+    extra = extra.dropna().groupby("model")["additional"].max().astype(int)
+    print("\n每个 (模型, 任务) 建议追加的运行次数:")
+    print(extra.to_string())
+    print(f"\n运行计划已保存: {path}")
+    return plan
+
+def _read_state(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _write_state(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def analyze_once(args, force=False, quiet=False, settle=0):
+    """
+    对变化过的实验执行一轮分析
+
+    Args:
+        force (bool): 忽略运行状态与章节缓存, 全部重新分析
+        quiet (bool): 没有需要分析的实验时不输出提示 (监视模式)
+        settle (float): 发现变化后等待的秒数, 期间指纹又变化则本轮跳过
+    """
+    exp_dirs = resolve_experiment_dirs(args.exp_dirs)
+    if not exp_dirs:
+        if not quiet:
+            print("未找到实验目录 (需要包含 summary/results.csv)")
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+    state_path = os.path.join(args.output_dir, STATE_FILE)
+    state = {} if force else _read_state(state_path)
+    analyses = sorted(args.analyses)
+    fps = {experiment_id(d): fingerprint(d) for d in exp_dirs}
+
+    # 状态中记录每个输出对应的输入指纹与分析项, 两者都未变化时跳过
+    def changed(key, fp):
+        prev = state.get(key) or {}
+        return prev.get("fingerprint") != fp or prev.get("analyses") != analyses
+
+    per_todo = []
+    if args.mode in ("per", "both"):
+        per_todo = [d for d in exp_dirs if changed(f"per:{experiment_id(d)}", fps[experiment_id(d)])]
+    union_fp = hashlib.sha1("".join(f"{k}:{v}\n" for k, v in sorted(fps.items())).encode("utf-8")).hexdigest()
+    union_todo = args.mode in ("union", "both") and changed("union", union_fp)
+
+    need = exp_dirs if union_todo else per_todo
+    if not need:
+        if not quiet:
+            print("所有实验自上次分析后均未变化, 无需重新分析 (使用 --force 强制重跑)")
+        return 0
+    if settle:
+        # 实验仍在运行时文件可能正在写入, 指纹在 settle 秒内保持不变才开始分析
+        time.sleep(settle)
+        if any(fingerprint(d) != fps[experiment_id(d)] for d in need):
+            return 0
+    print(f"\n[{datetime.now().strftime('%H:%M:%S')}] 实验目录:", ", ".join(experiment_id(d) for d in exp_dirs))
+    print(f"需要加载 {len(need)} 个实验目录...")
+    loaded = load_experiments(need, analyses, args.workers)
+
+    for d in per_todo:
+        exp_id = experiment_id(d)
+        print(f"\n==== 分析实验 {exp_id} ====")
+        run_analyses(loaded[exp_id], os.path.join(args.output_dir, exp_id), exp_id, analyses, args.figure_workers, force)
+        state[f"per:{exp_id}"] = {"fingerprint": fps[exp_id], "analyses": analyses}
+        _write_state(state_path, state)
+    skipped = [experiment_id(d) for d in exp_dirs if d not in per_todo]
+    if args.mode in ("per", "both") and skipped and not quiet:
+        print("未变化, 跳过:", ", ".join(skipped))
+
+    if union_todo:
+        print(f"\n==== 合并分析 {len(exp_dirs)} 个实验 ====")
+        union = {
+            "results": _label_models(_concat(loaded[k]["results"] for k in loaded)),
+            "stats": _concat(loaded[k]["stats"] for k in loaded),
+            "multivariate": _label_models(_concat(loaded[k]["multivariate"] for k in loaded)),
+        }
+        label = "+".join(experiment_id(d) for d in exp_dirs)
+        run_analyses(union, os.path.join(args.output_dir, "union"), label, analyses, args.figure_workers, force)
+        state["union"] = {"fingerprint": union_fp, "analyses": analyses, "experiments": list(fps)}
+        _write_state(state_path, state)
+
+    print(f"\n分析完成, 结果位于 {args.output_dir}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="多实验批次分析: 复合质效指标、图表与多元统计")
+    parser.add_argument("--exp-dirs", nargs="+", default=[os.path.join(BASE_DIR, "data", "experiments_*")],
+                        help="实验目录列表, 支持通配符 (默认 data/experiments_*)")
+    parser.add_argument("--mode", choices=["per", "union", "both"], default="both",
+                        help="per: 每个实验单独分析; union: 全部实验合并分析; both: 两者都做")
+    parser.add_argument("--analyses", nargs="+", choices=ANALYSES, default=list(ANALYSES))
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="输出目录, 每个实验一个子目录, 合并结果在 union/")
+    parser.add_argument("--workers", type=int, default=4, help="并行加载实验目录的线程数")
+    parser.add_argument("--figure-workers", type=int, default=None,
+                        help="渲染图表的进程数 (默认取 CPU 数, 0 表示在主进程中顺序渲染)")
+    parser.add_argument("--force", action="store_true", help="忽略上次运行状态与章节缓存, 全部重新分析")
+    parser.add_argument("--plan-runs", action="store_true",
+                        help="只估算区分各模型还需追加的运行次数 (不生成报告与图表)")
+    parser.add_argument("--alpha", type=float, default=0.05, help="--plan-runs 的显著性水平")
+    parser.add_argument("--power", type=float, default=0.8, help="--plan-runs 的检验功效")
+    parser.add_argument("--watch", action="store_true",
+                        help="持续监视实验目录, 有新记录写入时增量更新报告 (Ctrl+C 退出)")
+    parser.add_argument("--interval", type=float, default=10.0, help="--watch 的轮询间隔 (秒)")
+    parser.add_argument("--settle", type=float, default=2.0, help="--watch 发现变化后等待文件写完的秒数")
+    args = parser.parse_args()
+
+    if args.plan_runs:
+        exp_dirs = resolve_experiment_dirs(args.exp_dirs)
+        if not exp_dirs:
+            print("未找到实验目录 (需要包含 summary/results.csv)")
+            return 1
+        os.makedirs(args.output_dir, exist_ok=True)
+        return 0 if plan_runs(exp_dirs, args.output_dir, args.alpha, args.power, args.workers) is not None else 1
+    if not args.watch:
+        return analyze_once(args, force=args.force)
+
+    print(f"监视模式: 每 {args.interval:g} 秒检查一次实验目录, Ctrl+C 退出")
+    force = args.force
+    try:
+        while True:
+            try:
+                analyze_once(args, force=force, quiet=True, settle=args.settle)
+                force = False
+            except Exception as e:
+                # 运行中的实验可能暂时处于不完整状态, 下一轮重试
+                print(f"本轮分析失败, 稍后重试: {e}")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n停止监视")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,27 @@
 import os
-import json
 import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
-import matplotlib as mpl
-from matplotlib import font_manager as fm
 from datetime import datetime
 
 # 配置路径
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.evaluation.composite import EXPERIMENTS_1_SPEC, qe_ratio
+from src.evaluation.records import load_records
+from src.evaluation.figures import FigureJob, configure_fonts, data_digest, render_figures
+from src.evaluation.report_builder import ReportBuilder, Section
+from src.evaluation.stats import significance_section
+
 DATA_DIR = os.path.join(BASE_DIR, "data", "experiments_1")
 RESULTS_DIR = os.path.join(BASE_DIR, "results", "experiments_1")
 FIGURES_DIR = os.path.join(RESULTS_DIR, "figures")
 os.makedirs(FIGURES_DIR, exist_ok=True)
 
-HAS_CHINESE_FONT = False
-FONT_PROP = None
-
 def _configure_io_and_fonts():
-    global HAS_CHINESE_FONT
     if hasattr(sys.stdout, "reconfigure"):
         try:
             sys.stdout.reconfigure(encoding="utf-8")
@@ -31,72 +32,19 @@ def _configure_io_and_fonts():
             sys.stderr.reconfigure(encoding="utf-8")
         except Exception:
             pass
+    # 字体查找结果缓存在磁盘上, 图表进程池的子进程重新导入本模块时不必再扫描系统字体
+    return configure_fonts()
 
-    candidates = [
-        "Microsoft YaHei",
-        "SimHei",
-        "Noto Sans CJK SC",
-        "Source Han Sans CN",
-        "Arial Unicode MS",
-    ]
-    available = {f.name for f in fm.fontManager.ttflist}
-    chosen = None
-    for name in candidates:
-        if name in available:
-            chosen = name
-            break
-    if not chosen:
-        font_paths = []
-        try:
-            font_paths = fm.findSystemFonts()
-        except Exception:
-            font_paths = []
-        win_font_dir = r"C:\\Windows\\Fonts"
-        if os.path.isdir(win_font_dir):
-            try:
-                font_paths += [
-                    os.path.join(win_font_dir, f)
-                    for f in os.listdir(win_font_dir)
-                    if f.lower().endswith((".ttf", ".ttc", ".otf"))
-                ]
-            except Exception:
-                pass
-        desired = set(candidates + ["SimSun", "NSimSun", "Microsoft YaHei UI"]) 
-        for p in font_paths:
-            try:
-                nm = fm.FontProperties(fname=p).get_name()
-            except Exception:
-                continue
-            if nm in desired:
-                try:
-                    fm.fontManager.addfont(p)
-                except Exception:
-                    pass
-                chosen = nm
-                break
-    if chosen:
-        mpl.rcParams['font.family'] = chosen
-        mpl.rcParams['font.sans-serif'] = [chosen]
-        mpl.rcParams['axes.unicode_minus'] = False
-        HAS_CHINESE_FONT = True
-        print(f"使用字体: {chosen}")
-        try:
-            font_path = fm.findfont(chosen)
-            globals()['FONT_PROP'] = fm.FontProperties(fname=font_path)
-        except Exception:
-            globals()['FONT_PROP'] = None
-    else:
-        HAS_CHINESE_FONT = False
-
-_configure_io_and_fonts()
+FONT_NAME, FONT_PROP = _configure_io_and_fonts()
+HAS_CHINESE_FONT = FONT_NAME is not None
 
-def load_data():
+def load_data(data_dir=DATA_DIR):
     """加载汇总数据与统计数据"""
-    res_path = os.path.join(DATA_DIR, "summary", "results.csv")
-    stats_path = os.path.join(DATA_DIR, "summary", "stats.csv")
+    res_path = os.path.join(data_dir, "summary", "results.csv")
+    stats_path = os.path.join(data_dir, "summary", "stats.csv")
     
     if not os.path.exists(res_path) or not os.path.exists(stats_path):
-        print("数据文件未找到，请确认 experiments_1 是否执行完成。")
+        print(f"数据文件未找到，请确认 {os.path.basename(os.path.normpath(data_dir))} 是否执行完成。")
         return None, None
         
     df_res = pd.read_csv(res_path)
@@ -110,91 +58,37 @@ def load_data():
     
     return df_res, df_stats
 
-def load_quality_details():
+def load_quality_details(data_dir=DATA_DIR):
     """从原始JSON加载更细粒度的质量指标"""
-    raw_dir = os.path.join(DATA_DIR, "raw")
-    records = []
-    
-    for model in os.listdir(raw_dir):
-        model_path = os.path.join(raw_dir, model)
-        if not os.path.isdir(model_path):
-            continue
-            
-        for fname in os.listdir(model_path):
-            if not fname.endswith(".json"):
-                continue
-                
-            try:
-                with open(os.path.join(model_path, fname), "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    
-                q = data.get("quality", {}) or {}
-                # 提取Code指标
-                code_score = 0
-                if data.get("prompt", "").find("fibonacci") >= 0 or "code" in fname:
-                    if q.get("code") and q["code"].get("code_compiles"):
-                        code_score = 1.0
-                
-                # 提取Creative指标
-                creative_score = 0
-                if q.get("creative"):
-                    creative_score = q["creative"].get("distinct_2", 0)
-                
-                records.append({
-                    "model": data.get("model"),
-                    "task": fname.split("_")[0], # 假设命名规则 task_load_run.json
-                    "run": fname.split("_")[-1].replace(".json", "").replace("r", ""),
-                    "code_score": code_score,
-                    "creative_score": creative_score
-                })
-            except Exception as e:
-                print(f"Error reading {fname}: {e}")
-                
-    return pd.DataFrame(records)
+    rec = load_records(data_dir)
+    return pd.DataFrame({
+        "model": rec["model"],
+        "task": rec["task"],
+        "run": rec["run"],
+        # Code: 可编译记 1.0; Creative: distinct-2
+        "code_score": np.where((rec["task"] == "code") & rec["code_compiles"].fillna(False), 1.0, 0.0),
+        "creative_score": rec["distinct_2"].fillna(0.0).to_numpy()
+    })
 
 def calculate_composite_metrics(df):
     """计算复合质效指标"""
-    # 归一化 (Min-Max Scaling)
-    def normalize(series, mode='max'):
-        if series.max() == series.min():
-            return 1.0 if mode=='max' else 0.0
-        if mode == 'min': # 越小越好 (如延迟、能耗) -> 越大越好
-            return (series.max() - series) / (series.max() - series.min())
-        return (series - series.min()) / (series.max() - series.min())
-
-    # 按任务分组归一化，避免跨任务比较的不公平
-    df['norm_tps'] = df.groupby('task')['tps'].transform(lambda x: normalize(x, 'max'))
-    df['norm_lat'] = df.groupby('task')['latency'].transform(lambda x: normalize(x, 'min'))
-    df['norm_energy'] = df.groupby('task')['energy'].transform(lambda x: normalize(x, 'min'))
-    
-    # 质量分数归一化
-    # 对于 QA/Summary 使用 BARTScore
-    # 对于 Code 使用 code_score (编译通过率)
-    # 对于 Creative 使用 distinct-2
-    
-    df['quality_raw'] = df['bartscore'].fillna(0) # 暂用 BARTScore
-    # 如果有 code/creative 分数，覆盖 quality_raw
+    # 质量分数: QA/Summary 使用 BARTScore, Code 使用 code_score (编译通过率), Creative 使用 distinct-2
+    conds, choices = [], []
     if 'code_score' in df.columns:
-        df.loc[df['task']=='code', 'quality_raw'] = df['code_score']
+        conds.append(df['task'] == 'code')
+        choices.append(df['code_score'])
     if 'creative_score' in df.columns:
-        df.loc[df['task']=='creative', 'quality_raw'] = df['creative_score']
-        
-    df['norm_quality'] = df.groupby('task')['quality_raw'].transform(lambda x: normalize(x, 'max'))
-    
-    # 效能得分 (Efficiency Score): 40% 吞吐 + 30% 延迟 + 30% 能耗优
-    df['efficiency_score'] = 0.4 * df['norm_tps'] + 0.3 * df['norm_lat'] + 0.3 * df['norm_energy']
+        conds.append(df['task'] == 'creative')
+        choices.append(df['creative_score'])
+    df['quality_raw'] = np.select(conds, choices, default=df['bartscore'].fillna(0)) if conds else df['bartscore'].fillna(0)
     
-    # 质效比 (Q/E Ratio)
-    # 避免分母为0，加 epsilon
-    df['qe_ratio'] = (df['norm_quality'] + 0.01) / (1.01 - df['efficiency_score'])
-    
-    return df
+    # 按任务分组 Min-Max 归一化 (避免跨任务比较的不公平), 效能得分 = 40% 吞吐 + 30% 延迟 + 30% 能耗
+    # 质效比 (Q/E Ratio) 与排行榜共用 composite.qe_ratio
+    return qe_ratio(df, EXPERIMENTS_1_SPEC, inplace=True)
 
-def plot_charts(df):
-    """生成可视化图表"""
+def plot_throughput_latency(df, out_path):
+    """吞吐量 vs 延迟 (散点图)"""
     sns.set_style("whitegrid")
-    
-    # 1. 吞吐量 vs 延迟 (散点图)
     plt.figure(figsize=(10, 6))
     sns.scatterplot(data=df, x='latency', y='tps', hue='model', style='task', s=100)
     ax = plt.gca()
@@ -206,10 +100,12 @@ def plot_charts(df):
         ax.set_title("Throughput vs Latency")
         ax.set_xlabel("Latency (s) [lower better]")
         ax.set_ylabel("Throughput (tokens/s) [higher better]")
-    plt.savefig(os.path.join(FIGURES_DIR, "throughput_vs_latency.png"))
+    plt.savefig(out_path)
     plt.close()
-    
-    # 2. 能耗 vs 质量 (散点图)
+
+def plot_energy_quality(df, out_path):
+    """能耗 vs 质量 (散点图)"""
+    sns.set_style("whitegrid")
     plt.figure(figsize=(10, 6))
     # 过滤掉质量为0的点（可能无BARTScore）
     df_q = df[df['quality_raw'] != 0]
@@ -223,10 +119,12 @@ def plot_charts(df):
         ax.set_title("Energy vs Quality")
         ax.set_xlabel("GPU Energy (J) [lower better]")
         ax.set_ylabel("Quality score [higher better]")
-    plt.savefig(os.path.join(FIGURES_DIR, "energy_vs_quality.png"))
+    plt.savefig(out_path)
     plt.close()
-    
-    # 3. 质效比对比 (柱状图)
+
+def plot_qe_ratio(df, out_path):
+    """质效比对比 (柱状图)"""
+    sns.set_style("whitegrid")
     plt.figure(figsize=(12, 6))
     sns.barplot(data=df, x='task', y='qe_ratio', hue='model', errorbar=None)
     ax = plt.gca()
@@ -236,20 +134,17 @@ def plot_charts(df):
     else:
         ax.set_title("Q/E Ratio across tasks")
         ax.set_ylabel("Q/E Ratio [higher better]")
-    plt.savefig(os.path.join(FIGURES_DIR, "quality_efficiency_ratio.png"))
+    plt.savefig(out_path)
     plt.close()
-    
-    # 4. 雷达图 (各维度平均表现)
-    # 按模型聚合
-    radar_df = df.groupby('model')[[ 'norm_tps', 'norm_lat', 'norm_energy', 'norm_quality']].mean().reset_index()
-    
+
+def plot_radar(radar_df, out_path):
+    """雷达图 (各维度平均表现), radar_df 为按模型聚合后的归一化指标"""
     categories = ['吞吐', '延迟(优)', '能耗(优)', '质量'] if HAS_CHINESE_FONT else ['Throughput', 'Latency(+)', 'Energy(+)', 'Quality']
     N = len(categories)
     
     angles = [n / float(N) * 2 * np.pi for n in range(N)]
     angles += angles[:1]
     
-    
     plt.figure(figsize=(8, 8))
     ax = plt.subplot(111, polar=True)
     
@@ -270,30 +165,64 @@ def plot_charts(df):
     if HAS_CHINESE_FONT and FONT_PROP is not None:
         for text in leg.get_texts():
             text.set_fontproperties(FONT_PROP)
-    plt.savefig(os.path.join(FIGURES_DIR, "radar_chart.png"))
+    plt.savefig(out_path)
     plt.close()
 
-def generate_report(df, df_stats):
-    """生成Markdown分析报告"""
+def chart_jobs(df):
+    """构造图表任务, 每个任务只携带所需列 (输入哈希不受无关列影响)"""
+    radar_df = df.groupby('model')[['norm_tps', 'norm_lat', 'norm_energy', 'norm_quality']].mean().reset_index()
+    return [
+        FigureJob("throughput_vs_latency.png", plot_throughput_latency, df[['model', 'task', 'latency', 'tps']]),
+        FigureJob("energy_vs_quality.png", plot_energy_quality, df[['model', 'task', 'energy', 'quality_raw']]),
+        FigureJob("quality_efficiency_ratio.png", plot_qe_ratio, df[['model', 'task', 'qe_ratio']]),
+        FigureJob("radar_chart.png", plot_radar, radar_df),
+    ]
+
+def plot_charts(df, figures_dir=FIGURES_DIR, max_workers=None, force=False):
+    """生成可视化图表 (进程池并行渲染, 输入未变化的图表跳过)"""
+    status = render_figures(chart_jobs(df), figures_dir, max_workers=max_workers, force=force)
+    skipped = sum(1 for v in status.values() if v == "skipped")
+    if skipped:
+        print(f"{skipped} 张图表输入未变化, 已跳过")
+    return status
+
+_SIGNIFICANCE_MEMO = {}
+
+def _significance(data):
+    """关键发现与排名显著性两个章节共用同一次检验结果"""
+    key = data_digest(data)
+    if key not in _SIGNIFICANCE_MEMO:
+        _SIGNIFICANCE_MEMO.clear()
+        _SIGNIFICANCE_MEMO[key] = significance_section(data)
+    return _SIGNIFICANCE_MEMO[key]
+
+def report_findings(df, report_file):
+    """2. 关键发现"""
     best_model_qe = df.groupby('model')['qe_ratio'].mean().idxmax()
     best_model_tps = df.groupby('model')['tps'].mean().idxmax()
     best_model_energy = df.groupby('model')['energy'].mean().idxmin()
     
-    report_content = f"""# 实验数据分析报告：基于大语言模型的多维质效比评估
-
-## 1. 实验概况
-- **实验批次**: experiments_1
-- **生成时间**: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-- **包含模型**: {", ".join(df['model'].unique())}
-- **包含任务**: {", ".join(df['task'].unique())}
-- **总样本数**: {len(df)}
+    # 排名基于少量运行的均值, 附上最优与次优之差的置换检验结果
+    _, sig = _significance(df)
+    def _sig_note(metric, best):
+        r = sig.get(metric)
+        # 任务间样本不均衡时按任务平均的排名可能与总体均值不同, 此时不标注
+        if not r or r["best"] != best or r["runner_up"] is None or r["p_holm"] != r["p_holm"]:
+            return ""
+        if r["significant"]:
+            return f"（显著优于次优的 {r['runner_up']}，p={r['p_holm']:.3f}）"
+        return f"（与次优的 {r['runner_up']} 差异不显著，p={r['p_holm']:.3f}，排名尚不确定）"
+    
+    report_file.write(f"""## 2. 关键发现
+- **综合质效比最优**: **{best_model_qe}**{_sig_note('qe_ratio', best_model_qe)}，在质量与资源消耗之间取得了最佳平衡。
+- **吞吐性能最强**: **{best_model_tps}**{_sig_note('tps', best_model_tps)}，适合对延迟敏感的高并发场景。
+- **最节能模型**: **{best_model_energy}**{_sig_note('energy', best_model_energy)}，适合端侧或低功耗场景。
 
-## 2. 关键发现
-- **综合质效比最优**: **{best_model_qe}**，在质量与资源消耗之间取得了最佳平衡。
-- **吞吐性能最强**: **{best_model_tps}**，适合对延迟敏感的高并发场景。
-- **最节能模型**: **{best_model_energy}**，适合端侧或低功耗场景。
+""")
 
-## 3. 详细指标分析
+def report_metrics(df, report_file):
+    """3.1 - 3.3 详细指标"""
+    report_file.write(f"""## 3. 详细指标分析
 
 ### 3.1 效率维度
 - **吞吐量 (TPS)**: 
@@ -312,7 +241,19 @@ def generate_report(df, df_stats):
 - 排名如下：
 {df.groupby('model')['qe_ratio'].mean().sort_values(ascending=False).to_markdown()}
 
-## 4. 可视化图表
+""")
+
+def report_rankings(df, report_file):
+    """3.4 排名显著性"""
+    significance_md, _ = _significance(df)
+    report_file.write(f"""### 3.4 排名显著性
+{significance_md}
+
+""")
+
+def report_figures(_, report_file):
+    """4. 可视化图表 (图表由 plot_charts 渲染)"""
+    report_file.write("""## 4. 可视化图表
 ### 4.1 吞吐量 vs 延迟
 ![Throughput vs Latency](figures/throughput_vs_latency.png)
 
@@ -325,15 +266,65 @@ def generate_report(df, df_stats):
 ### 4.4 综合雷达图
 ![Radar Chart](figures/radar_chart.png)
 
-## 5. 数据摘要表
+""")
+
+def report_stats_table(df_stats, report_file):
+    """5. 数据摘要表"""
+    report_file.write(f"""## 5. 数据摘要表
 {df_stats.to_markdown(index=False)}
 
----
+""")
+
+def generate_report(df, df_stats, results_dir=RESULTS_DIR, batch="experiments_1", force=False):
+    """生成Markdown分析报告 (输入未变化的章节复用上次结果, 见 ReportBuilder)"""
+    rank_cols = ['model', 'task', 'tps', 'latency', 'energy', 'quality_raw', 'qe_ratio']
+    sections = [
+        Section("findings", report_findings, df[rank_cols], figures=False),
+        Section("metrics", report_metrics, df[['model', 'tps', 'energy', 'bartscore', 'qe_ratio']], figures=False),
+        Section("rankings", report_rankings, df[rank_cols], figures=False),
+        Section("figures", report_figures, figures=False),
+        Section("stats_table", report_stats_table, df_stats, figures=False),
+    ]
+    header = f"""# 实验数据分析报告：基于大语言模型的多维质效比评估
+
+## 1. 实验概况
+- **实验批次**: {batch}
+- **生成时间**: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+- **包含模型**: {", ".join(df['model'].unique())}
+- **包含任务**: {", ".join(df['task'].unique())}
+- **总样本数**: {len(df)}
+
+"""
+    footer = """---
 *注：本报告由自动化分析脚本生成。*
 """
-    with open(os.path.join(RESULTS_DIR, "report.md"), "w", encoding="utf-8") as f:
-        f.write(report_content)
-    print(f"报告已生成: {os.path.join(RESULTS_DIR, 'report.md')}")
+    report_path = os.path.join(results_dir, "report.md")
+    info = ReportBuilder(report_path, os.path.join(results_dir, "figures")).build(sections, header, footer, force=force)
+    cached = [r["name"] for r in info if r["status"] == "cached"]
+    if cached:
+        print("输入未变化, 复用章节:", ", ".join(cached))
+    print(f"报告已生成: {report_path}")
+
+def run_analysis(df_res, df_stats, results_dir=RESULTS_DIR, batch="experiments_1", figure_workers=None, force=False):
+    """计算复合指标、生成图表与报告, 输出到 results_dir"""
+    figures_dir = os.path.join(results_dir, "figures")
+    os.makedirs(figures_dir, exist_ok=True)
+    
+    print("计算复合指标...")
+    df_analysis = calculate_composite_metrics(df_res)
+    
+    # 保存中间数据
+    df_analysis.to_csv(os.path.join(results_dir, "analysis_data.csv"), index=False)
+    
+    print("生成图表...")
+    try:
+        plot_charts(df_analysis, figures_dir, max_workers=figure_workers, force=force)
+    except Exception as e:
+        print(f"生成图表失败 (可能是字体或依赖问题): {e}")
+    
+    print("生成报告...")
+    generate_report(df_analysis, df_stats, results_dir, batch, force)
+    return df_analysis
 
 def main():
     print("开始加载数据...")
@@ -351,20 +342,7 @@ def main():
     except Exception as e:
         print(f"加载细粒度质量指标失败: {e}")
 
-    print("计算复合指标...")
-    df_analysis = calculate_composite_metrics(df_res)
-    
-    # 保存中间数据
-    df_analysis.to_csv(os.path.join(RESULTS_DIR, "analysis_data.csv"), index=False)
-    
-    print("生成图表...")
-    try:
-        plot_charts(df_analysis)
-    except Exception as e:
-        print(f"生成图表失败 (可能是字体或依赖问题): {e}")
-    
-    print("生成报告...")
-    generate_report(df_analysis, df_stats)
+    run_analysis(df_res, df_stats)
     print("分析完成！")
 
 if __name__ == "__main__":
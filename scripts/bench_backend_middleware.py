@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from src.backend.core.instrumentation import InstrumentationMiddleware, RequestMetrics
+from src.backend.core.metrics import MetricsRegistry
+
+logger = logging.getLogger("bench.middleware")
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    """main.py 原先的请求日志中间件 (对照组)"""
+
+    async def dispatch(self, request, call_next):
+        logger.info(f"Request: {request.method} {request.url.path}")
+        response = await call_next(request)
+        logger.info(f"Response: {response.status_code}")
+        return response
+
+def make_app(variant):
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id, "name": f"item-{item_id}", "tags": ["a", "b", "c"]}
+
+    @app.get("/stream")
+    async def stream():
+        async def gen():
+            yield b"data: first\n\n"
+            await asyncio.sleep(0.2)
+            yield b"data: second\n\n"
+        return StreamingResponse(gen(), media_type="text/event-stream")
+
+    if variant == "legacy":
+        app.add_middleware(LegacyLoggingMiddleware)
+    elif variant == "instrumented":
+        app.add_middleware(InstrumentationMiddleware, metrics=RequestMetrics(MetricsRegistry()))
+    return app
+
+async def call(app, path, on_body=None):
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+             "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80)}
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if on_body and message["type"] == "http.response.body" and message.get("body"):
+            on_body(message["body"])
+
+    await app(scope, receive, send)
+
+async def throughput(app, n, concurrency):
+    # 预热 (FastAPI 首次构建中间件栈)
+    await call(app, "/items/0")
+    t0 = time.perf_counter()
+    for start in range(0, n, concurrency):
+        await asyncio.gather(*(call(app, f"/items/{i}") for i in range(start, min(n, start + concurrency))))
+    return n / (time.perf_counter() - t0)
+
+async def first_chunk_latency(app):
+    t0 = time.perf_counter()
+    first = []
+    await call(app, "/stream", on_body=lambda b: first.append(time.perf_counter() - t0))
+    return first[0] if first else None
+
+def main():
+    parser = argparse.ArgumentParser(description="请求中间件吞吐基准: 无中间件 / 原 LoggingMiddleware / 纯 ASGI 指标中间件")
+    parser.add_argument("--n", type=int, default=20000, help="每种配置的请求数")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数, 取最好成绩")
+    args = parser.parse_args()
+
+    # 与服务默认配置一致: INFO 级别日志, 输出丢弃以排除终端开销
+    logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
+
+    apps = {v: make_app(v) for v in ("none", "legacy", "instrumented")}
+    results = {v: 0.0 for v in apps}
+    # 各配置交替运行, 减少机器负载波动对比较的影响
+    for _ in range(args.repeat):
+        for variant, app in apps.items():
+            results[variant] = max(results[variant], asyncio.run(throughput(app, args.n, args.concurrency)))
+    for variant, app in apps.items():
+        asyncio.run(first_chunk_latency(app))  # 预热
+        ttfb = asyncio.run(first_chunk_latency(app))
+        print(f"{variant:>13}: {results[variant]:10.0f} req/s   流式响应首块 {ttfb * 1000:7.1f} ms")
+    base = results["none"]
+    for variant in ("legacy", "instrumented"):
+        print(f"{variant} 相对无中间件: {results[variant] / base:.1%}")
+    print(f"instrumented 相对 legacy: {results['instrumented'] / results['legacy']:.2f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
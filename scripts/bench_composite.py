@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.evaluation.composite import composite_scores, EXPERIMENTS_1_SPEC, performance_metrics_spec
+
+def legacy_composite(df):
+    # analyze_experiments_1.calculate_composite_metrics 的原实现, 作为基线与正确性参照
+    def normalize(series, mode='max'):
+        if series.max() == series.min():
+            return 1.0 if mode=='max' else 0.0
+        if mode == 'min':
+            return (series.max() - series) / (series.max() - series.min())
+        return (series - series.min()) / (series.max() - series.min())
+    df['norm_tps'] = df.groupby('task')['tps'].transform(lambda x: normalize(x, 'max'))
+    df['norm_lat'] = df.groupby('task')['latency'].transform(lambda x: normalize(x, 'min'))
+    df['norm_energy'] = df.groupby('task')['energy'].transform(lambda x: normalize(x, 'min'))
+    df['quality_raw'] = df['bartscore'].fillna(0)
+    if 'code_score' in df.columns:
+        df.loc[df['task']=='code', 'quality_raw'] = df['code_score']
+    if 'creative_score' in df.columns:
+        df.loc[df['task']=='creative', 'quality_raw'] = df['creative_score']
+    df['norm_quality'] = df.groupby('task')['quality_raw'].transform(lambda x: normalize(x, 'max'))
+    df['efficiency_score'] = 0.4 * df['norm_tps'] + 0.3 * df['norm_lat'] + 0.3 * df['norm_energy']
+    df['qe_ratio'] = (df['norm_quality'] + 0.01) / (1.01 - df['efficiency_score'])
+    return df
+
+def make_table(n, n_tasks, seed=1234):
+    """合成结果表: 任务数可调 (模拟 任务 x 负载 x 模型 的细粒度分组), 含缺失值与常量组"""
+    rng = np.random.default_rng(seed)
+    tasks = np.array([f"task{i}" for i in range(n_tasks)])
+    df = pd.DataFrame({
+        "model": rng.choice(["qwen3:8b", "gemma3:4b", "llama3.2:3b", "deepseek-r1:8b"], n),
+        "task": rng.choice(tasks, n),
+        "tps": rng.gamma(5, 6, n),
+        "latency": rng.gamma(3, 4, n),
+        "energy": rng.gamma(4, 50, n),
+        "bartscore": np.where(rng.random(n) < 0.2, np.nan, -rng.gamma(2, 1.5, n)),
+        "code_score": rng.integers(0, 2, n).astype(float),
+        "creative_score": rng.random(n)
+    })
+    df.loc[df["task"] == "task0", "energy"] = 100.0
+    if n_tasks > 1:
+        df = df.replace({"task": {"task1": "code", "task2": "creative"} if n_tasks > 2 else {}})
+    return df
+
+def main():
+    parser = argparse.ArgumentParser(description="复合指标计算基准测试")
+    parser.add_argument("--n", type=int, default=1_000_000, help="结果表行数")
+    parser.add_argument("--tasks", type=int, nargs="+", default=[4, 1000], help="分组数 (可给多个)")
+    args = parser.parse_args()
+
+    from scripts.analyze_experiments_1 import calculate_composite_metrics
+    cols = ["norm_tps", "norm_lat", "norm_energy", "norm_quality", "efficiency_score", "qe_ratio"]
+    for n_tasks in args.tasks:
+        base = make_table(args.n, n_tasks)
+        print(f"行数: {len(base)}, 分组数: {base['task'].nunique()}")
+
+        df = base.copy()
+        t0 = time.perf_counter()
+        ref = legacy_composite(df)
+        print(f"  legacy groupby.transform(lambda): {time.perf_counter() - t0:.2f}s")
+
+        df = base.copy()
+        t0 = time.perf_counter()
+        out = calculate_composite_metrics(df)
+        print(f"  composite_scores (向量化):         {time.perf_counter() - t0:.2f}s")
+
+        diff = max(np.nanmax(np.abs(out[c].to_numpy() - ref[c].to_numpy())) for c in cols)
+        same_nan = all((out[c].isna() == ref[c].isna()).all() for c in cols)
+        print(f"  与原实现最大差异: {diff:.2e}, 缺失位置一致: {same_nan}")
+
+        for method in ("zscore", "rank"):
+            spec = dict(EXPERIMENTS_1_SPEC, method=method)
+            df = base.assign(quality_raw=base["bartscore"].fillna(0))
+            t0 = time.perf_counter()
+            composite_scores(df, spec, inplace=True)
+            print(f"  composite_scores method={method}: {time.perf_counter() - t0:.2f}s")
+
+    # 后端 PERFORMANCE_METRICS 权重 (指标已在 [0, 1] 区间)
+    perf = {
+        "accuracy": {"weight": 0.25, "threshold": 0.8},
+        "efficiency": {"weight": 0.25, "threshold": 0.7},
+        "robustness": {"weight": 0.20, "threshold": 0.75},
+        "fairness": {"weight": 0.15, "threshold": 0.8},
+        "sustainability": {"weight": 0.15, "threshold": 0.7}
+    }
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({k: rng.random(args.n) for k in perf})
+    t0 = time.perf_counter()
+    composite_scores(df, performance_metrics_spec(perf), inplace=True)
+    print(f"PERFORMANCE_METRICS 加权 ({args.n} 行): {time.perf_counter() - t0:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from scripts import multivariate_statistic_analize as mv
+
+MODELS = ["qwen3:8b", "qwen3:4b", "gemma3:4b", "deepseek-r1:8b", "llama3.2:3b"]
+TASKS = ["qa", "summary", "code", "creative"]
+
+def make_runs(n, seed=0):
+    """合成多元分析输入: 模型决定吞吐/显存水平, 任务决定输出长度, 能耗与延迟相关"""
+    rng = np.random.default_rng(seed)
+    m = rng.integers(0, len(MODELS), n)
+    t = rng.integers(0, len(TASKS), n)
+    tps = rng.normal(20 + 15 * m, 5).clip(1)
+    tokens = rng.gamma(4, 60 + 40 * t)
+    latency = tokens / tps + rng.exponential(0.5, n)
+    util = rng.normal(80, 8, n).clip(5, 100)
+    return pd.DataFrame({
+        "model": np.array(MODELS)[m],
+        "task": np.array(TASKS)[t],
+        "latency_s": latency,
+        "toks_per_s": tps,
+        "gpu_mem_peak_mb": rng.normal(5000 + 700 * m, 200),
+        "gpu_util_avg": util,
+        "gpu_energy_j": latency * util * rng.normal(2.5, 0.2, n),
+        "final_quality": rng.normal(-3.5 + 0.1 * m, 0.4),
+    })
+
+def run(df, scalable, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        mv.write_report(df, tmp, "bench", max_workers=workers, scalable=scalable)
+        total = time.perf_counter() - t0
+    return dict(mv.LAST_TIMINGS, total=total)
+
+def main():
+    parser = argparse.ArgumentParser(description="多元统计分析在大样本下的耗时基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 5000, 100000])
+    parser.add_argument("--exact-max", type=int, default=5000, help="精确算法 (全量 Ward 聚类) 只在不超过该样本数时运行")
+    parser.add_argument("--figure-workers", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = []
+    for n in args.sizes:
+        df = make_runs(n)
+        modes = [True] + ([False] if n <= args.exact_max else [])
+        for scalable in modes:
+            timings = run(df, scalable, args.figure_workers)
+            rows.append(dict(n=n, mode="scalable" if scalable else "exact", **timings))
+    out = pd.DataFrame(rows)
+    print(out.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+    # 精度: 流式相关矩阵与增量 PCA 相对精确算法的差异
+    df = make_runs(max(args.sizes))
+    x = df[mv.FEATURES].to_numpy(dtype=float)
+    diff = np.abs(mv.streaming_corr(x, 7919) - np.corrcoef(x, rowvar=False)).max()
+    print(f"\n流式相关矩阵最大误差: {diff:.2e}")
+    xl = df[mv.FEATURES].copy()
+    for c in ['latency_s', 'gpu_energy_j', 'gpu_mem_peak_mb']:
+        xl[c] = np.log1p(xl[c])
+    xl = xl.to_numpy()
+    _, evr, _ = mv._incremental_pca(xl)
+    exact = mv.PCA(n_components=0.8).fit(mv.StandardScaler().fit_transform(xl)).explained_variance_ratio_
+    print(f"解释方差比 增量: {np.round(evr, 4)}  精确: {np.round(exact, 4)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from experiments.quality import diversity_metrics, tokenize
+
+def _legacy_distinct(text, toks=None):
+    # run_experiments._distinct_metrics 的原实现, 作为基线
+    import re
+    if toks is None:
+        toks = re.findall(r"\S+", text)
+    def ngrams(n):
+        return [tuple(toks[i:i+n]) for i in range(len(toks)-n+1)]
+    def distinct(n):
+        ng = ngrams(n)
+        return (len(set(ng))/len(ng)) if ng else 0.0
+    return {"distinct_1": distinct(1), "distinct_2": distinct(2), "distinct_3": distinct(3), "length_tokens": len(toks)}
+
+def make_texts(n, seed=1234):
+    """生成中英混合的合成文本, 长度分布接近 creative 任务的输出 (约300-800字)"""
+    rng = random.Random(seed)
+    zh = "人工智能与未来社会的发展将深刻改变人类的生活方式工作教育医疗交通能源环境"
+    en = ["AI", "model", "energy", "future", "society", "token", "GPU", "data"]
+    texts = []
+    for _ in range(n):
+        parts = []
+        for _ in range(rng.randint(300, 800)):
+            if rng.random() < 0.9:
+                parts.append(rng.choice(zh))
+            else:
+                parts.append(" " + rng.choice(en) + " ")
+            if rng.random() < 0.05:
+                parts.append("，")
+        texts.append("".join(parts))
+    return texts
+
+def main():
+    parser = argparse.ArgumentParser(description="distinct-n / self-BLEU 指标基准测试")
+    parser.add_argument("--n", type=int, default=10000, help="合成文本数量")
+    parser.add_argument("--no-self-bleu", action="store_true")
+    args = parser.parse_args()
+
+    texts = make_texts(args.n)
+    print(f"文本数: {len(texts)}, 平均字符数: {sum(len(t) for t in texts) / len(texts):.0f}")
+
+    t0 = time.perf_counter()
+    for t in texts:
+        _legacy_distinct(t)
+    t_legacy = time.perf_counter() - t0
+    print(f"legacy _distinct_metrics (逐篇, 空白分词, distinct-1..3): {t_legacy:.2f}s")
+
+    t0 = time.perf_counter()
+    for t in texts:
+        _legacy_distinct(t, tokenize(t))
+    t_legacy_cjk = time.perf_counter() - t0
+    print(f"legacy _distinct_metrics (逐篇, CJK分词, distinct-1..3): {t_legacy_cjk:.2f}s")
+
+    t0 = time.perf_counter()
+    for t in texts:
+        diversity_metrics([t], self_bleu=False)
+    t_single = time.perf_counter() - t0
+    print(f"diversity_metrics 逐篇调用 (CJK分词, distinct/重复率/熵): {t_single:.2f}s")
+
+    t0 = time.perf_counter()
+    res = diversity_metrics(texts, self_bleu=not args.no_self_bleu)
+    t_batch = time.perf_counter() - t0
+    label = "distinct/重复率/熵" if args.no_self_bleu else "distinct/重复率/熵/self-BLEU"
+    print(f"diversity_metrics 批量一次调用 ({label}): {t_batch:.2f}s")
+    print("示例:", res[0])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
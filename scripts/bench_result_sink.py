@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from experiments.result_sink import open_sink, read_results
+
+def make_record(i, rng):
+    """与 ExperimentRunner.run_single_experiment 输出结构相近的合成结果 (约2KB)"""
+    text = "".join(rng.choice("人工智能能效评估模型推理功耗") for _ in range(400))
+    return {
+        "model": rng.choice(["qwen3:8b", "gemma3:4b", "llama3.2:3b"]),
+        "prompt": "请解释牛顿第一定律。",
+        "task_type": rng.choice(["knowledge_qa", "creative_writing", "code"]),
+        "generated_text": text,
+        "latency_seconds": rng.random() * 10,
+        "throughput_tokens_per_sec": rng.random() * 50,
+        "resources": {"avg_cpu_percent": rng.random() * 100, "avg_gpu_utilization": rng.random() * 100},
+        "phase_metrics": {p: {"seconds": rng.random(), "gpu_energy_j": rng.random() * 100} for p in ("load", "prompt_eval", "eval")},
+        "metadata": {"case": i, "timestamp": time.time()}
+    }
+
+def checkpoints(times, n_points=5):
+    # 在套件不同位置取单条写入耗时 (毫秒, 邻近100条的中位数)
+    out = []
+    for k in range(n_points):
+        i = min(len(times) - 1, int(len(times) * (k + 1) / n_points) - 1)
+        win = sorted(times[max(0, i - 99):i + 1])
+        out.append((i + 1, win[len(win) // 2] * 1000))
+    return out
+
+def bench_legacy(records, path):
+    results = []
+    times = []
+    for r in records:
+        t0 = time.perf_counter()
+        results.append(r)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        times.append(time.perf_counter() - t0)
+    return times
+
+def bench_sink(records, path, fsync):
+    times = []
+    with open_sink(path, fsync=fsync) as sink:
+        for r in records:
+            t0 = time.perf_counter()
+            sink.write(r)
+            times.append(time.perf_counter() - t0)
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(description="实验结果写入方式基准测试")
+    parser.add_argument("--n", type=int, default=10000, help="追加写入的用例数")
+    parser.add_argument("--legacy-n", type=int, default=1000, help="整表重写方式的用例数 (二次复杂度, 默认只测前1000条)")
+    parser.add_argument("--fsync", choices=["always", "batch", "never"], default="batch")
+    args = parser.parse_args()
+
+    rng = random.Random(1234)
+    records = [make_record(i, rng) for i in range(args.n)]
+    with tempfile.TemporaryDirectory() as d:
+        if args.legacy_n > 0:
+            t0 = time.perf_counter()
+            times = bench_legacy(records[:args.legacy_n], os.path.join(d, "legacy.json"))
+            print(f"整表重写 json.dump(indent=2), {args.legacy_n} 条: 总计 {time.perf_counter() - t0:.2f}s")
+            for i, ms in checkpoints(times):
+                print(f"  第 {i:>6} 条: {ms:8.2f} ms/条")
+
+        for ext in ("jsonl", "parquet"):
+            path = os.path.join(d, f"results.{ext}")
+            try:
+                t0 = time.perf_counter()
+                times = bench_sink(records, path, args.fsync)
+                total = time.perf_counter() - t0
+            except ImportError:
+                print(f"{ext}: 缺少 pyarrow, 跳过")
+                continue
+            print(f"{ext} 追加写入 (fsync={args.fsync}), {args.n} 条: 总计 {total:.2f}s")
+            for i, ms in checkpoints(times):
+                print(f"  第 {i:>6} 条: {ms:8.3f} ms/条")
+            t0 = time.perf_counter()
+            n = len(read_results(path))
+            print(f"  读回 {n} 条: {time.perf_counter() - t0:.2f}s")
+
+        # 模拟写入中途崩溃: 截断最后一行后仍能读出前面的记录
+        path = os.path.join(d, "crash.jsonl")
+        sink = open_sink(path)
+        for r in records[:100]:
+            sink.write(r)
+        sink._f.flush()
+        with open(sink.part_path, "r+b") as f:
+            f.truncate(os.path.getsize(sink.part_path) - 10)
+        print(f"截断末行后读回: {len(read_results(path))} 条 (写入100条)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+def child_import():
+    t0 = time.perf_counter()
+    import src.backend.main  # noqa: F401
+    return {"import_s": time.perf_counter() - t0, "pandas_loaded": "pandas" in sys.modules}
+
+def child_startup():
+    t0 = time.perf_counter()
+    from src.backend.main import app
+    imported = time.perf_counter() - t0
+
+    async def run():
+        t1 = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            ready = time.perf_counter() - t1
+            await app.state.startup.wait_all()
+            background = time.perf_counter() - t1
+            steps = app.state.startup.status()["steps"]
+        return ready, background, steps
+
+    ready, background, steps = asyncio.run(run())
+    return {"import_s": imported, "ready_s": ready, "background_s": background, "steps": steps}
+
+def spawn(kind, env):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", kind], cwd=BASE_DIR, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def import_profile(env, top):
+    """python -X importtime: 第三方顶层包与本项目模块的累计导入耗时 (嵌套模块重复计入)"""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import src.backend.main"], cwd=BASE_DIR,
+                         env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        if "." not in name or name.startswith(("src.", "experiments.")):
+            rows.append((int(parts[1]) / 1e6, name))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="后端导入与启动耗时基准: 每次在新进程中导入 src.backend.main 并运行 lifespan")
+    parser.add_argument("--repeat", type=int, default=5, help="每项测量的进程数, 报告中位数与最小值")
+    parser.add_argument("--top", type=int, default=12, help="导入耗时最多的模块数")
+    parser.add_argument("--ollama-host", default="http://127.0.0.1:9", help="模型缓存初始化访问的 Ollama (默认不可达)")
+    parser.add_argument("--database-url", help="默认使用临时 SQLite 文件")
+    parser.add_argument("--child", choices=["import", "startup"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = child_import() if args.child == "import" else child_startup()
+        print(json.dumps(result, ensure_ascii=False))
+        return 0
+
+    tmp = tempfile.mkdtemp(prefix="bench_startup_")
+    env = dict(os.environ, PYTHONPATH=BASE_DIR, OLLAMA_HOST=args.ollama_host, LOG_LEVEL="WARNING",
+               DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}",
+               LEADERBOARD_DB=os.path.join(tmp, "leaderboard.sqlite"), DATA_DIR=tmp)
+
+    spawn("import", env)  # 预热 .pyc 与文件系统缓存
+    imports = [spawn("import", env) for _ in range(args.repeat)]
+    t = [r["import_s"] for r in imports]
+    print(f"导入 src.backend.main: 中位数 {statistics.median(t) * 1000:.0f} ms, 最小 {min(t) * 1000:.0f} ms, "
+          f"导入后 pandas 已加载: {imports[0]['pandas_loaded']}")
+    print(f"导入耗时最多的模块 (累计):")
+    for seconds, name in import_profile(env, args.top):
+        print(f"  {seconds * 1000:8.1f} ms  {name}")
+
+    runs = [spawn("startup", env) for _ in range(args.repeat)]
+    ready = [r["ready_s"] for r in runs]
+    background = [r["background_s"] for r in runs]
+    print(f"lifespan 就绪 (开始接收请求): 中位数 {statistics.median(ready) * 1000:.0f} ms, 最小 {min(ready) * 1000:.0f} ms")
+    print(f"后台初始化全部完成: 中位数 {statistics.median(background) * 1000:.0f} ms")
+    steps = runs[len(runs) // 2]["steps"]
+    for name, info in steps.items():
+        kind = "后台" if info["background"] else "前台"
+        print(f"  {kind} {name:<20} {info['status']:<8} {(info['seconds'] or 0) * 1000:8.1f} ms  {info['error'] or ''}")
+    serial = sum(info["seconds"] or 0 for info in steps.values())
+    print(f"各步骤串行执行的耗时合计 (原 lifespan 的顺序初始化): {serial * 1000:.0f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import math
+import time
+import signal
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.backend.core.config import settings
+from src.backend.services.model_cache import ModelCache
+
+FINISHED = ("succeeded", "failed", "timeout", "cancelled")
+
+def request(base, method, path, body=None, timeout=10):
+    """每次新建连接, 请求由任意一个工作进程处理"""
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(base + path, data=data, method=method, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"null")
+
+def roles(base, probes):
+    """多次探测 /health, 返回 {worker_id: role}"""
+    seen = {}
+    for _ in range(probes):
+        try:
+            _, report = request(base, "GET", "/health?force=true")
+        except OSError:
+            continue
+        coordination = report["checks"]["scheduler"].get("coordination")
+        if coordination:
+            seen[coordination["worker_id"]] = coordination["role"]
+    return seen
+
+def wait_leader(base, timeout, exclude=None):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        leaders = [w for w, role in roles(base, 10).items() if role == "leader" and w != exclude]
+        if leaders:
+            return leaders[0]
+        time.sleep(0.5)
+    raise RuntimeError("等待 leader 超时")
+
+def peak_vram(jobs):
+    """各任务运行区间重叠时的显存预留之和的最大值, 以及同时运行的最大任务数"""
+    points = []
+    for j in jobs:
+        if j["started_at"] and j["finished_at"]:
+            points += [(j["started_at"], 1, j["vram_mb"]), (j["finished_at"], -1, -j["vram_mb"])]
+    running = mb = peak_mb = peak_n = 0
+    for _, n, v in sorted(points, key=lambda p: (p[0], p[1])):
+        running += n
+        mb += v
+        peak_mb, peak_n = max(peak_mb, mb), max(peak_n, running)
+    return peak_mb, peak_n
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+def main():
+    parser = argparse.ArgumentParser(description="多工作进程部署检查: 以 uvicorn --workers 启动后端, 并发提交评估任务, "
+                                                 "检查只有一个 leader、任务不重复执行、显存预留不超出预算")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=6, help="提交的评估任务数")
+    parser.add_argument("--model", required=True, help="评估使用的模型 (须已在 Ollama 中安装)")
+    parser.add_argument("--runs", type=int, default=1, help="每个任务的重复次数 (每次一个 qa/short 用例)")
+    parser.add_argument("--budget-jobs", type=int, default=2, help="显存预算按同时运行几个任务设定")
+    parser.add_argument("--ollama-host", default=settings.OLLAMA_HOST)
+    parser.add_argument("--port", type=int, default=0, help="默认随机空闲端口")
+    parser.add_argument("--timeout", type=float, default=600, help="等待全部任务结束的时间 (秒)")
+    parser.add_argument("--failover", action="store_true", help="任务运行中强制结束 leader 进程, 检查其他进程接任")
+    args = parser.parse_args()
+
+    cache = ModelCache(host=args.ollama_host, budget_mb=0)
+    asyncio.run(cache.refresh(force=True))
+    job_mb = cache.job_mb([args.model])
+    budget = math.ceil(job_mb * args.budget_jobs)
+    port = args.port
+    if not port:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+
+    tmp = tempfile.mkdtemp(prefix="check_multiworker_")
+    env = dict(os.environ, PYTHONPATH=BASE_DIR, WORKERS=str(args.workers), COORDINATION_BACKEND="file",
+               LEADER_LOCK_FILE=os.path.join(tmp, "scheduler.lock"),
+               DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'jobs.sqlite')}",
+               LEADERBOARD_DB=os.path.join(tmp, "leaderboard.sqlite"), DATA_DIR=tmp,
+               OLLAMA_HOST=args.ollama_host, GPU_MEMORY_BUDGET_MB=str(budget),
+               EVALUATION_MAX_WORKERS=str(args.budget_jobs + 1), RATE_LIMIT_ENABLED="false",
+               CACHE_BACKEND="memory", EXPERIMENT_TRACKING_ENABLED="false", LOG_FILE="")
+    log_path = os.path.join(tmp, "server.log")
+    print(f"工作目录: {tmp}")
+    print(f"模型 {args.model}: 每个任务预留 {job_mb:.0f} MB, 显存预算 {budget:.0f} MB")
+    with open(log_path, "w") as log:
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "src.backend.main:app", "--host", "127.0.0.1",
+                                   "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"],
+                                  cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    failures = []
+    try:
+        leader = wait_leader(base, 60)
+        seen = roles(base, args.workers * 10)
+        leaders = [w for w, role in seen.items() if role == "leader"]
+        print(f"探测到 {len(seen)} 个工作进程, leader: {', '.join(leaders)}")
+        if len(leaders) != 1:
+            failures.append(f"leader 数为 {len(leaders)}")
+
+        spec = {"models": [args.model], "tasks": ["qa"], "loads": ["short"], "runs": args.runs}
+        with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+            submitted = list(pool.map(lambda _: request(base, "POST", "/api/v1/evaluations", spec), range(args.jobs)))
+        ids = [body["id"] for code, body in submitted if code == 202]
+        print(f"已提交 {len(ids)}/{args.jobs} 个任务")
+        if len(ids) != args.jobs:
+            failures.append(f"提交失败: {[body for code, body in submitted if code != 202]}")
+
+        killed = None
+        deadline = time.time() + args.timeout
+        while time.time() < deadline:
+            jobs = [request(base, "GET", f"/api/v1/evaluations/{i}")[1] for i in ids]
+            if args.failover and killed is None and any(j["status"] == "running" for j in jobs):
+                killed = leader
+                os.kill(int(leader.rsplit(":", 1)[1]), signal.SIGKILL)
+                interrupted = [j for j in jobs if j["status"] == "running"]
+                print(f"已强制结束 leader {leader}, 运行中的任务: {[j['id'] for j in interrupted]}")
+                leader = wait_leader(base, 60, exclude=killed)
+                print(f"新的 leader: {leader}")
+            if all(j["status"] in FINISHED for j in jobs):
+                break
+            time.sleep(1)
+        else:
+            failures.append("等待任务结束超时")
+
+        jobs = [request(base, "GET", f"/api/v1/evaluations/{i}")[1] for i in ids]
+        counts = {}
+        for j in jobs:
+            counts[j["status"]] = counts.get(j["status"], 0) + 1
+            if j["status"] == "succeeded" and j["completed"] != j["total"]:
+                failures.append(f"任务 {j['id']} 完成用例数 {j['completed']} != {j['total']} (重复执行?)")
+        print(f"任务状态: {counts}")
+        peak_mb, peak_n = peak_vram(jobs)
+        print(f"同时运行的任务数峰值 {peak_n}, 显存预留峰值 {peak_mb:.0f} MB (预算 {budget:.0f} MB)")
+        if peak_mb > budget:
+            failures.append("显存预留超出预算")
+        if args.failover:
+            lost = [j for j in jobs if j["status"] == "failed"]
+            print(f"接任后标记为失败的任务: {[(j['id'], j['error']) for j in lost]}")
+            orphans = [j["id"] for j in lost if j.get("pid") and pid_alive(j["pid"])]
+            if orphans:
+                failures.append(f"遗留的子进程仍在运行: {orphans}")
+            if counts.get("succeeded", 0) + len(lost) != len(ids):
+                failures.append("部分任务未执行")
+        elif counts.get("succeeded", 0) != len(ids):
+            failures.append("部分任务未成功")
+        final = roles(base, args.workers * 10)
+        if sum(1 for role in final.values() if role == "leader") != 1:
+            failures.append(f"结束时 leader 数不为 1: {final}")
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    if failures:
+        print("检查未通过:")
+        for f in failures:
+            print(f"  - {f}")
+        print(f"服务日志: {log_path}")
+        return 1
+    print("检查通过")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import os
+import sys
+import glob
+import time
+import argparse
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.evaluation.leaderboard import HIGHER_IS_BETTER, Leaderboard, default_db_path
+
+DEFAULT_DB = default_db_path(os.path.join(BASE_DIR, "data"))
+SHOW_COLUMNS = ["rank", "model", "quantization", "task", "load", "runs",
+                "tps", "ttft", "j_per_token", "quality", "qe_ratio"]
+
+def resolve_experiment_dirs(patterns):
+    """展开目录列表与通配符, 只保留包含 raw/ 的实验目录"""
+    dirs = []
+    for pat in patterns:
+        for d in (glob.glob(pat) if glob.has_magic(pat) else [pat]):
+            d = os.path.abspath(d)
+            if os.path.isdir(os.path.join(d, "raw")) and d not in dirs:
+                dirs.append(d)
+    return sorted(dirs)
+
+def cmd_update(lb, args):
+    dirs = resolve_experiment_dirs(args.exp_dirs)
+    if args.rebuild:
+        lb.rebuild()
+    t0 = time.perf_counter()
+    info = lb.update(dirs, max_workers=args.workers)
+    print(f"扫描 {len(dirs)} 个实验目录: 解析 {info['parsed']} 条记录, 移除 {info['removed']} 条, "
+          f"重算 {info['cells']} 个单元, 耗时 {time.perf_counter() - t0:.2f}s")
+    return 0
+
+def cmd_show(lb, args):
+    rows = lb.query(task=args.task, load=args.load, model=args.model, quantization=args.quantization,
+                    sort=args.sort, limit=args.limit, min_runs=args.min_runs)
+    if not rows:
+        print("排行榜为空 (先运行 update)")
+        return 1
+    df = pd.DataFrame(rows)[SHOW_COLUMNS]
+    if args.csv:
+        df.to_csv(args.csv, index=False, encoding="utf-8-sig")
+        print(f"已导出: {args.csv}")
+    print(df.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    return 0
+
+def cmd_best(lb, args):
+    facets = lb.facets()
+    tasks = [args.task] if args.task else facets["task"]
+    found = False
+    for task in tasks:
+        row = lb.best(args.metric, task=task, load=args.load, min_runs=args.min_runs)
+        if row is None:
+            continue
+        found = True
+        print(f"{task}: {row['model']} ({row['quantization']}, {row['load']}) "
+              f"{args.metric}={row[args.metric]:.4f}  runs={row['runs']}")
+    if not found:
+        print("没有满足条件的数据")
+        return 1
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="能效排行榜: 增量汇总实验记录并查询")
+    parser.add_argument("--db", default=DEFAULT_DB, help="排行榜 SQLite 文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("update", help="扫描实验目录, 只解析新增或变化的记录")
+    p.add_argument("--exp-dirs", nargs="+", default=[os.path.join(BASE_DIR, "data", "experiments_*")],
+                   help="实验目录 (支持通配符)")
+    p.add_argument("--workers", type=int, default=8, help="解析记录的线程数")
+    p.add_argument("--rebuild", action="store_true", help="先由已入库记录重算全部汇总")
+
+    p = sub.add_parser("show", help="按指标排序显示排行榜")
+    p.add_argument("--task")
+    p.add_argument("--load")
+    p.add_argument("--model")
+    p.add_argument("--quantization")
+    p.add_argument("--sort", choices=list(HIGHER_IS_BETTER), default="qe_ratio")
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--min-runs", type=int, default=1)
+    p.add_argument("--csv", help="同时导出为 CSV")
+
+    p = sub.add_parser("best", help="每个任务某指标的最优配置")
+    p.add_argument("--metric", choices=list(HIGHER_IS_BETTER), default="qe_ratio")
+    p.add_argument("--task")
+    p.add_argument("--load")
+    p.add_argument("--min-runs", type=int, default=1)
+
+    args = parser.parse_args()
+    lb = Leaderboard(args.db, readonly=args.command != "update")
+    try:
+        return {"update": cmd_update, "show": cmd_show, "best": cmd_best}[args.command](lb, args)
+    finally:
+        lb.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,14 @@
 import os
-import json
 import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from matplotlib import font_manager as fm
 from datetime import datetime
 from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
+from sklearn.decomposition import PCA, IncrementalPCA
 from sklearn.cross_decomposition import CCA
-from sklearn.cluster import AgglomerativeClustering
+from sklearn.cluster import AgglomerativeClustering, MiniBatchKMeans, Birch
 from scipy.cluster.hierarchy import dendrogram, linkage
 from statsmodels.multivariate.manova import MANOVA
 import warnings
@@ -20,66 +18,73 @@ warnings.filterwarnings("ignore")
 
 # 配置路径
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.evaluation.records import load_records
+from src.evaluation.figures import FigureJob, configure_fonts, render_figures
+from src.evaluation.report_builder import ReportBuilder, Section
+
 DATA_DIR = os.path.join(BASE_DIR, "data", "experiments_1")
 RESULTS_DIR = os.path.join(BASE_DIR, "results", "experiments_1")
 OUTPUT_DIR = os.path.join(RESULTS_DIR, "multivariate_analysis")
 FIGURES_DIR = os.path.join(OUTPUT_DIR, "figures")
+
+# 样本数超过该阈值时改用可扩展算法: 分块流式相关矩阵、增量 PCA、
+# MiniBatchKMeans/BIRCH 预聚类后对簇中心做层次聚类、子样本拟合 CCA
+SCALABLE_THRESHOLD = 5000
+CHUNK_SIZE = 50000
+N_CLUSTERS = 40
+CCA_FIT_SAMPLES = 20000
+# 散点图最多绘制的点数 (超出时随机抽样)
+PLOT_MAX_POINTS = 5000
+LAST_TIMINGS = []
+FEATURES = ['latency_s', 'toks_per_s', 'gpu_mem_peak_mb', 'gpu_util_avg', 'gpu_energy_j', 'final_quality']
 os.makedirs(FIGURES_DIR, exist_ok=True)
 
-# 字体配置 (复用 analyze_experiments_1.py 的逻辑)
-HAS_CHINESE_FONT = False
-FONT_PROP = None
-
-def _configure_fonts():
-    global HAS_CHINESE_FONT, FONT_PROP
-    candidates = ["Microsoft YaHei", "SimHei", "Noto Sans CJK SC", "Source Han Sans CN", "Arial Unicode MS"]
-    available = {f.name for f in fm.fontManager.ttflist}
-    chosen = None
-    for name in candidates:
-        if name in available:
-            chosen = name
-            break
-    
-    if not chosen:
-        # 尝试从系统查找
-        try:
-            win_font_dir = r"C:\\Windows\\Fonts"
-            if os.path.isdir(win_font_dir):
-                font_paths = [os.path.join(win_font_dir, f) for f in os.listdir(win_font_dir) 
-                              if f.lower().endswith((".ttf", ".ttc", ".otf"))]
-                desired = set(candidates + ["SimSun", "NSimSun", "Microsoft YaHei UI"])
-                for p in font_paths:
-                    try:
-                        nm = fm.FontProperties(fname=p).get_name()
-                        if nm in desired:
-                            fm.fontManager.addfont(p)
-                            chosen = nm
-                            break
-                    except:
-                        continue
-        except:
-            pass
-
-    if chosen:
-        plt.rcParams['font.family'] = chosen
-        plt.rcParams['font.sans-serif'] = [chosen]
-        plt.rcParams['axes.unicode_minus'] = False
-        HAS_CHINESE_FONT = True
-        try:
-            font_path = fm.findfont(chosen)
-            FONT_PROP = fm.FontProperties(fname=font_path)
-        except:
-            FONT_PROP = None
-        print(f"使用字体: {chosen}")
+# 字体配置 (与 analyze_experiments_1.py 共用, 查找结果缓存在磁盘上)
+FONT_NAME, FONT_PROP = configure_fonts()
+HAS_CHINESE_FONT = FONT_NAME is not None
+
+def _submit(job, jobs, figures_dir):
+    # 传入 jobs 列表时只登记任务, 由 write_report 统一并行渲染; 否则立即渲染
+    if jobs is None:
+        render_figures([job], figures_dir)
     else:
-        print("未找到中文字体，使用默认字体")
+        jobs.append(job)
+
+def _is_scalable(df, scalable):
+    return len(df) > SCALABLE_THRESHOLD if scalable is None else scalable
+
+def _sample_index(n, limit=PLOT_MAX_POINTS, seed=0):
+    """不超过 limit 个的随机行号 (升序); n <= limit 时返回全部"""
+    if n <= limit:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(seed).choice(n, size=limit, replace=False))
+
+def _chunks(n, size=CHUNK_SIZE):
+    for start in range(0, n, size):
+        yield slice(start, min(start + size, n))
 
-_configure_fonts()
+def streaming_corr(x, chunk_size=CHUNK_SIZE):
+    """分块累计一阶与二阶矩计算 Pearson 相关矩阵 (以首块均值平移, 减小抵消误差)"""
+    x = np.asarray(x, dtype=float)
+    n, p = x.shape
+    shift = x[:min(n, chunk_size)].mean(axis=0)
+    s = np.zeros(p)
+    ss = np.zeros((p, p))
+    for sl in _chunks(n, chunk_size):
+        c = x[sl] - shift
+        s += c.sum(axis=0)
+        ss += c.T @ c
+    cov = (ss - np.outer(s, s) / n) / (n - 1)
+    sd = np.sqrt(np.diag(cov))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return cov / np.outer(sd, sd)
 
-def load_and_preprocess_data():
+def load_and_preprocess_data(data_dir=DATA_DIR):
     """加载并预处理数据"""
     print("正在加载数据...")
-    res_path = os.path.join(DATA_DIR, "summary", "results.csv")
+    res_path = os.path.join(data_dir, "summary", "results.csv")
     if not os.path.exists(res_path):
         print(f"文件未找到: {res_path}")
         return None
@@ -91,49 +96,19 @@ def load_and_preprocess_data():
     for col in numeric_cols:
         df[col] = pd.to_numeric(df[col], errors='coerce')
     
-    # 补充细粒度质量指标
-    raw_dir = os.path.join(DATA_DIR, "raw")
-    quality_records = []
-    if os.path.exists(raw_dir):
-        for model in os.listdir(raw_dir):
-            model_path = os.path.join(raw_dir, model)
-            if not os.path.isdir(model_path): continue
-            for fname in os.listdir(model_path):
-                if not fname.endswith(".json"): continue
-                try:
-                    with open(os.path.join(model_path, fname), "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                    q = data.get("quality", {}) or {}
-                    
-                    # 统一提取一个 'quality_score'
-                    # 逻辑: code -> code_compiles (0/1), creative -> distinct_2, qa/summary -> bartscore
-                    task = fname.split("_")[0]
-                    score = None
-                    if task == "code":
-                        score = 1.0 if q.get("code", {}).get("code_compiles") else 0.0
-                    elif task == "creative":
-                        score = q.get("creative", {}).get("distinct_2", 0.0)
-                    else:
-                        score = q.get("bartscore")
-                    
-                    quality_records.append({
-                        "model": data.get("model"),
-                        "task": task,
-                        "run": str(data.get("metadata", {}).get("run_idx", fname.split("_")[-1].replace(".json", "").replace("r", ""))),
-                        "quality_unified": score
-                    })
-                except:
-                    pass
+    # 补充细粒度质量指标 (code -> 单元测试通过率/可编译, creative -> distinct_2, qa/summary -> bartscore)
+    rec = load_records(data_dir)
+    quality_records = len(rec) > 0
     
     if quality_records:
-        df_q = pd.DataFrame(quality_records)
-        # 简单的合并尝试，基于索引或顺序可能不准确，这里尝试用 model+task+run
-        # results.csv 里的 run 也是数字
+        df_q = pd.DataFrame({
+            "model": rec["model"].astype(object),
+            "task": rec["task"].astype(object),
+            "run": rec["run"].astype(str),
+            "quality_unified": rec["quality_unified"]
+        })
+        # 按 model+task+run 合并; 记录的 run 取自 metadata.run_idx, 与 results.csv 的 run 一致
         df['run'] = df['run'].astype(str)
-        # 注意: results.csv 里的 run 可能是 1, 2, 3... 但 raw json 文件名里的 run 也是对应关系
-        # 这里为了简便，直接假设行顺序一致，或者使用 merge
-        # 由于 results.csv 是 append 写入的，顺序应该与遍历顺序不一定一致
-        # 我们用 merge
         df = pd.merge(df, df_q, on=['model', 'task', 'run'], how='left')
         
         # 优先使用 quality_unified，如果为空则回退到 bartscore
@@ -153,19 +128,26 @@ def load_and_preprocess_data():
     print(f"数据加载完成，共 {len(df_clean)} 条有效样本。")
     return df_clean
 
-def analyze_correlation(df, report_file):
-    """1. 多元相关性分析"""
-    print("执行多元相关性分析...")
-    numeric_df = df.select_dtypes(include=[np.number])
-    corr_matrix = numeric_df.corr()
-    
+def plot_correlation_heatmap(corr_matrix, out_path):
     plt.figure(figsize=(10, 8))
     sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', fmt=".2f", square=True)
     title = "多元指标相关性热力图" if HAS_CHINESE_FONT else "Multivariate Correlation Heatmap"
     plt.title(title)
     plt.tight_layout()
-    plt.savefig(os.path.join(FIGURES_DIR, "correlation_heatmap.png"))
+    plt.savefig(out_path)
     plt.close()
+
+def analyze_correlation(df, report_file, figures_dir=FIGURES_DIR, jobs=None, scalable=None):
+    """1. 多元相关性分析"""
+    print("执行多元相关性分析...")
+    numeric_df = df.select_dtypes(include=[np.number])
+    if _is_scalable(df, scalable):
+        corr_matrix = pd.DataFrame(streaming_corr(numeric_df.to_numpy(dtype=float)),
+                                   index=numeric_df.columns, columns=numeric_df.columns)
+    else:
+        corr_matrix = numeric_df.corr()
+    
+    _submit(FigureJob("correlation_heatmap.png", plot_correlation_heatmap, corr_matrix), jobs, figures_dir)
     
     report_file.write("## 1. 多元相关性分析 (Multivariate Correlation)\n\n")
     report_file.write("分析了延迟、吞吐量、显存、利用率、能耗和质量得分之间的线性相关性。\n\n")
@@ -214,12 +196,77 @@ def analyze_manova(df, report_file):
         report_file.write(f"MANOVA 执行失败: {e}\n\n")
         print(f"MANOVA 失败: {e}")
 
-def analyze_pca(df, report_file):
+def plot_pca_biplot(pca_df, out_path, components, explained_variance, features, pc="PC2"):
+    """PCA 双标图: PC1 vs pc (PC2 / PC3); 只有一个主成分时纵轴取 0"""
+    j = int(pc[2:]) - 1
+    plt.figure(figsize=(10, 8))
+    if pc in pca_df.columns:
+        sns.scatterplot(x="PC1", y=pc, hue="model", style="task", data=pca_df, s=100)
+    else:
+        sns.scatterplot(x="PC1", y=[0]*len(pca_df), hue="model", style="task", data=pca_df, s=100)
+    
+    # 绘制特征向量 (Biplot 简化版)
+    # 缩放因子，让箭头适应散点图范围
+    scale_x = pca_df["PC1"].max()
+    scale_y = pca_df[pc].max() if pc in pca_df.columns else scale_x
+    scale_factor = max(scale_x, scale_y) * 0.8
+    if components.shape[0] > j:
+        for i, feature in enumerate(features):
+            plt.arrow(0, 0, components[0, i] * scale_factor, components[j, i] * scale_factor, color='r', alpha=0.5, head_width=0.05)
+            plt.text(components[0, i] * scale_factor * 1.15, components[j, i] * scale_factor * 1.15, feature, color='r', ha='center', va='center')
+        
+    title = "PCA 主成分双标图 (Biplot)" if HAS_CHINESE_FONT else "PCA Biplot"
+    if len(explained_variance) > j:
+        plt.title(f"{title}\nPC1 ({explained_variance[0]:.1%}) vs {pc} ({explained_variance[j]:.1%})")
+    elif pc != "PC2":
+        plt.title(f"{title}\nPC1 ({explained_variance[0]:.1%}) vs {pc}")
+    else:
+        plt.title(f"{title}\nPC1 ({explained_variance[0]:.1%})")
+    plt.xlabel("Principal Component 1")
+    plt.ylabel(f"Principal Component {j + 1}")
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.savefig(out_path)
+    plt.close()
+
+def plot_pca_scree(explained_variance, out_path):
+    plt.figure(figsize=(8, 5))
+    plt.bar(range(1, len(explained_variance)+1), explained_variance)
+    plt.plot(range(1, len(explained_variance)+1), np.cumsum(explained_variance), marker='o')
+    plt.xlabel("Principal Components")
+    plt.ylabel("Explained Variance Ratio")
+    plt.tight_layout()
+    plt.savefig(out_path)
+    plt.close()
+
+def _incremental_pca(x, threshold=0.8, chunk_size=CHUNK_SIZE):
+    """
+    分块标准化 + IncrementalPCA, 保留累计解释方差达到 threshold 的最少主成分
+    (与 PCA(n_components=0.8) 的取法一致)
+
+    Returns:
+        tuple: (components, explained_variance_ratio, 变换函数)
+    """
+    scaler = StandardScaler()
+    for sl in _chunks(len(x), chunk_size):
+        scaler.partial_fit(x[sl])
+    ipca = IncrementalPCA(n_components=x.shape[1], batch_size=chunk_size)
+    batches = list(_chunks(len(x), chunk_size))
+    # IncrementalPCA 要求每批样本数不少于成分数, 过短的末块并入前一块
+    if len(batches) > 1 and batches[-1].stop - batches[-1].start < x.shape[1]:
+        batches[-2:] = [slice(batches[-2].start, batches[-1].stop)]
+    for sl in batches:
+        ipca.partial_fit(scaler.transform(x[sl]))
+    k = int(np.searchsorted(np.cumsum(ipca.explained_variance_ratio_), threshold, side="right") + 1)
+    k = min(k, x.shape[1])
+    components = ipca.components_[:k]
+    return components, ipca.explained_variance_ratio_[:k], lambda rows: (scaler.transform(rows) - ipca.mean_) @ components.T
+
+def analyze_pca(df, report_file, figures_dir=FIGURES_DIR, jobs=None, scalable=None):
     """3. 主成分分析 (PCA)"""
     print("执行主成分分析 (PCA)...")
     report_file.write("## 3. 主成分分析 (PCA)\n\n")
     
-    features = ['latency_s', 'toks_per_s', 'gpu_mem_peak_mb', 'gpu_util_avg', 'gpu_energy_j', 'final_quality']
+    features = FEATURES
     x_df = df[features].copy()
     for c in ['latency_s', 'gpu_energy_j', 'gpu_mem_peak_mb']:
         x_df[c] = np.log1p(x_df[c])
@@ -227,14 +274,23 @@ def analyze_pca(df, report_file):
     y_model = df['model'].values
     y_task = df['task'].values
     
-    # 标准化
-    x = StandardScaler().fit_transform(x)
-    
-    pca = PCA(n_components=0.8)
-    principalComponents = pca.fit_transform(x)
-    
-    # 解释方差比
-    explained_variance = pca.explained_variance_ratio_
+    if _is_scalable(df, scalable):
+        # 大样本: 分块增量拟合, 只对绘图抽样的行计算主成分得分
+        components, explained_variance, transform = _incremental_pca(x)
+        idx = _sample_index(len(x))
+        principalComponents = transform(x[idx])
+        y_model, y_task = y_model[idx], y_task[idx]
+        report_file.write(f"> 样本数 {len(x)} 超过 {SCALABLE_THRESHOLD}, 使用 IncrementalPCA (每批 {CHUNK_SIZE} 行), 图中随机抽样 {len(idx)} 个点。\n\n")
+    else:
+        # 标准化
+        x = StandardScaler().fit_transform(x)
+        
+        pca = PCA(n_components=0.8)
+        principalComponents = pca.fit_transform(x)
+        components = pca.components_
+        
+        # 解释方差比
+        explained_variance = pca.explained_variance_ratio_
     report_file.write(f"- **PC1 解释方差**: {explained_variance[0]:.2%}\n")
     if len(explained_variance) > 1:
         report_file.write(f"- **PC2 解释方差**: {explained_variance[1]:.2%}\n")
@@ -243,8 +299,8 @@ def analyze_pca(df, report_file):
     report_file.write(f"- **累计解释方差**: {sum(explained_variance):.2%}\n\n")
     
     # 载荷矩阵 (Loadings) - 查看每个成分由哪些指标构成
-    load_cols = [f"PC{i+1}" for i in range(pca.components_.shape[0])]
-    loadings = pd.DataFrame(pca.components_.T, columns=load_cols, index=features)
+    load_cols = [f"PC{i+1}" for i in range(components.shape[0])]
+    loadings = pd.DataFrame(components.T, columns=load_cols, index=features)
     report_file.write("### 因子载荷 (Factor Loadings)\n")
     report_file.write(loadings.to_markdown())
     report_file.write("\n\n")
@@ -255,81 +311,17 @@ def analyze_pca(df, report_file):
     pca_df['model'] = y_model
     pca_df['task'] = y_task
     
-    plt.figure(figsize=(10, 8))
-    if 'PC2' in pca_df.columns:
-        sns.scatterplot(x="PC1", y="PC2", hue="model", style="task", data=pca_df, s=100)
-    else:
-        sns.scatterplot(x="PC1", y=[0]*len(pca_df), hue="model", style="task", data=pca_df, s=100)
-    
-    # 绘制特征向量 (Biplot 简化版)
-    # 缩放因子，让箭头适应散点图范围
-    scale_x = principalComponents[:, 0].max()
-    scale_y = principalComponents[:, 1].max() if principalComponents.shape[1] > 1 else principalComponents[:, 0].max()
-    scale_factor = max(scale_x, scale_y) * 0.8
-    if principalComponents.shape[1] > 1:
-        for i, feature in enumerate(features):
-            plt.arrow(0, 0, pca.components_[0, i] * scale_factor, pca.components_[1, i] * scale_factor, color='r', alpha=0.5, head_width=0.05)
-            plt.text(pca.components_[0, i] * scale_factor * 1.15, pca.components_[1, i] * scale_factor * 1.15, feature, color='r', ha='center', va='center')
-        
-    title = "PCA 主成分双标图 (Biplot)" if HAS_CHINESE_FONT else "PCA Biplot"
-    if len(explained_variance) > 1:
-        plt.title(f"{title}\nPC1 ({explained_variance[0]:.1%}) vs PC2 ({explained_variance[1]:.1%})")
-    else:
-        plt.title(f"{title}\nPC1 ({explained_variance[0]:.1%})")
-    plt.xlabel("Principal Component 1")
-    plt.ylabel("Principal Component 2")
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.savefig(os.path.join(FIGURES_DIR, "pca_biplot.png"))
-    plt.close()
-    
+    biplot = dict(components=components, explained_variance=list(explained_variance), features=features)
+    _submit(FigureJob("pca_biplot.png", plot_pca_biplot, pca_df, pc="PC2", **biplot), jobs, figures_dir)
     report_file.write("![PCA Biplot](figures/pca_biplot.png)\n\n")
     if 'PC3' in pca_df.columns:
-        plt.figure(figsize=(10, 8))
-        sns.scatterplot(x="PC1", y="PC3", hue="model", style="task", data=pca_df, s=100)
-        scale_x = principalComponents[:, 0].max()
-        scale_y3 = principalComponents[:, 2].max()
-        scale_factor3 = max(scale_x, scale_y3) * 0.8
-        for i, feature in enumerate(features):
-            plt.arrow(0, 0, pca.components_[0, i] * scale_factor3, pca.components_[2, i] * scale_factor3, color='r', alpha=0.5, head_width=0.05)
-            plt.text(pca.components_[0, i] * scale_factor3 * 1.15, pca.components_[2, i] * scale_factor3 * 1.15, feature, color='r', ha='center', va='center')
-        if len(explained_variance) > 2:
-            plt.title(f"{title}\nPC1 ({explained_variance[0]:.1%}) vs PC3 ({explained_variance[2]:.1%})")
-        else:
-            plt.title(f"{title}\nPC1 ({explained_variance[0]:.1%}) vs PC3")
-        plt.xlabel("Principal Component 1")
-        plt.ylabel("Principal Component 3")
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.savefig(os.path.join(FIGURES_DIR, "pca_biplot_pc1_pc3.png"))
-        plt.close()
+        _submit(FigureJob("pca_biplot_pc1_pc3.png", plot_pca_biplot, pca_df, pc="PC3", **biplot), jobs, figures_dir)
         report_file.write("![PCA Biplot PC1-PC3](figures/pca_biplot_pc1_pc3.png)\n\n")
-    plt.figure(figsize=(8, 5))
-    plt.bar(range(1, len(explained_variance)+1), explained_variance)
-    plt.plot(range(1, len(explained_variance)+1), np.cumsum(explained_variance), marker='o')
-    plt.xlabel("Principal Components")
-    plt.ylabel("Explained Variance Ratio")
-    plt.tight_layout()
-    plt.savefig(os.path.join(FIGURES_DIR, "pca_scree.png"))
-    plt.close()
+    _submit(FigureJob("pca_scree.png", plot_pca_scree, explained_variance), jobs, figures_dir)
     report_file.write("![PCA Scree](figures/pca_scree.png)\n\n")
 
-def analyze_clustering(df, report_file):
-    """4. 层次聚类分析"""
-    print("执行层次聚类分析...")
-    report_file.write("## 4. 层次聚类分析 (Hierarchical Clustering)\n\n")
-    
-    features = ['latency_s', 'toks_per_s', 'gpu_mem_peak_mb', 'gpu_util_avg', 'gpu_energy_j', 'final_quality']
-    x = df[features].values
-    
-    # 标准化
-    x_scaled = StandardScaler().fit_transform(x)
-    
-    # 链接矩阵
-    linked = linkage(x_scaled, 'ward')
-    
+def plot_dendrogram(linked, out_path, labels=None):
     plt.figure(figsize=(12, 7))
-    # 创建标签: Model-Task
-    labels = [f"{r['model']}-{r['task']}" for _, r in df.iterrows()]
-    
     dendrogram(linked,
                orientation='top',
                labels=labels,
@@ -341,13 +333,93 @@ def analyze_clustering(df, report_file):
     title = "实验运行层次聚类树状图" if HAS_CHINESE_FONT else "Hierarchical Clustering Dendrogram"
     plt.title(title)
     plt.tight_layout()
-    plt.savefig(os.path.join(FIGURES_DIR, "clustering_dendrogram.png"))
+    plt.savefig(out_path)
     plt.close()
+
+def _cluster_summary(labels, df, n_clusters):
+    """各簇的样本数与占比最高的 模型-任务 组合"""
+    mt = df['model'].astype(str).values + "-" + df['task'].astype(str).values
+    counts = pd.Series(1, index=pd.MultiIndex.from_arrays([labels, mt])).groupby(level=[0, 1]).size()
+    top = counts.sort_values(ascending=False).groupby(level=0).head(1)
+    sizes = np.bincount(labels, minlength=n_clusters)
+    rows = []
+    for (c, combo), cnt in top.items():
+        rows.append({"cluster": f"C{c}", "size": int(sizes[c]), "dominant": combo, "share": cnt / sizes[c]})
+    return pd.DataFrame(rows).sort_values("size", ascending=False).reset_index(drop=True)
+
+def _clustering_scalable(df, x_scaled, report_file, figures_dir, jobs, method):
+    k = min(N_CLUSTERS, len(x_scaled))
+    if method == "birch":
+        model = Birch(n_clusters=k).fit(x_scaled)
+        labels = model.labels_
+        name = "BIRCH"
+    else:
+        model = MiniBatchKMeans(n_clusters=k, batch_size=4096, n_init=3, random_state=0).fit(x_scaled)
+        labels = model.labels_
+        name = "MiniBatchKMeans"
+    # 簇中心取各簇成员均值 (BIRCH 的子簇中心与最终簇不一一对应); 空簇丢弃
+    used = np.unique(labels)
+    remap = np.full(labels.max() + 1, -1)
+    remap[used] = np.arange(len(used))
+    labels = remap[labels]
+    k = len(used)
+    sizes = np.bincount(labels, minlength=k)
+    centers = np.zeros((k, x_scaled.shape[1]))
+    np.add.at(centers, labels, x_scaled)
+    centers /= sizes[:, None]
+    summary = _cluster_summary(labels, df, k)
+    
+    if k > 1:
+        linked = linkage(centers, 'ward')
+        by_cluster = summary.set_index("cluster")
+        leaf_labels = [f"C{i} (n={sizes[i]}, {by_cluster.loc[f'C{i}', 'dominant']})" for i in range(k)]
+        _submit(FigureJob("clustering_dendrogram.png", plot_dendrogram, linked, labels=leaf_labels), jobs, figures_dir)
+    
+    report_file.write(f"样本数 {len(x_scaled)} 超过 {SCALABLE_THRESHOLD}, 先用 {name} 将所有运行划分为 {k} 个簇, "
+                      "再对簇中心做 Ward 层次聚类：\n\n")
+    report_file.write(summary.to_markdown(index=False, floatfmt=".2f"))
+    report_file.write("\n\n")
+    if k > 1:
+        report_file.write("![Clustering Dendrogram](figures/clustering_dendrogram.png)\n\n")
+
+def analyze_clustering(df, report_file, figures_dir=FIGURES_DIR, jobs=None, scalable=None, method="minibatch"):
+    """4. 层次聚类分析 (大样本时为 MiniBatchKMeans / BIRCH 预聚类 + 簇级树状图)"""
+    print("执行层次聚类分析...")
+    report_file.write("## 4. 层次聚类分析 (Hierarchical Clustering)\n\n")
+    
+    features = FEATURES
+    x = df[features].values
+    
+    # 标准化
+    x_scaled = StandardScaler().fit_transform(x)
+    
+    if _is_scalable(df, scalable):
+        _clustering_scalable(df, x_scaled, report_file, figures_dir, jobs, method)
+        return
+    
+    # 链接矩阵
+    linked = linkage(x_scaled, 'ward')
+    
+    # 创建标签: Model-Task
+    labels = (df['model'].astype(str) + "-" + df['task'].astype(str)).tolist()
+    _submit(FigureJob("clustering_dendrogram.png", plot_dendrogram, linked, labels=labels), jobs, figures_dir)
     
     report_file.write("使用 Ward 方法和欧氏距离对所有实验运行进行聚类，结果如下：\n\n")
     report_file.write("![Clustering Dendrogram](figures/clustering_dendrogram.png)\n\n")
 
-def analyze_cca(df, report_file):
+def plot_cca_pair(cv_df, out_path, r=0.0):
+    """第一对典型变量的散点图, cv_df 包含 x / y / model / task 列"""
+    plt.figure(figsize=(8, 8))
+    sns.scatterplot(x=cv_df['x'].values, y=cv_df['y'].values, hue=cv_df['model'], style=cv_df['task'], s=100)
+    title = f"典型变量对 1 (r={r:.2f})" if HAS_CHINESE_FONT else f"Canonical Variate Pair 1 (r={r:.2f})"
+    plt.title(title)
+    plt.xlabel("Resource Canonical Variate 1")
+    plt.ylabel("Performance Canonical Variate 1")
+    plt.grid(True)
+    plt.savefig(out_path)
+    plt.close()
+
+def analyze_cca(df, report_file, figures_dir=FIGURES_DIR, jobs=None, scalable=None):
     """5. 典型相关分析 (CCA)"""
     print("执行典型相关分析 (CCA)...")
     report_file.write("## 5. 典型相关分析 (Canonical Correlation Analysis)\n\n")
@@ -368,8 +440,17 @@ def analyze_cca(df, report_file):
     # n_components 不能超过 min(X.shape[1], Y.shape[1])
     n_comps = min(len(X_cols), len(Y_cols))
     cca = CCA(n_components=n_comps)
+    scalable = _is_scalable(df, scalable)
     try:
-        cca.fit(X_scaled, Y_scaled)
+        if scalable:
+            # 大样本: 在随机子样本上拟合, 再对全部样本做线性变换
+            fit_idx = _sample_index(len(X_scaled), CCA_FIT_SAMPLES, seed=1)
+            cca.fit(X_scaled[fit_idx], Y_scaled[fit_idx])
+            if len(fit_idx) < len(X_scaled):
+                report_file.write(f"> 样本数 {len(X_scaled)} 超过 {CCA_FIT_SAMPLES}, CCA 在随机抽取的 {len(fit_idx)} 个样本上拟合, "
+                                  "相关系数与载荷在全部样本上计算。\n\n")
+        else:
+            cca.fit(X_scaled, Y_scaled)
         
         # 典型变量
         X_c, Y_c = cca.transform(X_scaled, Y_scaled)
@@ -399,15 +480,9 @@ def analyze_cca(df, report_file):
         report_file.write("\n\n")
         
         # 绘图：第一对典型变量的散点图
-        plt.figure(figsize=(8, 8))
-        sns.scatterplot(x=X_c[:, 0], y=Y_c[:, 0], hue=df['model'], style=df['task'], s=100)
-        title = f"典型变量对 1 (r={corrs[0]:.2f})" if HAS_CHINESE_FONT else f"Canonical Variate Pair 1 (r={corrs[0]:.2f})"
-        plt.title(title)
-        plt.xlabel("Resource Canonical Variate 1")
-        plt.ylabel("Performance Canonical Variate 1")
-        plt.grid(True)
-        plt.savefig(os.path.join(FIGURES_DIR, "cca_pair1.png"))
-        plt.close()
+        idx = _sample_index(len(X_c)) if scalable else np.arange(len(X_c))
+        cv_df = pd.DataFrame({"x": X_c[idx, 0], "y": Y_c[idx, 0], "model": df['model'].values[idx], "task": df['task'].values[idx]})
+        _submit(FigureJob("cca_pair1.png", plot_cca_pair, cv_df, r=float(corrs[0])), jobs, figures_dir)
         
         report_file.write("![CCA Pair 1](figures/cca_pair1.png)\n\n")
         
@@ -415,25 +490,51 @@ def analyze_cca(df, report_file):
         report_file.write(f"CCA 执行失败 (可能是样本量不足或共线性): {e}\n\n")
         print(f"CCA 失败: {e}")
 
+def write_report(df, output_dir=OUTPUT_DIR, source="data/experiments_1", max_workers=None,
+                 scalable=None, cluster_method="minibatch", force=False):
+    """
+    执行全部多元分析并生成报告, 图表保存在 output_dir/figures (分析完成后并行渲染)
+
+    各章节只声明自己用到的列, 输入未变化的章节直接复用上次的结果 (见 ReportBuilder);
+    scalable 为 None 时按样本数是否超过 SCALABLE_THRESHOLD 自动选择算法。
+    各阶段耗时与缓存状态写入报告末尾, 同时保存到模块变量 LAST_TIMINGS。
+    """
+    global LAST_TIMINGS
+    figures_dir = os.path.join(output_dir, "figures")
+    os.makedirs(figures_dir, exist_ok=True)
+    report_path = os.path.join(output_dir, "multivariate_report.md")
+    scalable = _is_scalable(df, scalable)
+    keys = ['model', 'task']
+    common = dict(figures_dir=figures_dir, scalable=scalable)
+    sections = [
+        Section("correlation", analyze_correlation, df[FEATURES], common),
+        Section("manova", analyze_manova, df[keys + ['latency_s', 'toks_per_s', 'gpu_energy_j', 'final_quality']], figures=False),
+        Section("pca", analyze_pca, df[keys + FEATURES], common),
+        Section("clustering", analyze_clustering, df[keys + FEATURES], dict(common, method=cluster_method)),
+        Section("cca", analyze_cca, df[keys + FEATURES], common),
+    ]
+    header = (f"# 实验数据多元统计分析报告\n\n"
+              f"- **生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+              f"- **样本数量**: {len(df)}\n"
+              f"- **数据来源**: `{source}`\n"
+              f"- **算法模式**: {'可扩展 (大样本)' if scalable else '精确 (全量)'}\n\n")
+    info = ReportBuilder(report_path, figures_dir).build(sections, header, max_workers=max_workers,
+                                                         force=force, timings=True)
+    
+    cached = [r["name"] for r in info if r["status"] == "cached"]
+    if cached:
+        print("输入未变化, 复用章节:", ", ".join(cached))
+    print("各阶段耗时: " + ", ".join(f"{r['name']} {r['seconds']:.2f}s" for r in info))
+    LAST_TIMINGS = [(r["name"], r["seconds"]) for r in info]
+    return report_path
+
 def main():
     df = load_and_preprocess_data()
     if df is None or df.empty:
         print("无数据可分析。")
         return
 
-    report_path = os.path.join(OUTPUT_DIR, "multivariate_report.md")
-    
-    with open(report_path, "w", encoding="utf-8") as f:
-        f.write(f"# 实验数据多元统计分析报告\n\n")
-        f.write(f"- **生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"- **样本数量**: {len(df)}\n")
-        f.write(f"- **数据来源**: `data/experiments_1`\n\n")
-        
-        analyze_correlation(df, f)
-        analyze_manova(df, f)
-        analyze_pca(df, f)
-        analyze_clustering(df, f)
-        analyze_cca(df, f)
+    report_path = write_report(df)
         
     print(f"\n分析完成！报告已生成: {report_path}")
     print(f"图表已保存至: {FIGURES_DIR}")
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from scripts.leaderboard import resolve_experiment_dirs
+from src.backend.core.config import settings
+from src.backend.core.database import create_engine, create_tables
+from src.backend.services.record_store import RecordStore
+from src.evaluation.leaderboard import METRICS
+
+SHOW_COLUMNS = ["rank", "model", "quantization", "task", "load", "runs"] + list(METRICS)
+
+async def cmd_import(store, args):
+    dirs = resolve_experiment_dirs(args.exp_dirs)
+    t0 = time.perf_counter()
+    total = {"parsed": 0, "skipped": 0, "removed": 0, "samples": 0}
+    for d in dirs:
+        info = await store.import_experiment(d)
+        for k in total:
+            total[k] += info[k]
+    counts = await store.counts()
+    print(f"扫描 {len(dirs)} 个实验目录: 导入 {total['parsed']} 条记录 ({total['samples']} 行采样), "
+          f"未变化 {total['skipped']} 条, 移除 {total['removed']} 条, 耗时 {time.perf_counter() - t0:.2f}s")
+    print(f"数据库: {counts}")
+    return 0
+
+async def cmd_show(store, args):
+    rows = await store.leaderboard(task=args.task, load=args.load, model=args.model, quantization=args.quantization,
+                                   sort=args.sort, limit=args.limit, min_runs=args.min_runs)
+    if not rows:
+        print("数据库中没有记录 (先运行 import)")
+        return 1
+    df = pd.DataFrame(rows)[SHOW_COLUMNS]
+    print(df.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    return 0
+
+async def run(args):
+    engine = create_engine(args.db_url)
+    try:
+        await create_tables(engine)
+        store = RecordStore(engine, batch_size=args.batch_size)
+        return await {"import": cmd_import, "show": cmd_show}[args.command](store, args)
+    finally:
+        await engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description="实验记录数据库: 把原始记录导入 runs / samples / scores 表并查询")
+    parser.add_argument("--db-url", default=settings.DATABASE_URL,
+                        help="数据库 URL, 默认 DATABASE_URL (本地可用 sqlite:///data/records.sqlite)")
+    parser.add_argument("--batch-size", type=int, default=200, help="每个事务写入的记录数")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import", help="增量导入实验目录 (只处理新增或变化的记录)")
+    p.add_argument("--exp-dirs", nargs="+", default=[os.path.join(BASE_DIR, "data", "experiments_*")],
+                   help="实验目录 (支持通配符)")
+
+    p = sub.add_parser("show", help="按 (模型, 量化, 任务, 负载) 聚合并排序")
+    p.add_argument("--task")
+    p.add_argument("--load")
+    p.add_argument("--model")
+    p.add_argument("--quantization")
+    p.add_argument("--sort", choices=list(METRICS), default="tps")
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--min-runs", type=int, default=1)
+
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
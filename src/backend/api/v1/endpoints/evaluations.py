@@ -0,0 +1,175 @@
+"""
+评估任务接口
+
+提交一组用例 (模型 x 任务 x 负载 x 重复次数, 或 test_cases.json 格式的自定义用例),
+返回任务 ID 后可轮询状态或通过 SSE 订阅进度。任务由 app.state.task_scheduler 执行;
+多进程部署时任务状态存于数据库, 请求可由任一工作进程处理。
+已结束任务的结果汇总不再变化, 经由结果缓存 (EVALUATION_RESULT_CACHE_TTL) 返回。
+提交接口按客户端限流 (app.state.rate_limiter), 响应带 X-RateLimit-* 头, 超限时返回 429 与 Retry-After。
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, root_validator, validator
+
+from src.backend.core.config import settings
+from src.backend.core.exceptions import ConflictError, TooManyRequestsError
+from src.backend.services.rate_limiter import client_key
+from src.backend.services.result_cache import cached
+from src.backend.services.task_scheduler import DEFAULT_LOADS, DEFAULT_TASKS, FINISHED, TaskScheduler, read_stats
+
+router = APIRouter()
+
+CASE_TASK_TYPES = ["knowledge_qa", "text_summarization", "creative_writing", "code_generation"]
+CACHE_NAMESPACE = "evaluations"
+
+
+class EvaluationCase(BaseModel):
+    """自定义用例, 字段与 experiments/test_cases.json 一致"""
+
+    model: Any = Field(..., description="模型名、模型名列表或 \"all\"")
+    prompt: str
+    task_type: str
+    max_tokens: int = Field(..., gt=0)
+    temperature: float = Field(..., ge=0, le=2)
+    reference_text: Optional[str] = None
+    unit_tests: Optional[Dict[str, Any]] = None
+
+    @validator("model")
+    def check_model(cls, v):
+        if isinstance(v, str) and v.strip():
+            return v
+        if isinstance(v, list) and v and all(isinstance(m, str) and m.strip() for m in v):
+            return v
+        raise ValueError("model 必须为非空字符串或非空字符串列表")
+
+    @validator("task_type")
+    def check_task_type(cls, v):
+        if v not in CASE_TASK_TYPES:
+            raise ValueError(f"task_type 可选: {', '.join(CASE_TASK_TYPES)}")
+        return v
+
+    @validator("unit_tests")
+    def check_unit_tests(cls, v):
+        if v is not None and not isinstance(v.get("tests"), list):
+            raise ValueError("unit_tests.tests 必须为列表")
+        return v
+
+
+class EvaluationRequest(BaseModel):
+    """评估任务参数, 与 run_experiments 命令行参数对应"""
+
+    models: List[str] = Field(default_factory=list, description="模型矩阵 (cases 为空时必填)")
+    tasks: Optional[List[str]] = Field(None, description=f"默认全部: {', '.join(DEFAULT_TASKS)}")
+    loads: Optional[List[str]] = Field(None, description=f"默认全部: {', '.join(DEFAULT_LOADS)}")
+    runs: int = Field(1, ge=1, le=100)
+    cases: Optional[List[EvaluationCase]] = Field(None, description="自定义用例, 提供时忽略 models/tasks/loads")
+    max_tokens: Optional[int] = Field(None, gt=0)
+    temperature: Optional[float] = Field(None, ge=0, le=2)
+    top_p: Optional[float] = Field(None, gt=0, le=1)
+    num_ctx: Optional[int] = Field(None, gt=0)
+    seed: Optional[int] = None
+    keepalive: Optional[str] = None
+    warmup: bool = False
+
+    @validator("tasks")
+    def check_tasks(cls, v):
+        bad = [t for t in v or [] if t not in DEFAULT_TASKS]
+        if bad:
+            raise ValueError(f"未知任务: {bad}")
+        return v
+
+    @validator("loads")
+    def check_loads(cls, v):
+        bad = [x for x in v or [] if x not in DEFAULT_LOADS]
+        if bad:
+            raise ValueError(f"未知负载: {bad}")
+        return v
+
+    @root_validator(skip_on_failure=True)
+    def check_matrix(cls, values):
+        if not values.get("cases") and not values.get("models"):
+            raise ValueError("models 与 cases 至少提供一个")
+        return values
+
+
+def get_scheduler(request: Request) -> TaskScheduler:
+    return request.app.state.task_scheduler
+
+
+async def rate_limit(request: Request, response: Response) -> None:
+    """按客户端消耗一个令牌, 超限时返回 429"""
+    limiter = getattr(request.app.state, "rate_limiter", None)
+    if limiter is None or not limiter.enabled:
+        return
+    result = await limiter.check(client_key(request))
+    headers = {"X-RateLimit-Limit": str(result.limit), "X-RateLimit-Remaining": str(result.remaining)}
+    if not result.allowed:
+        raise TooManyRequestsError("请求过于频繁，请稍后重试", retry_after=result.retry_after, headers=headers)
+    response.headers.update(headers)
+
+
+@router.post("", status_code=202, dependencies=[Depends(rate_limit)])
+async def submit_evaluation(body: EvaluationRequest, request: Request) -> Dict[str, Any]:
+    """提交评估任务, 返回任务 ID、预计开始时间与状态查询地址"""
+    spec = body.dict(exclude_none=True)
+    scheduler = get_scheduler(request)
+    job = await scheduler.submit(spec)
+    base = request.url.path.rstrip("/")
+    return dict(job.to_dict(), queue_eta_seconds=round(scheduler.queue_eta(job), 1),
+                links={"self": f"{base}/{job.id}", "events": f"{base}/{job.id}/events"})
+
+
+@router.get("")
+async def list_evaluations(request: Request, status: Optional[str] = None) -> Dict[str, Any]:
+    """任务列表 (新提交的在前)"""
+    return {"items": [j.to_dict() for j in await get_scheduler(request).list_jobs(status)]}
+
+
+@router.get("/{job_id}")
+async def get_evaluation(job_id: str, request: Request) -> Dict[str, Any]:
+    """任务状态、进度与最近的输出"""
+    job = await get_scheduler(request).get(job_id)
+    return job.to_dict(log=True)
+
+
+@router.delete("/{job_id}")
+async def cancel_evaluation(job_id: str, request: Request) -> Dict[str, Any]:
+    """取消排队中或运行中的任务"""
+    job = await get_scheduler(request).cancel(job_id)
+    return job.to_dict()
+
+
+@router.get("/{job_id}/results")
+async def evaluation_results(job_id: str, request: Request) -> Dict[str, Any]:
+    """已结束任务按模型 x 任务 x 负载汇总的延迟、吞吐、能耗与质量均值"""
+    job = await get_scheduler(request).get(job_id)
+    if not job.finished:
+        raise ConflictError("任务尚未结束", details={"status": job.status})
+    items = await cached(getattr(request.app.state, "result_cache", None), CACHE_NAMESPACE,
+                         {"job": job.id, "finished_at": job.finished_at}, lambda: read_stats(job.output_dir),
+                         ttl=settings.EVALUATION_RESULT_CACHE_TTL)
+    return {"id": job.id, "status": job.status, "items": items}
+
+
+@router.get("/{job_id}/events")
+async def stream_evaluation(job_id: str, request: Request) -> StreamingResponse:
+    """以 Server-Sent Events 推送任务状态 (progress / done 事件), 任务结束后关闭连接"""
+    scheduler = get_scheduler(request)
+    await scheduler.get(job_id)  # 任务不存在时在建立流之前返回 404
+
+    async def gen():
+        async for snap in scheduler.watch(job_id):
+            if await request.is_disconnected():
+                break
+            if snap is None:
+                yield ": keep-alive\n\n"
+                continue
+            event = "done" if snap["status"] in FINISHED else "progress"
+            yield f"event: {event}\ndata: {json.dumps(snap, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(gen(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,90 @@
+"""
+能效排行榜接口
+
+只读查询 settings.LEADERBOARD_DB 中物化的排行榜 (src.evaluation.leaderboard),
+不读取原始实验记录; 排行榜由 scripts/leaderboard.py update 或实验运行过程增量更新。
+查询结果经由结果缓存 (app.state.result_cache), 缓存键包含数据库版本, 排行榜写入后自然失效。
+src.evaluation.leaderboard 依赖 pandas, 首次使用时才导入 (启动后由后台任务预热)。
+"""
+
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from src.backend.core.config import settings
+from src.backend.services.result_cache import cached
+
+router = APIRouter()
+
+CACHE_NAMESPACE = "leaderboard"
+
+_leaderboard = None
+
+
+def get_leaderboard():
+    """进程内共享一个只读连接 (src.evaluation.leaderboard.Leaderboard); 数据库文件尚不存在时每次查询重试打开"""
+    global _leaderboard
+    if _leaderboard is None:
+        from src.evaluation.leaderboard import Leaderboard
+        _leaderboard = Leaderboard(settings.LEADERBOARD_DB, readonly=True)
+    return _leaderboard
+
+
+def _check_metric(metric: str) -> bool:
+    """校验指标名, 返回该指标是否越大越好"""
+    from src.evaluation.leaderboard import HIGHER_IS_BETTER
+    if metric not in HIGHER_IS_BETTER:
+        raise HTTPException(status_code=400, detail=f"不支持的指标: {metric}，可选: {', '.join(HIGHER_IS_BETTER)}")
+    return HIGHER_IS_BETTER[metric]
+
+
+async def _cached_query(request: Request, kind: str, params: Dict[str, Any], compute) -> Any:
+    lb = get_leaderboard()
+    key = {"kind": kind, "version": lb.version(), **params}
+    return await cached(getattr(request.app.state, "result_cache", None), CACHE_NAMESPACE, key, compute,
+                        ttl=settings.LEADERBOARD_CACHE_TTL)
+
+
+@router.get("")
+async def list_leaderboard(
+    request: Request,
+    task: Optional[str] = None,
+    load: Optional[str] = None,
+    model: Optional[str] = None,
+    quantization: Optional[str] = None,
+    sort: str = "qe_ratio",
+    limit: int = Query(20, ge=1, le=1000),
+    min_runs: int = Query(1, ge=1),
+) -> Dict[str, Any]:
+    """按指标排序的排行榜"""
+    higher_is_better = _check_metric(sort)
+    params = dict(task=task, load=load, model=model, quantization=quantization, sort=sort, limit=limit,
+                  min_runs=min_runs)
+    rows = await _cached_query(request, "query", params, lambda: get_leaderboard().query(**params))
+    return {"sort": sort, "higher_is_better": higher_is_better, "items": rows}
+
+
+@router.get("/best")
+async def best_configurations(
+    request: Request,
+    metric: str = "qe_ratio",
+    task: Optional[str] = None,
+    load: Optional[str] = None,
+    min_runs: int = Query(1, ge=1),
+) -> Dict[str, Any]:
+    """每个任务 (或指定任务) 某指标的最优配置"""
+    _check_metric(metric)
+
+    def compute():
+        lb = get_leaderboard()
+        tasks = [task] if task else lb.facets()["task"]
+        return [row for row in (lb.best(metric, task=t, load=load, min_runs=min_runs) for t in tasks) if row]
+
+    items = await _cached_query(request, "best", dict(metric=metric, task=task, load=load, min_runs=min_runs), compute)
+    return {"metric": metric, "items": items}
+
+
+@router.get("/facets")
+async def leaderboard_facets(request: Request) -> Dict[str, List[str]]:
+    """可用的模型 / 量化 / 任务 / 负载取值"""
+    return await _cached_query(request, "facets", {}, lambda: get_leaderboard().facets())
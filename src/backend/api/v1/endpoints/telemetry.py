@@ -0,0 +1,61 @@
+"""
+实时遥测接口
+
+以 Server-Sent Events 推送评估任务的资源采样 (功率、利用率、显存) 与生成片段时间。
+所有连接共享 app.state.telemetry 中的扇出缓冲区, 慢客户端只会丢弃自己的事件
+(收到 overrun 事件), 不影响采样与其他订阅者。
+"""
+
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+
+from src.backend.core.exceptions import ServiceUnavailableError
+from src.backend.services.telemetry import TelemetryHub
+
+router = APIRouter()
+
+
+def get_hub(request: Request) -> TelemetryHub:
+    hub = getattr(request.app.state, "telemetry", None)
+    if hub is None:
+        raise ServiceUnavailableError("实时遥测未启用")
+    return hub
+
+
+@router.get("/stream")
+async def stream_telemetry(
+    request: Request,
+    job_id: Optional[str] = None,
+    types: Optional[str] = Query(None, description="逗号分隔: sample,tokens,token,case_start,case_end,job,overrun"),
+    every: Optional[int] = Query(None, ge=1, description="资源采样每 N 条取一条"),
+    window: Optional[float] = Query(None, ge=0, le=60, description="片段事件合并窗口 (秒), 0 为逐片段"),
+    replay: int = Query(0, ge=0, description="先回放缓冲区中最近的事件数"),
+) -> StreamingResponse:
+    """订阅实时遥测 (可按任务过滤)"""
+    hub = get_hub(request)
+    events = hub.subscribe(job_id=job_id, types=types.split(",") if types else None,
+                           every=every, window=window, replay=replay)
+
+    async def gen():
+        try:
+            async for event in events:
+                if await request.is_disconnected():
+                    break
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(gen(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/stats")
+async def telemetry_stats(request: Request) -> Dict[str, Any]:
+    """缓冲区状态与当前订阅者数"""
+    return get_hub(request).stats()
@@ -0,0 +1,12 @@
+"""
+API v1 路由汇总
+"""
+
+from fastapi import APIRouter
+
+from src.backend.api.v1.endpoints import evaluations, leaderboard, telemetry
+
+api_router = APIRouter()
+api_router.include_router(evaluations.router, prefix="/evaluations", tags=["evaluations"])
+api_router.include_router(leaderboard.router, prefix="/leaderboard", tags=["leaderboard"])
+api_router.include_router(telemetry.router, prefix="/telemetry", tags=["telemetry"])
@@ -36,6 +36,12 @@ class Settings(BaseSettings):
     WORKERS: int = 1
     API_V1_STR: str = "/api/v1"
     
+    # 多进程协调 (WORKERS > 1): 评估任务状态存于数据库, 由选举出的 leader 进程执行
+    COORDINATION_BACKEND: str = "auto"  # auto (WORKERS > 1 时启用: PostgreSQL 用 advisory lock, 否则用文件锁) / file / postgres / none
+    LEADER_LOCK_FILE: str = "data/scheduler.lock"  # 文件锁路径 (各工作进程须在同一主机上)
+    COORDINATION_POLL_SECONDS: float = 1.0  # 选举、任务同步与进程间事件的轮询间隔
+    WORKER_EVENT_RETENTION: int = 3600  # 进程间事件的保留时间 (秒)
+    
     # 安全配置
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8天
@@ -100,6 +106,12 @@ class Settings(BaseSettings):
     EVALUATION_MAX_WORKERS: int = 4
     EVALUATION_TIMEOUT: int = 3600  # 1小时
     EVALUATION_RESULT_CACHE_TTL: int = 86400  # 24小时
+    EVALUATION_QUEUE_SIZE: int = 100  # 等待执行的评估任务上限
+    EVALUATION_JOB_HISTORY: int = 500  # 保留的已结束任务数 (内存中; 多进程部署时为数据库中)
+    EVALUATION_CASE_SECONDS: float = 60.0  # 没有历史耗时的模型, 每个用例的耗时估计 (秒)
+    EVALUATION_MAX_QUEUE_WAIT: int = 3600  # 预计排队时间超过该值 (秒) 时拒绝提交 (429), 0 表示不限制
+    EVALUATION_AGING_FACTOR: float = 1.0  # 短任务优先: 排序值 = 预计耗时 - 系数 x 已等待时间
+    EVALUATION_STARVATION_SECONDS: int = 1800  # 队首任务因显存不足等待超过该值后, 不再让其他任务插队
     
     # 性能指标配置
     PERFORMANCE_METRICS = {
@@ -131,6 +143,20 @@ class Settings(BaseSettings):
     METRICS_ENABLED: bool = True
     METRICS_PORT: int = 9090
     METRICS_PATH: str = "/metrics"
+    METRICS_LATENCY_BUCKETS: List[float] = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+    REQUEST_LOG_SAMPLE_RATE: float = 0.01  # 请求调试日志抽样比例
+    REQUEST_SLOW_SECONDS: float = 5.0  # 慢请求警告阈值 (秒)
+    
+    # 健康检查配置
+    HEALTH_CHECK_TIMEOUT: float = 2.0  # 单项检查超时 (秒)
+    HEALTH_CACHE_TTL: float = 5.0  # 检查结果缓存时间 (秒)
+    HEALTH_CRITICAL_CHECKS: List[str] = ["database", "scheduler"]  # 失败即未就绪的检查
+    
+    # 实时遥测配置 (评估任务的资源采样与生成片段时间)
+    TELEMETRY_ENABLED: bool = True
+    TELEMETRY_BUFFER_SIZE: int = 20000  # 扇出环形缓冲区容量 (事件数)
+    TELEMETRY_SAMPLE_EVERY: int = 1  # 资源采样默认降采样倍数
+    TELEMETRY_TOKEN_WINDOW: float = 0.5  # 生成片段事件默认合并窗口 (秒)
     
     # 通知配置
     EMAIL_ENABLED: bool = False
@@ -150,6 +176,8 @@ class Settings(BaseSettings):
     RESULTS_DIR: str = "results"
     REPORTS_DIR: str = "reports"
     PLOTS_DIR: str = "plots"
+    # 能效排行榜 (scripts/leaderboard.py update 与 run_experiments 增量写入)
+    LEADERBOARD_DB: str = "data/leaderboard.sqlite"
     
     # 前端配置
     FRONTEND_URL: str = "http://localhost:3000"
@@ -166,6 +194,8 @@ class Settings(BaseSettings):
     RATE_LIMIT_ENABLED: bool = True
     RATE_LIMIT_PER_MINUTE: int = 60
     RATE_LIMIT_PER_HOUR: int = 1000
+    RATE_LIMIT_BACKEND: str = "memory"  # memory (每个工作进程独立计数) / redis (多进程共享)
+    RATE_LIMIT_TRUST_PROXY: bool = False  # 按 X-Forwarded-For 的首个地址识别客户端 (仅在反向代理之后开启)
     
     # 文件上传配置
     UPLOAD_TEMP_DIR: str = "temp"
@@ -175,11 +205,20 @@ class Settings(BaseSettings):
     MODEL_SERVICE_ENABLED: bool = True
     MODEL_SERVICE_TIMEOUT: int = 300  # 5分钟
     MODEL_SERVICE_MAX_CONCURRENT: int = 5
+    OLLAMA_HOST: Optional[str] = None  # 评估任务使用的 Ollama 地址, 默认沿用环境变量 OLLAMA_HOST
+    MODEL_INFO_TTL: int = 300  # 已安装模型列表与大小 (Ollama /api/tags) 的刷新间隔
+    MODEL_VRAM_OVERHEAD: float = 1.2  # 模型文件大小 -> 显存占用的估计倍数 (KV 缓存与运行时开销)
+    MODEL_DEFAULT_VRAM_MB: int = 4096  # 大小未知的模型按该值估计显存
+    GPU_MEMORY_BUDGET_MB: int = 0  # 评估任务可用显存, 0 表示按 GPU 总显存 x GPU_MEMORY_UTILIZATION 检测, 无 GPU 时不限制
+    GPU_MEMORY_UTILIZATION: float = 0.9
     
     # 缓存配置
     CACHE_ENABLED: bool = True
     CACHE_TTL: int = 3600  # 1小时
     CACHE_MAX_SIZE: int = 1000  # 最大缓存条目数
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # 进程内一级缓存的字节上限
+    CACHE_BACKEND: str = "redis"  # 二级缓存: redis / memory (进程内替身, 测试用) / none
+    LEADERBOARD_CACHE_TTL: int = 300  # 排行榜查询缓存 (键中含数据库版本, 写入后自然失效)
     
     # 异步任务配置
     CELERY_BROKER_URL: str = "redis://localhost:6379/1"
@@ -215,8 +254,8 @@ class Settings(BaseSettings):
     BACKUP_RETENTION_DAYS: int = 30
     
     # 验证配置
-    def validate(self) -> bool:
-        """验证配置的有效性"""
+    def validate(self, check_connections: bool = False) -> bool:
+        """验证配置的有效性; check_connections 为 True 时同时同步连接数据库与 Redis (较慢, 启动时默认跳过, 由健康检查负责)"""
         
         # 检查必要的环境变量
         required_vars = [
@@ -247,6 +286,9 @@ class Settings(BaseSettings):
                     print(f"❌ 创建目录失败 {dir_path}: {e}")
                     return False
         
+        if not check_connections:
+            return True
+        
         # 验证数据库连接
         try:
             from sqlalchemy import create_engine
@@ -0,0 +1,132 @@
+"""
+异步数据库层 (SQLAlchemy asyncio)
+
+DATABASE_URL 可写成同步形式, 连接时自动换成异步驱动:
+postgresql:// -> postgresql+asyncpg://, sqlite:/// -> sqlite+aiosqlite:///。
+
+- 连接池遵循 DATABASE_POOL_SIZE / DATABASE_MAX_OVERFLOW / DATABASE_POOL_TIMEOUT,
+  并开启 pool_pre_ping; 内存 SQLite 使用单连接池 (StaticPool)
+- SQLite 文件库启用 WAL 与外键约束, 本地与测试无需 PostgreSQL
+- init_db() 创建引擎与表; get_db() 为 FastAPI 依赖, 每个请求一个 AsyncSession
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import StaticPool
+
+from src.backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+CREATE_ATTEMPTS = 3
+
+
+class Base(DeclarativeBase):
+    """ORM 模型基类"""
+
+
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[async_sessionmaker] = None
+
+
+def async_url(url: str) -> str:
+    """把同步驱动的数据库 URL 换成对应的异步驱动"""
+    u = make_url(url)
+    driver = ASYNC_DRIVERS.get(u.drivername)
+    return u.set(drivername=driver).render_as_string(hide_password=False) if driver else url
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    u = make_url(url)
+    return u.get_backend_name() == "sqlite" and u.database in (None, "", ":memory:")
+
+
+def create_engine(url: Optional[str] = None, echo: bool = False) -> AsyncEngine:
+    """按配置创建异步引擎 (不缓存, 脚本与测试可用不同的 URL)"""
+    url = async_url(url or settings.DATABASE_URL)
+    kwargs = {"echo": echo, "pool_pre_ping": True}
+    if _is_memory_sqlite(url):
+        # 内存库每个连接各自独立, 只能共用一个连接
+        kwargs.update(poolclass=StaticPool, connect_args={"check_same_thread": False})
+    else:
+        kwargs.update(pool_size=settings.DATABASE_POOL_SIZE, max_overflow=settings.DATABASE_MAX_OVERFLOW,
+                      pool_timeout=settings.DATABASE_POOL_TIMEOUT)
+    engine = create_async_engine(url, **kwargs)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine.sync_engine, "connect")
+        def _sqlite_pragmas(dbapi_conn, _):
+            cur = dbapi_conn.cursor()
+            cur.execute("PRAGMA foreign_keys=ON")
+            if not _is_memory_sqlite(url):
+                cur.execute("PRAGMA journal_mode=WAL")
+                cur.execute("PRAGMA synchronous=NORMAL")
+            cur.close()
+    return engine
+
+
+def get_engine() -> AsyncEngine:
+    """进程共享的引擎, 首次调用时创建"""
+    global _engine, _sessionmaker
+    if _engine is None:
+        _engine = create_engine()
+        _sessionmaker = async_sessionmaker(_engine, expire_on_commit=False)
+    return _engine
+
+
+def get_sessionmaker() -> async_sessionmaker:
+    get_engine()
+    return _sessionmaker
+
+
+async def create_tables(engine: AsyncEngine) -> None:
+    # 导入模型模块以注册到 Base.metadata
+    import src.backend.models.evaluation  # noqa: F401
+    import src.backend.models.experiment  # noqa: F401
+    # 多个工作进程同时启动时可能并发建表, 另一进程刚创建的表在重试时跳过
+    for attempt in range(CREATE_ATTEMPTS):
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            return
+        except (OperationalError, ProgrammingError):
+            if attempt == CREATE_ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(0.1 * (attempt + 1))
+
+
+async def init_db() -> AsyncEngine:
+    """创建引擎并建表 (已存在的表不变)"""
+    engine = get_engine()
+    await create_tables(engine)
+    logger.info(f"数据库已就绪: {engine.dialect.name} (连接池 {engine.pool.status()})")
+    return engine
+
+
+async def close_db() -> None:
+    global _engine, _sessionmaker
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+        _sessionmaker = None
+
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """FastAPI 依赖: 请求结束时关闭会话, 出错时回滚"""
+    async with get_sessionmaker()() as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
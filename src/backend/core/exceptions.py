@@ -0,0 +1,68 @@
+"""
+应用自定义异常
+
+由 main.py 中的 app_exception_handler 统一转换为
+{"error": {"code", "message", "details"}} 格式的 JSON 响应, headers 中的响应头一并返回。
+"""
+
+import math
+from typing import Any, Dict, Optional
+
+
+class AppException(Exception):
+    """应用异常基类"""
+
+    status_code: int = 400
+    error_code: str = "APP_ERROR"
+
+    def __init__(self, message: str, details: Optional[Any] = None,
+                 status_code: Optional[int] = None, error_code: Optional[str] = None,
+                 headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.message = message
+        self.details = details
+        self.headers = headers
+        if status_code is not None:
+            self.status_code = status_code
+        if error_code is not None:
+            self.error_code = error_code
+
+
+class NotFoundError(AppException):
+    """资源不存在"""
+
+    status_code = 404
+    error_code = "NOT_FOUND"
+
+
+class ValidationError(AppException):
+    """请求参数无效"""
+
+    status_code = 422
+    error_code = "VALIDATION_ERROR"
+
+
+class ConflictError(AppException):
+    """资源当前状态不允许该操作"""
+
+    status_code = 409
+    error_code = "CONFLICT"
+
+
+class ServiceUnavailableError(AppException):
+    """服务暂时无法处理请求 (如任务队列已满)"""
+
+    status_code = 503
+    error_code = "SERVICE_UNAVAILABLE"
+
+
+class TooManyRequestsError(AppException):
+    """请求过于频繁或评估队列过长, retry_after (秒) 写入 Retry-After 响应头"""
+
+    status_code = 429
+    error_code = "RATE_LIMITED"
+
+    def __init__(self, message: str, retry_after: float, details: Optional[Any] = None,
+                 headers: Optional[Dict[str, str]] = None):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(message, details=details, headers=dict(headers or {}, **{"Retry-After": str(self.retry_after)}))
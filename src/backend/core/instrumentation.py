@@ -0,0 +1,114 @@
+"""
+请求指标中间件 (纯 ASGI)
+
+直接包装 receive / send, 不像 BaseHTTPMiddleware 那样为每个请求创建额外任务与内存流,
+流式响应 (SSE 等) 原样透传。每个请求记录:
+
+- 按路由模板 (如 /api/v1/evaluations/{job_id}) 与方法统计的延迟直方图
+- 按路由、方法、状态码统计的请求数
+- 请求体与响应体字节数
+- 进行中的请求数
+
+未匹配任何路由的请求归入 "<unmatched>", 避免任意路径造成标签基数膨胀。
+调试日志按 REQUEST_LOG_SAMPLE_RATE 抽样, 超过 REQUEST_SLOW_SECONDS 的请求总是记录警告
+(text/event-stream 长连接除外)。
+"""
+
+import time
+import random
+import logging
+from typing import Any, Callable, Optional
+
+from src.backend.core.config import settings
+from src.backend.core.metrics import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED = "<unmatched>"
+
+
+class RequestMetrics:
+    """请求相关的指标集合"""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY):
+        self.requests = registry.counter(
+            "http_requests_total", "HTTP 请求数", ["method", "route", "status"])
+        self.latency = registry.histogram(
+            "http_request_duration_seconds", "HTTP 请求处理耗时 (秒, 流式响应至最后一个数据块)",
+            ["method", "route"], buckets=settings.METRICS_LATENCY_BUCKETS)
+        self.request_bytes = registry.counter(
+            "http_request_size_bytes_total", "HTTP 请求体字节数", ["method", "route"])
+        self.response_bytes = registry.counter(
+            "http_response_size_bytes_total", "HTTP 响应体字节数", ["method", "route"])
+        self.in_flight = registry.gauge(
+            "http_requests_in_flight", "正在处理的 HTTP 请求数", ["method"])
+
+
+def _route_template(scope: dict) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if path is None:
+        return UNMATCHED
+    return scope.get("root_path", "") + path
+
+
+class InstrumentationMiddleware:
+    """
+    Args:
+        app: 下游 ASGI 应用
+        metrics: 指标集合, 默认注册到进程级 REGISTRY
+        sample_rate: 调试日志抽样比例, 默认 REQUEST_LOG_SAMPLE_RATE
+        slow_seconds: 慢请求阈值 (秒), 默认 REQUEST_SLOW_SECONDS
+    """
+
+    def __init__(self, app: Callable, metrics: Optional[RequestMetrics] = None,
+                 sample_rate: Optional[float] = None, slow_seconds: Optional[float] = None):
+        self.app = app
+        self.metrics = metrics or RequestMetrics()
+        self.sample_rate = settings.REQUEST_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.slow_seconds = settings.REQUEST_SLOW_SECONDS if slow_seconds is None else slow_seconds
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        m = self.metrics
+        method = scope["method"]
+        t0 = time.perf_counter()
+        state: Any = [500, 0, 0, False]  # 状态码, 请求体字节, 响应体字节, 是否为事件流
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                state[1] += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state[0] = message["status"]
+                for k, v in message.get("headers", ()):
+                    if k.lower() == b"content-type" and v.startswith(b"text/event-stream"):
+                        state[3] = True
+            elif message["type"] == "http.response.body":
+                state[2] += len(message.get("body", b""))
+            await send(message)
+
+        m.in_flight.inc((method,))
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            m.in_flight.dec((method,))
+            route = _route_template(scope)
+            key = (method, route)
+            m.requests.inc((method, route, str(state[0])))
+            m.latency.observe(key, elapsed)
+            if state[1]:
+                m.request_bytes.inc(key, state[1])
+            m.response_bytes.inc(key, state[2])
+            if elapsed >= self.slow_seconds and route != UNMATCHED and not state[3]:
+                logger.warning(f"慢请求: {method} {scope['path']} -> {state[0]} 耗时 {elapsed:.3f}s")
+            elif self.sample_rate and random.random() < self.sample_rate and logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"{method} {scope['path']} -> {state[0]} {elapsed * 1000:.1f}ms "
+                             f"请求 {state[1]}B 响应 {state[2]}B")
@@ -0,0 +1,38 @@
+"""
+日志配置
+
+按 LOG_LEVEL / LOG_FORMAT 配置根日志: 输出到标准错误, 并按 LOG_FILE 写入滚动日志文件
+(单个文件 LOG_MAX_SIZE 字节, 保留 LOG_BACKUP_COUNT 个)。重复调用不会重复添加处理器。
+"""
+
+import os
+import logging
+from logging.handlers import RotatingFileHandler
+from typing import Optional
+
+from src.backend.core.config import settings
+
+_HANDLER_FLAG = "_genai_handler"
+
+
+def setup_logging(level: Optional[str] = None, log_file: Optional[str] = None) -> None:
+    root = logging.getLogger()
+    root.setLevel((level or settings.LOG_LEVEL).upper())
+    for handler in [h for h in root.handlers if getattr(h, _HANDLER_FLAG, False)]:
+        root.removeHandler(handler)
+        handler.close()
+
+    formatter = logging.Formatter(settings.LOG_FORMAT)
+    handlers = [logging.StreamHandler()]
+    log_file = settings.LOG_FILE if log_file is None else log_file
+    if log_file:
+        try:
+            os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+            handlers.append(RotatingFileHandler(log_file, maxBytes=settings.LOG_MAX_SIZE,
+                                                backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8"))
+        except OSError as e:
+            logging.getLogger(__name__).warning(f"无法写入日志文件 {log_file}: {e}")
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        setattr(handler, _HANDLER_FLAG, True)
+        root.addHandler(handler)
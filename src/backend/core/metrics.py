@@ -0,0 +1,173 @@
+"""
+轻量指标注册表与 Prometheus 文本格式输出
+
+计数器、仪表与直方图的值保存在以标签元组为键的普通字典中, 更新不加锁:
+请求指标只在事件循环线程中更新 (见 core.instrumentation), 同一线程内不存在竞争;
+输出时复制一份快照再格式化, 不阻塞更新。其他线程需要写入时请经由
+loop.call_soon_threadsafe 转到事件循环线程。
+
+来自内存状态的指标 (如最近一次资源采样) 通过 add_collector 注册回调, 在每次输出前
+调用一次, 抓取时才读取, 不另行采样。
+"""
+
+import logging
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Response 会为 text/* 补上 charset=utf-8
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _label_str(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += self.samples()
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_label_str(self.labelnames, k)} {_fmt(v)}" for k, v in list(self.values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, labels: Labels = (), value: float = 0.0) -> None:
+        self.values[labels] = value
+
+    def dec(self, labels: Labels = (), amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) - amount
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签 -> [各桶计数 (非累计, 末位为 +Inf), 总和, 次数]
+        self.values: Dict[Labels, list] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def samples(self) -> List[str]:
+        out = []
+        bounds = [_fmt(b) for b in self.buckets] + ["+Inf"]
+        for labels, (counts, total, n) in list(self.values.items()):
+            acc = 0
+            for le, c in zip(bounds, list(counts)):
+                acc += c
+                le_label = 'le="%s"' % le
+                out.append(f"{self.name}_bucket{_label_str(self.labelnames, labels, le_label)} {acc}")
+            ls = _label_str(self.labelnames, labels)
+            out.append(f"{self.name}_sum{ls} {_fmt(total)}")
+            out.append(f"{self.name}_count{ls} {n}")
+        return out
+
+    def quantile(self, labels: Labels, q: float) -> Optional[float]:
+        """由桶计数估计分位数 (桶内线性插值), 供报告与基准使用"""
+        entry = self.values.get(labels)
+        if not entry or not entry[2]:
+            return None
+        counts, _, n = entry
+        rank = q * n
+        acc = 0
+        for i, c in enumerate(counts):
+            if acc + c >= rank and c:
+                lo = self.buckets[i - 1] if i > 0 else 0.0
+                hi = self.buckets[i] if i < len(self.buckets) else lo
+                return lo + (hi - lo) * (rank - acc) / c
+            acc += c
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"指标 {metric.name} 已以不同类型或标签注册")
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """注册抓取时回调, 用于把内存中的最新状态写入仪表"""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in list(self.collectors):
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"指标收集回调出错: {e}")
+        return "".join(m.render() for m in list(self.metrics.values()))
+
+
+# 进程级默认注册表
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,99 @@
+"""
+服务启动编排
+
+lifespan 中的初始化分为两类:
+
+- 前台步骤: 相互独立, 并发执行, 全部结束后才开始接收请求; 单个步骤失败只记录状态,
+  不阻止启动, 由对应的健康检查与接口报告不可用
+- 后台步骤: 较慢且非必需 (模型列表与显存检测、实验跟踪、重模块预热), 开始接收请求后
+  以后台任务运行; 使用方可 wait(name) 等待完成, 服务本身也应在首次使用时自行初始化
+
+status() 给出每个步骤的状态 (pending / ready / failed)、耗时与错误, 健康检查的 startup 项
+据此反映部分可用的状态。
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING, READY, FAILED = "pending", "ready", "failed"
+
+Step = Callable[[], Awaitable[Any]]
+
+
+class Startup:
+    """记录并执行启动步骤"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _register(self, name: str, background: bool) -> None:
+        self.steps[name] = {"status": PENDING, "background": background, "seconds": None, "error": None}
+
+    async def _run_step(self, name: str, step: Step) -> bool:
+        info = self.steps[name]
+        t0 = time.perf_counter()
+        try:
+            await step()
+            info["status"] = READY
+        except asyncio.CancelledError:
+            info.update(status=FAILED, error="已取消")
+            raise
+        except Exception as e:
+            info.update(status=FAILED, error=f"{type(e).__name__}: {e}")
+            logger.error(f"启动步骤 {name} 失败: {e}")
+        finally:
+            info["seconds"] = round(time.perf_counter() - t0, 3)
+        logger.info(f"启动步骤 {name}: {info['status']} ({info['seconds']:.3f}s)")
+        return info["status"] == READY
+
+    async def run(self, steps: Dict[str, Step]) -> Dict[str, bool]:
+        """并发执行前台步骤, 返回 {步骤: 是否成功}"""
+        for name in steps:
+            self._register(name, background=False)
+        results = await asyncio.gather(*(self._run_step(name, step) for name, step in steps.items()))
+        return dict(zip(steps, results))
+
+    def background(self, name: str, step: Step) -> asyncio.Task:
+        """在后台执行步骤"""
+        self._register(name, background=True)
+        task = asyncio.create_task(self._run_step(name, step))
+        self._tasks[name] = task
+        return task
+
+    async def wait(self, name: str, timeout: Optional[float] = None) -> bool:
+        """等待步骤完成 (超时不取消步骤), 返回是否成功"""
+        task = self._tasks.get(name)
+        if task is not None and not task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return self.steps.get(name, {}).get("status") == READY
+
+    async def wait_all(self, timeout: Optional[float] = None) -> bool:
+        results = await asyncio.gather(*(self.wait(name, timeout) for name in self._tasks))
+        return all(results)
+
+    @property
+    def complete(self) -> bool:
+        return all(info["status"] != PENDING for info in self.steps.values())
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "complete": self.complete,
+            "pending": [n for n, info in self.steps.items() if info["status"] == PENDING],
+            "failed": [n for n, info in self.steps.items() if info["status"] == FAILED],
+            "steps": {n: dict(info) for n, info in self.steps.items()},
+        }
+
+    async def close(self) -> None:
+        """取消仍在进行的后台步骤"""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
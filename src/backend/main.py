@@ -15,7 +15,10 @@ GenAI模型能效评级体系 - 后端主入口
 
 import os
 import sys
+import time
+import asyncio
 import logging
+import importlib
 from pathlib import Path
 from contextlib import asynccontextmanager
 
@@ -23,71 +26,108 @@ from contextlib import asynccontextmanager
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 
 # 导入应用模块
 from src.backend.core.config import settings
-from src.backend.core.database import init_db, get_db
+from src.backend.core.database import close_db, get_db, get_engine, init_db
 from src.backend.api.v1.router import api_router
 from src.backend.core.logging import setup_logging
 from src.backend.core.exceptions import AppException
+from src.backend.core.instrumentation import InstrumentationMiddleware
+from src.backend.core.metrics import CONTENT_TYPE, REGISTRY
+from src.backend.core.startup import Startup
 from src.backend.services.task_scheduler import TaskScheduler
+from src.backend.services.telemetry import TelemetryHub
+from src.backend.services.health import HealthChecker
+from experiments.exporter import ExperimentMetrics
 from src.backend.services.model_cache import ModelCache
+from src.backend.services.result_cache import ResultCache
+from src.backend.services.rate_limiter import RateLimiter
+from src.backend.services.record_store import RecordStore
 from src.backend.services.experiment_tracker import ExperimentTracker
+from src.backend.services.coordination import Coordinator, coordination_backend
+from src.backend.services.job_store import JobStore
 
 # 设置日志
 logger = logging.getLogger(__name__)
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """请求日志中间件"""
-    
-    async def dispatch(self, request, call_next):
-        # 记录请求
-        logger.info(f"Request: {request.method} {request.url.path}")
-        
-        # 调用下一个中间件或路由处理函数
-        response = await call_next(request)
-        
-        # 记录响应
-        logger.info(f"Response: {response.status_code}")
-        
-        return response
+# 启动后在后台预热的重模块 (pandas 等), 首个排行榜与入库请求不再承担导入耗时
+WARM_IMPORTS = ["src.evaluation.leaderboard", "src.evaluation.records"]
+
+
+async def warm_imports() -> None:
+    for name in WARM_IMPORTS:
+        await asyncio.to_thread(importlib.import_module, name)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """应用生命周期管理"""
+    """
+    应用生命周期管理
+
+    服务对象的构造不做 I/O; 相互独立的初始化 (数据库、结果缓存、限流、任务调度器) 并发执行,
+    完成后开始接收请求; 模型缓存 (Ollama 模型列表与 GPU 检测)、实验跟踪器 (导入 mlflow)
+    与重模块预热在后台进行, 首次使用时若尚未完成由服务自行等待或初始化。
+    各步骤的状态与耗时见 app.state.startup 与健康检查的 startup 项。
+    
+    多进程部署 (WORKERS > 1 或 COORDINATION_BACKEND) 时评估任务存于数据库, 数据库就绪后
+    开始 leader 选举 (coordination 步骤), 只有 leader 进程执行任务。
+    """
     
     # 启动时执行
     logger.info("🚀 正在启动GenAI模型能效评级系统...")
+    app.state.health = HealthChecker(app.state)
+    app.state.startup = startup = Startup()
     
     try:
-        # 初始化数据库
-        logger.info("📊 初始化数据库...")
-        await init_db()
-        
-        # 初始化模型缓存
-        logger.info("🧠 初始化模型缓存...")
+        app.state.record_store = RecordStore(get_engine())
         app.state.model_cache = ModelCache()
-        await app.state.model_cache.initialize()
+        app.state.result_cache = ResultCache()
+        app.state.rate_limiter = RateLimiter()
+        app.state.telemetry = TelemetryHub() if settings.TELEMETRY_ENABLED else None
+        app.state.experiment_metrics = ExperimentMetrics(REGISTRY) if settings.METRICS_ENABLED else None
+        app.state.experiment_tracker = ExperimentTracker()
+        backend = coordination_backend()
+        app.state.coordinator = coordinator = Coordinator(get_engine(), backend) if backend else None
+        app.state.task_scheduler = TaskScheduler(telemetry=app.state.telemetry,
+                                                 metrics=app.state.experiment_metrics,
+                                                 store=app.state.record_store,
+                                                 model_cache=app.state.model_cache,
+                                                 tracker=app.state.experiment_tracker,
+                                                 job_store=JobStore(get_engine()) if coordinator else None,
+                                                 coordinator=coordinator)
+        if coordinator is not None:
+            if settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_BACKEND == "memory":
+                logger.warning("⚠️ 多进程部署时 RATE_LIMIT_BACKEND=memory 按工作进程各自计数, 建议使用 redis")
         
-        # 初始化任务调度器
-        logger.info("⏰ 初始化任务调度器...")
-        app.state.task_scheduler = TaskScheduler()
-        await app.state.task_scheduler.start()
+        # 📊 数据库、缓存、限流与 ⏰ 任务调度器并发初始化; 失败的步骤记入启动状态, 由健康检查报告
+        await startup.run({
+            "database": init_db,
+            "result_cache": app.state.result_cache.initialize,
+            "rate_limiter": app.state.rate_limiter.initialize,
+            "task_scheduler": app.state.task_scheduler.start,
+        })
         
-        # 初始化实验跟踪器
-        logger.info("🔬 初始化实验跟踪器...")
-        app.state.experiment_tracker = ExperimentTracker()
-        await app.state.experiment_tracker.initialize()
+        # 🔗 leader 选举与进程间事件 (需要数据库表已创建)
+        if coordinator is not None:
+            await startup.run({"coordination": coordinator.start})
+        
+        # 🧠 模型缓存与 🔬 实验跟踪器在后台初始化
+        startup.background("model_cache", app.state.model_cache.initialize)
+        startup.background("experiment_tracker", app.state.experiment_tracker.initialize)
+        startup.background("warm_imports", warm_imports)
         
-        logger.info("✅ 系统初始化完成")
+        failed = startup.status()["failed"]
+        if failed:
+            logger.warning(f"⚠️ 系统已启动, 部分服务不可用: {', '.join(failed)}")
+        else:
+            logger.info(f"✅ 系统初始化完成 ({time.perf_counter() - startup.started_at:.2f}s, 后台初始化进行中)")
         
     except Exception as e:
         logger.error(f"❌ 系统初始化失败: {e}")
@@ -99,21 +139,43 @@ async def lifespan(app: FastAPI):
     logger.info("🛑 正在关闭系统...")
     
     try:
+        # 取消未完成的后台初始化
+        await app.state.startup.close()
+        
         # 停止任务调度器
         if hasattr(app.state, 'task_scheduler'):
             await app.state.task_scheduler.stop()
             logger.info("任务调度器已停止")
         
+        # 释放 leader 锁 (其他工作进程在下一次轮询时接任)
+        if getattr(app.state, 'coordinator', None) is not None:
+            await app.state.coordinator.stop()
+            logger.info("多进程协调已停止")
+        
         # 关闭模型缓存
         if hasattr(app.state, 'model_cache'):
             await app.state.model_cache.close()
             logger.info("模型缓存已关闭")
         
+        # 关闭结果缓存
+        if hasattr(app.state, 'result_cache'):
+            await app.state.result_cache.close()
+        
+        # 关闭限流
+        if hasattr(app.state, 'rate_limiter'):
+            await app.state.rate_limiter.close()
+        
         # 关闭实验跟踪器
         if hasattr(app.state, 'experiment_tracker'):
             await app.state.experiment_tracker.close()
             logger.info("实验跟踪器已关闭")
         
+        # 释放健康检查持有的连接
+        await app.state.health.close()
+        
+        # 关闭数据库连接池
+        await close_db()
+        
         logger.info("✅ 系统已安全关闭")
         
     except Exception as e:
@@ -157,8 +219,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 添加日志中间件
-app.add_middleware(LoggingMiddleware)
+# 请求指标 (纯 ASGI, 不影响流式响应)
+if settings.METRICS_ENABLED:
+    app.add_middleware(InstrumentationMiddleware)
 
 
 # 全局异常处理
@@ -173,7 +236,8 @@ async def app_exception_handler(request, exc: AppException):
                 "message": exc.message,
                 "details": exc.details
             }
-        }
+        },
+        headers=exc.headers
     )
 
 
@@ -195,18 +259,32 @@ async def general_exception_handler(request, exc: Exception):
 
 # 健康检查端点
 @app.get("/health")
-async def health_check():
-    """系统健康检查"""
-    return {
-        "status": "healthy",
-        "timestamp": "2024-01-01T00:00:00Z",
-        "version": "1.0.0",
-        "services": {
-            "database": "connected",
-            "cache": "connected",
-            "scheduler": "running"
-        }
-    }
+async def health_check(request: Request, force: bool = False):
+    """系统健康检查: 各依赖的状态与耗时 (结果缓存 HEALTH_CACHE_TTL 秒), 存在关键依赖故障时返回 503"""
+    report = await request.app.state.health.check_all(force=force)
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+
+@app.get("/health/live")
+async def liveness_probe(request: Request):
+    """存活探针: 进程能处理请求即返回 200, 不访问任何依赖"""
+    return request.app.state.health.liveness()
+
+
+@app.get("/health/ready")
+async def readiness_probe(request: Request):
+    """就绪探针: 检查 HEALTH_CRITICAL_CHECKS 与启动进度, 关键检查失败时返回 503; 后台初始化未完成时仍就绪 (degraded)"""
+    health = request.app.state.health
+    report = await health.check_all(names=sorted(health.critical | {"startup"}))
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+
+# 指标端点 (Prometheus 文本格式)
+if settings.METRICS_ENABLED:
+    @app.get(settings.METRICS_PATH, include_in_schema=False)
+    async def metrics():
+        """请求指标 (延迟、状态码、字节数、进行中的请求数) 与评估任务的实验、硬件指标"""
+        return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
 
 
 # 根路径
@@ -0,0 +1,50 @@
+"""
+多进程部署的共享状态
+
+- EvaluationJobRow: 评估任务 (与 task_scheduler.EvaluationJob 对应); 任一工作进程都可提交、
+  查询与取消, 只有 leader 进程执行, 执行中的状态与进度由 leader 写回
+- WorkerEvent: 工作进程之间的广播事件 (如结果缓存失效), 各进程按自增 ID 轮询
+"""
+
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import JSON, Boolean, Float, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.backend.core.database import Base
+from src.backend.models.experiment import BigId
+
+
+class EvaluationJobRow(Base):
+    __tablename__ = "evaluation_jobs"
+    __table_args__ = (Index("ix_evaluation_jobs_status_created", "status", "created_at"),)
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    spec: Mapped[Dict[str, Any]] = mapped_column(JSON)
+    status: Mapped[str] = mapped_column(String(16))
+    total: Mapped[Optional[int]] = mapped_column(Integer)
+    completed: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[float] = mapped_column(Float)
+    started_at: Mapped[Optional[float]] = mapped_column(Float)
+    finished_at: Mapped[Optional[float]] = mapped_column(Float)
+    returncode: Mapped[Optional[int]] = mapped_column(Integer)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    output_dir: Mapped[str] = mapped_column(String(1024))
+    estimated_seconds: Mapped[float] = mapped_column(Float, default=0.0)
+    vram_mb: Mapped[float] = mapped_column(Float, default=0.0)
+    log: Mapped[Optional[List[str]]] = mapped_column(JSON)
+    # 执行任务的工作进程 (主机名:PID) 与 run_experiments 子进程 PID
+    owner: Mapped[Optional[str]] = mapped_column(String(255))
+    pid: Mapped[Optional[int]] = mapped_column(Integer)
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, default=False)
+    updated_at: Mapped[float] = mapped_column(Float)
+
+
+class WorkerEvent(Base):
+    __tablename__ = "worker_events"
+
+    id: Mapped[int] = mapped_column(BigId, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(64))
+    payload: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON)
+    origin: Mapped[str] = mapped_column(String(255))
+    created_at: Mapped[float] = mapped_column(Float, index=True)
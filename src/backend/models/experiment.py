@@ -0,0 +1,92 @@
+"""
+实验记录的 ORM 模型
+
+- Run: 一次用例运行 (对应一个原始记录文件 raw/<模型>/<用例>.json) 的汇总指标
+- Sample: 运行期间 ResourceMonitor 的逐次资源采样 (时序数据, 批量写入)
+- Score: 质量分数, 每个指标一行 (bartscore / quality_unified / tests_pass_rate / distinct_2 ...)
+
+索引按常用查询设计: 排行榜按 (task, load, model, quantization) 分组过滤,
+按实验目录增量导入时按 experiment 与 source 查找, 时序按 (run_id, t) 读取。
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import BigInteger, DateTime, Float, ForeignKey, Index, Integer, String, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from src.backend.core.database import Base
+
+# SQLite 只对 INTEGER PRIMARY KEY 自增
+BigId = BigInteger().with_variant(Integer, "sqlite")
+
+
+class Run(Base):
+    __tablename__ = "runs"
+    __table_args__ = (
+        Index("ix_runs_task_load_model", "task", "load", "model", "quantization"),
+        Index("ix_runs_model_quantization", "model", "quantization"),
+        Index("ix_runs_experiment", "experiment"),
+    )
+
+    id: Mapped[int] = mapped_column(BigId, primary_key=True, autoincrement=True)
+    experiment: Mapped[str] = mapped_column(String(255))
+    source: Mapped[str] = mapped_column(String(1024), unique=True)
+    source_mtime_ns: Mapped[Optional[int]] = mapped_column(BigInteger)
+    source_size: Mapped[Optional[int]] = mapped_column(BigInteger)
+    model: Mapped[str] = mapped_column(String(255))
+    quantization: Mapped[Optional[str]] = mapped_column(String(64))
+    task: Mapped[Optional[str]] = mapped_column(String(64))
+    load: Mapped[Optional[str]] = mapped_column(String(64))
+    run_idx: Mapped[Optional[int]] = mapped_column(Integer)
+    case_index: Mapped[Optional[int]] = mapped_column(Integer)
+    timestamp: Mapped[Optional[float]] = mapped_column(Float)
+    latency_s: Mapped[Optional[float]] = mapped_column(Float)
+    tps: Mapped[Optional[float]] = mapped_column(Float)
+    ttft_s: Mapped[Optional[float]] = mapped_column(Float)
+    token_count: Mapped[Optional[int]] = mapped_column(Integer)
+    token_count_method: Mapped[Optional[str]] = mapped_column(String(64))
+    gpu_energy_j: Mapped[Optional[float]] = mapped_column(Float)
+    cpu_energy_j: Mapped[Optional[float]] = mapped_column(Float)
+    j_per_token: Mapped[Optional[float]] = mapped_column(Float)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    samples: Mapped[List["Sample"]] = relationship(back_populates="run", cascade="all, delete-orphan",
+                                                   passive_deletes=True)
+    scores: Mapped[List["Score"]] = relationship(back_populates="run", cascade="all, delete-orphan",
+                                                 passive_deletes=True)
+
+
+class Sample(Base):
+    __tablename__ = "samples"
+    __table_args__ = (Index("ix_samples_run_t", "run_id", "t"),)
+
+    id: Mapped[int] = mapped_column(BigId, primary_key=True, autoincrement=True)
+    run_id: Mapped[int] = mapped_column(ForeignKey("runs.id", ondelete="CASCADE"))
+    t: Mapped[float] = mapped_column(Float)
+    cpu_percent: Mapped[Optional[float]] = mapped_column(Float)
+    mem_used_mb: Mapped[Optional[float]] = mapped_column(Float)
+    gpu_util: Mapped[Optional[float]] = mapped_column(Float)
+    gpu_mem_mb: Mapped[Optional[float]] = mapped_column(Float)
+    gpu_power_w: Mapped[Optional[float]] = mapped_column(Float)
+    gpu_temp_c: Mapped[Optional[float]] = mapped_column(Float)
+
+    run: Mapped[Run] = relationship(back_populates="samples")
+
+
+class Score(Base):
+    __tablename__ = "scores"
+    __table_args__ = (
+        UniqueConstraint("run_id", "metric", name="uq_scores_run_metric"),
+        Index("ix_scores_metric_value", "metric", "value"),
+    )
+
+    id: Mapped[int] = mapped_column(BigId, primary_key=True, autoincrement=True)
+    run_id: Mapped[int] = mapped_column(ForeignKey("runs.id", ondelete="CASCADE"))
+    metric: Mapped[str] = mapped_column(String(64))
+    value: Mapped[Optional[float]] = mapped_column(Float)
+
+    run: Mapped[Run] = relationship(back_populates="scores")
+
+
+SAMPLE_COLUMNS = ["run_id", "t", "cpu_percent", "mem_used_mb", "gpu_util", "gpu_mem_mb", "gpu_power_w", "gpu_temp_c"]
@@ -0,0 +1,343 @@
+"""
+多工作进程协调
+
+uvicorn 以 WORKERS > 1 运行时每个工作进程各有一份应用状态。Coordinator 为它们提供:
+
+- leader 选举: 持有锁的进程为 leader, 只有 leader 运行评估任务调度器的工作协程
+  (显存预留只在一个进程中记账, 不会重复分配)。锁为 LEADER_LOCK_FILE 上的文件锁
+  (同一主机) 或 PostgreSQL 会话级 advisory lock (占用一个专用连接); 进程退出时锁随之释放,
+  其余进程在下一次轮询时接任
+- 进程间事件: worker_events 表, 各进程按自增 ID 轮询, 跳过自己发布的事件;
+  leader 删除超过 WORKER_EVENT_RETENTION 秒的事件。PostgreSQL 的序列值在插入时分配,
+  并发事务的提交顺序可能与 ID 顺序不同 (较小的 ID 晚于较大的 ID 可见), 因此每次轮询
+  重新扫描已读最大 ID 之前 EVENT_LOOKBACK 个 ID 的窗口, 按已处理的 ID 集合去重
+- 周期回调: on_tick 注册的协程函数在每次轮询 (COORDINATION_POLL_SECONDS) 后执行
+
+COORDINATION_BACKEND=auto 时只在 WORKERS > 1 时启用 (coordination_backend())。
+"""
+
+import os
+import time
+import socket
+import asyncio
+import hashlib
+import inspect
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from src.backend.core.config import settings
+from src.backend.models.evaluation import WorkerEvent
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+Hook = Callable[[], Awaitable[None]]
+Handler = Callable[[Dict[str, Any]], Any]
+
+# advisory lock 的键: 由固定名称导出的 64 位有符号整数
+LOCK_KEY = int.from_bytes(hashlib.sha1(b"genai-power-evaluation-scheduler").digest()[:8], "big", signed=True)
+EVENT_BATCH = 1000
+EVENT_LOOKBACK = 100
+PRUNE_SECONDS = 60.0
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def coordination_backend() -> Optional[str]:
+    """按 COORDINATION_BACKEND 与 WORKERS 确定锁的类型, 不启用时返回 None"""
+    kind = settings.COORDINATION_BACKEND.lower()
+    if kind == "auto":
+        if settings.WORKERS <= 1:
+            return None
+        kind = "postgres" if make_url(settings.DATABASE_URL).get_backend_name() == "postgresql" else "file"
+    if kind in ("none", ""):
+        return None
+    if kind not in ("file", "postgres"):
+        raise ValueError(f"未知的 COORDINATION_BACKEND: {kind}")
+    return kind
+
+
+class FileLock:
+    """排他文件锁 (fcntl.flock / msvcrt.locking), 文件内容为持有者的 worker_id"""
+
+    name = "file"
+
+    def __init__(self, path: str, holder: str):
+        self.path = os.path.abspath(path)
+        self.holder = holder
+        self._fd: Optional[int] = None
+
+    async def acquire(self) -> bool:
+        return await asyncio.to_thread(self._acquire)
+
+    def _acquire(self) -> bool:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+        if fcntl is not None:
+            os.ftruncate(fd, 0)
+            os.write(fd, self.holder.encode("utf-8"))
+        self._fd = fd
+        return True
+
+    async def check(self) -> bool:
+        """文件锁在进程存活期间一直有效"""
+        return self._fd is not None
+
+    async def release(self) -> None:
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+        os.close(fd)
+
+
+class AdvisoryLock:
+    """PostgreSQL 会话级 advisory lock; 专用连接断开时锁即释放"""
+
+    name = "postgres"
+
+    def __init__(self, engine: AsyncEngine, key: int = LOCK_KEY):
+        self.engine = engine
+        self.key = key
+        self._conn: Optional[AsyncConnection] = None
+
+    async def acquire(self) -> bool:
+        conn = await self.engine.connect()
+        try:
+            locked = (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key})).scalar()
+            await conn.commit()
+        except Exception:
+            await conn.close()
+            raise
+        if not locked:
+            await conn.close()
+            return False
+        self._conn = conn
+        return True
+
+    async def check(self) -> bool:
+        if self._conn is None:
+            return False
+        try:
+            await self._conn.execute(text("SELECT 1"))
+            await self._conn.commit()
+            return True
+        except Exception as e:
+            logger.warning(f"leader 锁连接已断开: {e}")
+            await self._discard()
+            return False
+
+    async def release(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            await self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+            await self._conn.commit()
+            await self._conn.close()
+            self._conn = None
+        except Exception:
+            await self._discard()
+
+    async def _discard(self) -> None:
+        """连接不再放回连接池 (会话连同锁一起结束)"""
+        conn, self._conn = self._conn, None
+        try:
+            await conn.invalidate()
+            await conn.close()
+        except Exception:
+            pass
+
+
+class Coordinator:
+    """
+    Args:
+        engine: 异步引擎, 存放进程间事件 (PostgreSQL 时同时用于 advisory lock)
+        backend: "file" 或 "postgres", 默认按 coordination_backend() 确定
+        poll_interval: 轮询间隔 (秒), 默认 COORDINATION_POLL_SECONDS
+        lock_file: 文件锁路径, 默认 LEADER_LOCK_FILE
+    """
+
+    def __init__(self, engine: AsyncEngine, backend: Optional[str] = None, poll_interval: Optional[float] = None,
+                 lock_file: Optional[str] = None):
+        self.engine = engine
+        self.backend = backend or coordination_backend() or "file"
+        self.poll_interval = poll_interval or settings.COORDINATION_POLL_SECONDS
+        self.worker_id = worker_id()
+        self.lock = (AdvisoryLock(engine) if self.backend == "postgres"
+                     else FileLock(lock_file or settings.LEADER_LOCK_FILE, self.worker_id))
+        self.is_leader = False
+        self.leader_since: Optional[float] = None
+        self._elected: List[Hook] = []
+        self._lost: List[Hook] = []
+        self._ticks: List[Hook] = []
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._last_event_id = 0
+        # 回看窗口内已处理的事件 ID
+        self._seen_events: Set[int] = set()
+        self._last_prune = 0.0
+        self._failing: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    # ---- 注册 ----
+
+    def on_leader(self, elected: Hook, lost: Hook) -> None:
+        """成为 leader 时调用 elected (抛出异常则放弃 leader 身份, 下次轮询重试); 失去锁时调用 lost"""
+        self._elected.append(elected)
+        self._lost.append(lost)
+
+    def on_tick(self, tick: Hook) -> None:
+        self._ticks.append(tick)
+
+    def on_event(self, kind: str, handler: Handler) -> None:
+        self._handlers.setdefault(kind, []).append(handler)
+
+    async def publish(self, kind: str, payload: Optional[Dict[str, Any]] = None) -> None:
+        """广播事件到其他工作进程; 写入失败只记录警告"""
+        try:
+            async with self.engine.begin() as conn:
+                await conn.execute(insert(WorkerEvent.__table__).values(
+                    kind=kind, payload=payload, origin=self.worker_id, created_at=time.time()))
+        except Exception as e:
+            logger.warning(f"进程间事件 {kind} 发布失败: {e}")
+
+    # ---- 生命周期 ----
+
+    async def start(self) -> None:
+        """从当前最新的事件开始接收, 立即进行一次选举, 之后在后台轮询 (需要数据库表已创建)"""
+        table = WorkerEvent.__table__
+        async with self.engine.connect() as conn:
+            self._last_event_id = (await conn.execute(select(func.max(table.c.id)))).scalar() or 0
+            self._seen_events = set((await conn.execute(
+                select(table.c.id).where(table.c.id > self._last_event_id - EVENT_LOOKBACK))).scalars())
+        await self._step()
+        self._task = asyncio.create_task(self._loop())
+        logger.info(f"多进程协调已启动: {self.backend} 锁, 本进程 {self.worker_id} "
+                    f"为 {'leader' if self.is_leader else 'follower'}")
+
+    async def stop(self) -> None:
+        """停止轮询并释放锁 (调用方应先停止依赖 leader 身份的服务)"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            self.is_leader = False
+            await self.lock.release()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "worker_id": self.worker_id,
+            "role": "leader" if self.is_leader else "follower",
+            "leader_since": self.leader_since if self.is_leader else None,
+            "last_event_id": self._last_event_id,
+        }
+
+    # ---- 轮询 ----
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self._step()
+
+    async def _step(self) -> None:
+        await self._guard("election", self._elect)
+        await self._guard("events", self._poll_events)
+        for tick in self._ticks:
+            await self._guard(getattr(tick, "__qualname__", "tick"), tick)
+
+    async def _guard(self, name: str, step: Hook) -> None:
+        """执行一个轮询步骤; 连续失败只在首次与恢复时记录日志"""
+        try:
+            await step()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if name not in self._failing:
+                logger.warning(f"多进程协调 {name} 失败: {e}")
+            self._failing[name] = str(e)
+            return
+        if self._failing.pop(name, None) is not None:
+            logger.info(f"多进程协调 {name} 已恢复")
+
+    async def _elect(self) -> None:
+        if self.is_leader:
+            if await self.lock.check():
+                return
+            self.is_leader = False
+            logger.error(f"工作进程 {self.worker_id} 失去 leader 身份")
+            await self._run_hooks(self._lost)
+            return
+        if not await self.lock.acquire():
+            return
+        self.is_leader = True
+        self.leader_since = time.time()
+        logger.info(f"工作进程 {self.worker_id} 成为 leader ({self.backend} 锁)")
+        try:
+            for hook in self._elected:
+                await hook()
+        except Exception:
+            self.is_leader = False
+            await self._run_hooks(self._lost)
+            await self.lock.release()
+            raise
+
+    @staticmethod
+    async def _run_hooks(hooks: List[Hook]) -> None:
+        for hook in hooks:
+            try:
+                await hook()
+            except Exception as e:
+                logger.error(f"多进程协调回调出错: {e}", exc_info=True)
+
+    async def _poll_events(self) -> None:
+        table = WorkerEvent.__table__
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(select(table).where(table.c.id > self._last_event_id - EVENT_LOOKBACK)
+                                       .order_by(table.c.id).limit(EVENT_BATCH))).all()
+        for row in rows:
+            if row.id in self._seen_events:
+                continue
+            self._seen_events.add(row.id)
+            self._last_event_id = max(self._last_event_id, row.id)
+            if row.origin == self.worker_id:
+                continue
+            for handler in self._handlers.get(row.kind, []):
+                try:
+                    result = handler(row.payload or {})
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    logger.warning(f"进程间事件 {row.kind} 处理失败: {e}")
+        floor = self._last_event_id - EVENT_LOOKBACK
+        self._seen_events = {i for i in self._seen_events if i > floor}
+        if self.is_leader and time.monotonic() - self._last_prune >= PRUNE_SECONDS:
+            self._last_prune = time.monotonic()
+            async with self.engine.begin() as conn:
+                await conn.execute(delete(table).where(
+                    table.c.created_at < time.time() - settings.WORKER_EVENT_RETENTION))
@@ -0,0 +1,134 @@
+"""
+评估任务的实验跟踪 (MLflow)
+
+每个结束的评估任务记为 MLFLOW_EXPERIMENT_NAME 下的一个 run:
+
+- 参数: 任务参数 (模型、任务、负载、采样参数等)
+- 指标: summary/stats.csv 中各 (模型, 任务, 负载) 的延迟、吞吐、能耗与质量均值,
+  键为 <指标>/<模型>/<任务>/<负载>; 以及完成用例数与总耗时
+- 产物: 任务目录下的 summary/ 与 job.json
+
+mlflow 导入需要数秒, 因此 initialize() 由启动过程放在后台执行, 首次记录时若尚未完成会等待。
+未安装 mlflow 时跟踪停用; 跟踪服务不可达时记录警告, 下次记录时重试, 不影响评估任务。
+"""
+
+import os
+import re
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from src.backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_PARAM_LENGTH = 500
+MAX_BATCH_METRICS = 1000  # log_batch 单次上限
+RUN_STATUS = {"succeeded": "FINISHED", "failed": "FAILED", "timeout": "FAILED", "cancelled": "KILLED"}
+
+
+def metric_key(*parts: str) -> str:
+    """MLflow 指标名只允许字母数字与 _ - . / 空格"""
+    return "/".join(re.sub(r"[^0-9A-Za-z_\-. ]", "_", str(p)) for p in parts)
+
+
+class ExperimentTracker:
+    """
+    Args:
+        tracking_uri: 跟踪服务地址, 默认 MLFLOW_TRACKING_URI
+        experiment_name: 实验名, 默认 MLFLOW_EXPERIMENT_NAME
+        enabled: 是否启用, 默认 EXPERIMENT_TRACKING_ENABLED
+    """
+
+    def __init__(self, tracking_uri: Optional[str] = None, experiment_name: Optional[str] = None,
+                 enabled: Optional[bool] = None):
+        self.enabled = settings.EXPERIMENT_TRACKING_ENABLED if enabled is None else enabled
+        self.tracking_uri = tracking_uri or settings.MLFLOW_TRACKING_URI
+        self.experiment_name = experiment_name or settings.MLFLOW_EXPERIMENT_NAME
+        self._client = None
+        self._experiment_id: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._experiment_id is not None
+
+    async def initialize(self) -> None:
+        """导入 mlflow 并获取 (或创建) 实验; 未安装 mlflow 时停用, 跟踪服务出错时抛出异常 (下次调用重试)"""
+        if not self.enabled or self.ready:
+            return
+        async with self._lock:
+            if self.ready:
+                return
+            try:
+                await asyncio.to_thread(self._connect)
+            except ImportError:
+                self.enabled = False
+                logger.warning("未安装 mlflow, 实验跟踪已停用")
+                return
+            logger.info(f"实验跟踪: {self.tracking_uri} 实验 {self.experiment_name} ({self._experiment_id})")
+
+    def _connect(self) -> None:
+        from mlflow.tracking import MlflowClient
+        client = MlflowClient(tracking_uri=self.tracking_uri)
+        experiment = client.get_experiment_by_name(self.experiment_name)
+        self._experiment_id = (experiment.experiment_id if experiment is not None
+                               else client.create_experiment(self.experiment_name))
+        self._client = client
+
+    async def close(self) -> None:
+        self._client = None
+        self._experiment_id = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "ready": self.ready, "tracking_uri": self.tracking_uri}
+
+    async def log_job(self, job: Any) -> Optional[str]:
+        """记录一个已结束的评估任务, 返回 run ID; 停用或出错时返回 None"""
+        if not self.enabled:
+            return None
+        try:
+            await self.initialize()
+            if not self.ready:
+                return None
+            return await asyncio.to_thread(self._log_job, job)
+        except Exception as e:
+            logger.warning(f"评估任务 {job.id} 实验跟踪记录失败: {e}")
+            return None
+
+    def _log_job(self, job: Any) -> str:
+        from mlflow.entities import Metric, Param
+        from src.backend.services.task_scheduler import read_stats
+
+        client = self._client
+        started = int((job.started_at or job.created_at) * 1000)
+        run = client.create_run(self._experiment_id, start_time=started,
+                                tags={"mlflow.runName": f"evaluation-{job.id}", "job_id": job.id,
+                                      "status": job.status})
+        run_id = run.info.run_id
+        now = int(time.time() * 1000)
+        params = [Param(k, (",".join(map(str, v)) if isinstance(v, list) else str(v))[:MAX_PARAM_LENGTH])
+                  for k, v in job.spec.items() if k != "cases"]
+        if job.spec.get("cases"):
+            params.append(Param("cases", str(len(job.spec["cases"]))))
+        metrics = [Metric("completed_cases", job.completed, now, 0)]
+        if job.started_at and job.finished_at:
+            metrics.append(Metric("elapsed_seconds", job.finished_at - job.started_at, now, 0))
+        for row in read_stats(job.output_dir):
+            for k, v in row.items():
+                if k.endswith("_mean") and v is not None:
+                    metrics.append(Metric(metric_key(k[:-len("_mean")], row["model"], row["task"], row["load"]),
+                                          v, now, 0))
+        client.log_batch(run_id, metrics=metrics[:MAX_BATCH_METRICS], params=params)
+        for start in range(MAX_BATCH_METRICS, len(metrics), MAX_BATCH_METRICS):
+            client.log_batch(run_id, metrics=metrics[start:start + MAX_BATCH_METRICS])
+        summary = os.path.join(job.output_dir, "summary")
+        if os.path.isdir(summary):
+            client.log_artifacts(run_id, summary, "summary")
+        job_file = os.path.join(job.output_dir, "job.json")
+        if os.path.exists(job_file):
+            client.log_artifact(run_id, job_file)
+        client.set_terminated(run_id, status=RUN_STATUS.get(job.status, "FINISHED"),
+                              end_time=int((job.finished_at or time.time()) * 1000))
+        return run_id
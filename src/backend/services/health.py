@@ -0,0 +1,216 @@
+"""
+健康检查服务
+
+逐项探测数据库、结果缓存 (二级缓存为 Redis 时探测 Redis)、任务调度队列、Ollama 服务与 GPU 监控,
+以及启动过程 (后台初始化的服务是否已就绪), 每项:
+
+- 在 HEALTH_CHECK_TIMEOUT 秒内完成, 超时记为 timeout
+- 记录耗时 (latency_ms)
+- 结果缓存 HEALTH_CACHE_TTL 秒; 缓存过期时并发的探测请求共用同一次检查,
+  编排系统频繁探测也不会放大到依赖服务
+
+就绪判定: HEALTH_CRITICAL_CHECKS 中的检查全部为 ok (或 degraded) 时就绪;
+其余检查失败只把整体状态标记为 degraded。存活检查不访问任何依赖。
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Check = Callable[[], Awaitable[Dict[str, Any]]]
+
+OK, DEGRADED, ERROR, TIMEOUT, DISABLED = "ok", "degraded", "error", "timeout", "disabled"
+
+
+class CheckFailed(Exception):
+    """检查未通过; details 会随结果返回"""
+
+    def __init__(self, message: str, status: str = ERROR, **details: Any):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+class HealthChecker:
+    """
+    Args:
+        app_state: FastAPI 的 app.state, 用于读取任务调度器等运行时组件
+        timeout: 单项检查超时 (秒), 默认 HEALTH_CHECK_TIMEOUT
+        ttl: 结果缓存时间 (秒), 默认 HEALTH_CACHE_TTL
+        critical: 影响就绪状态的检查, 默认 HEALTH_CRITICAL_CHECKS
+    """
+
+    def __init__(self, app_state: Any = None, timeout: Optional[float] = None, ttl: Optional[float] = None,
+                 critical: Optional[List[str]] = None):
+        self.app_state = app_state
+        self.timeout = timeout or settings.HEALTH_CHECK_TIMEOUT
+        self.ttl = settings.HEALTH_CACHE_TTL if ttl is None else ttl
+        self.critical = set(settings.HEALTH_CRITICAL_CHECKS if critical is None else critical)
+        self.started_at = time.time()
+        self.checks: Dict[str, Check] = {
+            "database": self.check_database,
+            "cache": self.check_cache,
+            "scheduler": self.check_scheduler,
+            "ollama": self.check_ollama,
+            "gpu": self.check_gpu,
+            "startup": self.check_startup,
+        }
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def register(self, name: str, check: Check, critical: bool = False) -> None:
+        """注册额外的检查: check 为无参协程函数, 返回详情字典, 失败时抛出异常"""
+        self.checks[name] = check
+        if critical:
+            self.critical.add(name)
+
+    # ---- 执行与缓存 ----
+
+    async def _run(self, name: str) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        try:
+            details = await asyncio.wait_for(self.checks[name](), self.timeout)
+            status = details.pop("status", OK) if isinstance(details, dict) else OK
+            result = {"status": status, **(details or {})}
+        except asyncio.TimeoutError:
+            result = {"status": TIMEOUT, "error": f"超过 {self.timeout} 秒未响应"}
+        except CheckFailed as e:
+            result = {"status": e.status, "error": str(e), **e.details}
+        except Exception as e:
+            result = {"status": ERROR, "error": f"{type(e).__name__}: {e}"}
+        result["latency_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        result["checked_at"] = time.time()
+        result["critical"] = name in self.critical
+        if result["status"] not in (OK, DISABLED):
+            logger.warning(f"健康检查 {name}: {result['status']} {result.get('error', '')}")
+        self._results[name] = result
+        return result
+
+    async def check(self, name: str, force: bool = False) -> Dict[str, Any]:
+        cached = self._results.get(name)
+        if not force and cached and time.time() - cached["checked_at"] < self.ttl:
+            return dict(cached, cached=True)
+        task = self._inflight.get(name)
+        if task is None:
+            task = asyncio.ensure_future(self._run(name))
+            self._inflight[name] = task
+            task.add_done_callback(lambda _: self._inflight.pop(name, None))
+        return dict(await asyncio.shield(task), cached=False)
+
+    async def check_all(self, names: Optional[List[str]] = None, force: bool = False) -> Dict[str, Any]:
+        """并发执行检查, 返回整体状态、是否就绪与各项结果"""
+        names = names or list(self.checks)
+        results = await asyncio.gather(*(self.check(n, force) for n in names))
+        checks = dict(zip(names, results))
+        failed_critical = [n for n, r in checks.items() if r["critical"] and r["status"] not in (OK, DEGRADED)]
+        failed_other = [n for n, r in checks.items() if r["status"] not in (OK, DISABLED)]
+        status = "unhealthy" if failed_critical else ("degraded" if failed_other else "healthy")
+        return {
+            "status": status,
+            "ready": not failed_critical,
+            "timestamp": time.time(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "version": settings.VERSION,
+            "checks": checks,
+        }
+
+    def liveness(self) -> Dict[str, Any]:
+        return {
+            "status": "alive",
+            "timestamp": time.time(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "version": settings.VERSION,
+        }
+
+    async def close(self) -> None:
+        for task in list(self._inflight.values()):
+            task.cancel()
+
+    # ---- 各项检查 ----
+
+    async def check_database(self) -> Dict[str, Any]:
+        # 使用应用共享的异步引擎 (core.database), 同时反映连接池状态
+        from sqlalchemy import text
+        from src.backend.core.database import get_engine
+        engine = get_engine()
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return {"dialect": engine.dialect.name, "pool": engine.pool.status()}
+
+    async def check_cache(self) -> Dict[str, Any]:
+        """结果缓存的统计; 只在二级缓存为 Redis 时探测 Redis (复用缓存自身的连接)"""
+        cache = getattr(self.app_state, "result_cache", None)
+        if cache is None:
+            raise CheckFailed("结果缓存未初始化")
+        details = cache.stats()
+        if not details["enabled"]:
+            return dict(details, status=DISABLED)
+        if details["backend"] == "redis":
+            await cache.backend.ping()
+        elif details["backend"] is None and settings.CACHE_BACKEND == "redis":
+            # 启动时 Redis 不可达, 只使用进程内一级缓存
+            details["status"] = DEGRADED
+        return details
+
+    async def check_scheduler(self) -> Dict[str, Any]:
+        scheduler = getattr(self.app_state, "task_scheduler", None)
+        if scheduler is None:
+            raise CheckFailed("任务调度器未初始化")
+        details = scheduler.stats()
+        if not details.pop("started"):
+            raise CheckFailed("任务调度器未启动")
+        if details["role"] == "follower":
+            # 多进程部署时只有 leader 运行工作协程
+            if details["queue_depth"] >= details["queue_capacity"]:
+                details["status"] = DEGRADED
+            return details
+        alive = details["workers_alive"]
+        if alive == 0:
+            raise CheckFailed("没有存活的工作协程", **details)
+        if alive < details["workers"] or details["queue_depth"] >= details["queue_capacity"]:
+            details["status"] = DEGRADED
+        return details
+
+    async def check_startup(self) -> Dict[str, Any]:
+        """后台初始化未完成或有步骤失败时为 degraded (服务部分可用)"""
+        startup = getattr(self.app_state, "startup", None)
+        if startup is None:
+            raise CheckFailed("启动尚未开始")
+        details = startup.status()
+        if details["pending"] or details["failed"]:
+            details["status"] = DEGRADED
+        return details
+
+    async def check_ollama(self) -> Dict[str, Any]:
+        from experiments import ollama_client
+        host = settings.OLLAMA_HOST
+        ver = await asyncio.to_thread(ollama_client.version, host, self.timeout)
+        return {"version": ver, "host": ollama_client._base_url(host)}
+
+    async def check_gpu(self) -> Dict[str, Any]:
+        def probe():
+            try:
+                import pynvml
+            except ImportError:
+                raise CheckFailed("未安装 pynvml, 无法采集 GPU 能耗", status=DISABLED)
+            try:
+                pynvml.nvmlInit()
+            except Exception as e:
+                raise CheckFailed(f"NVML 初始化失败: {e}")
+            count = pynvml.nvmlDeviceGetCount()
+            if count == 0:
+                raise CheckFailed("未检测到 GPU")
+            handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+            info = {"devices": count}
+            try:
+                info["power_w"] = pynvml.nvmlDeviceGetPowerUsage(handle) / 1000.0
+            except Exception:
+                info["status"] = DEGRADED
+                info["error"] = "无法读取功率, 能耗数据将为 0"
+            return info
+        return await asyncio.to_thread(probe)
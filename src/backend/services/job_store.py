@@ -0,0 +1,124 @@
+"""
+评估任务的共享存储 (多进程部署)
+
+evaluation_jobs 表 (src.backend.models.evaluation.EvaluationJobRow) 是多个工作进程共享的任务状态:
+任一进程插入排队中的任务; leader 进程以条件更新 (status='queued') 认领任务后执行,
+同一任务不会被执行两次; 排队中的任务由任一进程以同样的条件更新取消, 运行中的任务
+只能标记 cancel_requested, 由 leader 终止子进程。
+
+行以字典形式读写 (列名与 EvaluationJob.to_row() 一致), 不依赖调度器模块。
+"""
+
+import time
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.backend.models.evaluation import EvaluationJobRow
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = ("queued", "running")
+# leader 写回时不覆盖: 由其他进程设置的取消请求
+PROTECTED_COLUMNS = ("id", "cancel_requested")
+
+
+def _row(r: Any) -> Dict[str, Any]:
+    return dict(r._mapping)
+
+
+class JobStore:
+    """
+    Args:
+        engine: 异步引擎 (src.backend.core.database.get_engine)
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.table = EvaluationJobRow.__table__
+
+    async def insert(self, row: Dict[str, Any]) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(insert(self.table).values(**row, cancel_requested=False, updated_at=time.time()))
+
+    async def update(self, job_id: str, values: Dict[str, Any]) -> None:
+        values = {k: v for k, v in values.items() if k not in PROTECTED_COLUMNS}
+        async with self.engine.begin() as conn:
+            await conn.execute(update(self.table).where(self.table.c.id == job_id)
+                               .values(**values, updated_at=time.time()))
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        async with self.engine.connect() as conn:
+            r = (await conn.execute(select(self.table).where(self.table.c.id == job_id))).first()
+        return _row(r) if r is not None else None
+
+    async def list(self, status: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按提交时间倒序"""
+        stmt = select(self.table).order_by(self.table.c.created_at.desc())
+        if status is not None:
+            stmt = stmt.where(self.table.c.status == status)
+        if limit:
+            stmt = stmt.limit(limit)
+        async with self.engine.connect() as conn:
+            return [_row(r) for r in await conn.execute(stmt)]
+
+    async def active(self) -> List[Dict[str, Any]]:
+        """排队中与运行中的任务 (按提交顺序)"""
+        stmt = select(self.table).where(self.table.c.status.in_(ACTIVE)).order_by(self.table.c.created_at)
+        async with self.engine.connect() as conn:
+            return [_row(r) for r in await conn.execute(stmt)]
+
+    async def statuses(self, job_ids: Iterable[str]) -> Dict[str, str]:
+        job_ids = list(job_ids)
+        if not job_ids:
+            return {}
+        async with self.engine.connect() as conn:
+            rows = await conn.execute(select(self.table.c.id, self.table.c.status)
+                                      .where(self.table.c.id.in_(job_ids)))
+            return {job_id: status for job_id, status in rows}
+
+    async def claim(self, job_id: str, owner: str) -> bool:
+        """把排队中的任务标记为 owner 执行; 任务已被取消或认领时返回 False"""
+        now = time.time()
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                update(self.table).where(and_(self.table.c.id == job_id, self.table.c.status == "queued"))
+                .values(status="running", owner=owner, started_at=now, updated_at=now))
+        return result.rowcount == 1
+
+    async def cancel_queued(self, job_id: str) -> bool:
+        """取消排队中的任务; 任务已开始或已结束时返回 False"""
+        now = time.time()
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                update(self.table).where(and_(self.table.c.id == job_id, self.table.c.status == "queued"))
+                .values(status="cancelled", finished_at=now, updated_at=now))
+        return result.rowcount == 1
+
+    async def request_cancel(self, job_id: str) -> bool:
+        """请求 leader 取消运行中的任务"""
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                update(self.table).where(and_(self.table.c.id == job_id, self.table.c.status == "running"))
+                .values(cancel_requested=True, updated_at=time.time()))
+        return result.rowcount == 1
+
+    async def cancel_requests(self) -> List[str]:
+        async with self.engine.connect() as conn:
+            rows = await conn.execute(select(self.table.c.id).where(
+                and_(self.table.c.status == "running", self.table.c.cancel_requested.is_(True))))
+            return [job_id for job_id, in rows]
+
+    async def prune(self, keep: int) -> int:
+        """只保留最近结束的 keep 个任务, 返回删除的行数"""
+        finished = ~self.table.c.status.in_(ACTIVE)
+        async with self.engine.begin() as conn:
+            cutoff = (await conn.execute(select(self.table.c.finished_at).where(finished)
+                                         .order_by(self.table.c.finished_at.desc()).offset(keep).limit(1))).scalar()
+            if cutoff is None:
+                return 0
+            result = await conn.execute(delete(self.table).where(and_(finished,
+                                                                      self.table.c.finished_at <= cutoff)))
+        return result.rowcount
@@ -0,0 +1,142 @@
+"""
+模型信息与显存预算
+
+评估任务调度器的准入依据:
+
+- 已安装模型及其文件大小来自 Ollama /api/tags, 每 MODEL_INFO_TTL 秒刷新一次;
+  显存占用按 文件大小 x MODEL_VRAM_OVERHEAD 估计, 大小未知时取 MODEL_DEFAULT_VRAM_MB
+- 显存预算为 GPU_MEMORY_BUDGET_MB; 为 0 时按 GPU 0 的总显存 x GPU_MEMORY_UTILIZATION 检测 (pynvml),
+  检测不到 GPU 时不限制
+- 运行中的任务各自预留显存; run_experiments 逐个模型串行执行, 同一时刻只加载一个模型,
+  因此一个任务的预留量为其各模型估计值的最大值
+
+预留只是调度器内部的记账, 不读取实际显存占用 (模型按 keepalive 随时加载与卸载)。
+initialize() 需要访问 Ollama 与 NVML, 由启动过程放在后台执行; 调度器首次 refresh() 时
+若尚未完成会等待同一次初始化。
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def detect_gpu_memory_mb() -> Optional[float]:
+    """GPU 0 的总显存 (MB); 未安装 pynvml 或没有 GPU 时返回 None"""
+    try:
+        import pynvml
+        pynvml.nvmlInit()
+    except Exception:
+        return None
+    try:
+        if pynvml.nvmlDeviceGetCount() == 0:
+            return None
+        handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+        return pynvml.nvmlDeviceGetMemoryInfo(handle).total / MB
+    except Exception:
+        return None
+    finally:
+        try:
+            pynvml.nvmlShutdown()
+        except Exception:
+            pass
+
+
+class ModelCache:
+    """
+    Args:
+        host: Ollama 地址, 默认 OLLAMA_HOST
+        budget_mb: 显存预算 (MB); None 时由 initialize() 按配置确定, 0 表示不限制
+        ttl: 模型列表刷新间隔 (秒), 默认 MODEL_INFO_TTL
+    """
+
+    def __init__(self, host: Optional[str] = None, budget_mb: Optional[float] = None,
+                 ttl: Optional[float] = None):
+        self.host = host or settings.OLLAMA_HOST
+        self.budget_mb = budget_mb
+        self.ttl = ttl or settings.MODEL_INFO_TTL
+        # 模型名 -> 文件大小 (MB, 未知为 None)
+        self._sizes: Dict[str, Optional[float]] = {}
+        self._fetched_at = 0.0
+        self._refresh_lock = asyncio.Lock()
+        # 预留键 (任务 ID) -> 显存 (MB)
+        self._reserved: Dict[str, float] = {}
+
+    async def initialize(self) -> None:
+        await self.refresh(force=True)
+        budget = f"{self.budget_mb:.0f} MB" if self.budget_mb else "不限制"
+        logger.info(f"模型缓存: {len(self._sizes)} 个已安装模型, 评估任务显存预算 {budget}")
+
+    async def close(self) -> None:
+        self._reserved.clear()
+
+    async def refresh(self, force: bool = False) -> None:
+        """刷新已安装模型列表 (首次调用时同时确定显存预算); Ollama 不可达时保留上一次的结果"""
+        if not force and time.monotonic() - self._fetched_at < self.ttl:
+            return
+        async with self._refresh_lock:
+            if not force and time.monotonic() - self._fetched_at < self.ttl:
+                return
+            if self.budget_mb is None:
+                self.budget_mb = await self._detect_budget()
+            from experiments import ollama_client
+            try:
+                tags = await asyncio.to_thread(ollama_client.tags, self.host)
+                self._sizes = {t["name"]: (t["size"] / MB if t.get("size") else None)
+                               for t in tags if t.get("name")}
+            except Exception as e:
+                logger.warning(f"无法获取 Ollama 模型列表: {e}")
+            # 失败时同样推迟下一次刷新, 避免每次调度都等待超时
+            self._fetched_at = time.monotonic()
+
+    @staticmethod
+    async def _detect_budget() -> float:
+        if settings.GPU_MEMORY_BUDGET_MB > 0:
+            return float(settings.GPU_MEMORY_BUDGET_MB)
+        total = await asyncio.to_thread(detect_gpu_memory_mb)
+        return total * settings.GPU_MEMORY_UTILIZATION if total else 0.0
+
+    def installed(self) -> List[str]:
+        return sorted(self._sizes)
+
+    def model_mb(self, model: str) -> float:
+        size = self._sizes.get(model)
+        return size * settings.MODEL_VRAM_OVERHEAD if size else float(settings.MODEL_DEFAULT_VRAM_MB)
+
+    def job_mb(self, models: Iterable[str]) -> float:
+        """任务的显存需求: 各模型估计值的最大值 (模型串行加载)"""
+        return max((self.model_mb(m) for m in models), default=float(settings.MODEL_DEFAULT_VRAM_MB))
+
+    @property
+    def reserved_mb(self) -> float:
+        return sum(self._reserved.values())
+
+    def can_admit(self, mb: float) -> bool:
+        """预算内是否还能容纳 mb; 没有任务运行时总是允许 (单个超出预算的任务也能执行)"""
+        if not self.budget_mb or not self._reserved:
+            return True
+        return self.reserved_mb + mb <= self.budget_mb
+
+    def saturated(self) -> bool:
+        return bool(self.budget_mb) and self.reserved_mb >= self.budget_mb
+
+    def reserve(self, key: str, mb: float) -> None:
+        self._reserved[key] = mb
+
+    def release(self, key: str) -> None:
+        self._reserved.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "models": len(self._sizes),
+            "budget_mb": round(self.budget_mb, 1) if self.budget_mb else None,
+            "reserved_mb": round(self.reserved_mb, 1),
+            "reservations": len(self._reserved),
+            "saturated": self.saturated(),
+        }
@@ -0,0 +1,212 @@
+"""
+按客户端的令牌桶限流
+
+每个客户端两个令牌桶: 容量 RATE_LIMIT_PER_MINUTE、每分钟补满, 与容量 RATE_LIMIT_PER_HOUR、
+每小时补满; 一次请求在两个桶中各消耗 cost 个令牌, 任一桶不足时拒绝且不扣减,
+并给出令牌补足所需的等待时间 (Retry-After)。
+
+- 客户端: 请求头 X-API-Key (取摘要, 不保存原文), 否则为来源 IP;
+  RATE_LIMIT_TRUST_PROXY 开启时取 X-Forwarded-For 的首个地址
+- 后端: memory 为进程内计数 (多个工作进程各自限流); redis 用 Lua 脚本原子地
+  补充与扣减, 多进程共享计数; Redis 不可达或出错时退回进程内计数, 出错后暂停使用一段时间
+"""
+
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from src.backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "genai:ratelimit:"
+MAX_CLIENTS = 10000
+BACKEND_RETRY_SECONDS = 30.0
+
+# (容量, 每秒补充的令牌数)
+Bucket = Tuple[float, float]
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    retry_after: float  # 拒绝时距离令牌补足的秒数
+    remaining: int  # 各桶剩余令牌的最小值
+    limit: int  # 最紧的桶容量 (每分钟)
+
+
+def take(tokens: List[float], elapsed: float, buckets: Sequence[Bucket], cost: float) -> Tuple[bool, float]:
+    """补充 elapsed 秒的令牌后尝试扣减 cost (原地更新 tokens), 返回 (是否允许, 需要等待的秒数)"""
+    wait = 0.0
+    for i, (capacity, rate) in enumerate(buckets):
+        tokens[i] = min(capacity, tokens[i] + elapsed * rate)
+        if tokens[i] < cost:
+            wait = max(wait, (cost - tokens[i]) / rate)
+    if wait > 0:
+        return False, wait
+    for i in range(len(tokens)):
+        tokens[i] -= cost
+    return True, 0.0
+
+
+class MemoryBackend:
+    """进程内令牌桶, 客户端数超过 MAX_CLIENTS 时淘汰最久未访问的"""
+
+    name = "memory"
+
+    def __init__(self, max_clients: int = MAX_CLIENTS):
+        self.max_clients = max_clients
+        # 客户端 -> (上次更新时间, 各桶令牌数)
+        self._state: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+
+    async def take(self, key: str, buckets: Sequence[Bucket], cost: float) -> Tuple[bool, float, List[float]]:
+        now = time.monotonic()
+        last, tokens = self._state.pop(key, (now, [capacity for capacity, _ in buckets]))
+        allowed, wait = take(tokens, now - last, buckets, cost)
+        self._state[key] = (now, tokens)
+        while len(self._state) > self.max_clients:
+            self._state.popitem(last=False)
+        return allowed, wait, tokens
+
+    async def close(self) -> None:
+        self._state.clear()
+
+
+class RedisBackend:
+    """
+    Redis 令牌桶: 每个客户端一个哈希 (t 为上次更新时间, b1..bn 为各桶令牌数),
+    时间取 Redis 服务器时钟, 各工作进程的时钟偏差不影响计数
+    """
+
+    name = "redis"
+
+    # KEYS[1]: 客户端键; ARGV: cost, 容量1, 速率1, 容量2, 速率2, ...
+    SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local cost = tonumber(ARGV[1])
+local n = (#ARGV - 1) / 2
+local last = tonumber(redis.call('HGET', KEYS[1], 't') or now)
+local elapsed = math.max(0, now - last)
+local tokens = {}
+local wait = 0
+local ttl = 1
+for i = 1, n do
+  local capacity = tonumber(ARGV[2 * i])
+  local rate = tonumber(ARGV[2 * i + 1])
+  local v = tonumber(redis.call('HGET', KEYS[1], 'b' .. i) or capacity)
+  v = math.min(capacity, v + elapsed * rate)
+  tokens[i] = v
+  if v < cost then wait = math.max(wait, (cost - v) / rate) end
+  ttl = math.max(ttl, capacity / rate)
+end
+local allowed = 0
+if wait == 0 then
+  allowed = 1
+  for i = 1, n do tokens[i] = tokens[i] - cost end
+end
+local out = {allowed, tostring(wait)}
+for i = 1, n do
+  redis.call('HSET', KEYS[1], 'b' .. i, tostring(tokens[i]))
+  out[i + 2] = tostring(tokens[i])
+end
+redis.call('HSET', KEYS[1], 't', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(ttl))
+return out
+"""
+
+    def __init__(self, url: Optional[str] = None, timeout: Optional[float] = None):
+        import redis.asyncio as aioredis
+        timeout = timeout or settings.REDIS_TIMEOUT
+        self._client = aioredis.from_url(url or settings.REDIS_URL, max_connections=settings.REDIS_POOL_SIZE,
+                                         socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    async def ping(self) -> None:
+        await self._client.ping()
+
+    async def take(self, key: str, buckets: Sequence[Bucket], cost: float) -> Tuple[bool, float, List[float]]:
+        args = [cost] + [x for bucket in buckets for x in bucket]
+        out = await self._script(keys=[KEY_PREFIX + key], args=args)
+        return bool(int(out[0])), float(out[1]), [float(v) for v in out[2:]]
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+class RateLimiter:
+    """
+    Args:
+        per_minute: 每分钟请求数, 默认 RATE_LIMIT_PER_MINUTE
+        per_hour: 每小时请求数, 默认 RATE_LIMIT_PER_HOUR
+        backend: 计数后端; None 时由 initialize() 按 RATE_LIMIT_BACKEND 创建
+        enabled: 是否启用, 默认 RATE_LIMIT_ENABLED
+    """
+
+    def __init__(self, per_minute: Optional[int] = None, per_hour: Optional[int] = None,
+                 backend: Any = None, enabled: Optional[bool] = None):
+        self.enabled = settings.RATE_LIMIT_ENABLED if enabled is None else enabled
+        self.per_minute = per_minute or settings.RATE_LIMIT_PER_MINUTE
+        self.per_hour = per_hour or settings.RATE_LIMIT_PER_HOUR
+        self.buckets: List[Bucket] = [(float(self.per_minute), self.per_minute / 60.0),
+                                      (float(self.per_hour), self.per_hour / 3600.0)]
+        self.backend = backend
+        self._fallback = MemoryBackend()
+        self._backend_down_until = 0.0
+
+    async def initialize(self) -> None:
+        if not self.enabled or self.backend is not None:
+            return
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            backend = None
+            try:
+                backend = RedisBackend()
+                await asyncio.wait_for(backend.ping(), settings.REDIS_TIMEOUT)
+                self.backend = backend
+            except Exception as e:
+                logger.warning(f"Redis 不可用, 限流改为进程内计数: {e}")
+                if backend is not None:
+                    await asyncio.gather(backend.close(), return_exceptions=True)
+        if self.backend is None:
+            self.backend = self._fallback
+        logger.info(f"限流: 每分钟 {self.per_minute} / 每小时 {self.per_hour} 次, 后端 {self.backend.name}")
+
+    async def close(self) -> None:
+        if self.backend is not None:
+            try:
+                await self.backend.close()
+            except Exception:
+                pass
+
+    async def check(self, client: str, cost: float = 1.0) -> RateLimitResult:
+        """消耗 client 的 cost 个令牌; 未启用时总是允许"""
+        if not self.enabled:
+            return RateLimitResult(True, 0.0, self.per_minute, self.per_minute)
+        backend = self.backend or self._fallback
+        if backend is not self._fallback and time.monotonic() < self._backend_down_until:
+            backend = self._fallback
+        try:
+            allowed, wait, tokens = await backend.take(client, self.buckets, cost)
+        except Exception as e:
+            # Redis 出错时不因限流拒绝服务, 暂时改用进程内计数
+            logger.warning(f"限流后端 {backend.name} 出错, {BACKEND_RETRY_SECONDS:.0f} 秒内使用进程内计数: {e}")
+            self._backend_down_until = time.monotonic() + BACKEND_RETRY_SECONDS
+            allowed, wait, tokens = await self._fallback.take(client, self.buckets, cost)
+        return RateLimitResult(allowed, wait, int(min(tokens)), self.per_minute)
+
+
+def client_key(request: Any) -> str:
+    """限流使用的客户端标识"""
+    api_key = request.headers.get("x-api-key")
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:32]
+    host = None
+    if settings.RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            host = forwarded.split(",")[0].strip()
+    if not host and request.client is not None:
+        host = request.client.host
+    return "ip:" + (host or "unknown")
@@ -0,0 +1,229 @@
+"""
+实验记录入库与查询
+
+把 run_experiments 写出的原始记录 (<实验目录>/raw/<模型>/*.json) 导入 runs / samples /
+scores 三张表 (src.backend.models.experiment):
+
+- 按文件路径、mtime 与大小增量导入: 未变化的文件跳过, 变化的文件先删除旧行再写入,
+  已删除的文件对应的行一并移除
+- 记录解析 (JSON 解码) 在线程池中进行; 每批记录一个事务, runs 以 executemany + RETURNING
+  写入取回主键, 时序采样在 PostgreSQL (asyncpg) 上用 COPY 写入, 其他数据库用 executemany
+- 查询按 (模型, 量化, 任务, 负载) 聚合, 指标口径与排行榜 (src.evaluation.leaderboard) 一致
+
+src.evaluation 的模块依赖 pandas, 在首次解析或查询时才导入, 不拖慢后端启动。
+"""
+
+import os
+import json
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from src.backend.models.experiment import SAMPLE_COLUMNS, Run, Sample, Score
+
+logger = logging.getLogger(__name__)
+
+SCORE_FIELDS = ("quality_unified", "bartscore", "tests_pass_rate", "distinct_2", "code_compiles")
+# ResourceMonitor.to_dict() 中与 Sample 列对应的时序
+SERIES = {
+    "cpu_percent": "cpu_percent",
+    "mem_used_mb": "mem_used_mb",
+    "gpu_util": "gpu_util",
+    "gpu_mem_mb": "gpu_mem_mb",
+    "gpu_power_w": "gpu_power_w",
+    "gpu_temp_c": "gpu_temp_c",
+}
+QUALITY_METRIC = "quality_unified"
+
+
+def parse_record_file(path: str, experiment: str) -> Tuple[Dict[str, Any], List[tuple], List[Tuple[str, float]]]:
+    """解析一个原始记录文件, 返回 (runs 行, 采样行 (不含 run_id), [(指标, 分数)])"""
+    from src.evaluation.records import parse_record
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    flat = parse_record(path, data)
+    full = data.get("system_metrics_full") or {}
+    summary = data.get("system_metrics_summary") or {}
+    j_per_token = flat["energy_j_per_token"]
+    if j_per_token is None and flat["gpu_energy_j"]:
+        # 与排行榜一致: 缺少 token 数时以 吞吐 x 延迟 估计
+        tokens = flat["token_count"] or ((flat["toks_per_s"] or 0) * (flat["latency_s"] or 0))
+        j_per_token = flat["gpu_energy_j"] / tokens if tokens else None
+    run = {
+        "experiment": experiment,
+        "source": os.path.abspath(path),
+        "source_mtime_ns": flat["mtime_ns"],
+        "source_size": flat["size"],
+        "model": flat["model"] or "unknown",
+        "quantization": flat["quantization"],
+        "task": flat["task"],
+        "load": flat["load"],
+        "run_idx": flat["run"],
+        "case_index": flat["case_index"],
+        "timestamp": flat["timestamp"],
+        "latency_s": flat["latency_s"],
+        "tps": flat["toks_per_s"],
+        "ttft_s": flat["first_token_s"],
+        "token_count": flat["token_count"],
+        "token_count_method": flat["token_count_method"],
+        "gpu_energy_j": flat["gpu_energy_j"],
+        "cpu_energy_j": summary.get("cpu_energy_j_approx"),
+        "j_per_token": j_per_token,
+    }
+    ts = full.get("timestamps") or []
+    series = [full.get(key) or [] for key in SERIES.values()]
+    samples = [(t, *(s[i] if i < len(s) else None for s in series)) for i, t in enumerate(ts)]
+    scores = []
+    for name in SCORE_FIELDS:
+        v = flat.get(name)
+        if v is not None:
+            scores.append((name, float(v)))
+    return run, samples, scores
+
+
+async def insert_samples(conn: AsyncConnection, rows: List[tuple]) -> None:
+    """批量写入采样行 (与 SAMPLE_COLUMNS 顺序一致); asyncpg 使用 COPY"""
+    if not rows:
+        return
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "asyncpg":
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(Sample.__tablename__, records=rows, columns=SAMPLE_COLUMNS)
+    else:
+        await conn.execute(insert(Sample.__table__), [dict(zip(SAMPLE_COLUMNS, r)) for r in rows])
+
+
+class RecordStore:
+    """
+    Args:
+        engine: 异步引擎 (src.backend.core.database.get_engine / create_engine)
+        batch_size: 每个事务写入的记录数
+        max_workers: 解析记录文件的线程数
+    """
+
+    def __init__(self, engine: AsyncEngine, batch_size: int = 200, max_workers: int = 8):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+
+    # ---- 写入 ----
+
+    async def import_experiment(self, exp_dir: str, experiment: Optional[str] = None) -> Dict[str, int]:
+        """增量导入一个实验目录, 返回 {"parsed", "skipped", "removed", "samples"}"""
+        from src.evaluation.records import list_raw_files
+        experiment = experiment or os.path.basename(os.path.normpath(exp_dir))
+        files = {os.path.abspath(p): p for p in list_raw_files(exp_dir)}
+        async with self.engine.connect() as conn:
+            known = {src: (mtime, size) for src, mtime, size in await conn.execute(
+                select(Run.source, Run.source_mtime_ns, Run.source_size).where(Run.experiment == experiment))}
+        todo = []
+        for src in list(files):
+            try:
+                st = os.stat(src)
+            except FileNotFoundError:
+                # 列出后被删除: 按已删除的文件处理
+                del files[src]
+                continue
+            except OSError as e:
+                logger.warning(f"跳过无法读取的记录 {src}: {e}")
+                continue
+            if known.get(src) != (st.st_mtime_ns, st.st_size):
+                todo.append(src)
+        gone = [src for src in known if src not in files]
+        if gone:
+            async with self.engine.begin() as conn:
+                await self._delete_sources(conn, gone)
+        info = await self.import_files(todo, experiment)
+        return dict(info, skipped=len(files) - len(todo), removed=len(gone))
+
+    async def import_files(self, paths: Iterable[str], experiment: str) -> Dict[str, int]:
+        paths = list(paths)
+        parsed = samples = 0
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for start in range(0, len(paths), self.batch_size):
+                batch = paths[start:start + self.batch_size]
+                futures = [loop.run_in_executor(pool, self._parse_safe, p, experiment) for p in batch]
+                items = [item for item in await asyncio.gather(*futures) if item is not None]
+                if not items:
+                    continue
+                async with self.engine.begin() as conn:
+                    samples += await self._write(conn, items)
+                parsed += len(items)
+        return {"parsed": parsed, "samples": samples}
+
+    @staticmethod
+    def _parse_safe(path: str, experiment: str):
+        try:
+            return parse_record_file(path, experiment)
+        except (OSError, ValueError) as e:
+            logger.warning(f"跳过无法解析的记录 {path}: {e}")
+            return None
+
+    async def _delete_sources(self, conn: AsyncConnection, sources: List[str]) -> None:
+        ids = select(Run.id).where(Run.source.in_(sources)).scalar_subquery()
+        # 显式删除子表, 不依赖数据库的级联删除设置
+        await conn.execute(delete(Sample.__table__).where(Sample.run_id.in_(ids)))
+        await conn.execute(delete(Score.__table__).where(Score.run_id.in_(ids)))
+        await conn.execute(delete(Run.__table__).where(Run.source.in_(sources)))
+
+    async def _write(self, conn: AsyncConnection, items: List[tuple]) -> int:
+        runs = [run for run, _, _ in items]
+        await self._delete_sources(conn, [r["source"] for r in runs])
+        result = await conn.execute(
+            insert(Run.__table__).returning(Run.__table__.c.id, sort_by_parameter_order=True), runs)
+        ids = [row[0] for row in result]
+        sample_rows = [(run_id, *s) for run_id, (_, samples, _) in zip(ids, items) for s in samples]
+        await insert_samples(conn, sample_rows)
+        score_rows = [{"run_id": run_id, "metric": m, "value": v}
+                      for run_id, (_, _, scores) in zip(ids, items) for m, v in scores]
+        if score_rows:
+            await conn.execute(insert(Score.__table__), score_rows)
+        return len(sample_rows)
+
+    # ---- 查询 ----
+
+    async def leaderboard(self, task: Optional[str] = None, load: Optional[str] = None, model: Optional[str] = None,
+                          quantization: Optional[str] = None, sort: str = "tps", limit: Optional[int] = 20,
+                          min_runs: int = 1) -> List[Dict[str, Any]]:
+        """按 (模型, 量化, 任务, 负载) 聚合的均值, 按 sort 指标方向排序, 缺失值排最后"""
+        from src.evaluation.leaderboard import HIGHER_IS_BETTER, METRICS
+        if sort not in METRICS:
+            raise ValueError(f"不支持的排序指标: {sort} (可选: {', '.join(METRICS)})")
+        keys = [Run.model, Run.quantization, Run.task, Run.load]
+        cols = {
+            "tps": func.avg(Run.tps),
+            "ttft": func.avg(Run.ttft_s),
+            "j_per_token": func.avg(Run.j_per_token),
+            "energy": func.avg(Run.gpu_energy_j),
+            "latency": func.avg(Run.latency_s),
+            "quality": func.avg(Score.value),
+        }
+        stmt = (select(*keys, func.count(Run.id).label("runs"), *(c.label(k) for k, c in cols.items()))
+                .outerjoin(Score, and_(Score.run_id == Run.id, Score.metric == QUALITY_METRIC))
+                .group_by(*keys)
+                .having(func.count(Run.id) >= min_runs))
+        for col, val in zip(keys, (model, quantization, task, load)):
+            if val is not None:
+                stmt = stmt.where(col == val)
+        order = cols[sort].desc() if HIGHER_IS_BETTER[sort] else cols[sort].asc()
+        stmt = stmt.order_by(order.nulls_last())
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(stmt)).mappings().all()
+        return [dict(r, rank=i + 1) for i, r in enumerate(rows)]
+
+    async def run_samples(self, run_id: int) -> List[Dict[str, Any]]:
+        """一次运行的资源采样时序"""
+        stmt = select(*(getattr(Sample, c) for c in SAMPLE_COLUMNS[1:])).where(Sample.run_id == run_id).order_by(Sample.t)
+        async with self.engine.connect() as conn:
+            return [dict(r) for r in (await conn.execute(stmt)).mappings()]
+
+    async def counts(self) -> Dict[str, int]:
+        async with self.engine.connect() as conn:
+            return {m.__tablename__: (await conn.execute(select(func.count()).select_from(m))).scalar_one()
+                    for m in (Run, Sample, Score)}
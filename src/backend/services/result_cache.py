@@ -0,0 +1,317 @@
+"""
+评估结果与排行榜查询的两级缓存
+
+- 一级: 进程内 LRU, 每条记录带过期时间并按序列化后的字节数计量, 条目数超过
+  CACHE_MAX_SIZE 或总字节数超过 CACHE_MAX_BYTES 时淘汰最久未使用的条目
+- 二级: REDIS_URL 可达时为 Redis (多个工作进程共享); CACHE_BACKEND=memory 时使用
+  进程内替身 MemoryBackend (测试用); 二级读写出错时暂停使用一段时间, 只用一级缓存
+- 请求合并: 同一键的计算进行中时, 并发的相同查询等待同一次计算, 不重复查询
+- 多进程: 调用方的缓存键包含数据版本 (排行榜数据库版本、任务结束时间), 数据变化后
+  各工作进程自然不再命中旧条目, 不需要进程间的失效通知
+
+命中、未命中、合并与淘汰计入 /metrics (genai_cache_*)。缓存值为 JSON 可序列化对象,
+一级命中直接返回同一对象, 调用方不得修改。
+"""
+
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import inspect
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from src.backend.core.config import settings
+from src.backend.core.metrics import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "genai:cache:"
+BACKEND_RETRY_SECONDS = 30.0
+
+Compute = Callable[[], Union[Any, Awaitable[Any]]]
+
+
+class LRUCache:
+    """
+    带过期时间与字节计量的 LRU (只在事件循环线程中使用, 不加锁)
+
+    Args:
+        max_entries: 最大条目数
+        max_bytes: 最大总字节数 (按序列化后的长度计)
+        on_evict: 淘汰回调, 参数为原因 (capacity / bytes / expired)
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, on_evict: Optional[Callable[[str], None]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        # 键 -> (过期时间, 字节数, 值)
+        self._data: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _drop(self, key: str, reason: str) -> None:
+        _, size, _ = self._data.pop(key)
+        self.bytes -= size
+        if self.on_evict is not None:
+            self.on_evict(reason)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] <= time.monotonic():
+            self._drop(key, "expired")
+            return False, None
+        self._data.move_to_end(key)
+        return True, entry[2]
+
+    def set(self, key: str, value: Any, size: int, ttl: float) -> None:
+        if key in self._data:
+            _, old, _ = self._data.pop(key)
+            self.bytes -= old
+        if size > self.max_bytes:
+            return
+        self._data[key] = (time.monotonic() + ttl, size, value)
+        self.bytes += size
+        while len(self._data) > self.max_entries:
+            self._drop(next(iter(self._data)), "capacity")
+        while self.bytes > self.max_bytes:
+            self._drop(next(iter(self._data)), "bytes")
+
+    def delete_prefix(self, prefix: str) -> int:
+        keys = [k for k in self._data if k.startswith(prefix)]
+        for k in keys:
+            _, size, _ = self._data.pop(k)
+            self.bytes -= size
+        return len(keys)
+
+
+class MemoryBackend:
+    """二级缓存的进程内替身, 接口与 RedisBackend 相同"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[float, bytes]] = {}
+
+    async def ping(self) -> None:
+        return None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return entry[1]
+
+    async def set(self, key: str, payload: bytes, ttl: float) -> None:
+        self._data[key] = (time.monotonic() + ttl, payload)
+
+    async def delete_prefix(self, prefix: str) -> int:
+        keys = [k for k in self._data if k.startswith(prefix)]
+        for k in keys:
+            del self._data[k]
+        return len(keys)
+
+    async def close(self) -> None:
+        self._data.clear()
+
+
+class RedisBackend:
+    """Redis 二级缓存 (redis.asyncio)"""
+
+    name = "redis"
+
+    def __init__(self, url: Optional[str] = None, timeout: Optional[float] = None):
+        import redis.asyncio as aioredis
+        timeout = timeout or settings.REDIS_TIMEOUT
+        self._client = aioredis.from_url(url or settings.REDIS_URL, max_connections=settings.REDIS_POOL_SIZE,
+                                         socket_timeout=timeout, socket_connect_timeout=timeout)
+
+    async def ping(self) -> None:
+        await self._client.ping()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, payload: bytes, ttl: float) -> None:
+        await self._client.set(key, payload, px=max(1, int(ttl * 1000)))
+
+    async def delete_prefix(self, prefix: str) -> int:
+        count = 0
+        async for key in self._client.scan_iter(match=prefix + "*", count=500):
+            count += await self._client.delete(key)
+        return count
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+class ResultCache:
+    """
+    Args:
+        max_entries: 一级缓存条目上限, 默认 CACHE_MAX_SIZE
+        max_bytes: 一级缓存字节上限, 默认 CACHE_MAX_BYTES
+        ttl: 默认过期时间 (秒), 默认 CACHE_TTL
+        backend: 二级缓存; None 时由 initialize() 按 CACHE_BACKEND 创建
+        enabled: 是否启用, 默认 CACHE_ENABLED; 关闭时每次都直接计算
+        registry: 指标注册表
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 ttl: Optional[float] = None, backend: Any = None, enabled: Optional[bool] = None,
+                 registry: MetricsRegistry = REGISTRY):
+        self.enabled = settings.CACHE_ENABLED if enabled is None else enabled
+        self.ttl = ttl or settings.CACHE_TTL
+        self.backend = backend
+        self._backend_down_until = 0.0
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        self.hits = registry.counter("genai_cache_hits_total", "结果缓存命中数", ["namespace", "tier"])
+        self.misses = registry.counter("genai_cache_misses_total", "结果缓存未命中 (需要计算) 数", ["namespace"])
+        self.coalesced = registry.counter("genai_cache_coalesced_total", "等待进行中的相同计算的请求数",
+                                          ["namespace"])
+        self.evictions = registry.counter("genai_cache_evictions_total", "一级缓存淘汰数", ["reason"])
+        self.errors = registry.counter("genai_cache_backend_errors_total", "二级缓存读写错误数", ["op"])
+        self.entries = registry.gauge("genai_cache_entries", "一级缓存条目数")
+        self.size = registry.gauge("genai_cache_bytes", "一级缓存占用字节数")
+        registry.add_collector(self._collect)
+
+        self.local = LRUCache(max_entries or settings.CACHE_MAX_SIZE, max_bytes or settings.CACHE_MAX_BYTES,
+                              on_evict=lambda reason: self.evictions.inc((reason,)))
+
+    async def initialize(self) -> None:
+        """按 CACHE_BACKEND 连接二级缓存; Redis 不可达时只使用一级缓存"""
+        if not self.enabled or self.backend is not None:
+            return
+        kind = settings.CACHE_BACKEND
+        if kind == "memory":
+            self.backend = MemoryBackend()
+        elif kind == "redis":
+            backend = None
+            try:
+                backend = RedisBackend()
+                await asyncio.wait_for(backend.ping(), settings.REDIS_TIMEOUT)
+                self.backend = backend
+            except Exception as e:
+                logger.warning(f"Redis 不可用, 结果缓存只使用进程内一级缓存: {e}")
+                if backend is not None:
+                    await asyncio.gather(backend.close(), return_exceptions=True)
+        logger.info(f"结果缓存: 一级 {self.local.max_entries} 条 / {self.local.max_bytes} 字节, "
+                    f"二级 {getattr(self.backend, 'name', '无')}")
+
+    async def close(self) -> None:
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self.backend is not None:
+            try:
+                await self.backend.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def make_key(namespace: str, key: Any) -> str:
+        digest = hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        return f"{KEY_PREFIX}{namespace}:{digest}"
+
+    async def get_or_compute(self, namespace: str, key: Any, compute: Compute, ttl: Optional[float] = None) -> Any:
+        """
+        返回缓存值, 未命中时调用 compute 计算并写入两级缓存
+
+        Args:
+            namespace: 命名空间 (指标标签, invalidate 的单位)
+            key: 可 JSON 序列化的查询参数
+            compute: 无参函数; 协程函数在事件循环中执行, 普通函数在线程池中执行
+            ttl: 过期时间 (秒), 默认为构造时的 ttl
+        """
+        if not self.enabled:
+            return await self._call(compute)
+        full_key = self.make_key(namespace, key)
+        found, value = self.local.get(full_key)
+        if found:
+            self.hits.inc((namespace, "l1"))
+            return value
+        task = self._inflight.get(full_key)
+        if task is not None:
+            self.coalesced.inc((namespace,))
+        else:
+            task = asyncio.ensure_future(self._fill(namespace, full_key, compute, ttl or self.ttl))
+            self._inflight[full_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(full_key, None))
+        # shield: 某个等待者断开不会取消其他等待者共用的计算
+        return await asyncio.shield(task)
+
+    async def _fill(self, namespace: str, full_key: str, compute: Compute, ttl: float) -> Any:
+        payload = await self._backend_call("get", full_key)
+        if payload is not None:
+            try:
+                value = json.loads(payload)
+                self.hits.inc((namespace, "l2"))
+                self.local.set(full_key, value, len(payload), ttl)
+                return value
+            except ValueError:
+                pass
+        self.misses.inc((namespace,))
+        value = await self._call(compute)
+        payload = json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+        self.local.set(full_key, value, len(payload), ttl)
+        await self._backend_call("set", full_key, payload, ttl)
+        return value
+
+    async def invalidate(self, namespace: str) -> int:
+        """删除命名空间下的全部缓存, 返回一级缓存删除的条目数"""
+        prefix = f"{KEY_PREFIX}{namespace}:"
+        removed = self.local.delete_prefix(prefix)
+        await self._backend_call("delete_prefix", prefix)
+        return removed
+
+    @staticmethod
+    async def _call(compute: Compute) -> Any:
+        if inspect.iscoroutinefunction(compute):
+            return await compute()
+        result = await asyncio.to_thread(compute)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    async def _backend_call(self, op: str, *args: Any) -> Any:
+        if self.backend is None or time.monotonic() < self._backend_down_until:
+            return None
+        try:
+            return await getattr(self.backend, op)(*args)
+        except Exception as e:
+            self.errors.inc((op,))
+            self._backend_down_until = time.monotonic() + BACKEND_RETRY_SECONDS
+            logger.warning(f"二级缓存 {op} 失败, {BACKEND_RETRY_SECONDS:.0f} 秒内只使用一级缓存: {e}")
+            return None
+
+    def _collect(self) -> None:
+        self.entries.set((), len(self.local))
+        self.size.set((), self.local.bytes)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.local),
+            "bytes": self.local.bytes,
+            "max_entries": self.local.max_entries,
+            "max_bytes": self.local.max_bytes,
+            "backend": getattr(self.backend, "name", None),
+            "backend_available": self.backend is not None and time.monotonic() >= self._backend_down_until,
+            "inflight": len(self._inflight),
+        }
+
+
+async def cached(cache: Optional[ResultCache], namespace: str, key: Any, compute: Compute,
+                 ttl: Optional[float] = None) -> Any:
+    """经由缓存计算; cache 为 None (应用未初始化缓存) 时直接计算"""
+    if cache is None:
+        return await ResultCache._call(compute)
+    return await cache.get_or_compute(namespace, key, compute, ttl)
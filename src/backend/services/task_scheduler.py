@@ -0,0 +1,874 @@
+"""
+评估任务调度服务
+
+每个评估任务在独立子进程中运行 experiments.run_experiments (与命令行实验完全相同的
+采集、质量评估与落盘逻辑), 输出到 <DATA_DIR>/experiments_api_<任务ID>/, 完成的用例
+同时写入能效排行榜。子进程隔离了 GPU 监控线程, 超时或取消时可直接终止。
+
+- 并发: EVALUATION_MAX_WORKERS 个工作协程从等待队列 (上限 EVALUATION_QUEUE_SIZE) 取任务,
+  同时运行的任务数不超过 MODEL_SERVICE_MAX_CONCURRENT (run_experiments 对模型服务串行发请求,
+  同时在途的模型请求数不超过两者的较小值)
+- 排序: 短任务优先, 预计耗时 = 各模型用例数 x 该模型每个用例的平均耗时 (由已完成任务的
+  指数滑动平均得到, 没有历史时取 EVALUATION_CASE_SECONDS); 排序值减去
+  EVALUATION_AGING_FACTOR x 已等待时间, 长任务等待越久越靠前
+- 准入: 提供 ModelCache 时任务运行期间预留模型所需显存, 预算不足的任务留在队列中,
+  由后面放得下的任务先执行; 队首任务等待超过 EVALUATION_STARVATION_SECONDS 后不再插队
+- 拒绝: 队列已满或新任务的预计开始时间超过 EVALUATION_MAX_QUEUE_WAIT 时抛出
+  TooManyRequestsError (429), Retry-After 为预计腾出位置所需的时间
+- 超时: 单个任务超过 EVALUATION_TIMEOUT 秒即终止子进程, 状态记为 timeout
+- 进度: 轮询任务目录下逐用例追加的 summary/results.csv, 状态变化通过 watch() 推送
+- 遥测: 提供 TelemetryHub 时子进程以 --telemetry 运行, 输出中的遥测行 (资源采样、
+  生成片段时间) 附上任务 ID 后发布到扇出缓冲区, 不计入任务日志
+- 指标: 提供 ExperimentMetrics 时同样解析遥测行, 资源采样与用例结束事件计入 /metrics
+- 入库: 提供 RecordStore 时, 子进程结束后 (包括失败与超时任务的部分结果, 取消的任务除外)
+  把任务目录中的记录导入数据库; 成功与失败的任务在入库完成后才标记结束
+- 跟踪: 提供 ExperimentTracker 时, 任务结束后在后台记录到 MLflow, 不占用工作协程
+- 多进程: 提供 JobStore 与 Coordinator 时任务状态存于数据库, 任一工作进程都可提交、查询与取消;
+  只有 leader 进程运行工作协程 (以条件更新认领任务, 显存预留只在 leader 中记账),
+  定期接收其他进程提交的任务、处理取消请求, 并把状态与进度写回数据库; follower 按数据库
+  中的队列估计排队时间。接任的 leader 把前任遗留的运行中任务标记为失败 (同一主机上
+  终止其子进程)。实时遥测只在 leader 进程中发布
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import uuid
+import socket
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Awaitable, Deque, Dict, List, Optional, Set, Tuple
+
+from src.backend.core.config import settings
+from src.backend.core.exceptions import ConflictError, NotFoundError, ServiceUnavailableError, TooManyRequestsError
+from src.backend.services.coordination import Coordinator
+from src.backend.services.experiment_tracker import ExperimentTracker
+from src.backend.services.job_store import JobStore
+from src.backend.services.model_cache import ModelCache
+from src.backend.services.record_store import RecordStore
+from src.backend.services.telemetry import TelemetryHub
+from experiments.exporter import ExperimentMetrics
+from experiments.telemetry import parse_line
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+DEFAULT_TASKS = ["qa", "summary", "code", "creative"]
+DEFAULT_LOADS = ["short", "medium", "long"]
+FINISHED = ("succeeded", "failed", "timeout", "cancelled")
+LOG_TAIL = 50
+CASE_SECONDS_ALPHA = 0.3  # 每个用例耗时的指数滑动平均系数
+PRUNE_SECONDS = 60.0  # 多进程部署时清理数据库中已结束任务的间隔
+# 与 evaluation_jobs 表同名的任务字段 (日志与取消请求另行处理)
+ROW_COLUMNS = ("id", "spec", "status", "total", "completed", "created_at", "started_at", "finished_at",
+               "returncode", "error", "output_dir", "estimated_seconds", "vram_mb", "owner", "pid")
+
+
+class EvaluationJob:
+    """一个评估任务的状态"""
+
+    def __init__(self, job_id: str, spec: Dict[str, Any], output_dir: str, total: Optional[int]):
+        self.id = job_id
+        self.spec = spec
+        self.output_dir = output_dir
+        self.status = "queued"
+        self.total = total
+        self.estimated_seconds = 0.0
+        self.vram_mb = 0.0
+        self.completed = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.returncode: Optional[int] = None
+        self.error: Optional[str] = None
+        self.log: Deque[str] = deque(maxlen=LOG_TAIL)
+        self.process: Optional[asyncio.subprocess.Process] = None
+        # 多进程部署: 执行任务的工作进程、子进程 PID 与其他进程的取消请求
+        self.owner: Optional[str] = None
+        self.pid: Optional[int] = None
+        self.cancel_requested = False
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def touch(self) -> None:
+        """唤醒等待状态变化的订阅者"""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def to_dict(self, log: bool = False) -> Dict[str, Any]:
+        now = self.finished_at or time.time()
+        d = {
+            "id": self.id,
+            "status": self.status,
+            "completed": self.completed,
+            "total": self.total,
+            "progress": (self.completed / self.total) if self.total else None,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": (now - self.started_at) if self.started_at else 0.0,
+            "estimated_seconds": round(self.estimated_seconds, 1),
+            "vram_mb": round(self.vram_mb, 1),
+            "returncode": self.returncode,
+            "error": self.error,
+            "output_dir": self.output_dir,
+            "spec": self.spec,
+        }
+        if self.owner is not None:
+            d["owner"] = self.owner
+            d["pid"] = self.pid
+        if self.cancel_requested:
+            d["cancel_requested"] = True
+        if log:
+            d["log"] = list(self.log)
+        return d
+
+    def to_row(self) -> Dict[str, Any]:
+        """evaluation_jobs 表的一行"""
+        row = {c: getattr(self, c) for c in ROW_COLUMNS}
+        row["log"] = list(self.log)
+        return row
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "EvaluationJob":
+        job = cls(row["id"], row["spec"], row["output_dir"], row["total"])
+        for c in ROW_COLUMNS:
+            setattr(job, c, row[c])
+        job.log.extend(row.get("log") or [])
+        job.cancel_requested = bool(row.get("cancel_requested"))
+        return job
+
+
+def expected_cases(spec: Dict[str, Any]) -> Optional[int]:
+    """任务包含的用例数; 用例中模型为 "all" 时取决于服务端已安装模型, 返回 None"""
+    cases = spec.get("cases")
+    if cases:
+        total = 0
+        for c in cases:
+            m = c.get("model")
+            if isinstance(m, list):
+                total += len([x for x in m if isinstance(x, str) and x.strip()])
+            elif isinstance(m, str) and m.strip().lower() == "all":
+                return None
+            else:
+                total += 1
+        return total
+    return (len(spec["models"]) * len(spec.get("tasks") or DEFAULT_TASKS)
+            * len(spec.get("loads") or DEFAULT_LOADS) * spec.get("runs", 1))
+
+
+def model_cases(spec: Dict[str, Any], installed: Optional[List[str]] = None) -> Dict[str, int]:
+    """每个模型的用例数; 用例中模型为 "all" 时按已安装模型展开, 未知时记在 "all" 名下"""
+    counts: Dict[str, int] = {}
+    cases = spec.get("cases")
+    if not cases:
+        per_model = (len(spec.get("tasks") or DEFAULT_TASKS) * len(spec.get("loads") or DEFAULT_LOADS)
+                     * spec.get("runs", 1))
+        for m in spec["models"]:
+            counts[m] = counts.get(m, 0) + per_model
+        return counts
+    for c in cases:
+        m = c.get("model")
+        if isinstance(m, str) and m.strip().lower() == "all":
+            models = installed or ["all"]
+        elif isinstance(m, list):
+            models = [x for x in m if isinstance(x, str) and x.strip()]
+        else:
+            models = [m]
+        for name in models:
+            counts[name] = counts.get(name, 0) + spec.get("runs", 1)
+    return counts
+
+
+def read_stats(output_dir: str) -> List[Dict[str, Any]]:
+    """读取任务目录下 run_experiments 写出的 summary/stats.csv (按模型 x 任务 x 负载汇总)"""
+    path = os.path.join(output_dir, "summary", "stats.csv")
+    if not os.path.exists(path):
+        return []
+    rows = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            for k, v in row.items():
+                if k in ("model", "task", "load"):
+                    continue
+                try:
+                    row[k] = int(v) if k == "count" else float(v)
+                except (TypeError, ValueError):
+                    row[k] = None
+            rows.append(row)
+    return rows
+
+
+def stop_orphan(row: Dict[str, Any], grace: float = 5.0) -> bool:
+    """终止已退出的工作进程遗留的 run_experiments 子进程 (同一主机且命令行包含任务目录时)"""
+    owner, pid = row.get("owner") or "", row.get("pid")
+    if not pid or owner.rsplit(":", 1)[0] != socket.gethostname():
+        return False
+    try:
+        import psutil
+        proc = psutil.Process(pid)
+        if row["output_dir"] not in " ".join(proc.cmdline()):
+            return False
+        proc.terminate()
+        try:
+            proc.wait(grace)
+        except psutil.TimeoutExpired:
+            proc.kill()
+        return True
+    except Exception:
+        return False
+
+
+def build_command(spec: Dict[str, Any], output_dir: str, telemetry: bool = False) -> List[str]:
+    """由任务参数生成 run_experiments 命令行 (用例矩阵写入任务目录的 test_cases.json)"""
+    cmd = [sys.executable, "-m", "experiments.run_experiments", "--exp-dir", output_dir,
+           "--leaderboard", os.path.abspath(settings.LEADERBOARD_DB)]
+    if spec.get("cases"):
+        with open(os.path.join(output_dir, "test_cases.json"), "w", encoding="utf-8") as f:
+            json.dump(spec["cases"], f, ensure_ascii=False, indent=2)
+    else:
+        cmd += ["--models", *spec["models"]]
+        if spec.get("tasks"):
+            cmd += ["--tasks", *spec["tasks"]]
+        if spec.get("loads"):
+            cmd += ["--loads", *spec["loads"]]
+    for key, flag in (("runs", "--runs"), ("max_tokens", "--max_tokens"), ("temperature", "--temperature"),
+                      ("top_p", "--top_p"), ("num_ctx", "--num_ctx"), ("seed", "--seed"),
+                      ("keepalive", "--keepalive")):
+        if spec.get(key) is not None:
+            cmd += [flag, str(spec[key])]
+    if spec.get("warmup"):
+        cmd.append("--warmup")
+    if telemetry:
+        cmd.append("--telemetry")
+    return cmd
+
+
+class TaskScheduler:
+    """
+    评估任务调度器
+
+    Args:
+        max_workers: 同时运行的任务数, 默认 EVALUATION_MAX_WORKERS
+        timeout: 单个任务超时 (秒), 默认 EVALUATION_TIMEOUT
+        max_model_concurrency: 同时访问模型服务的任务数, 默认 MODEL_SERVICE_MAX_CONCURRENT
+        output_dir: 任务输出根目录, 默认 DATA_DIR
+        poll_interval: 进度轮询间隔 (秒)
+        telemetry: 实时遥测扇出缓冲区, None 表示不采集
+        metrics: 实验与硬件指标, None 表示不导出
+        store: 实验记录数据库, None 表示只保留文件
+        model_cache: 模型显存估计与预留, None 表示不做显存准入
+        tracker: 实验跟踪, None 表示不记录
+        job_store: 共享的任务状态 (多进程部署, 与 coordinator 一起提供), None 表示只在内存中
+        coordinator: 多进程协调 (leader 选举), None 表示单进程
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, timeout: Optional[float] = None,
+                 max_model_concurrency: Optional[int] = None, output_dir: Optional[str] = None,
+                 poll_interval: float = 1.0, telemetry: Optional[TelemetryHub] = None,
+                 metrics: Optional[ExperimentMetrics] = None, store: Optional[RecordStore] = None,
+                 model_cache: Optional[ModelCache] = None, tracker: Optional[ExperimentTracker] = None,
+                 job_store: Optional[JobStore] = None, coordinator: Optional[Coordinator] = None):
+        if (job_store is None) != (coordinator is None):
+            raise ValueError("job_store 与 coordinator 须同时提供")
+        self.max_workers = max_workers or settings.EVALUATION_MAX_WORKERS
+        self.timeout = timeout or settings.EVALUATION_TIMEOUT
+        self.max_model_concurrency = max_model_concurrency or settings.MODEL_SERVICE_MAX_CONCURRENT
+        self.output_dir = output_dir or settings.DATA_DIR
+        self.poll_interval = poll_interval
+        self.telemetry = telemetry
+        self.metrics = metrics
+        self.store = store
+        self.model_cache = model_cache
+        self.tracker = tracker
+        self.job_store = job_store
+        self.coordinator = coordinator
+        self.queue_capacity = settings.EVALUATION_QUEUE_SIZE
+        self.jobs: "OrderedDict[str, EvaluationJob]" = OrderedDict()
+        # 等待执行的任务 (提交顺序), 出队顺序由 _select() 决定
+        self._pending: List[EvaluationJob] = []
+        self._running: Dict[str, EvaluationJob] = {}
+        self._cond: Optional[asyncio.Condition] = None
+        # 模型 -> 每个用例的平均耗时 (秒)
+        self._case_seconds: Dict[str, float] = {}
+        self._workers: List[asyncio.Task] = []
+        self._background: Set[asyncio.Task] = set()
+        # 多进程部署: follower 看到的排队中与运行中任务; 待写回数据库的任务 (按 ID 去重)
+        self._snapshot: List[EvaluationJob] = []
+        self._dirty: "OrderedDict[str, EvaluationJob]" = OrderedDict()
+        self._dirty_event = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._last_prune = 0.0
+
+    @property
+    def slots(self) -> int:
+        return max(1, min(self.max_workers, self.max_model_concurrency))
+
+    @property
+    def is_leader(self) -> bool:
+        """单进程时总是 True"""
+        return self.coordinator is None or self.coordinator.is_leader
+
+    @property
+    def role(self) -> str:
+        if self.coordinator is None:
+            return "standalone"
+        return "leader" if self.coordinator.is_leader else "follower"
+
+    async def start(self) -> None:
+        self._cond = asyncio.Condition()
+        if self.coordinator is None:
+            self._start_workers()
+        else:
+            # 工作协程在本进程成为 leader 时启动 (coordinator.start() 之后)
+            self._writer = asyncio.create_task(self._write_loop())
+            self.coordinator.on_leader(self._become_leader, self._step_down)
+            self.coordinator.on_tick(self._sync)
+            self.coordinator.on_event("case_seconds", self._case_seconds.update)
+        logger.info(f"评估任务调度器已启动: {self.max_workers} 个工作协程 ({self.role}), "
+                    f"模型服务并发 {self.max_model_concurrency}, 超时 {self.timeout}s")
+
+    async def stop(self) -> None:
+        for job in list(self.jobs.values()):
+            if job.finished or (self.job_store is not None and job.status == "queued"):
+                # 多进程部署时排队中的任务留在数据库中, 由接任的 leader 执行
+                continue
+            await self._cancel_local(job)
+        await self._stop_workers()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+            await self._flush()
+
+    def _start_workers(self) -> None:
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.max_workers)]
+
+    async def _stop_workers(self) -> None:
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict[str, Any]:
+        """队列深度、运行中任务数、存活的工作协程数与排队时间估计 (健康检查使用)"""
+        pending, running = self._queue_view()
+        d = {
+            "started": self._cond is not None,
+            "role": self.role,
+            "queue_depth": len(pending),
+            "queue_capacity": self.queue_capacity,
+            "running": len(running),
+            "workers_alive": sum(1 for w in self._workers if not w.done()),
+            "workers": self.max_workers,
+            "queue_eta_seconds": round(self._backlog_seconds(pending, running) / self.slots, 1),
+        }
+        if self.model_cache is not None:
+            d["gpu"] = gpu = self.model_cache.stats()
+            if not self.is_leader:
+                # 显存预留在 leader 中记账, follower 按数据库中运行中的任务汇总
+                gpu["reserved_mb"] = round(sum(j.vram_mb for j in running), 1)
+                gpu["reservations"] = len(running)
+                gpu["saturated"] = bool(gpu["budget_mb"]) and gpu["reserved_mb"] >= gpu["budget_mb"]
+        if self.coordinator is not None:
+            d["coordination"] = self.coordinator.status()
+        return d
+
+    # ---- 耗时估计与排序 ----
+
+    def case_seconds(self, model: str) -> float:
+        return self._case_seconds.get(model, settings.EVALUATION_CASE_SECONDS)
+
+    def _estimate(self, job: EvaluationJob) -> None:
+        installed = self.model_cache.installed() if self.model_cache is not None else None
+        counts = model_cases(job.spec, installed)
+        job.estimated_seconds = sum(n * self.case_seconds(m) for m, n in counts.items())
+        if self.model_cache is not None:
+            job.vram_mb = self.model_cache.job_mb(counts)
+
+    def _remaining(self, job: EvaluationJob, now: float) -> float:
+        """运行中任务的剩余耗时估计"""
+        if job.total:
+            left = job.estimated_seconds * (1 - job.completed / job.total)
+        else:
+            left = job.estimated_seconds - (now - (job.started_at or now))
+        return max(0.0, left)
+
+    def _priority(self, job: EvaluationJob, now: float) -> float:
+        return job.estimated_seconds - settings.EVALUATION_AGING_FACTOR * (now - job.created_at)
+
+    def _queue_view(self) -> Tuple[List[EvaluationJob], List[EvaluationJob]]:
+        """(排队中, 运行中) 的任务: leader 与单进程为本地队列, follower 为数据库快照"""
+        if self.is_leader:
+            return self._pending, list(self._running.values())
+        return ([j for j in self._snapshot if j.status == "queued"],
+                [j for j in self._snapshot if j.status == "running"])
+
+    def _backlog_seconds(self, pending: List[EvaluationJob], running: List[EvaluationJob]) -> float:
+        now = time.time()
+        return sum(self._remaining(j, now) for j in running) + sum(j.estimated_seconds for j in pending)
+
+    def queue_eta(self, job: EvaluationJob) -> float:
+        """排队中的任务预计多久后开始 (按排序值在它之前的任务与运行中任务的剩余耗时估计)"""
+        if job.status != "queued":
+            return 0.0
+        pending, running = self._queue_view()
+        now = time.time()
+        p = self._priority(job, now)
+        ahead = [j for j in pending if j.id != job.id and self._priority(j, now) <= p]
+        if not ahead and len(running) < self.slots:
+            return 0.0
+        return self._backlog_seconds(ahead, running) / self.slots
+
+    def _select(self) -> Optional[EvaluationJob]:
+        """下一个可执行的任务: 按排序值依次检查显存预算"""
+        if len(self._running) >= self.slots:
+            return None
+        now = time.time()
+        for job in sorted(self._pending, key=lambda j: self._priority(j, now)):
+            if self.model_cache is None or self.model_cache.can_admit(job.vram_mb):
+                return job
+            if now - job.created_at >= settings.EVALUATION_STARVATION_SECONDS:
+                # 等待过久的任务保留显存名额: 不再让后面的任务插队
+                return None
+        return None
+
+    def _learn(self, job: EvaluationJob) -> None:
+        """按完成的用例数更新各模型每个用例耗时的滑动平均"""
+        if not job.completed or job.started_at is None:
+            return
+        per_case = ((job.finished_at or time.time()) - job.started_at) / job.completed
+        installed = self.model_cache.installed() if self.model_cache is not None else None
+        for model in model_cases(job.spec, installed):
+            old = self._case_seconds.get(model)
+            self._case_seconds[model] = per_case if old is None else old + CASE_SECONDS_ALPHA * (per_case - old)
+        if self.coordinator is not None:
+            # follower 用同样的估计计算排队时间
+            self._spawn(self.coordinator.publish("case_seconds", dict(self._case_seconds)))
+
+    def _wake(self) -> None:
+        """队列或资源变化后唤醒等待的工作协程"""
+        if self._cond is None:
+            return
+
+        async def notify():
+            async with self._cond:
+                self._cond.notify_all()
+
+        asyncio.ensure_future(notify())
+
+    # ---- 任务管理 ----
+
+    async def submit(self, spec: Dict[str, Any]) -> EvaluationJob:
+        if self._cond is None:
+            raise ServiceUnavailableError("任务调度器未启动")
+        if not self.is_leader:
+            await self._refresh_snapshot()
+        pending, running = self._queue_view()
+        if len(pending) >= self.queue_capacity:
+            now = time.time()
+            soonest = min((self._remaining(j, now) for j in running), default=0.0)
+            raise TooManyRequestsError("评估任务队列已满，请稍后重试", retry_after=soonest,
+                                       details={"queue_size": self.queue_capacity})
+        job_id = uuid.uuid4().hex[:12]
+        output_dir = os.path.abspath(os.path.join(self.output_dir, f"experiments_api_{job_id}"))
+        job = EvaluationJob(job_id, spec, output_dir, expected_cases(spec))
+        self._estimate(job)
+        eta = self.queue_eta(job)
+        limit = settings.EVALUATION_MAX_QUEUE_WAIT
+        if limit and eta > limit:
+            raise TooManyRequestsError("评估任务排队时间过长，请稍后重试", retry_after=eta - limit,
+                                       details={"queue_eta_seconds": round(eta, 1), "max_queue_wait": limit})
+        if self.job_store is not None:
+            await self.job_store.insert(job.to_row())
+        if self.is_leader:
+            self.jobs[job_id] = job
+            self._pending.append(job)
+            self._prune()
+            self._wake()
+        else:
+            # 由 leader 在下一次同步时接收
+            self._snapshot.append(job)
+        logger.info(f"评估任务 {job_id} 已提交: {job.total} 个用例, 预计耗时 {job.estimated_seconds:.0f}s, "
+                    f"预计 {eta:.0f}s 后开始")
+        return job
+
+    async def get(self, job_id: str) -> EvaluationJob:
+        """本进程的任务直接返回; 多进程部署时其余任务从数据库读取 (快照)"""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        if self.job_store is not None:
+            row = await self.job_store.get(job_id)
+            if row is not None:
+                return EvaluationJob.from_row(row)
+        raise NotFoundError(f"评估任务不存在: {job_id}")
+
+    async def list_jobs(self, status: Optional[str] = None) -> List[EvaluationJob]:
+        if self.job_store is None:
+            return [j for j in reversed(self.jobs.values()) if status is None or j.status == status]
+        return [self.jobs.get(r["id"]) or EvaluationJob.from_row(r) for r in await self.job_store.list(status)]
+
+    async def cancel(self, job_id: str) -> EvaluationJob:
+        job = await self.get(job_id)
+        if job.finished:
+            raise ConflictError(f"评估任务已结束: {job.status}")
+        if job_id in self.jobs:
+            await self._cancel_local(job)
+            return job
+        # 其他进程的任务: 排队中的直接取消, 运行中的请求 leader 终止
+        if await self.job_store.cancel_queued(job_id) or await self.job_store.request_cancel(job_id):
+            return await self.get(job_id)
+        job = await self.get(job_id)
+        raise ConflictError(f"评估任务已结束: {job.status}")
+
+    async def _cancel_local(self, job: EvaluationJob) -> None:
+        if job in self._pending:
+            self._pending.remove(job)
+            self._wake()
+        if job.status == "running" and job.process is not None:
+            await self._terminate(job.process)
+        self._finish(job, "cancelled")
+
+    async def watch(self, job_id: str, heartbeat: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        订阅任务状态: 每次状态或进度变化时产出快照, 任务结束后停止;
+        heartbeat 秒内无变化时产出 None (供 SSE 发送保活注释)。
+        不在本进程中的任务 (多进程部署) 按 poll_interval 轮询数据库
+        """
+        job = await self.get(job_id)
+        if job_id not in self.jobs:
+            async for snap in self._watch_store(job_id, heartbeat):
+                yield snap
+            return
+        last = None
+        while True:
+            changed = job._changed
+            snap = job.to_dict()
+            snap.pop("elapsed_seconds")
+            if snap != last:
+                last = snap
+                yield job.to_dict()
+            if job.finished:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+    async def _watch_store(self, job_id: str, heartbeat: float) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        last = None
+        idle = 0.0
+        while True:
+            job = await self.get(job_id)
+            snap = job.to_dict()
+            snap.pop("elapsed_seconds")
+            if snap != last:
+                last = snap
+                idle = 0.0
+                yield job.to_dict()
+            elif idle >= heartbeat:
+                idle = 0.0
+                yield None
+            if job.finished:
+                return
+            await asyncio.sleep(self.poll_interval)
+            idle += self.poll_interval
+
+    def _prune(self) -> None:
+        finished = [j.id for j in self.jobs.values() if j.finished]
+        for job_id in finished[:max(0, len(finished) - settings.EVALUATION_JOB_HISTORY)]:
+            del self.jobs[job_id]
+
+    def _finish(self, job: EvaluationJob, status: str, error: Optional[str] = None) -> None:
+        if job.finished:
+            return
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        try:
+            with open(os.path.join(job.output_dir, "job.json"), "w", encoding="utf-8") as f:
+                json.dump(job.to_dict(log=True), f, ensure_ascii=False, indent=2)
+        except OSError:
+            pass
+        self._touch(job)
+        self._publish_status(job)
+        logger.info(f"评估任务 {job.id} 结束: {status}")
+
+    def _touch(self, job: EvaluationJob) -> None:
+        """状态或进度变化: 唤醒订阅者, 多进程部署时排队写回数据库"""
+        job.touch()
+        if self.job_store is not None:
+            self._dirty[job.id] = job
+            self._dirty_event.set()
+
+    def _publish_status(self, job: EvaluationJob) -> None:
+        if self.telemetry is not None:
+            self.telemetry.publish({"type": "job", "job_id": job.id, "status": job.status,
+                                    "completed": job.completed, "total": job.total})
+
+    # ---- 多进程部署 ----
+
+    async def _write_loop(self) -> None:
+        """按变化顺序把任务的最新状态写回数据库; 写入失败时稍后重试"""
+        while True:
+            await self._dirty_event.wait()
+            if not await self._flush():
+                await asyncio.sleep(self.poll_interval)
+
+    async def _flush(self) -> bool:
+        self._dirty_event.clear()
+        while self._dirty:
+            job_id, job = self._dirty.popitem(last=False)
+            try:
+                await self.job_store.update(job_id, job.to_row())
+            except Exception as e:
+                self._dirty.setdefault(job_id, job)
+                self._dirty_event.set()
+                logger.warning(f"评估任务 {job_id} 状态写回失败, 稍后重试: {e}")
+                return False
+        return True
+
+    async def _refresh_snapshot(self) -> None:
+        self._snapshot = [EvaluationJob.from_row(r) for r in await self.job_store.active()]
+
+    async def _adopt(self) -> None:
+        """接收数据库中尚未在本地队列中的排队任务 (其他进程提交的)"""
+        rows = await self.job_store.list(status="queued")
+        adopted = [EvaluationJob.from_row(r) for r in reversed(rows) if r["id"] not in self.jobs]
+        for job in adopted:
+            self.jobs[job.id] = job
+            self._pending.append(job)
+        if adopted:
+            self._wake()
+
+    @staticmethod
+    def _mark(job: EvaluationJob, status: str) -> None:
+        """其他进程已改变的任务状态 (数据库中已是最新, 不再写回)"""
+        job.status = status
+        job.finished_at = job.finished_at or time.time()
+        job.touch()
+
+    async def _sync(self) -> None:
+        """
+        每次协调轮询时调用: leader 接收新任务、移除已被其他进程取消的排队任务、
+        终止被请求取消的运行中任务并定期清理历史; follower 刷新队列快照
+        """
+        if not self.is_leader:
+            await self._refresh_snapshot()
+            return
+        await self._adopt()
+        statuses = await self.job_store.statuses(j.id for j in self._pending)
+        for job in list(self._pending):
+            status = statuses.get(job.id)
+            if status is not None and status != "queued":
+                self._pending.remove(job)
+                self._mark(job, status)
+        for job_id in await self.job_store.cancel_requests():
+            job = self._running.get(job_id)
+            if job is not None and not job.finished:
+                job.cancel_requested = True
+                await self._cancel_local(job)
+        if time.monotonic() - self._last_prune >= PRUNE_SECONDS:
+            self._last_prune = time.monotonic()
+            self._prune()
+            await self.job_store.prune(settings.EVALUATION_JOB_HISTORY)
+
+    async def _become_leader(self) -> None:
+        """接任 leader: 结束前任遗留的运行中任务, 接收排队中的任务并启动工作协程"""
+        for row in await self.job_store.active():
+            if row["status"] != "running" or row["id"] in self._running:
+                continue
+            killed = await asyncio.to_thread(stop_orphan, row)
+            await self.job_store.update(row["id"], {
+                "status": "failed", "finished_at": time.time(),
+                "error": f"执行任务的工作进程 {row['owner']} 已退出" + ("" if killed else " (子进程状态未知)")})
+            logger.warning(f"评估任务 {row['id']} 的工作进程 {row['owner']} 已退出, 标记为失败")
+        await self._adopt()
+        self._start_workers()
+
+    async def _step_down(self) -> None:
+        """失去 leader 身份: 终止本进程运行的任务并停止工作协程, 队列以数据库为准"""
+        for job in list(self._running.values()):
+            if job.process is not None:
+                await self._terminate(job.process)
+            self._finish(job, "failed", "工作进程失去 leader 身份, 任务中断")
+        await self._stop_workers()
+        self._pending.clear()
+        self.jobs.clear()
+
+    # ---- 执行 ----
+
+    async def _next_job(self) -> EvaluationJob:
+        """等待下一个可执行的任务, 出队 (多进程部署时在数据库中认领) 并预留资源"""
+        if self.model_cache is not None:
+            await self.model_cache.refresh()
+            # 提交时模型信息可能尚未获取 (启动后台初始化未完成), 按最新信息重新估计
+            for job in self._pending:
+                self._estimate(job)
+        while True:
+            async with self._cond:
+                job = self._select()
+                while job is None:
+                    await self._cond.wait()
+                    job = self._select()
+                # 出队即占用执行名额与显存, 认领期间其他工作协程不会超额准入
+                self._pending.remove(job)
+                self._running[job.id] = job
+                if self.model_cache is not None:
+                    self.model_cache.reserve(job.id, job.vram_mb)
+            # 认领 (数据库写入) 在条件锁外进行, 不阻塞其他工作协程与提交
+            claimed = None
+            try:
+                claimed = True if self.job_store is None else await self._claim(job)
+            finally:
+                if not claimed or job.finished:
+                    self._running.pop(job.id, None)
+                    if self.model_cache is not None:
+                        self.model_cache.release(job.id)
+                    if claimed is None and not job.finished:
+                        self._pending.append(job)
+                    self._wake()
+            if claimed and not job.finished:
+                return job
+            if claimed is None:
+                # 数据库出错: 稍后重试
+                await asyncio.sleep(self.poll_interval)
+
+    async def _claim(self, job: EvaluationJob) -> Optional[bool]:
+        """在数据库中认领任务; 已被其他进程取消时返回 False, 数据库出错时返回 None (由调用方放回队列)"""
+        try:
+            claimed = await self.job_store.claim(job.id, self.coordinator.worker_id)
+        except Exception as e:
+            logger.warning(f"评估任务 {job.id} 认领失败, 稍后重试: {e}")
+            return None
+        if claimed:
+            job.owner = self.coordinator.worker_id
+        elif not job.finished:
+            self._mark(job, "cancelled")
+        return claimed
+
+    async def _worker(self, idx: int) -> None:
+        while True:
+            job = await self._next_job()
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"评估任务 {job.id} 执行出错: {e}", exc_info=True)
+                self._finish(job, "failed", str(e))
+            finally:
+                self._running.pop(job.id, None)
+                if self.model_cache is not None:
+                    self.model_cache.release(job.id)
+                self._wake()
+
+    async def _run(self, job: EvaluationJob) -> None:
+        os.makedirs(job.output_dir, exist_ok=True)
+        cmd = build_command(job.spec, job.output_dir, telemetry=self.telemetry is not None or self.metrics is not None)
+        env = dict(os.environ, PYTHONIOENCODING="utf-8")
+        if settings.OLLAMA_HOST:
+            env["OLLAMA_HOST"] = settings.OLLAMA_HOST
+        job.status = "running"
+        job.started_at = time.time()
+        self._publish_status(job)
+        job.process = await asyncio.create_subprocess_exec(
+            *cmd, cwd=PROJECT_ROOT, env=env,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+        job.pid = job.process.pid
+        self._touch(job)
+        reader = asyncio.create_task(self._read_output(job))
+        poller = asyncio.create_task(self._poll_progress(job))
+        try:
+            job.returncode = await asyncio.wait_for(job.process.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            await self._terminate(job.process)
+            self._finish(job, "timeout", f"超过 {self.timeout} 秒未完成")
+        except asyncio.CancelledError:
+            await self._terminate(job.process)
+            self._finish(job, "cancelled")
+            raise
+        finally:
+            poller.cancel()
+            await asyncio.gather(reader, poller, return_exceptions=True)
+            self._update_progress(job)
+        if job.status != "cancelled":
+            # 取消的任务不入库
+            await self._store_records(job)
+        if job.returncode == 0:
+            self._finish(job, "succeeded")
+            self._learn(job)
+        else:
+            self._finish(job, "failed", (job.log[-1] if job.log else None) or f"退出码 {job.returncode}")
+        self._track(job)
+
+    def _track(self, job: EvaluationJob) -> None:
+        if self.tracker is None or not self.tracker.enabled:
+            return
+        self._spawn(self.tracker.log_job(job))
+
+    def _spawn(self, coro: Awaitable[Any]) -> None:
+        """在后台执行, 不占用工作协程 (stop() 时等待完成)"""
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _store_records(self, job: EvaluationJob) -> None:
+        if self.store is None:
+            return
+        try:
+            info = await self.store.import_experiment(job.output_dir)
+            logger.info(f"评估任务 {job.id} 记录已入库: {info['parsed']} 条, 采样 {info['samples']} 行")
+        except Exception as e:
+            logger.error(f"评估任务 {job.id} 记录入库失败: {e}")
+
+    async def _read_output(self, job: EvaluationJob) -> None:
+        async for line in job.process.stdout:
+            text = line.decode("utf-8", errors="replace").rstrip()
+            if not text:
+                continue
+            event = parse_line(text)
+            if event is None:
+                job.log.append(text)
+                continue
+            event["job_id"] = job.id
+            if self.metrics is not None:
+                self.metrics.observe_event(event)
+            if self.telemetry is not None:
+                self.telemetry.publish(event)
+
+    async def _poll_progress(self, job: EvaluationJob) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            self._update_progress(job)
+
+    def _update_progress(self, job: EvaluationJob) -> None:
+        """results.csv 每完成一个用例追加一行 (首行为表头)"""
+        path = os.path.join(job.output_dir, "summary", "results.csv")
+        try:
+            with open(path, "rb") as f:
+                done = max(0, sum(1 for line in f if line.strip()) - 1)
+        except OSError:
+            return
+        if done != job.completed:
+            job.completed = done
+            self._touch(job)
+
+    @staticmethod
+    async def _terminate(proc: asyncio.subprocess.Process, grace: float = 5.0) -> None:
+        if proc.returncode is not None:
+            return
+        proc.terminate()
+        try:
+            await asyncio.wait_for(proc.wait(), grace)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
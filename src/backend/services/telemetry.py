@@ -0,0 +1,183 @@
+"""
+实时遥测扇出
+
+评估任务子进程输出的遥测事件 (资源采样、生成片段时间、用例开始/结束) 由任务调度器
+publish 到一个进程内环形缓冲区 (TELEMETRY_BUFFER_SIZE), 每个事件带递增序号。
+多个订阅者各自持有读取位置, 从同一缓冲区读取:
+
+- 发布不等待订阅者: 缓冲区满时覆盖最旧事件, 慢客户端不会拖慢采样与任务输出解析
+- 订阅者落后超过缓冲区容量时跳到最旧事件, 并收到一条 overrun 事件说明丢弃数量
+- 降采样按订阅者分别进行: 资源采样每 every 条取一条; 片段事件在 window 秒内
+  合并为一条 tokens 事件 (片段数、速率、平均/最大间隔)
+
+发布与订阅都在事件循环线程中进行; 其他线程请使用 publish_threadsafe。
+"""
+
+import time
+import asyncio
+from collections import deque
+from itertools import islice
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, Optional, Tuple
+
+from src.backend.core.config import settings
+
+
+class TelemetryHub:
+    """
+    Args:
+        capacity: 环形缓冲区容量 (事件数), 默认 TELEMETRY_BUFFER_SIZE
+    """
+
+    def __init__(self, capacity: Optional[int] = None):
+        self.capacity = capacity or settings.TELEMETRY_BUFFER_SIZE
+        self._buffer: Deque[Tuple[int, Dict[str, Any]]] = deque(maxlen=self.capacity)
+        self._next_seq = 0
+        self._changed = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.subscribers = 0
+        self.published = 0
+
+    @property
+    def first_seq(self) -> int:
+        return self._buffer[0][0] if self._buffer else self._next_seq
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """追加一个事件并唤醒订阅者, 返回事件序号"""
+        self._loop = self._loop or asyncio.get_running_loop()
+        seq = self._next_seq
+        self._next_seq += 1
+        event.setdefault("t", time.time())
+        self._buffer.append((seq, event))
+        self.published += 1
+        self._changed.set()
+        self._changed = asyncio.Event()
+        return seq
+
+    def publish_threadsafe(self, event: Dict[str, Any]) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self.publish, event)
+
+    def _read(self, cursor: int) -> Tuple[int, int, list]:
+        """返回 (新读取位置, 丢弃数, 事件列表)"""
+        first = self.first_seq
+        dropped = max(0, first - cursor)
+        start = max(cursor, first)
+        # 序号连续, 从尾部取出新事件, 开销与新事件数成正比而非缓冲区容量
+        new = list(islice(reversed(self._buffer), self._next_seq - start))
+        events = [e for _, e in reversed(new)]
+        return self._next_seq, dropped, events
+
+    def subscribe(
+        self,
+        job_id: Optional[str] = None,
+        types: Optional[Iterable[str]] = None,
+        every: Optional[int] = None,
+        window: Optional[float] = None,
+        replay: int = 0,
+        heartbeat: float = 15.0,
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        订阅遥测事件
+
+        Args:
+            job_id: 只接收该任务的事件
+            types: 只接收这些类型 (sample / tokens / case_start / case_end / job / overrun)
+            every: 资源采样降采样倍数, 默认 TELEMETRY_SAMPLE_EVERY
+            window: 片段事件合并窗口 (秒), 默认 TELEMETRY_TOKEN_WINDOW; 0 表示逐片段输出 token 事件
+            replay: 从缓冲区中最近的多少个事件开始
+            heartbeat: 无事件时每隔多少秒产出 None (供 SSE 保活)
+
+        读取位置在调用时确定, 之后发布的事件都不会遗漏
+        """
+        every = max(1, every or settings.TELEMETRY_SAMPLE_EVERY)
+        window = settings.TELEMETRY_TOKEN_WINDOW if window is None else max(0.0, window)
+        cursor = max(self.first_seq, self._next_seq - max(0, replay))
+        return self._stream(cursor, job_id, set(types) if types else None, every, window, heartbeat)
+
+    async def _stream(self, cursor: int, job_id: Optional[str], types: Optional[set], every: int,
+                      window: float, heartbeat: float) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        sample_count: Dict[Any, int] = {}
+        pending: Dict[Any, Dict[str, Any]] = {}
+
+        def wanted(kind: str) -> bool:
+            return types is None or kind in types
+
+        def flush(job: Any) -> Optional[Dict[str, Any]]:
+            agg = pending.pop(job, None)
+            if not agg:
+                return None
+            span = agg["last_t"] - agg["first_t"]
+            return {
+                "type": "tokens", "job_id": job, "t": agg["last_t"], "count": agg["count"],
+                "chars": agg["chars"], "index": agg["index"],
+                "rate": (agg["count"] - 1) / span if span > 0 and agg["count"] > 1 else None,
+                "gap_mean": agg["gap_sum"] / agg["gaps"] if agg["gaps"] else None,
+                "gap_max": agg["gap_max"],
+            }
+
+        self.subscribers += 1
+        try:
+            while True:
+                changed = self._changed
+                cursor, dropped, events = self._read(cursor)
+                out = []
+                if dropped and wanted("overrun"):
+                    out.append({"type": "overrun", "dropped": dropped, "t": time.time()})
+                for e in events:
+                    if job_id is not None and e.get("job_id") != job_id:
+                        continue
+                    kind = e.get("type")
+                    job = e.get("job_id")
+                    if kind == "sample":
+                        n = sample_count.get(job, 0)
+                        sample_count[job] = n + 1
+                        if n % every == 0 and wanted("sample"):
+                            out.append(e)
+                    elif kind == "token":
+                        if not (wanted("tokens") or wanted("token")):
+                            continue
+                        if window == 0:
+                            out.append(e)
+                            continue
+                        agg = pending.setdefault(job, {"count": 0, "chars": 0, "gaps": 0, "gap_sum": 0.0,
+                                                       "gap_max": None, "first_t": e["t"]})
+                        agg["count"] += 1
+                        agg["chars"] += e.get("chars", 0)
+                        agg["last_t"] = e["t"]
+                        agg["index"] = e.get("index")
+                        if e.get("gap") is not None:
+                            agg["gaps"] += 1
+                            agg["gap_sum"] += e["gap"]
+                            agg["gap_max"] = max(agg["gap_max"] or 0.0, e["gap"])
+                    else:
+                        if kind in ("case_end", "job"):
+                            ev = flush(job)
+                            if ev:
+                                out.append(ev)
+                        if wanted(kind):
+                            out.append(e)
+                now = time.time()
+                for job in [j for j, agg in pending.items() if now - agg["first_t"] >= window]:
+                    out.append(flush(job))
+                for e in out:
+                    yield e
+                timeout = heartbeat
+                if pending:
+                    timeout = min(timeout, max(0.01, window - (now - min(a["first_t"] for a in pending.values()))))
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    if not pending:
+                        yield None
+        finally:
+            self.subscribers -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "buffered": len(self._buffer),
+            "first_seq": self.first_seq,
+            "next_seq": self._next_seq,
+            "published": self.published,
+            "subscribers": self.subscribers,
+        }
@@ -0,0 +1,191 @@
+"""
+复合指标计算引擎
+
+以声明式规格描述各指标 (列名、方向、权重、归一化方式、所属复合得分),
+按分组键一次性完成全部归一化与加权求和。每种归一化方式只做一次 groupby,
+用内置聚合 (min/max/mean/std/rank) 向量化完成, 避免逐组调用 Python 函数。
+
+规格示例::
+
+    {
+        "by": "task",
+        "metrics": [
+            {"name": "norm_tps", "column": "tps", "direction": "max", "weight": 0.4, "score": "efficiency_score"},
+            {"name": "norm_lat", "column": "latency", "direction": "min", "weight": 0.3, "score": "efficiency_score"},
+        ]
+    }
+
+direction 为 "max" 表示越大越好, "min" 表示越小越好; 归一化后统一为越大越好。
+"""
+
+import numpy as np
+import pandas as pd
+
+METHODS = ("minmax", "zscore", "rank", "none")
+DIRECTIONS = ("max", "min")
+
+def _metric(m, default_method):
+    column = m.get("column") or m.get("name")
+    if not column:
+        raise ValueError(f"指标规格缺少 column: {m}")
+    out = {
+        "name": m.get("name") or f"norm_{column}",
+        "column": column,
+        "direction": m.get("direction", "max"),
+        "weight": float(m.get("weight", 1.0)),
+        "method": m.get("method", default_method),
+        "score": m.get("score"),
+        "threshold": m.get("threshold")
+    }
+    if out["direction"] not in DIRECTIONS:
+        raise ValueError(f"direction 必须为 {DIRECTIONS} 之一: {m}")
+    if out["method"] not in METHODS:
+        raise ValueError(f"method 必须为 {METHODS} 之一: {m}")
+    return out
+
+def _group_keys(df, by):
+    # 分组键先编码为整数, 多列指标共用; 键缺失的行编码为 NaN, groupby 时被排除 (结果为 NaN)
+    if by is None:
+        # 不分组时视为单一分组, 与分组路径共用同一套向量化计算
+        return np.zeros(len(df), dtype=np.int8)
+    if isinstance(by, (list, tuple)):
+        codes = df.groupby(list(by), sort=False).ngroup().to_numpy()
+    else:
+        codes = pd.factorize(df[by])[0]
+    if (codes < 0).any():
+        return np.where(codes < 0, np.nan, codes)
+    return codes
+
+def _normalize_block(df, metrics, method, keys):
+    cols = [m["column"] for m in metrics]
+    x = df[cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    lower = np.array([m["direction"] == "min" for m in metrics])
+    # 原始值缺失的行归一化后仍为 NaN (组内常数的特殊取值只给有值的行)
+    missing = np.isnan(x)
+    if method == "none":
+        # 加 0.0 把 -0.0 变为 0.0
+        return np.where(lower, -x, x) + 0.0
+    g = pd.DataFrame(x, index=df.index, columns=cols).groupby(keys, sort=False)
+    if method == "minmax":
+        lo = g.transform("min").to_numpy()
+        hi = g.transform("max").to_numpy()
+        rng = hi - lo
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out = np.where(lower, hi - x, x - lo) / rng
+        # 组内取值全相同时, 越大越好记 1.0, 越小越好记 0.0 (与原分析脚本保持一致)
+        return np.where(missing, np.nan, np.where(rng == 0, np.where(lower, 0.0, 1.0), out))
+    if method == "zscore":
+        mu = g.transform("mean").to_numpy()
+        sd = g.transform("std", ddof=0).to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out = (x - mu) / sd
+        out = np.where(missing, np.nan, np.where(sd == 0, 0.0, out))
+        return np.where(lower, -out, out) + 0.0
+    # rank: 组内百分位秩, 并列取平均秩
+    xs = np.where(lower, -x, x)
+    g = pd.DataFrame(xs, index=df.index, columns=cols).groupby(keys, sort=False)
+    return g.rank(pct=True, method="average").to_numpy()
+
+def normalize(df, metrics, by=None, method="minmax"):
+    """
+    按分组归一化多列指标
+
+    Args:
+        df (DataFrame): 原始数据
+        metrics (list[dict]): 指标规格, 见模块说明
+        by (str|list, optional): 分组键, None 表示全体一起归一化
+        method (str): 指标未指定 method 时的默认归一化方式
+
+    Returns:
+        DataFrame: 列名为各指标 name 的归一化结果, 索引与 df 一致
+    """
+    specs = [_metric(m, method) for m in metrics]
+    keys = _group_keys(df, by)
+    out = pd.DataFrame(index=df.index)
+    for meth in METHODS:
+        block = [m for m in specs if m["method"] == meth]
+        if not block:
+            continue
+        values = _normalize_block(df, block, meth, keys)
+        for j, m in enumerate(block):
+            out[m["name"]] = values[:, j]
+    return out[[m["name"] for m in specs]]
+
+def composite_scores(df, spec, inplace=False):
+    """
+    按规格计算归一化列与各复合得分
+
+    每个复合得分为所属指标归一化值的加权和 (权重不再重新归一, 缺失值向上传播);
+    指标带 threshold 时额外输出 <column>_ok 列, 表示原始值是否达到阈值 (按 direction 比较)。
+
+    Args:
+        df (DataFrame): 原始数据
+        spec (dict): {"by": 分组键, "method": 默认归一化方式, "metrics": [指标规格...]}
+        inplace (bool): 是否直接写回 df
+
+    Returns:
+        DataFrame: 增加了归一化列与复合得分列的数据
+    """
+    metrics = [_metric(m, spec.get("method", "minmax")) for m in spec["metrics"]]
+    norm = normalize(df, metrics, by=spec.get("by"))
+    if not inplace:
+        df = df.copy()
+    for col in norm.columns:
+        df[col] = norm[col].to_numpy()
+    scores = {}
+    for m in metrics:
+        if m["score"]:
+            scores.setdefault(m["score"], []).append(m)
+    for score, ms in scores.items():
+        w = np.array([m["weight"] for m in ms])
+        df[score] = norm[[m["name"] for m in ms]].to_numpy() @ w
+    for m in metrics:
+        if m["threshold"] is not None:
+            raw = pd.to_numeric(df[m["column"]], errors="coerce")
+            df[f"{m['column']}_ok"] = (raw <= m["threshold"]) if m["direction"] == "min" else (raw >= m["threshold"])
+    return df
+
+# analyze_experiments_1 的效能得分: 40% 吞吐 + 30% 延迟 + 30% 能耗, 质量单独归一化
+EXPERIMENTS_1_SPEC = {
+    "by": "task",
+    "method": "minmax",
+    "metrics": [
+        {"name": "norm_tps", "column": "tps", "direction": "max", "weight": 0.4, "score": "efficiency_score"},
+        {"name": "norm_lat", "column": "latency", "direction": "min", "weight": 0.3, "score": "efficiency_score"},
+        {"name": "norm_energy", "column": "energy", "direction": "min", "weight": 0.3, "score": "efficiency_score"},
+        {"name": "norm_quality", "column": "quality_raw", "direction": "max"}
+    ]
+}
+
+def qe_ratio(df, spec=EXPERIMENTS_1_SPEC, inplace=False):
+    """
+    质效比 (Q/E Ratio): 按 spec 计算效能得分与归一化质量后取 (质量 + 0.01) / (1.01 - 效能得分)
+
+    df 需包含 spec 中的各列 (默认 tps / latency / energy / quality_raw 与分组键 task)。
+    """
+    df = composite_scores(df, spec, inplace=inplace)
+    # 避免分母为0，加 epsilon
+    df['qe_ratio'] = (df['norm_quality'] + 0.01) / (1.01 - df['efficiency_score'])
+    return df
+
+def performance_metrics_spec(performance_metrics, by=None, method="none", score="overall_score"):
+    """
+    由后端配置 settings.PERFORMANCE_METRICS ({指标: {"weight", "threshold"}}) 生成规格
+
+    这些指标本身已在 [0, 1] 区间, 默认不再归一化 (method="none"), 直接按权重求和并检查阈值。
+    """
+    return {
+        "by": by,
+        "method": method,
+        "metrics": [
+            {
+                "name": f"norm_{name}" if method != "none" else f"{name}_score",
+                "column": name,
+                "direction": cfg.get("direction", "max"),
+                "weight": cfg.get("weight", 0.0),
+                "threshold": cfg.get("threshold"),
+                "score": score
+            }
+            for name, cfg in performance_metrics.items()
+        ]
+    }
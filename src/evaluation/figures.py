@@ -0,0 +1,268 @@
+"""
+分析图表的并行渲染
+
+每张图表描述为一个 FigureJob (模块级绘图函数 + 输入数据 + 参数), 由 render_figures
+在进程池中以 Agg 后端渲染。输入数据、参数与字体的哈希记录在图表目录的
+.figure_hashes.json 中, 未变化且文件仍存在的图表直接跳过。
+
+中文字体的查找结果缓存在磁盘上 (默认 ~/.cache/genai_power_analize/cjk_font.json,
+可用 GENAI_FONT_CACHE 指定), 避免每次导入分析脚本都扫描全部系统字体。
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+FONT_CANDIDATES = ["Microsoft YaHei", "SimHei", "Noto Sans CJK SC", "Source Han Sans CN", "Arial Unicode MS"]
+FONT_EXTRA = ["SimSun", "NSimSun", "Microsoft YaHei UI"]
+# 未找到中文字体的结果只缓存一段时间, 之后重新扫描 (期间可能安装了字体)
+NEGATIVE_CACHE_SECONDS = 7 * 24 * 3600
+MANIFEST = ".figure_hashes.json"
+
+FONT_NAME = None
+FONT_PROP = None
+
+def _font_cache_path():
+    return os.environ.get("GENAI_FONT_CACHE") or os.path.join(
+        os.path.expanduser("~"), ".cache", "genai_power_analize", "cjk_font.json")
+
+def _scan_fonts(desired):
+    from matplotlib import font_manager as fm
+    font_paths = []
+    try:
+        font_paths = fm.findSystemFonts()
+    except Exception:
+        font_paths = []
+    win_font_dir = r"C:\\Windows\\Fonts"
+    if os.path.isdir(win_font_dir):
+        try:
+            font_paths += [
+                os.path.join(win_font_dir, f)
+                for f in os.listdir(win_font_dir)
+                if f.lower().endswith((".ttf", ".ttc", ".otf"))
+            ]
+        except Exception:
+            pass
+    for p in font_paths:
+        try:
+            nm = fm.FontProperties(fname=p).get_name()
+        except Exception:
+            continue
+        if nm in desired:
+            return nm, p
+    return None, None
+
+def _resolve_font(candidates):
+    from matplotlib import font_manager as fm
+    cache_file = _font_cache_path()
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("candidates") == candidates:
+            if cached.get("path") and os.path.exists(cached["path"]):
+                return cached["name"], cached["path"]
+            if not cached.get("path") and time.time() - cached.get("ts", 0) < NEGATIVE_CACHE_SECONDS:
+                return None, None
+    except Exception:
+        pass
+
+    name, path = None, None
+    by_name = {f.name: f.fname for f in fm.fontManager.ttflist}
+    for cand in candidates:
+        if cand in by_name:
+            name, path = cand, by_name[cand]
+            break
+    if not name:
+        name, path = _scan_fonts(set(candidates + FONT_EXTRA))
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(cache_file, "w", encoding="utf-8") as f:
+            json.dump({"candidates": candidates, "name": name, "path": path, "ts": time.time()}, f, ensure_ascii=False)
+    except Exception:
+        pass
+    return name, path
+
+def configure_fonts(candidates=None, verbose=True):
+    """
+    配置 matplotlib 中文字体
+
+    Returns:
+        tuple: (字体名或 None, FontProperties 或 None)
+    """
+    global FONT_NAME, FONT_PROP
+    import matplotlib as mpl
+    from matplotlib import font_manager as fm
+    candidates = list(candidates or FONT_CANDIDATES)
+    name, path = _resolve_font(candidates)
+    if not name:
+        if verbose:
+            print("未找到中文字体，使用默认字体")
+        FONT_NAME, FONT_PROP = None, None
+        return None, None
+    try:
+        fm.fontManager.addfont(path)
+    except Exception:
+        pass
+    mpl.rcParams['font.family'] = name
+    mpl.rcParams['font.sans-serif'] = [name]
+    mpl.rcParams['axes.unicode_minus'] = False
+    try:
+        FONT_PROP = fm.FontProperties(fname=path)
+    except Exception:
+        FONT_PROP = None
+    FONT_NAME = name
+    if verbose:
+        print(f"使用字体: {name}")
+    return FONT_NAME, FONT_PROP
+
+class FigureJob:
+    """
+    一张待渲染的图表
+
+    Args:
+        filename (str): 输出文件名 (相对图表目录)
+        func (callable): 模块级绘图函数 func(data, out_path, **kwargs), 需可被 pickle
+        data: 绘图所需数据 (DataFrame / ndarray / dict / list), 参与哈希
+        kwargs: 传给 func 的其余参数, 参与哈希
+    """
+
+    def __init__(self, filename, func, data=None, **kwargs):
+        self.filename = filename
+        self.func = func
+        self.data = data
+        self.kwargs = kwargs
+
+    def digest(self):
+        h = hashlib.sha1()
+        h.update(f"{self.func.__module__}.{self.func.__qualname__}|{FONT_NAME}".encode("utf-8"))
+        _hash_update(h, self.data)
+        _hash_update(h, self.kwargs)
+        return h.hexdigest()
+
+def data_digest(*objs):
+    """DataFrame / ndarray / 字典 / 列表等输入的内容哈希 (sha1 十六进制)"""
+    h = hashlib.sha1()
+    for obj in objs:
+        _hash_update(h, obj)
+    return h.hexdigest()
+
+def _hash_update(h, obj):
+    if obj is None:
+        h.update(b"N")
+    elif isinstance(obj, pd.DataFrame):
+        h.update(b"D")
+        h.update(repr((list(map(str, obj.columns)), list(map(str, obj.dtypes)))).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, pd.Series):
+        h.update(b"S" + str(obj.name).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(b"A" + repr((obj.shape, str(obj.dtype))).encode("utf-8"))
+        if obj.dtype == object:
+            h.update(repr(obj.tolist()).encode("utf-8"))
+        else:
+            h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b"{")
+        for k in sorted(obj, key=str):
+            h.update(str(k).encode("utf-8") + b":")
+            _hash_update(h, obj[k])
+        h.update(b"}")
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[")
+        for v in obj:
+            _hash_update(h, v)
+        h.update(b"]")
+    else:
+        h.update(repr(obj).encode("utf-8"))
+
+def _init_worker(font_name):
+    import matplotlib
+    matplotlib.use("Agg")
+    if font_name:
+        configure_fonts(verbose=False)
+
+def _render(func, data, out_path, kwargs):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    try:
+        func(data, out_path, **kwargs)
+    finally:
+        plt.close("all")
+    return out_path
+
+def _read_manifest(figures_dir):
+    try:
+        with open(os.path.join(figures_dir, MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _write_manifest(figures_dir, manifest):
+    path = os.path.join(figures_dir, MANIFEST)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def render_figures(jobs, figures_dir, max_workers=None, force=False):
+    """
+    渲染一组图表, 输入未变化的图表跳过
+
+    Args:
+        jobs (list[FigureJob]): 图表任务
+        figures_dir (str): 输出目录
+        max_workers (int, optional): 进程数, 默认取 CPU 数; 0 表示在当前进程中顺序渲染
+        force (bool): 忽略哈希, 全部重新渲染
+
+    Returns:
+        dict: 文件名 -> "rendered" / "skipped" / "failed: <错误>"
+    """
+    os.makedirs(figures_dir, exist_ok=True)
+    manifest = _read_manifest(figures_dir)
+    status = {}
+    todo = []
+    for job in jobs:
+        digest = job.digest()
+        out_path = os.path.join(figures_dir, job.filename)
+        if not force and manifest.get(job.filename) == digest and os.path.exists(out_path):
+            status[job.filename] = "skipped"
+            continue
+        todo.append((job, digest, out_path))
+
+    if max_workers is None:
+        max_workers = min(len(todo), os.cpu_count() or 1)
+    if todo and (max_workers <= 1 or len(todo) == 1):
+        for job, digest, out_path in todo:
+            try:
+                _render(job.func, job.data, out_path, job.kwargs)
+                manifest[job.filename] = digest
+                status[job.filename] = "rendered"
+            except Exception as e:
+                manifest.pop(job.filename, None)
+                status[job.filename] = f"failed: {e}"
+    elif todo:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(FONT_NAME,)) as ex:
+            futs = [(job, digest, ex.submit(_render, job.func, job.data, out_path, job.kwargs))
+                    for job, digest, out_path in todo]
+            for job, digest, fut in futs:
+                try:
+                    fut.result()
+                    manifest[job.filename] = digest
+                    status[job.filename] = "rendered"
+                except Exception as e:
+                    manifest.pop(job.filename, None)
+                    status[job.filename] = f"failed: {e}"
+    if todo:
+        _write_manifest(figures_dir, manifest)
+    for name, st in status.items():
+        if st.startswith("failed"):
+            print(f"图表 {name} 渲染失败: {st[8:]}", file=sys.stderr)
+    return status
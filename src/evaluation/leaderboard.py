@@ -0,0 +1,319 @@
+"""
+能效排行榜 (物化视图)
+
+以 (模型, 量化, 任务, 负载) 为键, 汇总吞吐、首 token 时间、每 token 能耗、质量与质效比,
+保存在单个 SQLite 文件中 (默认 data/leaderboard.sqlite):
+
+- records: 每个原始记录一行的紧凑数值 (路径 + mtime/大小 用于增量判断)
+- cells: 各键的均值 / 标准差 / 运行次数, 只重算本次有记录变化的键
+- leaderboard: cells 加上质效比 (composite.qe_ratio, 与 calculate_composite_metrics 相同),
+  质效比按任务归一化, 只重算有变化的任务
+
+查询只读取 leaderboard 表, 不接触原始 JSON。
+"""
+
+import os
+import time
+import sqlite3
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.evaluation.composite import qe_ratio
+from src.evaluation.records import list_raw_files, parse_record
+
+DB_NAME = "leaderboard.sqlite"
+KEYS = ("model", "quantization", "task", "load")
+# 每个记录参与聚合的指标 (列名 -> 说明)
+METRICS = {
+    "tps": "吞吐 (tokens/s)",
+    "ttft": "首 token 时间 (s)",
+    "j_per_token": "每 token GPU 能耗 (J)",
+    "energy": "单次 GPU 能耗 (J)",
+    "latency": "延迟 (s)",
+    "quality": "统一质量分",
+}
+# 排序方向: True 表示越高越好
+HIGHER_IS_BETTER = {
+    "tps": True, "ttft": False, "j_per_token": False, "energy": False,
+    "latency": False, "quality": True, "qe_ratio": True, "efficiency_score": True,
+}
+LEADERBOARD_COLUMNS = list(KEYS) + ["runs"] + [c for m in METRICS for c in (m, f"{m}_std")] + \
+    ["efficiency_score", "norm_quality", "qe_ratio", "updated_at"]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS records (
+    path TEXT PRIMARY KEY,
+    experiment TEXT NOT NULL,
+    model TEXT NOT NULL, quantization TEXT NOT NULL, task TEXT NOT NULL, load TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL,
+    {", ".join(f"{m} REAL" for m in METRICS)}
+);
+CREATE INDEX IF NOT EXISTS records_key ON records (model, quantization, task, load);
+CREATE INDEX IF NOT EXISTS records_experiment ON records (experiment);
+CREATE TABLE IF NOT EXISTS cells (
+    model TEXT NOT NULL, quantization TEXT NOT NULL, task TEXT NOT NULL, load TEXT NOT NULL,
+    runs INTEGER NOT NULL,
+    {", ".join(f"{m} REAL, {m}_std REAL" for m in METRICS)},
+    PRIMARY KEY (model, quantization, task, load)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS leaderboard (
+    model TEXT NOT NULL, quantization TEXT NOT NULL, task TEXT NOT NULL, load TEXT NOT NULL,
+    runs INTEGER NOT NULL,
+    {", ".join(f"{m} REAL, {m}_std REAL" for m in METRICS)},
+    efficiency_score REAL, norm_quality REAL, qe_ratio REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (model, quantization, task, load)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS leaderboard_task_load ON leaderboard (task, load);
+"""
+
+def default_db_path(data_dir="data"):
+    return os.path.join(data_dir, DB_NAME)
+
+def _record_row(rec, experiment):
+    """parse_record 的结果 -> records 表的一行; J/token 缺失时由单次能耗 / token 数推算
+    (旧记录没有 token_count, 以吞吐 x 延迟估计)"""
+    def num(v):
+        return None if v is None or pd.isna(v) else float(v)
+    jpt = num(rec.get("energy_j_per_token"))
+    energy = num(rec.get("gpu_energy_j"))
+    tokens = rec.get("token_count")
+    if (tokens is None or pd.isna(tokens)) and num(rec.get("toks_per_s")) and num(rec.get("latency_s")):
+        tokens = rec["toks_per_s"] * rec["latency_s"]
+    if jpt is None and energy is not None and tokens:
+        jpt = energy / tokens
+    return {
+        "path": rec["path"],
+        "experiment": experiment,
+        "model": rec.get("model") or "unknown",
+        "quantization": rec.get("quantization") or "unknown",
+        "task": rec.get("task") or "unknown",
+        "load": rec.get("load") or "unknown",
+        "mtime_ns": rec["mtime_ns"],
+        "size": rec["size"],
+        "tps": num(rec.get("toks_per_s")),
+        "ttft": num(rec.get("first_token_s")),
+        "j_per_token": jpt,
+        "energy": energy,
+        "latency": num(rec.get("latency_s")),
+        "quality": num(rec.get("quality_unified")),
+    }
+
+class Leaderboard:
+    """
+    排行榜存储
+
+    Args:
+        db_path (str): SQLite 文件路径, 不存在时自动创建
+        readonly (bool): 只读打开 (后端查询使用), 文件不存在时查询返回空结果
+    """
+
+    def __init__(self, db_path=None, readonly=False):
+        self.db_path = db_path or default_db_path()
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            if self.readonly:
+                if not os.path.exists(self.db_path):
+                    return None
+                # 路径中的 ? # % 等字符在 URI 中须转义
+                path = urllib.parse.quote(os.path.abspath(self.db_path).replace("\\", "/"), safe="/:")
+                uri = f"file:{path}?mode=ro"
+                self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            else:
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+                self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ---- 写入 ----
+
+    def update(self, exp_dirs, max_workers=8):
+        """
+        扫描实验目录, 只解析新增或变化 (mtime / 大小) 的原始记录;
+        已从这些目录中删除的记录同步移除。
+
+        Returns:
+            dict: {"parsed": 解析的记录数, "removed": 移除的记录数, "cells": 重算的键数}
+        """
+        files = {}
+        for d in exp_dirs:
+            exp = os.path.basename(os.path.normpath(d))
+            for p in list_raw_files(d):
+                files[os.path.abspath(p)] = exp
+        with self._lock:
+            conn = self._connect()
+            known = {}
+            for exp in set(files.values()) | {os.path.basename(os.path.normpath(d)) for d in exp_dirs}:
+                for path, m, n in conn.execute("SELECT path, mtime_ns, size FROM records WHERE experiment = ?", (exp,)):
+                    known[path] = (m, n)
+        todo = []
+        for p in files:
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            if known.get(p) != (st.st_mtime_ns, st.st_size):
+                todo.append(p)
+        removed = [p for p in known if p not in files]
+        return self._apply(todo, files, removed, max_workers)
+
+    def ingest_files(self, paths, experiment=None):
+        """运行过程中逐个写入刚完成的记录文件 (experiment 默认取文件所在实验目录名)"""
+        files = {}
+        for p in paths:
+            p = os.path.abspath(p)
+            files[p] = experiment or os.path.basename(os.path.dirname(os.path.dirname(os.path.dirname(p))))
+        return self._apply(list(files), files, [], max_workers=0)
+
+    def _apply(self, todo, files, removed, max_workers):
+        def _one(p):
+            try:
+                return _record_row(parse_record(p), files[p])
+            except Exception as e:
+                print(f"排行榜: 读取记录失败 {p}: {e}")
+                return None
+        if max_workers and len(todo) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as ex:
+                rows = [r for r in ex.map(_one, todo) if r is not None]
+        else:
+            rows = [r for r in map(_one, todo) if r is not None]
+
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                dirty = set()
+                # 记录的键可能变化 (如 metadata 被修正), 旧键与新键都要重算
+                stale = [p for p in removed] + [r["path"] for r in rows]
+                for i in range(0, len(stale), 500):
+                    chunk = stale[i:i + 500]
+                    q = f"SELECT model, quantization, task, load FROM records WHERE path IN ({','.join('?' * len(chunk))})"
+                    dirty.update(conn.execute(q, chunk).fetchall())
+                conn.executemany("DELETE FROM records WHERE path = ?", [(p,) for p in removed])
+                if rows:
+                    cols = list(rows[0])
+                    conn.executemany(
+                        f"INSERT OR REPLACE INTO records ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                        [tuple(r[c] for c in cols) for r in rows])
+                    dirty.update(tuple(r[k] for k in KEYS) for r in rows)
+                self._refresh_cells(conn, dirty)
+                self._refresh_leaderboard(conn, {k[2] for k in dirty})
+        return {"parsed": len(rows), "removed": len(removed), "cells": len(dirty)}
+
+    def _refresh_cells(self, conn, keys):
+        if not keys:
+            return
+        agg = ", ".join(
+            f"AVG({m}), CASE WHEN COUNT({m}) = 0 THEN NULL WHEN COUNT({m}) > 1 THEN "
+            f"SQRT(MAX(SUM({m} * {m}) / COUNT({m}) - AVG({m}) * AVG({m}), 0) * COUNT({m}) / (COUNT({m}) - 1)) ELSE 0 END"
+            for m in METRICS)
+        cols = ", ".join(f"{m}, {m}_std" for m in METRICS)
+        where = "model = ? AND quantization = ? AND task = ? AND load = ?"
+        for key in keys:
+            conn.execute(f"DELETE FROM cells WHERE {where}", key)
+            conn.execute(
+                f"INSERT INTO cells (model, quantization, task, load, runs, {cols}) "
+                f"SELECT model, quantization, task, load, COUNT(*), {agg} FROM records WHERE {where} "
+                f"GROUP BY model, quantization, task, load", key)
+
+    def _refresh_leaderboard(self, conn, tasks):
+        """质效比按任务内 min-max 归一化, 任务内任一键变化都需重算整个任务"""
+        for task in tasks:
+            conn.execute("DELETE FROM leaderboard WHERE task = ?", (task,))
+            df = pd.read_sql_query("SELECT * FROM cells WHERE task = ?", conn, params=(task,))
+            if df.empty:
+                continue
+            df = df.assign(quality_raw=df["quality"].fillna(0))
+            df = qe_ratio(df)
+            df["updated_at"] = time.time()
+            df = df[LEADERBOARD_COLUMNS].replace({np.nan: None})
+            conn.executemany(
+                f"INSERT INTO leaderboard ({', '.join(LEADERBOARD_COLUMNS)}) VALUES ({', '.join('?' * len(LEADERBOARD_COLUMNS))})",
+                df.itertuples(index=False, name=None))
+
+    def rebuild(self):
+        """由 records 表重算全部 cells 与 leaderboard (升级计算逻辑后使用)"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                keys = conn.execute("SELECT DISTINCT model, quantization, task, load FROM records").fetchall()
+                conn.execute("DELETE FROM cells")
+                conn.execute("DELETE FROM leaderboard")
+                self._refresh_cells(conn, keys)
+                self._refresh_leaderboard(conn, {k[2] for k in keys})
+
+    # ---- 查询 ----
+
+    def version(self):
+        """
+        数据库文件与 WAL 的修改时间和大小; 任何写入都会改变该值, 可作为查询缓存键的一部分
+        (空 WAL 与不存在等价: 打开连接时会重新创建空 WAL, 内容不变)
+        """
+        parts = []
+        for suffix in ("", "-wal"):
+            try:
+                st = os.stat(self.db_path + suffix)
+            except OSError:
+                st = None
+            parts.append(f"{st.st_mtime_ns}:{st.st_size}" if st and st.st_size else "-")
+        return "/".join(parts)
+
+    def query(self, task=None, load=None, model=None, quantization=None, sort="qe_ratio", limit=20, min_runs=1):
+        """
+        查询排行榜
+
+        Args:
+            task / load / model / quantization: 过滤条件 (精确匹配, None 表示不过滤)
+            sort (str): 排序指标, 见 HIGHER_IS_BETTER; 按指标方向排序, 缺失值排最后
+            limit (int): 最多返回的行数, None 表示全部
+            min_runs (int): 最少运行次数
+
+        Returns:
+            list[dict]: 按排序指标排列的行, 附 rank 字段
+        """
+        if sort not in HIGHER_IS_BETTER:
+            raise ValueError(f"不支持的排序指标: {sort} (可选: {', '.join(HIGHER_IS_BETTER)})")
+        where, params = ["runs >= ?"], [min_runs]
+        for col, val in (("task", task), ("load", load), ("model", model), ("quantization", quantization)):
+            if val is not None:
+                where.append(f"{col} = ?")
+                params.append(val)
+        order = "DESC" if HIGHER_IS_BETTER[sort] else "ASC"
+        sql = (f"SELECT {', '.join(LEADERBOARD_COLUMNS)} FROM leaderboard WHERE {' AND '.join(where)} "
+               f"ORDER BY {sort} IS NULL, {sort} {order}")
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return []
+            rows = conn.execute(sql, params).fetchall()
+        return [dict(zip(LEADERBOARD_COLUMNS, r), rank=i + 1) for i, r in enumerate(rows)]
+
+    def best(self, metric="qe_ratio", task=None, load=None, **filters):
+        """某个指标的最优行, 没有该指标数据时返回 None"""
+        rows = self.query(task=task, load=load, sort=metric, limit=1, **filters)
+        return rows[0] if rows and rows[0][metric] is not None else None
+
+    def facets(self):
+        """排行榜中出现过的模型 / 量化 / 任务 / 负载取值"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return {k: [] for k in KEYS}
+            return {k: [r[0] for r in conn.execute(f"SELECT DISTINCT {k} FROM leaderboard ORDER BY {k}")] for k in KEYS}
@@ -0,0 +1,243 @@
+"""
+原始实验记录加载
+
+遍历 <实验目录>/raw/<模型>/*.json, 只解码分析所需的顶层字段 (quality / metadata / model 等),
+跳过体积最大的 system_metrics_full 与 generated_text; 多文件用线程池并行读取。
+解析结果缓存到 <实验目录>/summary/raw_records.parquet (无 pyarrow 时为 .pkl),
+按文件 mtime 与大小增量失效。task / run / load 优先取记录中的 metadata,
+旧记录缺少这些字段时才从文件名 {task}_{load}_r{run}.json 推断。
+"""
+
+import os
+import re
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+CACHE_VERSION = 2
+# 需要解码的顶层字段; 其余字段 (system_metrics_full, generated_text, ...) 不解析
+FIELDS = ("model", "prompt", "quality", "metadata", "token_count", "token_count_method",
+          "energy_j_per_token", "latency_seconds", "throughput_tokens_per_sec", "first_token_seconds",
+          "system_metrics_summary")
+
+COLUMNS = {
+    "path": "string",
+    "model": "string",
+    "quantization": "string",
+    "task": "string",
+    "load": "string",
+    "run": "Int64",
+    "case_index": "Int64",
+    "timestamp": "float64",
+    "latency_s": "float64",
+    "toks_per_s": "float64",
+    "first_token_s": "float64",
+    "token_count": "Int64",
+    "token_count_method": "string",
+    "energy_j_per_token": "float64",
+    "gpu_energy_j": "float64",
+    "bartscore": "float64",
+    "code_compiles": "boolean",
+    "tests_pass_rate": "float64",
+    "distinct_2": "float64",
+    "quality_unified": "float64",
+    "mtime_ns": "int64",
+    "size": "int64",
+}
+
+_NAME_RE = re.compile(r"^(?P<task>[^_]+)_(?P<load>.+)_r(?P<run>\d+)\.json$")
+_decoder = json.JSONDecoder()
+
+def _read_fields(path):
+    """
+    只解码 FIELDS 中的顶层字段
+
+    run_experiments 以 json.dump(indent=2) 写出记录, 顶层键位于行首两个空格处;
+    按此定位各字段后用 raw_decode 单独解码。格式不符 (找不到任何字段) 时退回完整解析。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    out = {}
+    for k in FIELDS:
+        # 嵌套键缩进更深, 字符串中的换行已转义, 因此 "\n  \"键\": " 只会匹配顶层键
+        marker = f'\n  "{k}": '
+        i = text.rfind(marker)
+        if i < 0:
+            continue
+        try:
+            out[k], _ = _decoder.raw_decode(text, i + len(marker))
+        except ValueError:
+            continue
+    if not out:
+        data = json.loads(text)
+        out = {k: data.get(k) for k in FIELDS if k in data}
+    return out
+
+def _unified_quality(task, bartscore, code_compiles, tests_pass_rate, distinct_2):
+    # code -> 单元测试通过率 (无测试时为可编译 0/1), creative -> distinct-2, qa/summary -> BARTScore
+    if task == "code":
+        if tests_pass_rate is not None:
+            return tests_pass_rate
+        return 1.0 if code_compiles else 0.0
+    if task == "creative":
+        return distinct_2 if distinct_2 is not None else 0.0
+    return bartscore
+
+def parse_record(path, data=None):
+    """把单个原始记录文件解析为一行扁平数据"""
+    if data is None:
+        data = _read_fields(path)
+    st = os.stat(path)
+    meta = data.get("metadata") or {}
+    sysm = data.get("system_metrics_summary") or {}
+    q = data.get("quality") or {}
+    code = q.get("code") or {}
+    creative = q.get("creative") or {}
+    name = _NAME_RE.match(os.path.basename(path))
+    task = meta.get("task") or (name.group("task") if name else None)
+    load = meta.get("load") or (name.group("load") if name else None)
+    run = meta.get("run_idx")
+    if run is None and name:
+        run = int(name.group("run"))
+    compiles = code.get("code_compiles") if code else None
+    tests = code.get("tests_pass_rate") if code else None
+    distinct_2 = creative.get("distinct_2") if creative else None
+    return {
+        "path": path,
+        "model": data.get("model"),
+        "quantization": (meta.get("model_details") or {}).get("quantization_level"),
+        "task": task,
+        "load": load,
+        "run": run,
+        "case_index": meta.get("case_index"),
+        "timestamp": meta.get("timestamp"),
+        "latency_s": data.get("latency_seconds"),
+        "toks_per_s": data.get("throughput_tokens_per_sec"),
+        "first_token_s": data.get("first_token_seconds"),
+        "token_count": data.get("token_count"),
+        "token_count_method": data.get("token_count_method"),
+        "energy_j_per_token": data.get("energy_j_per_token"),
+        "gpu_energy_j": sysm.get("gpu_energy_j"),
+        "bartscore": q.get("bartscore"),
+        "code_compiles": compiles,
+        "tests_pass_rate": tests,
+        "distinct_2": distinct_2,
+        "quality_unified": _unified_quality(task, q.get("bartscore"), compiles, tests, distinct_2),
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+    }
+
+def _typed(rows):
+    df = pd.DataFrame(rows, columns=list(COLUMNS))
+    for col, dtype in COLUMNS.items():
+        if dtype in ("float64",):
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+        elif dtype == "Int64":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+        elif dtype == "boolean":
+            df[col] = df[col].astype("boolean")
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+def list_raw_files(exp_dir):
+    raw_dir = os.path.join(exp_dir, "raw")
+    files = []
+    if not os.path.isdir(raw_dir):
+        return files
+    for model in sorted(os.listdir(raw_dir)):
+        model_path = os.path.join(raw_dir, model)
+        if not os.path.isdir(model_path):
+            continue
+        for fname in sorted(os.listdir(model_path)):
+            if fname.endswith(".json"):
+                files.append(os.path.join(model_path, fname))
+    return files
+
+def _cache_path(exp_dir):
+    summary = os.path.join(exp_dir, "summary")
+    try:
+        import pyarrow  # noqa: F401
+        return os.path.join(summary, "raw_records.parquet")
+    except ImportError:
+        return os.path.join(summary, "raw_records.pkl")
+
+def _read_cache(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        if path.endswith(".parquet"):
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_pickle(path)
+    except Exception:
+        return None
+    if df.attrs.get("cache_version", CACHE_VERSION) != CACHE_VERSION or list(df.columns) != list(COLUMNS):
+        return None
+    return df
+
+def _write_cache(df, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    df.attrs["cache_version"] = CACHE_VERSION
+    try:
+        if path.endswith(".parquet"):
+            df.to_parquet(tmp, index=False)
+        else:
+            df.to_pickle(tmp)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"写入记录缓存失败: {e}")
+
+def load_records(exp_dir, use_cache=True, max_workers=8):
+    """
+    加载实验目录下的全部原始记录
+
+    Args:
+        exp_dir (str): 实验目录 (包含 raw/ 与 summary/)
+        use_cache (bool): 是否读写解析缓存
+        max_workers (int): 并行读取的线程数
+
+    Returns:
+        DataFrame: 每个原始记录一行, 列及类型见 COLUMNS; path 为记录文件的绝对路径
+    """
+    files = [os.path.abspath(p) for p in list_raw_files(exp_dir)]
+    cache_file = _cache_path(exp_dir)
+    cached = _read_cache(cache_file) if use_cache else None
+    keep = None
+    todo = files
+    if cached is not None and len(cached):
+        stats = {}
+        for p in files:
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            stats[p] = (st.st_mtime_ns, st.st_size)
+        ok = np.array([stats.get(p) == (m, n) for p, m, n in zip(cached["path"], cached["mtime_ns"], cached["size"])], dtype=bool)
+        keep = cached[ok]
+        valid = set(keep["path"])
+        todo = [p for p in files if p not in valid]
+
+    rows = []
+    if todo:
+        def _one(p):
+            try:
+                return parse_record(p)
+            except Exception as e:
+                print(f"读取记录失败 {p}: {e}")
+                return None
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            rows = [r for r in ex.map(_one, todo) if r is not None]
+
+    fresh = _typed(rows)
+    if keep is not None and len(keep):
+        df = pd.concat([keep, fresh], ignore_index=True) if len(fresh) else keep.reset_index(drop=True)
+    else:
+        df = fresh
+    df = df[df["path"].isin(files)].sort_values("path", kind="stable").reset_index(drop=True)
+    if use_cache and (todo or cached is None or len(df) != len(cached)):
+        _write_cache(df, cache_file)
+    return df
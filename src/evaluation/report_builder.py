@@ -0,0 +1,133 @@
+"""
+按章节增量生成 Markdown 报告
+
+每个章节 (Section) 声明自己的输入数据与参数, 章节函数以 func(data, report_file, jobs=..., **params)
+的形式把 Markdown 写入 report_file, 并把图表任务追加到 jobs。输入的内容哈希与章节函数名、
+版本号一起作为缓存键, 保存在报告旁的 .report_cache.json 中; 键未变化且章节图表仍存在时
+直接复用缓存的 Markdown, 只重新计算输入变化的章节, 图表再交给 render_figures 按哈希跳过。
+"""
+
+import io
+import os
+import json
+import time
+
+from src.evaluation import figures as figs
+from src.evaluation.figures import data_digest, render_figures
+
+CACHE_FILE = ".report_cache.json"
+
+class Section:
+    """
+    报告中的一个章节
+
+    Args:
+        name (str): 章节名 (缓存键, 同一报告内唯一)
+        func (callable): func(data, report_file, jobs=jobs, **params); figures=False 时不传 jobs
+        data: 章节的全部输入 (通常为所需列构成的 DataFrame), 参与哈希
+        params (dict): 其余参数, 参与哈希
+        figures (bool): 章节是否生成图表
+        version (int): 章节逻辑变化时递增, 使旧缓存失效
+    """
+
+    def __init__(self, name, func, data=None, params=None, figures=True, version=1):
+        self.name = name
+        self.func = func
+        self.data = data
+        self.params = params or {}
+        self.figures = figures
+        self.version = version
+
+    def key(self):
+        return data_digest(f"{self.func.__module__}.{self.func.__qualname__}", self.version,
+                           figs.FONT_NAME, self.data, self.params)
+
+    def render(self):
+        buf = io.StringIO()
+        jobs = []
+        if self.figures:
+            self.func(self.data, buf, jobs=jobs, **self.params)
+        else:
+            self.func(self.data, buf, **self.params)
+        return buf.getvalue(), jobs
+
+class ReportBuilder:
+    """
+    Args:
+        report_path (str): 输出的 Markdown 文件
+        figures_dir (str): 图表目录 (章节图表相对报告以 figures/ 引用)
+    """
+
+    def __init__(self, report_path, figures_dir):
+        self.report_path = report_path
+        self.figures_dir = figures_dir
+        self.cache_path = os.path.join(os.path.dirname(os.path.abspath(report_path)), CACHE_FILE)
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _write_cache(self, cache):
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp, self.cache_path)
+
+    def build(self, sections, header="", footer="", max_workers=None, force=False, timings=False):
+        """
+        生成报告
+
+        Args:
+            sections (list[Section]): 按报告顺序排列的章节
+            header / footer (str): 每次都重新写入的开头与结尾 (如生成时间)
+            max_workers (int, optional): 图表渲染进程数, 见 render_figures
+            force (bool): 忽略缓存, 全部重新计算
+            timings (bool): 在报告末尾附上各章节耗时与缓存状态
+
+        Returns:
+            list[dict]: 每个章节的 name / status ("cached" / "rebuilt") / seconds
+        """
+        os.makedirs(self.figures_dir, exist_ok=True)
+        cache = {} if force else self._read_cache()
+        parts, jobs, info = [], [], []
+        for sec in sections:
+            t0 = time.perf_counter()
+            key = sec.key()
+            hit = cache.get(sec.name)
+            if hit and hit.get("key") == key and all(
+                    os.path.exists(os.path.join(self.figures_dir, fn)) for fn in hit.get("figures", [])):
+                parts.append(hit["markdown"])
+                info.append({"name": sec.name, "status": "cached", "seconds": time.perf_counter() - t0})
+                continue
+            markdown, sec_jobs = sec.render()
+            jobs += sec_jobs
+            cache[sec.name] = {"key": key, "markdown": markdown, "figures": [j.filename for j in sec_jobs]}
+            parts.append(markdown)
+            info.append({"name": sec.name, "status": "rebuilt", "seconds": time.perf_counter() - t0})
+
+        if jobs:
+            t0 = time.perf_counter()
+            status = render_figures(jobs, self.figures_dir, max_workers=max_workers)
+            info.append({"name": "图表渲染", "status": f"{sum(v == 'rendered' for v in status.values())} 张重绘",
+                         "seconds": time.perf_counter() - t0})
+            # 渲染失败的章节不写入缓存, 下次重新计算
+            failed = {fn for fn, st in status.items() if st.startswith("failed")}
+            for name, entry in cache.items():
+                if failed & set(entry.get("figures", [])):
+                    entry["key"] = None
+        self._write_cache(cache)
+
+        text = header + "".join(parts)
+        if timings:
+            text += "## 附录: 各阶段耗时\n\n| 阶段 | 状态 | 耗时 (秒) |\n|---|---|---|\n"
+            text += "".join(f"| {r['name']} | {r['status']} | {r['seconds']:.3f} |\n" for r in info)
+            text += "\n"
+        text += footer
+        tmp = self.report_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, self.report_path)
+        return info
@@ -0,0 +1,248 @@
+"""
+模型排名的统计显著性
+
+- bootstrap_ci: 各模型均值的自助法置信区间, 以 (B, n) 索引矩阵一次性重采样
+- pairwise_tests: 模型两两之间的置换检验, 多重比较用 Holm 校正
+- ranking_significance: 最优模型与次优模型之差是否显著
+- runs_needed: 按运行间波动与当前差值估算区分两模型还需的运行次数
+
+指定 block (通常为 task) 时按区组分析: 重采样 / 置换只在同一任务内进行,
+模型均值取各任务均值的平均, 因此不同任务的量纲差异不会混入运行间波动。
+每个 (模型, 任务) 只有 1 次运行时无法估计运行间波动, 置信区间退化为一个点,
+runs_needed 会给出估计方差所需的最少运行次数。
+各模型 / 各模型对的计算相互独立, 用线程池并行 (NumPy 运算期间释放 GIL)。
+"""
+
+import math
+from itertools import combinations
+from statistics import NormalDist
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# 指标方向: True 表示越高越好
+DIRECTIONS = {
+    "tps": True,
+    "latency": False,
+    "energy": False,
+    "quality_raw": True,
+    "qe_ratio": True,
+}
+
+def _cells(df, value, by, block):
+    """按 (模型, 区组) 切分观测值, 返回 {模型: {区组: ndarray}}; 缺失值丢弃"""
+    d = df[[by, value] + ([block] if block else [])].dropna(subset=[value])
+    out = {}
+    if block:
+        for (g, b), s in d.groupby([by, block], sort=True)[value]:
+            out.setdefault(g, {})[b] = s.to_numpy(dtype=float)
+    else:
+        for g, s in d.groupby(by, sort=True)[value]:
+            out[g] = {None: s.to_numpy(dtype=float)}
+    return out
+
+def _map(func, items, max_workers):
+    if max_workers == 0 or len(items) <= 1:
+        return [func(*it) for it in items]
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        return list(ex.map(lambda it: func(*it), items))
+
+def _boot_one(cells, n_boot, ci, seed):
+    rng = np.random.default_rng(seed)
+    means = np.zeros(n_boot)
+    for v in cells.values():
+        idx = rng.integers(0, len(v), size=(n_boot, len(v)))
+        means += v[idx].mean(axis=1)
+    means /= len(cells)
+    point = float(np.mean([v.mean() for v in cells.values()]))
+    lo, hi = np.quantile(means, [(1 - ci) / 2, (1 + ci) / 2])
+    runs = [len(v) for v in cells.values()]
+    return point, float(lo), float(hi), int(sum(runs)), int(min(runs))
+
+def bootstrap_ci(df, value, by="model", block=None, n_boot=2000, ci=0.95, seed=0, max_workers=None):
+    """
+    各组均值的自助法置信区间
+
+    Returns:
+        DataFrame: by, mean, ci_low, ci_high, n, min_runs (每个区组内的最少运行次数)
+    """
+    cells = _cells(df, value, by, block)
+    groups = list(cells)
+    seeds = np.random.SeedSequence(seed).spawn(len(groups))
+    res = _map(_boot_one, [(cells[g], n_boot, ci, s) for g, s in zip(groups, seeds)], max_workers)
+    return pd.DataFrame(
+        [(g,) + r for g, r in zip(groups, res)],
+        columns=[by, "mean", "ci_low", "ci_high", "n", "min_runs"],
+    )
+
+def _perm_one(a_cells, b_cells, n_perm, seed):
+    """区组内置换检验: 统计量为各区组 (均值 A - 均值 B) 的平均, 双侧 p 值"""
+    rng = np.random.default_rng(seed)
+    common = [k for k in a_cells if k in b_cells]
+    if not common:
+        return float("nan"), float("nan"), 0
+    obs = 0.0
+    perm = np.zeros(n_perm)
+    for k in common:
+        a, b = a_cells[k], b_cells[k]
+        pooled = np.concatenate([a, b])
+        obs += a.mean() - b.mean()
+        shuffled = rng.permuted(np.broadcast_to(pooled, (n_perm, len(pooled))), axis=1)
+        perm += shuffled[:, :len(a)].mean(axis=1) - shuffled[:, len(a):].mean(axis=1)
+    obs /= len(common)
+    perm /= len(common)
+    # 浮点误差下与观测值相等的置换也计入
+    extreme = np.count_nonzero(np.abs(perm) >= abs(obs) - 1e-12)
+    return float(obs), float((extreme + 1) / (n_perm + 1)), len(common)
+
+def _holm(p):
+    p = np.asarray(p, dtype=float)
+    order = np.argsort(p)
+    m = len(p)
+    adj = np.empty(m)
+    running = 0.0
+    for rank, i in enumerate(order):
+        running = max(running, min(1.0, (m - rank) * p[i]))
+        adj[i] = running
+    return adj
+
+def pairwise_tests(df, value, by="model", block=None, n_perm=5000, seed=0, max_workers=None):
+    """
+    各组两两之间的置换检验
+
+    Returns:
+        DataFrame: a, b, diff (A - B), p_value, p_holm, blocks (参与比较的区组数)
+    """
+    cells = _cells(df, value, by, block)
+    pairs = list(combinations(list(cells), 2))
+    if not pairs:
+        return pd.DataFrame(columns=["a", "b", "diff", "p_value", "p_holm", "blocks"])
+    seeds = np.random.SeedSequence(seed).spawn(len(pairs))
+    res = _map(_perm_one, [(cells[a], cells[b], n_perm, s) for (a, b), s in zip(pairs, seeds)], max_workers)
+    out = pd.DataFrame([(a, b) + r for (a, b), r in zip(pairs, res)], columns=["a", "b", "diff", "p_value", "blocks"])
+    valid = out["p_value"].notna()
+    out["p_holm"] = np.nan
+    if valid.any():
+        out.loc[valid, "p_holm"] = _holm(out.loc[valid, "p_value"].to_numpy())
+    return out[["a", "b", "diff", "p_value", "p_holm", "blocks"]]
+
+def _pair_row(tests, a, b):
+    row = tests[((tests["a"] == a) & (tests["b"] == b)) | ((tests["a"] == b) & (tests["b"] == a))]
+    return row.iloc[0] if len(row) else None
+
+def ranking_significance(df, value, by="model", higher_is_better=True, block=None, alpha=0.05,
+                         n_boot=2000, n_perm=5000, seed=0, max_workers=None):
+    """
+    检验排名第一的组是否显著优于第二名
+
+    Returns:
+        dict: metric, best, runner_up, diff, p_value, p_holm, significant, ci (bootstrap_ci 结果, 按排名排序), tests
+    """
+    ci = bootstrap_ci(df, value, by, block, n_boot=n_boot, seed=seed, max_workers=max_workers)
+    ci = ci.sort_values("mean", ascending=not higher_is_better).reset_index(drop=True)
+    tests = pairwise_tests(df, value, by, block, n_perm=n_perm, seed=seed, max_workers=max_workers)
+    out = {"metric": value, "best": None, "runner_up": None, "diff": float("nan"), "p_value": float("nan"),
+           "p_holm": float("nan"), "significant": False, "ci": ci, "tests": tests}
+    if len(ci) == 0:
+        return out
+    out["best"] = ci.loc[0, by]
+    if len(ci) < 2:
+        return out
+    out["runner_up"] = ci.loc[1, by]
+    out["diff"] = float(ci.loc[0, "mean"] - ci.loc[1, "mean"])
+    row = _pair_row(tests, out["best"], out["runner_up"])
+    if row is not None:
+        out["p_value"] = float(row["p_value"])
+        out["p_holm"] = float(row["p_holm"])
+        out["significant"] = bool(row["p_holm"] < alpha)
+    return out
+
+def _noise_sd(cells):
+    """运行间波动: 各 (组, 区组) 格内方差按自由度合并; 没有格包含 2 次以上运行时返回 None"""
+    ss, dof = 0.0, 0
+    for g in cells.values():
+        for v in g.values():
+            if len(v) > 1:
+                ss += float(((v - v.mean()) ** 2).sum())
+                dof += len(v) - 1
+    return math.sqrt(ss / dof) if dof else None
+
+def runs_needed(df, value, by="model", higher_is_better=True, block=None, alpha=0.05, power=0.8, max_runs=1000):
+    """
+    估算区分相邻排名的两组还需要的运行次数 (每组每个区组)
+
+    正态近似: 两组均值 (各区组平均) 之差的方差为 2 * sd^2 / (区组数 * 运行次数),
+    令 |差值| / 标准误 >= z(1 - alpha/2) + z(power) 解出每格所需运行次数。
+
+    Returns:
+        DataFrame: a, b, diff, noise_sd, runs_per_cell (当前每格最少运行次数), required, additional, note
+    """
+    cells = _cells(df, value, by, block)
+    means = {g: float(np.mean([v.mean() for v in c.values()])) for g, c in cells.items()}
+    ranked = sorted(means, key=means.get, reverse=higher_is_better)
+    sd = _noise_sd(cells)
+    z = NormalDist().inv_cdf(1 - alpha / 2) + NormalDist().inv_cdf(power)
+    rows = []
+    for a, b in zip(ranked, ranked[1:]):
+        common = [k for k in cells[a] if k in cells[b]]
+        current = min([len(cells[a][k]) for k in common] + [len(cells[b][k]) for k in common]) if common else 0
+        diff = means[a] - means[b]
+        if not common:
+            rows.append((a, b, diff, sd, current, None, None, "两组没有共同的区组, 无法比较"))
+        elif sd is None:
+            rows.append((a, b, diff, sd, current, None, max(0, 2 - current), "每格仅 1 次运行, 需至少 2 次运行以估计运行间波动"))
+        elif sd == 0:
+            rows.append((a, b, diff, sd, current, current, 0, "运行间无波动"))
+        elif diff == 0:
+            rows.append((a, b, diff, sd, current, None, None, "均值相同, 无法区分"))
+        else:
+            required = math.ceil(2 * (z * sd / abs(diff)) ** 2 / len(common))
+            if required > max_runs:
+                rows.append((a, b, diff, sd, current, required, None, f"差值过小, 需要超过 {max_runs} 次运行, 实际可视为无差异"))
+            else:
+                required = max(required, 2)
+                rows.append((a, b, diff, sd, current, required, max(0, required - current), ""))
+    return pd.DataFrame(rows, columns=["a", "b", "diff", "noise_sd", "runs_per_cell", "required", "additional", "note"])
+
+def significance_section(df, metrics=None, by="model", block="task", alpha=0.05, power=0.8, seed=0, max_workers=None):
+    """
+    生成报告中的统计显著性章节 (Markdown)
+
+    Args:
+        metrics (dict): 指标列 -> 是否越高越好, 默认 DIRECTIONS 中存在于 df 的列
+    """
+    metrics = metrics or {m: d for m, d in DIRECTIONS.items() if m in df.columns}
+    if block and block not in df.columns:
+        block = None
+    lines = [
+        f"- 检验方法: 自助法 95% 置信区间 + 置换检验 (Holm 校正, α={alpha})"
+        + (f", 按 `{block}` 分区组" if block else ""),
+        "",
+        "| 指标 | 最优 | 次优 | 差值 | p (Holm) | 排名是否显著 | 最优均值 95% CI |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    results = {}
+    plans = []
+    for m, higher in metrics.items():
+        r = ranking_significance(df, m, by, higher, block, alpha, seed=seed, max_workers=max_workers)
+        results[m] = r
+        if r["best"] is None:
+            continue
+        best_ci = r["ci"].iloc[0]
+        sig = "是" if r["significant"] else "否"
+        p = "-" if np.isnan(r["p_holm"]) else f"{r['p_holm']:.3f}"
+        lines.append(f"| {m} | {r['best']} | {r['runner_up'] or '-'} | {r['diff']:.4g} | {p} | {sig} "
+                     f"| [{best_ci['ci_low']:.4g}, {best_ci['ci_high']:.4g}] |")
+        plan = runs_needed(df, m, by, higher, block, alpha, power)
+        if len(plan):
+            plans.append(plan.assign(metric=m))
+    if any(r["ci"]["min_runs"].min() < 2 for r in results.values() if len(r["ci"])):
+        lines += ["", "> 部分 (模型, 任务) 只有 1 次运行, 置信区间仅反映已有数据, 无法体现运行间波动。"]
+    if plans:
+        plan = pd.concat(plans, ignore_index=True)
+        plan = plan[["metric", "a", "b", "diff", "noise_sd", "runs_per_cell", "required", "additional", "note"]]
+        lines += ["", f"#### 追加运行建议 (功效 {power:.0%})", "",
+                  "区分相邻排名的两个模型时, 每个 (模型, 任务) 所需的运行次数:", "",
+                  plan.to_markdown(index=False, floatfmt=".4g")]
+    return "\n".join(lines), results
@@ -0,0 +1,39 @@
+"""
+测试公共夹具
+
+stub_ollama: 在后台线程中启动 experiments.stub_ollama (随机端口), 返回其地址。
+slow_ollama: 同上, 逐 token 输出较慢, 任务运行时间足够在中途取消。
+"""
+
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from experiments.stub_ollama import make_handler
+
+STUB_MODEL = "stub:1b"
+
+
+def _serve_stub(token_delay):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler([STUB_MODEL], token_delay=token_delay))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def stub_ollama():
+    yield from _serve_stub(0.001)
+
+
+@pytest.fixture
+def slow_ollama():
+    yield from _serve_stub(0.2)
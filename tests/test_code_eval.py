@@ -0,0 +1,62 @@
+"""
+代码执行沙箱: 超时时结束整个进程组, 偶发的超时与崩溃结果不写入磁盘缓存
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+from experiments.code_eval import CodeEvaluator, run_sandboxed
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="进程组与 rlimit 只在 POSIX 上可用")
+
+SPAWN_AND_HANG = """
+import subprocess, sys
+p = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+with open({pid_file!r}, "w") as f:
+    f.write(str(p.pid))
+while True:
+    pass
+"""
+
+
+def _alive(pid):
+    """进程存在且不是僵尸进程"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="需要 /proc")
+def test_timeout_kills_spawned_processes(tmp_path):
+    pid_file = str(tmp_path / "child.pid")
+    r = run_sandboxed(SPAWN_AND_HANG.format(pid_file=pid_file), ["assert True"], {"timeout": 2})
+    assert r["status"] == "timeout"
+    pid = int(open(pid_file).read())
+    deadline = time.time() + 5
+    while _alive(pid) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not _alive(pid)
+
+
+def test_rlimits_are_applied_in_child():
+    code = "import resource\ndef nofile():\n    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]\n"
+    r = run_sandboxed(code, ["assert nofile() == 32"], {"nofile": 32})
+    assert r["status"] == "ok" and r["passed"], r
+
+
+def test_transient_results_are_not_persisted(tmp_path):
+    cache = str(tmp_path / "cache")
+    slow = "import time\ntime.sleep(5)\n"
+    ok = "def f():\n    return 1\n"
+    ev = CodeEvaluator(cache_dir=cache)
+    statuses = [r["status"] for r in ev.evaluate_many([(slow, ["assert True"], {"timeout": 1}),
+                                                      (ok, ["assert f() == 1"], None)])]
+    assert statuses == ["timeout", "ok"]
+    assert len(os.listdir(cache)) == 1
+    # 新的评估器 (下次运行) 只从磁盘缓存取回成功的结果
+    assert CodeEvaluator(cache_dir=cache).evaluate(ok, ["assert f() == 1"])["status"] == "ok"
@@ -0,0 +1,53 @@
+"""
+复合指标引擎: 各归一化方式的手算结果, 缺失值保持 NaN, 组内常数不产生 -0.0
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.evaluation.composite import composite_scores, normalize
+
+
+def _norm(values, method, direction, by=None, groups=None):
+    df = pd.DataFrame({"x": values})
+    if groups is not None:
+        df["g"] = groups
+    out = normalize(df, [{"name": "n", "column": "x", "direction": direction}], by=by, method=method)
+    return out["n"].to_numpy()
+
+
+@pytest.mark.parametrize("method, direction, expected", [
+    ("minmax", "max", [1.0, np.nan, 1.0]),
+    ("minmax", "min", [0.0, np.nan, 0.0]),
+    ("zscore", "max", [0.0, np.nan, 0.0]),
+    ("zscore", "min", [0.0, np.nan, 0.0]),
+    ("rank", "max", [0.75, np.nan, 0.75]),
+    ("none", "min", [-2.0, np.nan, -2.0]),
+])
+def test_constant_group_with_missing_value(method, direction, expected):
+    out = _norm([2.0, np.nan, 2.0], method, direction)
+    np.testing.assert_array_equal(out, expected)
+    # 不出现 -0.0
+    assert not np.signbit(out[out == 0]).any()
+
+
+def test_minmax_and_zscore_by_group():
+    values = [1.0, 2.0, 3.0, 10.0, 30.0]
+    groups = ["a", "a", "a", "b", "b"]
+    np.testing.assert_allclose(_norm(values, "minmax", "max", "g", groups), [0.0, 0.5, 1.0, 0.0, 1.0])
+    np.testing.assert_allclose(_norm(values, "minmax", "min", "g", groups), [1.0, 0.5, 0.0, 1.0, 0.0])
+    sd = np.sqrt(2 / 3)
+    np.testing.assert_allclose(_norm(values, "zscore", "max", "g", groups), [-1 / sd, 0.0, 1 / sd, -1.0, 1.0])
+    np.testing.assert_allclose(_norm(values, "rank", "min", "g", groups), [1.0, 2 / 3, 1 / 3, 1.0, 0.5])
+
+
+def test_composite_weights_and_thresholds():
+    df = pd.DataFrame({"tps": [10.0, 20.0], "latency": [2.0, 1.0]})
+    spec = {"metrics": [
+        {"name": "n_tps", "column": "tps", "direction": "max", "weight": 0.6, "score": "s", "threshold": 15},
+        {"name": "n_lat", "column": "latency", "direction": "min", "weight": 0.4, "score": "s"},
+    ]}
+    out = composite_scores(df, spec)
+    np.testing.assert_allclose(out["s"], [0.0, 1.0])
+    assert out["tps_ok"].tolist() == [False, True]
@@ -0,0 +1,50 @@
+"""
+进程间事件: ID 较小的事件晚于较大的 ID 提交 (PostgreSQL 序列的提交顺序) 时仍被处理, 且只处理一次
+"""
+
+import asyncio
+import time
+
+from sqlalchemy import insert
+
+from src.backend.core.database import create_engine, create_tables
+from src.backend.models.evaluation import WorkerEvent
+from src.backend.services import coordination
+from src.backend.services.coordination import Coordinator
+
+
+async def _insert(engine, event_id, n):
+    async with engine.begin() as conn:
+        await conn.execute(insert(WorkerEvent.__table__).values(
+            id=event_id, kind="ping", payload={"n": n}, origin="other:1", created_at=time.time()))
+
+
+def test_late_committed_event_is_delivered_once(tmp_path):
+    async def run():
+        engine = create_engine(f"sqlite:///{tmp_path / 'events.sqlite'}")
+        await create_tables(engine)
+        await _insert(engine, 1, 0)
+        coordinator = Coordinator(engine, backend="file", poll_interval=3600,
+                                  lock_file=str(tmp_path / "scheduler.lock"))
+        received = []
+        coordinator.on_event("ping", lambda p: received.append(p["n"]))
+        await coordinator.start()
+        try:
+            # 启动前已有的事件不处理; ID 2 已分配但尚未提交时 ID 3 先可见
+            await _insert(engine, 3, 3)
+            await coordinator._poll_events()
+            assert received == [3]
+            await _insert(engine, 2, 2)
+            await coordinator._poll_events()
+            await coordinator._poll_events()
+            assert received == [3, 2]
+            # 超出回看窗口的 ID 不再保留
+            await _insert(engine, 3 + coordination.EVENT_LOOKBACK + 1, 4)
+            await coordinator._poll_events()
+            assert received == [3, 2, 4]
+            assert coordinator._seen_events == {3 + coordination.EVENT_LOOKBACK + 1}
+        finally:
+            await coordinator.stop()
+            await engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,137 @@
+"""
+评估任务接口: 提交任务后经 SSE 跟踪到 done, 取消运行中的任务, 以及 404/409 错误格式
+
+应用在测试进程内以 ASGI 方式调用, 数据库、数据目录与排行榜放在临时目录, 模型服务为 stub_ollama。
+"""
+
+import json
+import asyncio
+
+import httpx
+import pytest
+
+from conftest import STUB_MODEL
+from src.backend.core.config import settings
+from src.backend.main import app
+
+BASE = "/api/v1/evaluations"
+
+
+@pytest.fixture
+def configure(tmp_path, monkeypatch):
+    """把应用配置指向临时目录与给定的模型服务地址 (须在应用启动前调用)"""
+    def apply(ollama_host):
+        for name, value in {
+            "DATABASE_URL": f"sqlite:///{tmp_path / 'app.sqlite'}",
+            "DATA_DIR": str(tmp_path / "data"),
+            "LEADERBOARD_DB": str(tmp_path / "leaderboard.sqlite"),
+            "OLLAMA_HOST": ollama_host,
+            "CACHE_BACKEND": "memory",
+            "RATE_LIMIT_ENABLED": False,
+            "EXPERIMENT_TRACKING_ENABLED": False,
+            "COORDINATION_BACKEND": "none",
+        }.items():
+            monkeypatch.setattr(settings, name, value)
+    return apply
+
+
+async def _with_client(test):
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=120) as client:
+            await test(client)
+
+
+async def _events(client, job_id):
+    """读取 SSE 流直到连接关闭, 返回 [(event, data)]"""
+    events = []
+    async with client.stream("GET", f"{BASE}/{job_id}/events") as resp:
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        event = None
+        async for line in resp.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((event, json.loads(line[len("data: "):])))
+    return events
+
+
+async def _wait(client, job_id, predicate, timeout=60):
+    async def poll():
+        while True:
+            job = (await client.get(f"{BASE}/{job_id}")).json()
+            if predicate(job):
+                return job
+            await asyncio.sleep(0.1)
+    return await asyncio.wait_for(poll(), timeout)
+
+
+def test_submit_and_follow_events(stub_ollama, configure):
+    configure(stub_ollama)
+
+    async def test(client):
+        resp = await client.post(BASE, json={"models": [STUB_MODEL], "tasks": ["qa"], "loads": ["short"], "runs": 2})
+        assert resp.status_code == 202
+        job = resp.json()
+        assert job["links"]["events"] == f"{BASE}/{job['id']}/events"
+
+        events = await _events(client, job["id"])
+        assert events[-1][0] == "done"
+        assert {e for e, _ in events[:-1]} <= {"progress"}
+        done = events[-1][1]
+        assert done["status"] == "succeeded"
+        assert done["completed"] == done["total"] == 2
+
+        results = (await client.get(f"{BASE}/{job['id']}/results")).json()
+        assert results["status"] == "succeeded"
+        assert [(r["model"], r["task"], r["load"]) for r in results["items"]] == [(STUB_MODEL, "qa", "short")]
+        assert (await app.state.record_store.counts())["runs"] == 2
+
+    asyncio.run(_with_client(test))
+
+
+def test_cancel_running_job(slow_ollama, configure):
+    configure(slow_ollama)
+
+    async def test(client):
+        resp = await client.post(BASE, json={"models": [STUB_MODEL], "tasks": ["qa"], "loads": ["long"], "runs": 3})
+        job_id = resp.json()["id"]
+        # 至少完成一个用例 (已有原始记录) 后取消
+        await _wait(client, job_id, lambda j: j["completed"] >= 1)
+
+        resp = await client.delete(f"{BASE}/{job_id}")
+        assert resp.status_code == 200
+        assert resp.json()["status"] == "cancelled"
+        event, data = (await _events(client, job_id))[-1]
+        assert (event, data["status"]) == ("done", "cancelled")
+
+        # 已结束的任务不能再次取消
+        resp = await client.delete(f"{BASE}/{job_id}")
+        assert resp.status_code == 409
+        error = resp.json()["error"]
+        assert error["code"] == "CONFLICT"
+        assert "cancelled" in error["message"]
+
+        # 取消的任务不入库 (等待工作协程处理完该任务)
+        scheduler = app.state.task_scheduler
+        while scheduler.stats()["running"]:
+            await asyncio.sleep(0.05)
+        assert (await app.state.record_store.counts())["runs"] == 0
+
+    asyncio.run(_with_client(test))
+
+
+def test_unknown_job_returns_404(stub_ollama, configure):
+    configure(stub_ollama)
+
+    async def test(client):
+        for method, path in [("GET", "missing"), ("DELETE", "missing"), ("GET", "missing/results"),
+                             ("GET", "missing/events")]:
+            resp = await client.request(method, f"{BASE}/{path}")
+            assert resp.status_code == 404
+            error = resp.json()["error"]
+            assert error["code"] == "NOT_FOUND"
+            assert set(error) >= {"code", "message"}
+
+    asyncio.run(_with_client(test))
@@ -0,0 +1,79 @@
+"""experiments.experiment_runner 的流水线模式 (对接 Ollama 桩服务)"""
+
+import time
+import threading
+
+import pytest
+
+from conftest import STUB_MODEL
+from experiments.experiment_runner import ExperimentRunner
+
+
+class SerialScorer:
+    """记录 score() 是否被并发调用"""
+
+    def __init__(self):
+        self.active = 0
+        self.overlapped = False
+        self._lock = threading.Lock()
+
+    def score(self, refs, hyps):
+        with self._lock:
+            self.active += 1
+            self.overlapped |= self.active > 1
+        time.sleep(0.02)
+        with self._lock:
+            self.active -= 1
+        return [-1.0] * len(hyps)
+
+
+@pytest.mark.parametrize("kwargs", [{"max_per_host": 0}, {"quality_workers": 0}])
+def test_pipeline_rejects_bad_settings(tmp_path, kwargs):
+    runner = ExperimentRunner(output_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        runner.run_experiment_suite([], output_file=str(tmp_path / "r.jsonl"), pipeline=True, **kwargs)
+
+
+def test_pipeline_serialises_scorer(stub_ollama, tmp_path, monkeypatch):
+    import experiments.experiment_runner as runner_module
+    monkeypatch.setattr(runner_module, "BARTSCORE_AVAILABLE", True)
+    runner = ExperimentRunner(output_dir=str(tmp_path), ollama_host=stub_ollama)
+    runner.bart_scorer = scorer = SerialScorer()
+    cases = [{"model": STUB_MODEL, "prompt": f"问题 {i}", "task_type": "knowledge_qa", "max_tokens": 8,
+              "reference_text": "参考答案"} for i in range(6)]
+    results = runner.run_experiment_suite(cases, output_file=str(tmp_path / "r.jsonl"), pipeline=True,
+                                          max_per_host=3, quality_workers=3)
+    assert len(results) == len(cases)
+    assert all(r["quality"]["bartscore"] == -1.0 for r in results)
+    assert not scorer.overlapped
+
+
+def test_runners_share_result_fields(stub_ollama, tmp_path, monkeypatch):
+    """两个实验入口的结果由同一个 build_result 整理; 缺少 eval_count 时按模型 family 选择分词器"""
+    import experiments.case_result as case_result
+    from experiments import ollama_client, simple_experiment
+    from experiments.monitor import ResourceMonitor
+
+    counted = []
+
+    def count_tokens(text, model, family=None):
+        counted.append((model, family))
+        return 7, "approx"
+
+    monkeypatch.setattr(case_result, "count_tokens", count_tokens)
+    mon = ResourceMonitor(interval=0.2)
+    mon.start()
+    response = ollama_client.generate_stream(STUB_MODEL, "问题", options={"num_predict": 8}, host=stub_ollama)
+    mon.stop()
+    response["total_time"] = response["t_done"] - response["t_request"]
+    response["eval_count"] = None
+
+    runner = ExperimentRunner(output_dir=str(tmp_path), ollama_host=stub_ollama)
+    full = runner.finalize_result(STUB_MODEL, "问题", "knowledge_qa", response, mon)
+    monkeypatch.setattr(simple_experiment, "call_ollama_generate", lambda *a, **k: dict(response))
+    simple = simple_experiment.run_single_experiment(STUB_MODEL, "问题", "knowledge_qa")
+
+    assert counted == [(STUB_MODEL, "stub"), (STUB_MODEL, "stub")]
+    assert full["token_count"] == simple["token_count"] == 7
+    assert full["token_count_method"] == "approx"
+    assert set(full) - set(simple) == {"quality"}
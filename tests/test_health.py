@@ -0,0 +1,56 @@
+"""
+健康检查: 结果缓存一项报告缓存统计, 只在二级缓存为 Redis 时探测 Redis
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from src.backend.services.health import DEGRADED, DISABLED, OK, HealthChecker
+from src.backend.core.metrics import MetricsRegistry
+from src.backend.services.result_cache import MemoryBackend, ResultCache
+
+
+class PingCounter(MemoryBackend):
+    """记录 ping 次数的二级缓存, name 为缓存报告的后端类型"""
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.pings = 0
+
+    async def ping(self) -> None:
+        self.pings += 1
+
+
+def _check(cache):
+    checker = HealthChecker(SimpleNamespace(result_cache=cache), ttl=0)
+    return asyncio.run(checker.check("cache"))
+
+
+def test_memory_backend_reports_stats():
+    backend = PingCounter("memory")
+    result = _check(ResultCache(backend=backend, enabled=True, registry=MetricsRegistry()))
+    assert result["status"] == OK
+    assert result["backend"] == "memory"
+    assert result["entries"] == 0
+    assert backend.pings == 0
+
+
+def test_redis_backend_is_pinged():
+    backend = PingCounter("redis")
+    result = _check(ResultCache(backend=backend, enabled=True, registry=MetricsRegistry()))
+    assert result["status"] == OK
+    assert result["backend"] == "redis"
+    assert backend.pings == 1
+
+
+def test_redis_unreachable_at_startup_is_degraded(monkeypatch):
+    monkeypatch.setattr("src.backend.core.config.settings.CACHE_BACKEND", "redis")
+    result = _check(ResultCache(backend=None, enabled=True, registry=MetricsRegistry()))
+    assert result["status"] == DEGRADED
+    assert result["backend"] is None
+
+
+def test_disabled_cache():
+    result = _check(ResultCache(enabled=False, registry=MetricsRegistry()))
+    assert result["status"] == DISABLED
@@ -0,0 +1,25 @@
+"""
+排行榜: 只读连接可打开路径中带有 URI 特殊字符 (空格 ? # %) 的数据库文件
+"""
+
+import os
+import json
+
+from conftest import STUB_MODEL
+from src.evaluation.leaderboard import Leaderboard
+
+
+def test_readonly_path_with_uri_characters(tmp_path):
+    exp_dir = tmp_path / "exp"
+    raw = exp_dir / "raw" / STUB_MODEL.replace(":", "_")
+    raw.mkdir(parents=True)
+    with open(raw / "qa_short_r1.json", "w", encoding="utf-8") as f:
+        json.dump({"model": STUB_MODEL, "latency_seconds": 2.0, "throughput_tokens_per_sec": 10.0,
+                   "metadata": {"task": "qa", "load": "short", "run_idx": 1}}, f)
+    db = os.path.join(tmp_path, "lb #1 ?50%", "leaderboard.sqlite")
+    writer = Leaderboard(db)
+    writer.update([str(exp_dir)])
+    writer.close()
+
+    rows = Leaderboard(db, readonly=True).query(task="qa", limit=None)
+    assert [(r["model"], r["load"], r["latency"]) for r in rows] == [(STUB_MODEL, "short", 2.0)]
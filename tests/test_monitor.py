@@ -0,0 +1,64 @@
+"""
+ResourceMonitor 的CPU利用率: 每个监控器按自己的基准计算, 并发的监控器互不重置统计区间
+"""
+
+from collections import namedtuple
+from types import SimpleNamespace
+
+import pytest
+
+from experiments import monitor
+from experiments.monitor import ResourceMonitor
+
+CpuTimes = namedtuple("CpuTimes", "user system idle iowait")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可控的系统CPU时间与 ollama 进程"""
+    state = SimpleNamespace(busy=0.0, idle=0.0, procs={})
+
+    def cpu_times():
+        return CpuTimes(state.busy, 0.0, state.idle, 0.0)
+
+    def process_iter(attrs=None):
+        for pid, used in state.procs.items():
+            yield SimpleNamespace(pid=pid, info={"pid": pid, "name": "ollama"},
+                                  cpu_times=lambda used=used: SimpleNamespace(user=used, system=0.0))
+
+    monkeypatch.setattr(monitor.psutil, "cpu_times", cpu_times)
+    monkeypatch.setattr(monitor.psutil, "process_iter", process_iter)
+    return state
+
+
+def test_concurrent_monitors_keep_their_own_baseline(clock):
+    a = ResourceMonitor()
+    a._cpu_last = monitor._cpu_busy_total(monitor.psutil.cpu_times())
+    clock.busy, clock.idle = 3.0, 1.0          # a 的区间: 75%
+    b = ResourceMonitor()
+    b._cpu_last = monitor._cpu_busy_total(monitor.psutil.cpu_times())
+    clock.busy, clock.idle = 4.0, 4.0          # b 的区间: 1 / 4 = 25%
+    assert b._system_cpu_percent() == pytest.approx(25.0)
+    # b 的采样不影响 a: a 的区间为 4 / 8
+    assert a._system_cpu_percent() == pytest.approx(50.0)
+    clock.busy, clock.idle = 4.0, 6.0
+    assert a._system_cpu_percent() == pytest.approx(0.0)
+    assert b._system_cpu_percent() == pytest.approx(0.0)
+
+
+def test_ollama_process_cpu(clock):
+    m = ResourceMonitor()
+    clock.procs = {10: 1.0}
+    assert m._ollama_cpu_percent(100.0) == 0.0   # 首次出现只建立基准
+    clock.procs = {10: 1.5, 11: 7.0}
+    assert m._ollama_cpu_percent(101.0) == pytest.approx(50.0)
+    clock.procs = {10: 2.5, 11: 8.0}
+    assert m._ollama_cpu_percent(102.0) == pytest.approx(200.0)
+
+
+def test_monitor_records_samples():
+    m = ResourceMonitor(interval=0.05)
+    m.start()
+    m.stop()
+    assert len(m.cpu_percent) == len(m.timestamps) == len(m.cpu_proc_percent) >= 1
+    assert all(0.0 <= v <= 100.0 for v in m.cpu_percent)
@@ -0,0 +1,66 @@
+"""
+多样性指标: distinct-n、重复率、熵与 self-BLEU 的手算值
+"""
+
+import math
+
+import pytest
+
+from experiments.quality import diversity_metrics, tokenize
+
+
+def test_tokenize_cjk_and_words():
+    assert tokenize("你好, AI model 2024!") == ["你", "好", "AI", "model", "2024"]
+
+
+def test_distinct_repetition_entropy():
+    # a b a b: 一元 {a, b} / 4, 二元 {ab, ba} / 3 (ab 出现两次), 三元 {aba, bab} / 2
+    r = diversity_metrics(["a b a b"], rep_n=2, self_bleu=False)[0]
+    assert r["distinct_1"] == pytest.approx(2 / 4)
+    assert r["distinct_2"] == pytest.approx(2 / 3)
+    assert r["distinct_3"] == pytest.approx(1.0)
+    assert r["repetition_rate"] == pytest.approx(1 - 2 / 3)
+    assert r["entropy"] == pytest.approx(1.0)
+    assert r["length_tokens"] == 4
+    assert "self_bleu" not in r
+
+
+def test_entropy_and_short_text():
+    # 你你你好: p = 3/4, 1/4
+    r = diversity_metrics(["你你你好", "x"], self_bleu=False)
+    assert r[0]["entropy"] == pytest.approx(-(0.75 * math.log2(0.75) + 0.25 * math.log2(0.25)))
+    assert r[0]["distinct_1"] == pytest.approx(2 / 4)
+    # 短于n的文本: distinct_n 与重复率记 0
+    assert (r[1]["distinct_1"], r[1]["distinct_2"], r[1]["repetition_rate"]) == (1.0, 0.0, 0.0)
+
+
+def test_self_bleu_hand_computed():
+    # 一元: 命中 a, b -> (2+1)/(3+1); 二元: 命中 ab -> (1+1)/(2+1); 长度相同无长度惩罚
+    expected = math.sqrt(3 / 4 * 2 / 3)
+    r = diversity_metrics(["a b c", "a b d"], max_n=2)
+    assert [x["self_bleu"] for x in r] == pytest.approx([expected, expected])
+
+
+def test_self_bleu_clips_against_other_texts_only():
+    # "a a" 的参考 (其余文本) 中 a 最多出现 1 次; "a" 的参考中最多 2 次; "b" 没有命中
+    r = diversity_metrics(["a a", "a", "b"], max_n=1)
+    assert [x["self_bleu"] for x in r] == pytest.approx([2 / 3, 1.0, 1 / 2])
+
+
+def test_self_bleu_brevity_penalty():
+    # "a b" 最接近的参考长度为 4: 惩罚 exp(1 - 4/2)
+    r = diversity_metrics(["a b c d", "a b"], max_n=1)
+    assert [x["self_bleu"] for x in r] == pytest.approx([3 / 5, math.exp(-1)])
+
+
+def test_self_bleu_texts_shorter_than_max_n():
+    # 所有文本都短于3个token: 跳过没有n-gram的阶, 相同文本的 self-BLEU 为 1
+    r = diversity_metrics(["a b", "a b"], max_n=3)
+    assert [x["self_bleu"] for x in r] == pytest.approx([1.0, 1.0])
+    # "x": 一元精度 (0+1)/(1+1), 参考长度 2 的长度惩罚 exp(1 - 2/1)
+    r = diversity_metrics(["x", "a b"], max_n=3)
+    assert r[0]["self_bleu"] == pytest.approx(1 / 2 * math.exp(-1))
+
+
+def test_self_bleu_single_text():
+    assert diversity_metrics(["a b c"])[0]["self_bleu"] is None
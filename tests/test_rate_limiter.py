@@ -0,0 +1,87 @@
+"""
+限流: 令牌桶的补充与扣减、拒绝时的 Retry-After, 以及提交接口的 429 响应头
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Response
+
+from src.backend.api.v1.endpoints.evaluations import rate_limit
+from src.backend.core.exceptions import TooManyRequestsError
+from src.backend.services import rate_limiter
+from src.backend.services.rate_limiter import MemoryBackend, RateLimiter, take
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """rate_limiter 模块使用的单调时钟, 由测试推进"""
+    now = SimpleNamespace(t=1000.0)
+    monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(monotonic=lambda: now.t))
+    return now
+
+
+def test_take_refills_and_rejects_without_deducting():
+    buckets = [(2.0, 1.0), (5.0, 0.1)]
+    tokens = [2.0, 5.0]
+    assert take(tokens, 0.0, buckets, 1.0) == (True, 0.0)
+    assert take(tokens, 0.0, buckets, 1.0) == (True, 0.0)
+    assert tokens == [0.0, 3.0]
+    # 第一个桶不足: 拒绝且不扣减, 等待时间为补足所需
+    allowed, wait = take(tokens, 0.25, buckets, 1.0)
+    assert not allowed and wait == pytest.approx(0.75)
+    assert tokens == pytest.approx([0.25, 3.025])
+    # 补充不超过容量; 两个桶都不足时取较长的等待
+    assert take(tokens, 100.0, buckets, 1.0) == (True, 0.0)
+    assert tokens == pytest.approx([1.0, 4.0])
+    tokens = [0.0, 0.5]
+    allowed, wait = take(tokens, 0.0, buckets, 1.0)
+    assert not allowed and wait == pytest.approx(5.0)
+
+
+def test_limiter_minute_and_hour_buckets(clock):
+    async def run():
+        limiter = RateLimiter(per_minute=2, per_hour=3, backend=MemoryBackend(), enabled=True)
+        results = [await limiter.check("ip:a") for _ in range(3)]
+        assert [r.allowed for r in results] == [True, True, False]
+        assert [r.remaining for r in results] == [1, 0, 0]
+        # 每分钟 2 个令牌: 补足 1 个需要 30 秒
+        assert results[2].retry_after == pytest.approx(30.0)
+        assert results[2].limit == 2
+        # 其他客户端各自计数
+        assert (await limiter.check("ip:b")).allowed
+
+        clock.t += 30.0
+        assert (await limiter.check("ip:a")).allowed
+        # 每小时 3 个已用完: 等待由小时桶决定 (剩余 0.025 个, 每秒补充 1/1200 个)
+        clock.t += 60.0
+        result = await limiter.check("ip:a")
+        assert not result.allowed
+        assert result.retry_after == pytest.approx((1 - 90 / 1200) * 1200)
+
+        disabled = RateLimiter(per_minute=1, per_hour=1, enabled=False)
+        assert all([(await disabled.check("ip:a")).allowed for _ in range(3)])
+
+    asyncio.run(run())
+
+
+def test_rate_limit_dependency_sets_headers(clock):
+    async def run():
+        limiter = RateLimiter(per_minute=1, per_hour=100, backend=MemoryBackend(), enabled=True)
+        request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(rate_limiter=limiter)),
+                                  headers={"x-api-key": "secret"}, client=SimpleNamespace(host="10.0.0.1"))
+        response = Response()
+        await rate_limit(request, response)
+        assert response.headers["X-RateLimit-Limit"] == "1"
+        assert response.headers["X-RateLimit-Remaining"] == "0"
+
+        clock.t += 59.2
+        with pytest.raises(TooManyRequestsError) as exc:
+            await rate_limit(request, Response())
+        # 还需 0.8 秒, Retry-After 向上取整到整秒
+        assert exc.value.status_code == 429
+        assert exc.value.headers["Retry-After"] == "1"
+        assert exc.value.headers["X-RateLimit-Remaining"] == "0"
+
+    asyncio.run(run())
@@ -0,0 +1,53 @@
+"""
+实验记录入库: 列出后被删除的记录文件跳过, 其已入库的行随之移除
+"""
+
+import os
+import json
+import asyncio
+
+from conftest import STUB_MODEL
+from src.backend.core.database import create_engine, create_tables
+from src.backend.services.record_store import RecordStore
+from src.evaluation import records
+
+
+def _write_record(exp_dir, name):
+    path = os.path.join(exp_dir, "raw", STUB_MODEL.replace(":", "_"), name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    task, load, run = os.path.splitext(name)[0].split("_")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"model": STUB_MODEL, "latency_seconds": 1.0,
+                   "metadata": {"task": task, "load": load, "run_idx": int(run[1:])}}, f)
+    return path
+
+
+def test_file_removed_during_import_is_skipped(tmp_path, monkeypatch):
+    exp_dir = str(tmp_path / "exp")
+    _write_record(exp_dir, "qa_short_r1.json")
+    removed = _write_record(exp_dir, "qa_short_r2.json")
+
+    async def run():
+        engine = create_engine(f"sqlite:///{tmp_path / 'records.sqlite'}")
+        await create_tables(engine)
+        store = RecordStore(engine)
+        try:
+            assert (await store.import_experiment(exp_dir))["parsed"] == 2
+
+            # 目录列出之后、读取文件状态之前记录被删除
+            list_raw_files = records.list_raw_files
+
+            def list_then_remove(path):
+                files = list_raw_files(path)
+                os.remove(removed)
+                return files
+
+            monkeypatch.setattr(records, "list_raw_files", list_then_remove)
+            _write_record(exp_dir, "qa_short_r3.json")
+            info = await store.import_experiment(exp_dir)
+            assert info == {"parsed": 1, "samples": 0, "skipped": 1, "removed": 1}
+            assert (await store.counts())["runs"] == 2
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,57 @@
+"""
+结果缓存: 多个工作进程 (各自的一级缓存, 共享二级缓存) 在排行榜写入后不经失效通知即返回新数据
+"""
+
+import json
+import asyncio
+
+from conftest import STUB_MODEL
+from src.backend.core.metrics import MetricsRegistry
+from src.backend.services.result_cache import MemoryBackend, ResultCache
+from src.evaluation.leaderboard import Leaderboard
+
+
+def _write_record(exp_dir, run_idx, latency):
+    raw = exp_dir / "raw" / STUB_MODEL.replace(":", "_")
+    raw.mkdir(parents=True, exist_ok=True)
+    with open(raw / f"qa_short_r{run_idx}.json", "w", encoding="utf-8") as f:
+        json.dump({"model": STUB_MODEL, "latency_seconds": latency, "throughput_tokens_per_sec": 10.0,
+                   "metadata": {"task": "qa", "load": "short", "run_idx": run_idx}}, f)
+
+
+def test_workers_see_leaderboard_writes_without_invalidation(tmp_path):
+    exp_dir = tmp_path / "exp"
+    db = str(tmp_path / "leaderboard.sqlite")
+    _write_record(exp_dir, 1, 2.0)
+    writer = Leaderboard(db)
+    writer.update([str(exp_dir)])
+
+    async def run():
+        shared = MemoryBackend()
+        workers = [ResultCache(backend=shared, registry=MetricsRegistry()) for _ in range(2)]
+        readers = [Leaderboard(db, readonly=True) for _ in workers]
+
+        async def query(i):
+            lb = readers[i]
+            rows = await workers[i].get_or_compute(
+                "leaderboard", {"version": lb.version()},
+                lambda: [r["runs"] for r in lb.query(task="qa", limit=None)])
+            return rows
+
+        assert [await query(0), await query(1)] == [[1], [1]]
+        assert len(workers[0].local) == len(workers[1].local) == 1
+
+        # 写入改变数据库版本, 两个进程都不再命中旧条目
+        _write_record(exp_dir, 2, 4.0)
+        writer.update([str(exp_dir)])
+        assert [await query(0), await query(1)] == [[2], [2]]
+        assert [await query(0), await query(1)] == [[2], [2]]
+        assert workers[0].misses.values[("leaderboard",)] == 2
+        assert ("leaderboard",) not in workers[1].misses.values
+        for lb in readers:
+            lb.close()
+
+    try:
+        asyncio.run(run())
+    finally:
+        writer.close()
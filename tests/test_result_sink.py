@@ -0,0 +1,47 @@
+"""experiments.result_sink 的崩溃恢复"""
+
+import os
+
+import pytest
+
+from experiments.result_sink import open_sink, read_results
+
+
+@pytest.mark.parametrize("ext", ["jsonl", "json", "parquet"])
+def test_unclosed_sink_is_readable(tmp_path, ext):
+    """未关闭 (崩溃) 时已写入的记录可读回; 下一次运行不追加到遗留的 .part"""
+    if ext == "parquet":
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"results.{ext}")
+    crashed = open_sink(path, batch_size=3)
+    for i in range(5):
+        crashed.write({"model": "m", "task_type": "qa", "i": i})
+    assert [r["i"] for r in read_results(path)] == list(range(5))
+
+    sink = open_sink(path, batch_size=3)
+    sink.write({"model": "m", "task_type": "qa", "i": 99})
+    sink.close()
+    assert [r["i"] for r in read_results(path)] == [99]
+    assert not os.path.exists(path + ".part")
+
+
+def test_interrupted_simple_experiment_keeps_part(tmp_path, monkeypatch):
+    """simple_experiment 中断时不把部分结果改名为完整输出"""
+    from experiments import simple_experiment
+
+    calls = []
+
+    def run_single_experiment(**case):
+        calls.append(case)
+        if len(calls) > 1:
+            raise KeyboardInterrupt
+        return {"model": case["model"], "task_type": case["task_type"], "i": len(calls)}
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(simple_experiment, "run_single_experiment", run_single_experiment)
+    with pytest.raises(KeyboardInterrupt):
+        simple_experiment.main()
+    names = os.listdir(tmp_path / "results")
+    assert len(names) == 1 and names[0].endswith(".jsonl.part")
+    path = str(tmp_path / "results" / names[0][:-len(".part")])
+    assert [r["i"] for r in read_results(path)] == [1]
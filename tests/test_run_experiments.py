@@ -0,0 +1,30 @@
+"""experiments.run_experiments 的矩阵运行 (对接 Ollama 桩服务)"""
+
+import os
+import sys
+import subprocess
+
+from conftest import PROJECT_ROOT, STUB_MODEL
+from src.evaluation.leaderboard import Leaderboard
+
+
+def test_matrix_keeps_each_load(stub_ollama, tmp_path):
+    """每个负载各自落盘, 排行榜按负载分格"""
+    exp_dir = tmp_path / "exp"
+    db = tmp_path / "leaderboard.sqlite"
+    env = dict(os.environ, OLLAMA_HOST=stub_ollama, PYTHONIOENCODING="utf-8")
+    subprocess.run([sys.executable, "-m", "experiments.run_experiments", "--models", STUB_MODEL,
+                    "--tasks", "qa", "--loads", "short", "medium", "long", "--runs", "1",
+                    "--exp-dir", str(exp_dir), "--leaderboard", str(db)],
+                   cwd=PROJECT_ROOT, env=env, check=True, capture_output=True, timeout=300)
+
+    raw = sorted(os.listdir(exp_dir / "raw" / STUB_MODEL.replace(":", "_")))
+    assert raw == ["qa_long_r1.json", "qa_medium_r1.json", "qa_short_r1.json"]
+
+    board = Leaderboard(str(db), readonly=True)
+    try:
+        rows = board.query(task="qa", limit=None)
+        assert sorted(r["load"] for r in rows) == ["long", "medium", "short"]
+        assert all(r["runs"] == 1 for r in rows)
+    finally:
+        board.close()
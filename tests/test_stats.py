@@ -0,0 +1,112 @@
+"""
+统计显著性: Holm 校正与手算结果一致, 自助法置信区间在正态样本上的覆盖率,
+置换检验的精确 p 值, 以及追加运行次数的正态近似估算 (均使用固定种子)
+"""
+
+import math
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.evaluation.stats import _holm, bootstrap_ci, pairwise_tests, runs_needed
+
+
+def _frame(values, block=None):
+    """{模型: [观测值]} (或 {模型: {区组: [观测值]}}) -> 长表"""
+    rows = []
+    for model, v in values.items():
+        for b, obs in (v.items() if block else [(None, v)]):
+            rows += [dict(model=model, value=x, **({block: b} if block else {})) for x in obs]
+    return pd.DataFrame(rows)
+
+
+def test_holm_matches_hand_computed():
+    # 升序: 0.005 x 4 = 0.02, 0.01 x 3 = 0.03, 0.03 x 2 = 0.06, 0.04 x 1 = 0.04 -> 单调化为 0.06
+    assert _holm([0.01, 0.04, 0.03, 0.005]) == pytest.approx([0.03, 0.06, 0.06, 0.02])
+    # 截断到 1, 且保持单调
+    assert _holm([0.5, 0.6]) == pytest.approx([1.0, 1.0])
+    assert _holm([0.02]) == pytest.approx([0.02])
+
+
+def test_bootstrap_ci_covers_normal_mean():
+    rng = np.random.default_rng(42)
+    n_samples, n = 200, 30
+    df = pd.DataFrame({"model": np.repeat(np.arange(n_samples), n), "value": rng.normal(10.0, 2.0, n_samples * n)})
+    ci = bootstrap_ci(df, "value", n_boot=1000, seed=7, max_workers=0)
+    assert len(ci) == n_samples and (ci["n"] == n).all()
+    assert np.allclose(ci["mean"], df.groupby("model")["value"].mean())
+    # 标准误 2 / sqrt(30): 区间宽度约 2 x 1.96 x 0.365
+    assert (ci["ci_high"] - ci["ci_low"]).mean() == pytest.approx(2 * 1.96 * 2.0 / math.sqrt(n), rel=0.1)
+    coverage = ((ci["ci_low"] <= 10.0) & (10.0 <= ci["ci_high"])).mean()
+    assert 0.88 <= coverage <= 0.99
+    # 固定种子结果可复现, 与并行与否无关
+    again = bootstrap_ci(df, "value", n_boot=1000, seed=7, max_workers=4)
+    pd.testing.assert_frame_equal(ci, again)
+
+
+def test_bootstrap_ci_blocks_and_single_runs():
+    df = _frame({"a": {"qa": [1.0, 3.0], "code": [10.0, 10.0]}, "b": {"qa": [5.0], "code": [7.0]}}, block="task")
+    ci = bootstrap_ci(df, "value", block="task", n_boot=500, seed=0).set_index("model")
+    # 均值取各任务均值的平均
+    assert ci.loc["a", "mean"] == pytest.approx((2.0 + 10.0) / 2)
+    assert (ci.loc["a", "n"], ci.loc["a", "min_runs"]) == (4, 2)
+    assert (ci.loc["a", "ci_low"], ci.loc["a", "ci_high"]) == pytest.approx((5.5, 6.5))
+    # 每格只有 1 次运行: 区间退化为点
+    assert ci.loc["b", "ci_low"] == ci.loc["b", "ci_high"] == ci.loc["b", "mean"] == 6.0
+    assert ci.loc["b", "min_runs"] == 1
+
+
+def test_pairwise_permutation_p_values():
+    df = _frame({"a": [1.0, 2.0, 3.0], "b": [4.0, 5.0, 6.0], "c": [1.0, 2.0, 3.0]})
+    tests = pairwise_tests(df, "value", n_perm=20000, seed=3, max_workers=0).set_index(["a", "b"])
+    # 6 个值分为两组共 20 种, |差值| >= 3 的只有 2 种: 精确 p = 0.1
+    assert tests.loc[("a", "b"), "diff"] == pytest.approx(-3.0)
+    assert tests.loc[("a", "b"), "p_value"] == pytest.approx(0.1, abs=0.01)
+    assert tests.loc[("b", "c"), "p_value"] == pytest.approx(0.1, abs=0.01)
+    # 两组相同: 所有置换都不比观测值更小
+    assert tests.loc[("a", "c"), "diff"] == 0.0
+    assert tests.loc[("a", "c"), "p_value"] == 1.0
+    assert np.allclose(tests["p_holm"], _holm(tests["p_value"].to_numpy()))
+    again = pairwise_tests(df, "value", n_perm=20000, seed=3, max_workers=4).set_index(["a", "b"])
+    pd.testing.assert_frame_equal(tests, again)
+
+
+def test_pairwise_blocks():
+    # 任务量纲相差 100 倍; 只比较共同的区组, 没有共同区组时 p 值为 NaN
+    df = _frame({"a": {"qa": [1.0, 2.0], "code": [100.0, 200.0]},
+                 "b": {"qa": [2.0, 3.0], "code": [200.0, 300.0]},
+                 "c": {"math": [1.0, 2.0]}}, block="task")
+    tests = pairwise_tests(df, "value", block="task", n_perm=2000, seed=0).set_index(["a", "b"])
+    assert tests.loc[("a", "b"), "diff"] == pytest.approx((-1.0 - 100.0) / 2)
+    assert tests.loc[("a", "b"), "blocks"] == 2
+    assert tests.loc[("a", "c"), "blocks"] == 0
+    assert np.isnan(tests.loc[("a", "c"), "p_value"]) and np.isnan(tests.loc[("a", "c"), "p_holm"])
+    # 只有一个有效比较时 Holm 校正不改变 p 值
+    assert tests.loc[("a", "b"), "p_holm"] == tests.loc[("a", "b"), "p_value"]
+
+
+def test_runs_needed_normal_approximation():
+    z = NormalDist().inv_cdf(0.975) + NormalDist().inv_cdf(0.8)
+    # 合并方差 (2 + 2) / 2 = 2, 差值 2: 每组需要 2 x (z x sqrt(2) / 2)^2 = z^2 = 7.85 -> 8 次
+    df = _frame({"a": [10.0, 12.0], "b": [8.0, 10.0]})
+    row = runs_needed(df, "value").iloc[0]
+    assert (row["a"], row["b"], row["diff"]) == ("a", "b", 2.0)
+    assert row["noise_sd"] == pytest.approx(math.sqrt(2))
+    assert (row["runs_per_cell"], row["required"], row["additional"]) == (2, math.ceil(z ** 2), math.ceil(z ** 2) - 2)
+    # 越低越好时排名相反, 差值为负
+    row = runs_needed(df, "value", higher_is_better=False).iloc[0]
+    assert (row["a"], row["b"], row["diff"]) == ("b", "a", -2.0)
+
+
+def test_runs_needed_edge_cases():
+    single = runs_needed(_frame({"a": [2.0], "b": [1.0]}), "value").iloc[0]
+    assert single["required"] is None and single["additional"] == 1 and "1 次运行" in single["note"]
+    flat = runs_needed(_frame({"a": [2.0, 2.0], "b": [1.0, 1.0]}), "value").iloc[0]
+    assert (flat["required"], flat["additional"], flat["note"]) == (2, 0, "运行间无波动")
+    tiny = runs_needed(_frame({"a": [10.0, 12.0], "b": [9.99, 11.99]}), "value", max_runs=1000).iloc[0]
+    assert tiny["required"] > 1000 and tiny["additional"] is None
+    # 差值大时至少 2 次
+    wide = runs_needed(_frame({"a": [100.0, 101.0], "b": [0.0, 1.0]}), "value").iloc[0]
+    assert (wide["required"], wide["additional"]) == (2, 0)
@@ -0,0 +1,191 @@
+"""
+任务调度器: 提交时的 429 (队列已满、预计排队过久)、按显存预算准入与防饿死,
+出队与数据库认领 (认领在条件锁外进行, 失败时放回队列并唤醒其他工作协程)
+"""
+
+import time
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.backend.core.config import settings
+from src.backend.core.exceptions import TooManyRequestsError
+from src.backend.services.model_cache import ModelCache
+from src.backend.services.task_scheduler import EvaluationJob, TaskScheduler
+
+# 每个模型的显存 (MB); 预算可同时容纳 big + small, 不能容纳两个 big
+MODEL_MB = {"big": 6000.0, "small": 2000.0}
+BUDGET_MB = 8000.0
+
+
+@pytest.fixture
+def admission(tmp_path, monkeypatch):
+    """不启动工作协程的调度器 (任务停留在队列中), 模型缓存使用固定的显存预算"""
+    monkeypatch.setattr(settings, "MODEL_VRAM_OVERHEAD", 1.0)
+    monkeypatch.setattr(settings, "EVALUATION_CASE_SECONDS", 60.0)
+    monkeypatch.setattr(settings, "EVALUATION_AGING_FACTOR", 0.0)
+    monkeypatch.setattr(settings, "EVALUATION_MAX_QUEUE_WAIT", 0)
+    model_cache = ModelCache(host="http://unused", budget_mb=BUDGET_MB)
+    model_cache._sizes = dict(MODEL_MB)
+    scheduler = TaskScheduler(max_workers=2, max_model_concurrency=2, output_dir=str(tmp_path),
+                              model_cache=model_cache)
+    scheduler._cond = asyncio.Condition()
+    return scheduler
+
+
+def _spec(model, runs=1):
+    return {"models": [model], "tasks": ["qa"], "loads": ["short"], "runs": runs}
+
+
+def _start(scheduler, job_id, model, estimated, completed=0, total=2):
+    """模拟运行中的任务: 预计耗时 estimated 秒, 已完成 completed/total 个用例"""
+    job = EvaluationJob(job_id, _spec(model), "unused", total)
+    job.status, job.started_at = "running", time.time()
+    job.estimated_seconds, job.completed = estimated, completed
+    job.vram_mb = MODEL_MB[model]
+    scheduler._running[job.id] = job
+    scheduler.model_cache.reserve(job.id, job.vram_mb)
+    return job
+
+
+def test_submit_rejects_when_queue_full(admission):
+    async def run():
+        admission.queue_capacity = 2
+        _start(admission, "r1", "small", estimated=120.0, completed=1)
+        _start(admission, "r2", "small", estimated=300.0)
+        for _ in range(2):
+            await admission.submit(_spec("small"))
+        with pytest.raises(TooManyRequestsError) as exc:
+            await admission.submit(_spec("small"))
+        # Retry-After: 最早结束的运行中任务的剩余耗时 (120 x 1/2)
+        assert exc.value.status_code == 429
+        assert exc.value.headers["Retry-After"] == "60"
+        assert exc.value.details == {"queue_size": 2}
+        assert len(admission._pending) == 2
+
+    asyncio.run(run())
+
+
+def test_submit_rejects_when_queue_wait_too_long(admission, monkeypatch):
+    async def run():
+        monkeypatch.setattr(settings, "EVALUATION_MAX_QUEUE_WAIT", 100)
+        _start(admission, "r1", "small", estimated=120.0, completed=1)
+        _start(admission, "r2", "small", estimated=120.0, completed=1)
+        # 预计排队 (60 + 60) / 2 = 60 秒: 接受
+        first = await admission.submit(_spec("small", runs=2))
+        assert admission.queue_eta(first) == pytest.approx(60.0)
+        # 同样 120 秒的任务排在 first 之后: (60 + 60 + 120) / 2 = 120 秒, 超出 20 秒
+        with pytest.raises(TooManyRequestsError) as exc:
+            await admission.submit(_spec("small", runs=2))
+        assert exc.value.headers["Retry-After"] == "20"
+        assert exc.value.details == {"queue_eta_seconds": 120.0, "max_queue_wait": 100}
+        assert admission._pending == [first]
+
+    asyncio.run(run())
+
+
+def test_vram_admission_and_starvation_cutoff(admission):
+    async def run():
+        big = await admission.submit(_spec("big"))
+        small = await admission.submit(_spec("small"))
+        assert (big.vram_mb, small.vram_mb) == (6000.0, 2000.0)
+        # 没有预留时总是准入队首任务
+        assert admission._select() is big
+        _start(admission, "r1", "big", estimated=600.0)
+        # big 超出剩余预算: 后面的 small 可以先执行
+        assert admission._select() is small
+        # big 等待超过 EVALUATION_STARVATION_SECONDS 后保留名额, small 不再插队
+        big.created_at -= settings.EVALUATION_STARVATION_SECONDS
+        assert admission._select() is None
+        # 运行中任务结束、显存释放后 big 准入
+        admission._running.pop("r1")
+        admission.model_cache.release("r1")
+        assert admission._select() is big
+        # 执行名额已满时不准入
+        _start(admission, "r2", "small", estimated=60.0)
+        _start(admission, "r3", "small", estimated=60.0)
+        assert admission._select() is None
+
+    asyncio.run(run())
+
+
+class BlockingJobStore:
+    """claim() 等待放行; fail 次数内抛出数据库错误"""
+
+    def __init__(self, fail=0):
+        self.fail = fail
+        self.entered = asyncio.Event()
+        self.release = asyncio.Event()
+        self.claims = []
+
+    async def claim(self, job_id, owner):
+        self.claims.append(job_id)
+        self.entered.set()
+        await self.release.wait()
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("database is locked")
+        return True
+
+
+def _scheduler(job_store, max_workers, poll_interval=3600.0):
+    scheduler = TaskScheduler(max_workers=max_workers, max_model_concurrency=max_workers,
+                              output_dir="unused", poll_interval=poll_interval, job_store=job_store,
+                              coordinator=SimpleNamespace(worker_id="w1", is_leader=True))
+    scheduler._cond = asyncio.Condition()
+    return scheduler
+
+
+def _enqueue(scheduler, *job_ids):
+    jobs = [EvaluationJob(job_id, {}, "unused", 1) for job_id in job_ids]
+    for job in jobs:
+        scheduler.jobs[job.id] = job
+        scheduler._pending.append(job)
+    return jobs
+
+
+def test_claim_runs_outside_condition_lock():
+    async def run():
+        store = BlockingJobStore()
+        scheduler = _scheduler(store, max_workers=2)
+        first, second = _enqueue(scheduler, "a", "b")
+
+        claiming = asyncio.create_task(scheduler._next_job())
+        await asyncio.wait_for(store.entered.wait(), 5)
+        # 认领进行中: 锁已释放, 任务占用执行名额, 另一个工作协程可出队下一个任务
+        assert not scheduler._cond.locked()
+        assert list(scheduler._running) == ["a"] and scheduler._pending == [second]
+        other = asyncio.create_task(scheduler._next_job())
+        await asyncio.sleep(0.01)
+        assert store.claims == ["a", "b"]
+
+        store.release.set()
+        assert {await claiming, await other} == {first, second}
+        assert first.owner == second.owner == "w1"
+
+    asyncio.run(run())
+
+
+def test_failed_claim_requeues_and_wakes_waiting_worker():
+    async def run():
+        store = BlockingJobStore(fail=1)
+        scheduler = _scheduler(store, max_workers=1)
+        job, = _enqueue(scheduler, "a")
+
+        retrying = asyncio.create_task(scheduler._next_job())
+        await asyncio.wait_for(store.entered.wait(), 5)
+        # 唯一的执行名额被认领中的任务占用, 第二个工作协程等待
+        waiting = asyncio.create_task(scheduler._next_job())
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+
+        # 认领失败: 任务放回队列并释放名额, 等待中的工作协程被唤醒后认领成功
+        store.release.set()
+        assert await asyncio.wait_for(waiting, 5) is job
+        assert store.claims == ["a", "a"]
+        assert list(scheduler._running) == ["a"] and scheduler._pending == []
+        retrying.cancel()
+        await asyncio.gather(retrying, return_exceptions=True)
+
+    asyncio.run(run())
@@ -0,0 +1,117 @@
+"""
+遥测扇出: 环形缓冲区覆盖与 overrun、按任务的资源采样降采样、片段事件的窗口合并、落后的订阅者
+"""
+
+import time
+import asyncio
+
+import pytest
+
+from src.backend.services.telemetry import TelemetryHub
+
+
+async def _take(stream, n, timeout=5):
+    """从订阅中读取 n 个事件 (跳过心跳)"""
+    out = []
+    while len(out) < n:
+        e = await asyncio.wait_for(stream.__anext__(), timeout)
+        if e is not None:
+            out.append(e)
+    return out
+
+
+def _sample(job, i):
+    return {"type": "sample", "job_id": job, "i": i}
+
+
+def test_ring_buffer_overwrite_and_overrun():
+    async def run():
+        hub = TelemetryHub(capacity=4)
+        stream = hub.subscribe(every=1)
+        for i in range(6):
+            hub.publish(_sample("a", i))
+        # 最旧的两个事件已被覆盖: 订阅者跳到最旧的事件, 先收到 overrun
+        assert hub.stats()["first_seq"] == 2 and hub.stats()["buffered"] == 4
+        events = await _take(stream, 5)
+        assert events[0]["type"] == "overrun" and events[0]["dropped"] == 2
+        assert [e["i"] for e in events[1:]] == [2, 3, 4, 5]
+        # 之后发布的事件不再有丢弃
+        hub.publish(_sample("a", 6))
+        assert [e["i"] for e in await _take(stream, 1)] == [6]
+        await stream.aclose()
+        assert hub.subscribers == 0
+
+    asyncio.run(run())
+
+
+def test_slow_subscriber_does_not_affect_others():
+    async def run():
+        hub = TelemetryHub(capacity=3)
+        fast = hub.subscribe(every=1)
+        slow = hub.subscribe(every=1, types=["sample"])
+        received = []
+        for i in range(8):
+            hub.publish(_sample("a", i))
+            received += await _take(fast, 1)
+        assert [e["i"] for e in received] == list(range(8))
+        # 落后的订阅者只能读到缓冲区中最近的事件; 未订阅 overrun 类型时不产出说明
+        assert [e["i"] for e in await _take(slow, 3)] == [5, 6, 7]
+        await asyncio.gather(fast.aclose(), slow.aclose())
+
+    asyncio.run(run())
+
+
+def test_sample_decimation_per_job():
+    async def run():
+        hub = TelemetryHub(capacity=64)
+        stream = hub.subscribe(every=3)
+        for i in range(7):
+            hub.publish(_sample("a", i))
+            if i < 2:
+                hub.publish(_sample("b", i))
+        hub.publish({"type": "job", "job_id": "a", "status": "succeeded"})
+        events = await _take(stream, 5)
+        # 每个任务分别计数: a 取第 0/3/6 条, b 取第 0 条; 其他类型不降采样
+        assert [(e["job_id"], e.get("i")) for e in events] == [("a", 0), ("b", 0), ("a", 3), ("a", 6), ("a", None)]
+        filtered = hub.subscribe(job_id="b", every=1, replay=64)
+        assert [e["i"] for e in await _take(filtered, 2)] == [0, 1]
+        await asyncio.gather(stream.aclose(), filtered.aclose())
+
+    asyncio.run(run())
+
+
+def test_token_window_aggregation():
+    async def run():
+        hub = TelemetryHub(capacity=64)
+        stream = hub.subscribe(window=60)
+        for i, (t, gap) in enumerate([(100.0, None), (100.5, 0.5), (101.0, 0.5), (102.0, 1.0)]):
+            hub.publish({"type": "token", "job_id": "a", "t": t, "chars": 2, "index": i, "gap": gap})
+        hub.publish({"type": "case_end", "job_id": "a", "t": 102.5})
+        tokens, end = await _take(stream, 2)
+        # 用例结束时合并窗口内的片段: 4 个片段, 2 秒 -> 1.5 片段/秒
+        assert end["type"] == "case_end"
+        assert tokens["type"] == "tokens" and tokens["job_id"] == "a"
+        assert (tokens["count"], tokens["chars"], tokens["index"], tokens["t"]) == (4, 8, 3, 102.0)
+        assert tokens["rate"] == pytest.approx(1.5)
+        assert tokens["gap_mean"] == pytest.approx(2.0 / 3)
+        assert tokens["gap_max"] == 1.0
+        await stream.aclose()
+
+    asyncio.run(run())
+
+
+def test_token_window_expires_and_raw_tokens():
+    async def run():
+        hub = TelemetryHub(capacity=64)
+        windowed = hub.subscribe(window=0.05)
+        raw = hub.subscribe(window=0)
+        now = time.time()
+        for i in range(3):
+            hub.publish({"type": "token", "job_id": "a", "t": now + i * 0.01, "chars": 1, "index": i})
+        # 窗口到期后不等用例结束即产出合并事件; window=0 时逐片段输出
+        (tokens,) = await _take(windowed, 1)
+        assert (tokens["count"], tokens["chars"], tokens["gap_mean"]) == (3, 3, None)
+        assert [e["index"] for e in await _take(raw, 3)] == [0, 1, 2]
+        await asyncio.gather(windowed.aclose(), raw.aclose())
+
+    asyncio.run(run())
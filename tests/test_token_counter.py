@@ -0,0 +1,43 @@
+"""
+分词器加载: 默认只使用本地文件, TOKENIZER_DOWNLOAD=1 或 allow_download=True 时才允许下载
+"""
+
+import sys
+import types
+
+import pytest
+
+from experiments.token_counter import TokenCounter
+
+
+@pytest.fixture
+def fake_transformers(monkeypatch):
+    """记录 AutoTokenizer.from_pretrained 的 local_files_only 参数"""
+    calls = []
+
+    def from_pretrained(repo, local_files_only=False, **kwargs):
+        calls.append(local_files_only)
+        raise OSError("not cached")
+
+    module = types.ModuleType("transformers")
+    module.AutoTokenizer = types.SimpleNamespace(from_pretrained=from_pretrained)
+    monkeypatch.setitem(sys.modules, "transformers", module)
+    for name in ("TOKENIZER_DIR", "TOKENIZER_DOWNLOAD", "HF_HUB_OFFLINE"):
+        monkeypatch.delenv(name, raising=False)
+    return calls
+
+
+@pytest.mark.parametrize("env, allow_download, local_only", [
+    (None, None, True),
+    ("1", None, False),
+    ("0", None, True),
+    (None, True, False),
+    ("1", False, True),
+])
+def test_download_is_opt_in(fake_transformers, monkeypatch, env, allow_download, local_only):
+    if env is not None:
+        monkeypatch.setenv("TOKENIZER_DOWNLOAD", env)
+    counter = TokenCounter(allow_download=allow_download)
+    count, method = counter.count("hello world", "qwen2.5:7b")
+    assert method == "approx" and count == 3
+    assert fake_transformers == [local_only]